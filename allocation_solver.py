@@ -0,0 +1,308 @@
+"""
+Constrained allocation solver for SLA-Smart Energy Arbitrage Platform
+
+Builds a linear/integer program over all sites and hardware classes:
+
+    maximize    sum(value[s, h] * x[s, h])
+    subject to  sum_h power[s, h] * x[s, h]              <= capacity[s]
+                sum_{h in inference} power[s, h] * x[s, h] >= firm_sla_power[s]
+                0 <= x[s, h] <= available[s, h],  x integer
+
+Constraints only couple hardware classes within a site, so the NumPy solver
+solves every site at once with a vectorized two-phase greedy (exact for the
+LP relaxation) followed by an integer repair pass. A SciPy MILP backend
+(exact, but slower past a few dozen sites) is available when SciPy is
+installed.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import logging
+import time
+
+import numpy as np
+
+from revenue_engine import FleetArrays, INFERENCE_MASK
+
+logger = logging.getLogger(__name__)
+
+# Treat values this close to zero as "no room left"
+EPSILON = 1e-9
+
+
+@dataclass
+class AllocationProblem:
+    """Dense allocation program, one row per site"""
+    site_ids: List[str]
+    value: np.ndarray           # (S, H) net value per unit
+    unit_power: np.ndarray      # (S, H) power per unit
+    available: np.ndarray       # (S, H) unit upper bounds
+    power_capacity: np.ndarray  # (S,)
+    firm_sla_power: np.ndarray  # (S,) power that must be served by inference hardware
+
+    @property
+    def shape(self):
+        return self.value.shape
+
+    def achievable_firm_power(self) -> np.ndarray:
+        """Firm SLA power capped at what each site's inference hardware can deliver"""
+        inference_power = (self.unit_power * self.available * INFERENCE_MASK).sum(axis=1)
+        return np.minimum(self.firm_sla_power, np.minimum(inference_power, self.power_capacity))
+
+
+@dataclass
+class AllocationSolution:
+    """Solver output"""
+    allocation: np.ndarray      # (S, H) unit counts
+    objective: float
+    status: str                 # optimal, feasible or infeasible
+    solver: str
+    solve_time_ms: float
+    infeasible_sites: List[str] = field(default_factory=list)
+    warm_started_sites: int = 0
+
+    def summary(self) -> Dict:
+        return {
+            "solver": self.solver,
+            "status": self.status,
+            "objective": self.objective,
+            "solve_time_ms": round(self.solve_time_ms, 3),
+            "infeasible_sites": self.infeasible_sites,
+            "warm_started_sites": self.warm_started_sites
+        }
+
+
+def build_allocation_problem(fleet: FleetArrays, prices: Dict, demand_multiplier: np.ndarray,
+                             firm_sla_power: Optional[Dict[str, float]] = None,
+                             energy_cost_per_kw: Optional[float] = None) -> AllocationProblem:
+    """Build the allocation program for a packed fleet.
+
+    Unit value matches calculate_site_revenue (token revenue scaled by cooling
+    efficiency, hash revenue unscaled, both scaled by timezone demand) minus
+    the site's energy cost for the unit's power draw.
+    """
+    token_value = fleet.output * prices.get("token_price", 1.0) * fleet.cooling_efficiency[:, None]
+    hash_value = fleet.output * prices.get("hash_price", 8.5)
+    gross = np.where(INFERENCE_MASK, token_value, hash_value) * demand_multiplier[:, None]
+
+    energy_price = prices.get("energy_price", 0.0) if energy_cost_per_kw is None else energy_cost_per_kw
+    energy_cost = fleet.unit_power / 1000 * energy_price * fleet.energy_cost_multiplier[:, None]
+
+    firm_sla_power = firm_sla_power or {}
+    return AllocationProblem(
+        site_ids=fleet.site_ids,
+        value=gross - energy_cost,
+        unit_power=fleet.unit_power,
+        available=fleet.available,
+        power_capacity=fleet.power_capacity,
+        firm_sla_power=np.array([firm_sla_power.get(site_id, 0.0) for site_id in fleet.site_ids], dtype=float),
+    )
+
+
+def _greedy_fill(value: np.ndarray, power: np.ndarray, upper: np.ndarray, budget: np.ndarray,
+                 columns: np.ndarray) -> np.ndarray:
+    """Fill each row's power budget with the highest value-per-power columns first.
+
+    Fractional knapsack per row, vectorized across rows. Only ``columns`` are
+    eligible and only columns with positive value are used.
+    """
+    density = np.where(power > 0, value / np.where(power > 0, power, 1), np.inf)
+    eligible = columns[None, :] & (value > 0) & (upper > 0)
+    density = np.where(eligible, density, -np.inf)
+    order = np.argsort(-density, axis=1)
+
+    rows = np.arange(value.shape[0])[:, None]
+    sorted_power = (power * upper)[rows, order]
+    sorted_power = np.where(eligible[rows, order], sorted_power, 0.0)
+    spent_before = np.cumsum(sorted_power, axis=1) - sorted_power
+    room = np.clip(budget[:, None] - spent_before, 0.0, None)
+
+    sorted_unit_power = power[rows, order]
+    take = np.where(sorted_unit_power > 0, room / np.where(sorted_unit_power > 0, sorted_unit_power, 1), np.inf)
+    take = np.minimum(take, upper[rows, order])
+    take = np.where(eligible[rows, order], take, 0.0)
+
+    result = np.zeros_like(value)
+    result[rows, order] = take
+    return result
+
+
+class NumpyAllocationSolver:
+    """Vectorized greedy LP solver with integer repair, no external dependencies"""
+    name = "numpy"
+
+    def solve(self, problem: AllocationProblem, warm_start: Optional[np.ndarray] = None,
+              integer: bool = True) -> AllocationSolution:
+        start = time.perf_counter()
+        value, power, upper = problem.value, problem.unit_power, problem.available
+        capacity = problem.power_capacity
+        all_columns = np.ones(value.shape[1], dtype=bool)
+
+        # Phase 1: meet firm SLA power with the best inference hardware
+        firm = problem.achievable_firm_power()
+        inference_value = np.where(INFERENCE_MASK, np.maximum(value, EPSILON), value)
+        x = _greedy_fill(inference_value, power, upper, firm, INFERENCE_MASK)
+        if integer:
+            fractional = x
+            x = np.minimum(np.ceil(x - EPSILON), upper)
+            # Rounding up must not push a site over its capacity
+            over = (x * power).sum(axis=1) > capacity + EPSILON
+            x[over] = np.floor(fractional[over] + EPSILON)
+
+        # Phase 2: fill the remaining capacity with whatever earns the most
+        remaining = np.clip(capacity - (x * power).sum(axis=1), 0.0, None)
+        x += _greedy_fill(value, power, upper - x, remaining, all_columns)
+
+        if integer:
+            x = self._repair_integer(x, value, power, upper, capacity)
+
+        infeasible = self._infeasible_rows(problem, x)
+        objective = float((value * x).sum())
+        solution = AllocationSolution(
+            allocation=x,
+            objective=objective,
+            status="infeasible" if infeasible.any() else "optimal" if not integer else "feasible",
+            solver=self.name,
+            solve_time_ms=0.0,
+            infeasible_sites=[problem.site_ids[i] for i in np.flatnonzero(infeasible)],
+        )
+
+        if warm_start is not None:
+            apply_warm_start(problem, solution, warm_start)
+        solution.solve_time_ms = (time.perf_counter() - start) * 1000
+        return solution
+
+    @staticmethod
+    def _repair_integer(x: np.ndarray, value: np.ndarray, power: np.ndarray,
+                        upper: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+        """Round down, then top up leftover capacity one hardware class at a time"""
+        x = np.floor(x + EPSILON)
+        leftover = capacity - (x * power).sum(axis=1)
+
+        density = np.where(power > 0, value / np.where(power > 0, power, 1), np.inf)
+        order = np.argsort(-density, axis=1)
+        rows = np.arange(x.shape[0])
+        for rank in range(x.shape[1]):
+            col = order[:, rank]
+            unit_power = power[rows, col]
+            room = upper[rows, col] - x[rows, col]
+            fits = np.where(unit_power > 0, np.floor(np.clip(leftover, 0, None) / np.where(unit_power > 0, unit_power, 1)), room)
+            add = np.where(value[rows, col] > 0, np.minimum(room, fits), 0)
+            x[rows, col] += add
+            leftover -= add * unit_power
+        return x
+
+    @staticmethod
+    def _infeasible_rows(problem: AllocationProblem, x: np.ndarray) -> np.ndarray:
+        inference_power = (x * problem.unit_power * INFERENCE_MASK).sum(axis=1)
+        return inference_power + EPSILON < problem.firm_sla_power
+
+
+class ScipyAllocationSolver:
+    """Exact MILP via scipy.optimize.milp (HiGHS), one program for the whole fleet"""
+    name = "scipy"
+
+    def __init__(self, time_limit: float = 1.0):
+        # SciPy is optional and slow to import, so only this solver imports it
+        try:
+            import scipy.optimize  # noqa: F401
+        except ImportError:
+            raise RuntimeError("scipy is not installed")
+        self.time_limit = time_limit
+
+    def solve(self, problem: AllocationProblem, warm_start: Optional[np.ndarray] = None,
+              integer: bool = True) -> AllocationSolution:
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy.sparse import csr_matrix
+
+        start = time.perf_counter()
+        n_sites, n_classes = problem.shape
+        n = n_sites * n_classes
+
+        # Variables: n unit counts, then one firm SLA shortfall per site. The
+        # shortfall keeps the program feasible when a site cannot meet its SLA
+        # power exactly in whole units; its penalty dwarfs any unit value.
+        rows = np.repeat(np.arange(n_sites), n_classes)
+        cols = np.arange(n)
+        power = problem.unit_power.ravel()
+        capacity_matrix = csr_matrix((power, (rows, cols)), shape=(n_sites, n + n_sites))
+        firm_matrix = csr_matrix(
+            (np.concatenate([power * np.tile(INFERENCE_MASK, n_sites), np.ones(n_sites)]),
+             (np.concatenate([rows, np.arange(n_sites)]), np.concatenate([cols, n + np.arange(n_sites)]))),
+            shape=(n_sites, n + n_sites),
+        )
+        density = np.abs(problem.value) / np.maximum(problem.unit_power, 1.0)
+        penalty = 1e3 * max(float(density.max(initial=0.0)), 1.0)
+
+        result = milp(
+            c=np.concatenate([-problem.value.ravel(), np.full(n_sites, penalty)]),
+            constraints=[
+                LinearConstraint(capacity_matrix, -np.inf, problem.power_capacity),
+                LinearConstraint(firm_matrix, problem.achievable_firm_power(), np.inf),
+            ],
+            integrality=np.concatenate([np.ones(n) if integer else np.zeros(n), np.zeros(n_sites)]),
+            bounds=Bounds(np.zeros(n + n_sites), np.concatenate([problem.available.ravel(), np.full(n_sites, np.inf)])),
+            options={"time_limit": self.time_limit},
+        )
+
+        if result.x is None:
+            logger.warning(f"MILP returned no solution ({result.message}), using NumPy solver")
+            return NumpyAllocationSolver().solve(problem, warm_start, integer)
+
+        x = result.x[:n].reshape(n_sites, n_classes)
+        if integer:
+            x = np.round(x)
+        infeasible = NumpyAllocationSolver._infeasible_rows(problem, x)
+        solution = AllocationSolution(
+            allocation=x,
+            objective=float((problem.value * x).sum()),
+            status="infeasible" if infeasible.any() else "optimal" if result.status == 0 else "feasible",
+            solver=self.name,
+            solve_time_ms=0.0,
+            infeasible_sites=[problem.site_ids[i] for i in np.flatnonzero(infeasible)],
+        )
+        if warm_start is not None:
+            apply_warm_start(problem, solution, warm_start)
+        solution.solve_time_ms = (time.perf_counter() - start) * 1000
+        return solution
+
+
+def apply_warm_start(problem: AllocationProblem, solution: AllocationSolution,
+                     previous: np.ndarray, tolerance: float = 1e-6) -> None:
+    """Keep the previous allocation for sites where it is still feasible and as good.
+
+    This avoids reshuffling hardware between runs when the optimum is flat.
+    """
+    if previous.shape != solution.allocation.shape:
+        return
+    power = problem.unit_power
+    feasible = (
+        (previous >= 0).all(axis=1) &
+        (previous <= problem.available).all(axis=1) &
+        ((previous * power).sum(axis=1) <= problem.power_capacity + EPSILON) &
+        ((previous * power * INFERENCE_MASK).sum(axis=1) + EPSILON >= problem.firm_sla_power)
+    )
+    previous_value = (problem.value * previous).sum(axis=1)
+    new_value = (problem.value * solution.allocation).sum(axis=1)
+    keep = feasible & (previous_value >= new_value - tolerance * np.maximum(1.0, np.abs(new_value)))
+
+    if keep.any():
+        solution.allocation[keep] = previous[keep]
+        solution.objective = float((problem.value * solution.allocation).sum())
+        solution.warm_started_sites = int(keep.sum())
+
+
+SOLVERS = {
+    NumpyAllocationSolver.name: NumpyAllocationSolver,
+    ScipyAllocationSolver.name: ScipyAllocationSolver,
+}
+
+
+def get_solver(name: str = "numpy"):
+    """Return a solver instance by name, falling back to NumPy if unavailable"""
+    if name not in SOLVERS:
+        raise ValueError(f"Unknown allocation solver: {name}")
+    try:
+        return SOLVERS[name]()
+    except RuntimeError as e:
+        logger.warning(f"Allocation solver '{name}' unavailable ({e}), using NumPy solver")
+        return NumpyAllocationSolver()
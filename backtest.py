@@ -0,0 +1,392 @@
+"""
+Historical backtesting for SLA-Smart Energy Arbitrage Platform
+
+Replays a price trace (stored PricingData samples/rollups, or the synthetic
+dummy price model) and a seeded weather/demand trace at a chosen step size,
+runs the same allocation policy as /api/optimize at every step, and
+accumulates revenue, energy cost, power and firm-SLA shortfall per site.
+
+Traces are consumed in chunks of steps, and per-step results are appended to
+column files on disk as they are produced, so memory stays constant however
+long the history is. Independent scenarios (seeds, solvers, windows) run in
+a process pool.
+
+Usage:
+    python backtest.py --start 2025-01-01 --end 2026-01-01 --step-minutes 60 --seeds 1 2 3 --workers 3
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+
+import numpy as np
+from sqlalchemy import select
+
+# Run as a script, read config.env before the database module reads DATABASE_URL
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv("config.env")
+
+from allocation_solver import build_allocation_problem, get_solver
+from database import PricingData, PricingRollup, SessionLocal, init_db
+from price_series import RANGE_RESOLUTIONS, RESOLUTIONS
+from revenue_engine import INFERENCE_MASK, compute_fleet_revenue, pack_fleet
+from simulation import FleetSimulator, SimulationClock, _epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ("energy_price", "hash_price", "token_price")
+SITE_METRICS = ("revenue", "energy_cost", "power_used", "sla_shortfall", "temperature")
+BACKTEST_OUTPUT_DIR = os.getenv("BACKTEST_OUTPUT_DIR", "./backtests")
+
+
+@dataclass
+class BacktestScenario:
+    """One independent backtest run; plain data so it can be sent to a worker process"""
+    site_config: Dict[str, Dict]
+    site_inventories: Dict[str, Dict]
+    start: datetime
+    end: datetime
+    step: timedelta = timedelta(hours=1)
+    seed: int = 0
+    price_source: str = "synthetic"   # synthetic or stored
+    resolution: str = "1h"            # stored prices: raw, 1m, 1h or 1d
+    solver: str = "numpy"
+    mara_inventory: Optional[Dict] = None
+    firm_sla_power: Dict[str, float] = field(default_factory=dict)
+    chunk_steps: int = 24 * 7
+    per_site_series: bool = True      # write (steps x sites) columns, not just fleet totals
+    output_dir: Optional[str] = None
+    name: str = ""
+
+    @property
+    def clock(self) -> SimulationClock:
+        return SimulationClock(start=self.start, step=self.step, steps=int((self.end - self.start) / self.step))
+
+
+# Price traces
+
+class SyntheticPriceTrace:
+    """The dummy MARA price model (slow wave plus uniform noise), seeded"""
+
+    def __init__(self, seed: int):
+        self.rng = np.random.default_rng(seed)
+
+    def prices(self, timestamps: np.ndarray) -> np.ndarray:
+        """(N, 3) energy, hash and token prices"""
+        wave = np.sin(timestamps / 200) * 0.1
+        noise = self.rng.uniform(-0.05, 0.05, size=len(timestamps))
+        return np.column_stack([0.65 + wave + noise, 8.5 + (wave + noise) * 2, 2.9 + wave + noise])
+
+
+class StoredPriceTrace:
+    """Sample-and-hold resampling of stored prices, read in keyset-paginated batches.
+
+    Raw samples use their prices, rollups their close, effective from the end
+    of the bucket so a step never sees a price from its future. Steps before
+    the first stored sample take the first sample's prices.
+    """
+
+    def __init__(self, start: datetime, end: datetime, resolution: str = "1h", batch_size: int = 5000):
+        if resolution not in RANGE_RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        self.end = end
+        self.batch_size = batch_size
+        if resolution == "raw":
+            self.columns = (PricingData.timestamp, PricingData.energy_price,
+                            PricingData.hash_price, PricingData.token_price)
+            self.filters = ()
+            self.delay = 0.0
+        else:
+            self.columns = (PricingRollup.bucket_start, PricingRollup.energy_price_close,
+                            PricingRollup.hash_price_close, PricingRollup.token_price_close)
+            self.filters = (PricingRollup.resolution == resolution,)
+            self.delay = RESOLUTIONS[resolution].total_seconds()
+        self.db = SessionLocal()
+        self._cursor = self._last_at_or_before(start - timedelta(seconds=self.delay))
+        self._fetched = False
+        self._exhausted = False
+        self._times = np.empty(0)
+        self._values = np.empty((0, len(PRICE_COLUMNS)))
+        self._held: Optional[np.ndarray] = None
+
+    def prices(self, timestamps: np.ndarray) -> np.ndarray:
+        """(N, 3) prices in effect at each step; timestamps must increase across calls"""
+        while not self._exhausted and (not len(self._times) or self._times[-1] < timestamps[-1]):
+            self._fetch()
+        if self._held is None:
+            if not len(self._times):
+                raise ValueError("No stored prices for the backtest window")
+            self._held = self._values[0]
+        if not len(self._times):
+            return np.tile(self._held, (len(timestamps), 1))
+        index = np.searchsorted(self._times, timestamps, side="right") - 1
+        values = np.where((index >= 0)[:, None], self._values[np.maximum(index, 0)], self._held)
+        # Drop consumed samples, holding the one still in effect for the next chunk
+        last = int(index[-1])
+        if last >= 0:
+            self._held = self._values[last]
+            self._times, self._values = self._times[last + 1:], self._values[last + 1:]
+        return values
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _last_at_or_before(self, start: datetime) -> Optional[datetime]:
+        """Timestamp of the sample in effect at start, so reading begins there"""
+        key = self.columns[0]
+        return self.db.execute(
+            select(key).where(key <= start, *self.filters).order_by(key.desc()).limit(1)
+        ).scalar()
+
+    def _fetch(self) -> None:
+        key = self.columns[0]
+        query = select(*self.columns).where(key <= self.end, *self.filters)
+        if self._cursor is not None:
+            query = query.where(key > self._cursor if self._fetched else key >= self._cursor)
+        self._fetched = True
+        rows = self.db.execute(query.order_by(key).limit(self.batch_size)).all()
+        if len(rows) < self.batch_size:
+            self._exhausted = True
+        if not rows:
+            return
+        self._cursor = rows[-1][0]
+        self._times = np.concatenate([self._times, [_epoch_seconds(row[0]) + self.delay for row in rows]])
+        self._values = np.concatenate([self._values, np.array([row[1:] for row in rows], dtype=float)])
+
+
+def price_trace(scenario: BacktestScenario):
+    if scenario.price_source == "synthetic":
+        return SyntheticPriceTrace(scenario.seed)
+    if scenario.price_source == "stored":
+        return StoredPriceTrace(scenario.start, scenario.end, scenario.resolution)
+    raise ValueError(f"Unknown price source: {scenario.price_source}")
+
+
+# Columnar results
+
+class ColumnWriter:
+    """Appends fixed-width columns to raw little-endian files plus a JSON manifest"""
+
+    def __init__(self, path: str, site_ids: List[str]):
+        self.path = path
+        self.site_ids = site_ids
+        self.rows = 0
+        self.columns: Dict[str, Dict] = {}
+        self._files = {}
+        os.makedirs(os.path.join(path, "columns"), exist_ok=True)
+
+    def append(self, columns: Dict[str, np.ndarray]) -> None:
+        rows = None
+        for name, values in columns.items():
+            if name not in self.columns:
+                self.columns[name] = {"dtype": values.dtype.newbyteorder("<").str, "shape": list(values.shape[1:])}
+                self._files[name] = open(os.path.join(self.path, "columns", f"{name}.bin"), "wb")
+            self._files[name].write(np.ascontiguousarray(values, dtype=self.columns[name]["dtype"]).tobytes())
+            rows = len(values)
+        self.rows += rows or 0
+
+    def close(self, summary: Dict) -> None:
+        for handle in self._files.values():
+            handle.close()
+        manifest = {"rows": self.rows, "site_ids": self.site_ids, "columns": self.columns, "summary": summary}
+        with open(os.path.join(self.path, "manifest.json"), "w") as handle:
+            json.dump(manifest, handle, indent=2, default=str)
+
+
+def load_results(path: str) -> Dict:
+    """Manifest plus memory-mapped columns of a finished backtest"""
+    with open(os.path.join(path, "manifest.json")) as handle:
+        manifest = json.load(handle)
+    manifest["data"] = {
+        name: np.memmap(os.path.join(path, "columns", f"{name}.bin"), dtype=spec["dtype"], mode="r",
+                        shape=(manifest["rows"], *spec["shape"]))
+        for name, spec in manifest["columns"].items()
+    }
+    return manifest
+
+
+# Engine
+
+def run_backtest(scenario: BacktestScenario) -> Dict:
+    """Replay one scenario; returns its summary (also written to the manifest)"""
+    started = time.perf_counter()
+    clock = scenario.clock
+    if clock.steps <= 0:
+        raise ValueError("Backtest window is shorter than one step")
+
+    fleet = pack_fleet(scenario.site_config, scenario.site_inventories, scenario.mara_inventory)
+    solver = get_solver(scenario.solver)
+    simulator = FleetSimulator(scenario.site_config)
+    trace = price_trace(scenario)
+    firm = np.array([scenario.firm_sla_power.get(site_id, 0.0) for site_id in fleet.site_ids], dtype=float)
+    step_hours = scenario.step.total_seconds() / 3600
+    inference_power_per_unit = fleet.unit_power * INFERENCE_MASK
+
+    output_dir = scenario.output_dir or os.path.join(BACKTEST_OUTPUT_DIR, uuid.uuid4().hex[:12])
+    writer = ColumnWriter(output_dir, fleet.site_ids)
+    totals = {name: np.zeros(fleet.size) for name in SITE_METRICS}
+    totals.update(energy_mwh=np.zeros(fleet.size), breach_steps=np.zeros(fleet.size, dtype=np.int64))
+    infeasible_steps = 0
+    allocation = None
+
+    try:
+        for chunk in simulator.iter_chunks(clock, scenario.chunk_steps, seed=scenario.seed):
+            prices = trace.prices(chunk.timestamps)
+            n = len(chunk.timestamps)
+            series = {name: np.empty((n, fleet.size)) for name in SITE_METRICS}
+            for k in range(n):
+                step_prices = dict(zip(PRICE_COLUMNS, prices[k]))
+                demand = chunk.demand_multiplier[:, k]
+                problem = build_allocation_problem(fleet, step_prices, demand, scenario.firm_sla_power)
+                solution = solver.solve(problem, warm_start=allocation)
+                allocation = solution.allocation
+                infeasible_steps += bool(solution.infeasible_sites)
+
+                result = compute_fleet_revenue(fleet, allocation, step_prices,
+                                               inference_scale=fleet.cooling_efficiency, demand_multiplier=demand)
+                served = (allocation * inference_power_per_unit).sum(axis=1)
+                series["revenue"][k] = result.revenue * step_hours
+                series["energy_cost"][k] = (result.power_used / 1000 * step_prices["energy_price"] *
+                                            fleet.energy_cost_multiplier * step_hours)
+                series["power_used"][k] = result.power_used
+                series["sla_shortfall"][k] = np.maximum(firm - served, 0.0)
+            series["temperature"] = chunk.temperature.T
+
+            for name in SITE_METRICS:
+                totals[name] += series[name].sum(axis=0)
+            totals["energy_mwh"] += series["power_used"].sum(axis=0) * step_hours / 1000
+            totals["breach_steps"] += (series["sla_shortfall"] > 0).sum(axis=0)
+
+            columns = {"timestamp": chunk.timestamps,
+                       **{name: prices[:, i].astype(np.float32) for i, name in enumerate(PRICE_COLUMNS)},
+                       **{f"fleet_{name}": series[name].sum(axis=1) for name in SITE_METRICS if name != "temperature"}}
+            if scenario.per_site_series:
+                columns.update({name: series[name].astype(np.float32) for name in SITE_METRICS})
+            writer.append(columns)
+    finally:
+        if isinstance(trace, StoredPriceTrace):
+            trace.close()
+
+    elapsed = time.perf_counter() - started
+    summary = _summary(scenario, fleet.site_ids, totals, clock.steps, infeasible_steps, elapsed)
+    summary["output_dir"] = output_dir
+    writer.close(summary)
+    logger.info(f"Backtest {summary['name']} finished: {clock.steps} steps in {elapsed:.1f}s, "
+                f"net revenue ${summary['fleet']['net_revenue']:.2f}")
+    return summary
+
+
+def _summary(scenario: BacktestScenario, site_ids: List[str], totals: Dict[str, np.ndarray],
+             steps: int, infeasible_steps: int, elapsed: float) -> Dict:
+    step_hours = scenario.step.total_seconds() / 3600
+    sites = {
+        site_id: {
+            "revenue": float(totals["revenue"][i]),
+            "energy_cost": float(totals["energy_cost"][i]),
+            "net_revenue": float(totals["revenue"][i] - totals["energy_cost"][i]),
+            "energy_mwh": float(totals["energy_mwh"][i]),
+            "average_power": float(totals["power_used"][i] / steps),
+            "average_temperature": float(totals["temperature"][i] / steps),
+            "sla_breach_steps": int(totals["breach_steps"][i]),
+            "sla_shortfall_mwh": float(totals["sla_shortfall"][i] * step_hours / 1000),
+        }
+        for i, site_id in enumerate(site_ids)
+    }
+    revenue, energy_cost = float(totals["revenue"].sum()), float(totals["energy_cost"].sum())
+    return {
+        "name": scenario.name or f"seed-{scenario.seed}",
+        "start": scenario.start.isoformat(),
+        "end": scenario.end.isoformat(),
+        "step_minutes": scenario.step.total_seconds() / 60,
+        "steps": steps,
+        "seed": scenario.seed,
+        "price_source": scenario.price_source,
+        "solver": scenario.solver,
+        "fleet": {
+            "revenue": revenue,
+            "energy_cost": energy_cost,
+            "net_revenue": revenue - energy_cost,
+            "energy_mwh": float(totals["energy_mwh"].sum()),
+            "sla_breach_steps": int(totals["breach_steps"].sum()),
+            "infeasible_steps": infeasible_steps,
+        },
+        "sites": sites,
+        "elapsed_seconds": elapsed,
+        "steps_per_second": steps / elapsed if elapsed > 0 else None,
+    }
+
+
+def run_scenarios(scenarios: List[BacktestScenario], workers: int = 1) -> List[Dict]:
+    """Run independent scenarios, in a process pool when there is more than one worker"""
+    if workers <= 1 or len(scenarios) <= 1:
+        return [run_backtest(scenario) for scenario in scenarios]
+    # Spawned workers don't inherit the parent's threads, event loop or open connections
+    with ProcessPoolExecutor(max_workers=min(workers, len(scenarios)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(run_backtest, scenarios))
+
+
+# CLI
+
+def default_fleet() -> Dict:
+    """Site config, stored inventories (or the default distribution) and firm SLA power"""
+    from main import FIRM_SLA_TIERS, MULTI_SITE_CONFIG, distribute_hardware_across_sites, get_dummy_mara_inventory
+    from database import get_all_site_inventories, get_sla_power_by_site, get_system_state
+
+    db = SessionLocal()
+    try:
+        mara_inventory = get_system_state(db).mara_inventory or get_dummy_mara_inventory()
+        inventories = get_all_site_inventories(db) or distribute_hardware_across_sites(mara_inventory)
+        firm_sla_power = get_sla_power_by_site(db, FIRM_SLA_TIERS)
+    finally:
+        db.close()
+    return {"site_config": MULTI_SITE_CONFIG, "site_inventories": inventories,
+            "mara_inventory": mara_inventory, "firm_sla_power": firm_sla_power}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay price and weather traces through the allocator")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--step-minutes", type=float, default=60)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--price-source", choices=["synthetic", "stored"], default="synthetic")
+    parser.add_argument("--resolution", choices=RANGE_RESOLUTIONS, default="1h")
+    parser.add_argument("--solver", default="numpy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output-dir", default=BACKTEST_OUTPUT_DIR)
+    parser.add_argument("--fleet-only", action="store_true", help="Write fleet totals per step, not per-site columns")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    init_db()
+    fleet = default_fleet()
+    run_id = uuid.uuid4().hex[:12]
+    scenarios = [
+        BacktestScenario(**fleet, start=args.start, end=args.end, step=timedelta(minutes=args.step_minutes),
+                         seed=seed, price_source=args.price_source, resolution=args.resolution, solver=args.solver,
+                         per_site_series=not args.fleet_only, name=f"seed-{seed}",
+                         output_dir=os.path.join(args.output_dir, run_id, f"seed-{seed}"))
+        for seed in args.seeds
+    ]
+    results = run_scenarios(scenarios, args.workers)
+
+    print(f"{'scenario':>10} {'steps':>7} {'revenue':>16} {'energy cost':>14} {'net':>16} {'breaches':>9} {'steps/s':>9}")
+    for summary in results:
+        fleet_totals = summary["fleet"]
+        print(f"{summary['name']:>10} {summary['steps']:>7} {fleet_totals['revenue']:>16,.0f} "
+              f"{fleet_totals['energy_cost']:>14,.0f} {fleet_totals['net_revenue']:>16,.0f} "
+              f"{fleet_totals['sla_breach_steps']:>9} {summary['steps_per_second']:>9.0f}")
+    print(f"results: {os.path.join(args.output_dir, run_id)}")
+
+
+if __name__ == "__main__":
+    main()
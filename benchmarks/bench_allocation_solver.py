@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark allocation solver solve time as the fleet grows
+
+Usage:
+    python benchmarks/bench_allocation_solver.py [--sizes 10 100 500 1000] [--solver numpy]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from allocation_solver import AllocationProblem, NumpyAllocationSolver, get_solver
+
+UNIT_POWER = np.array([5000.0, 15000.0, 3500.0, 5000.0, 10000.0])
+
+
+def make_problem(n_sites: int, rng: np.random.Generator) -> AllocationProblem:
+    """Random fleet with mixed capacity pressure and firm SLA commitments"""
+    value = rng.uniform(500, 5000, (n_sites, len(UNIT_POWER)))
+    available = rng.integers(0, 120, (n_sites, len(UNIT_POWER))).astype(float)
+    return AllocationProblem(
+        site_ids=[f"site_{i}" for i in range(n_sites)],
+        value=value,
+        unit_power=np.tile(UNIT_POWER, (n_sites, 1)),
+        available=available,
+        power_capacity=rng.uniform(3e5, 1e6, n_sites),
+        firm_sla_power=rng.choice([0.0, 0.0, 5e4, 2e5], n_sites),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--solver", default="numpy")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    solver = get_solver(args.solver)
+    print(f"solver: {solver.name}")
+    print(f"{'sites':>8} {'cold ms':>10} {'warm ms':>10} {'kept sites':>11} {'gap vs LP':>10}")
+    for n in args.sizes:
+        problem = make_problem(n, rng)
+        cold = min(_timed(solver.solve, problem) for _ in range(args.repeat))
+        solution = solver.solve(problem)
+        warm = min(_timed(solver.solve, problem, solution.allocation) for _ in range(args.repeat))
+        kept = solver.solve(problem, warm_start=solution.allocation).warm_started_sites
+        bound = NumpyAllocationSolver().solve(problem, integer=False).objective
+        gap = (bound - solution.objective) / bound * 100 if bound else 0.0
+        print(f"{n:>8} {cold:>10.2f} {warm:>10.2f} {kept:>11} {gap:>9.3f}%")
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    main()
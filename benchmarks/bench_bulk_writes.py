@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-site writes against the bulk single-transaction helpers
+
+Writes site inventories (upsert) and site allocations (insert) for N sites
+on a temporary SQLite database, once with the per-site helpers (one SELECT
+and commit per site) and once with the bulk helpers (one statement, one
+commit).
+
+Usage:
+    python benchmarks/bench_bulk_writes.py [--sizes 10 1000 10000] [--loop-limit 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+
+import database
+from database import (SessionLocal, SiteAllocation, SiteHardwareInventory, query_stats,
+                      bulk_insert_site_allocations, bulk_upsert_site_inventories,
+                      update_site_allocation, update_site_inventory)
+
+database.init_db()
+
+INVENTORY = {
+    "inference": {"gpu": {"available": 40, "power": 5000}, "asic": {"available": 12, "power": 15000}},
+    "miners": {"air": {"available": 50, "power": 3500}, "hydro": {"available": 20, "power": 5000},
+               "immersion": {"available": 10, "power": 10000}}
+}
+ALLOCATION = {"gpu_compute": 30, "asic_compute": 8, "air_miners": 40, "hydro_miners": 15, "immersion_miners": 6}
+
+
+def reset():
+    db = SessionLocal()
+    db.query(SiteHardwareInventory).delete()
+    db.query(SiteAllocation).delete()
+    db.commit()
+    db.close()
+
+
+def per_site(site_ids):
+    db = SessionLocal()
+    for site_id in site_ids:
+        update_site_inventory(db, site_id, INVENTORY)
+    for site_id in site_ids:
+        update_site_allocation(db, site_id, ALLOCATION)
+    db.close()
+
+
+def bulk(site_ids):
+    db = SessionLocal()
+    bulk_upsert_site_inventories(db, {site_id: INVENTORY for site_id in site_ids})
+    bulk_insert_site_allocations(db, {site_id: ALLOCATION for site_id in site_ids})
+    db.close()
+
+
+def measure(fn, site_ids, upsert: bool):
+    """Time one write pass; with upsert=True inventories already exist"""
+    reset()
+    if upsert:
+        bulk(site_ids)
+    queries = query_stats["queries"]
+    start = time.perf_counter()
+    fn(site_ids)
+    return (time.perf_counter() - start) * 1000, query_stats["queries"] - queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--loop-limit", type=int, default=10000,
+                        help="Skip the per-site baseline above this many sites")
+    args = parser.parse_args()
+
+    print(f"database: {database.DATABASE_URL}")
+    print(f"{'sites':>7} {'mode':>8} {'loop ms':>10} {'loop stmts':>11} {'bulk ms':>9} {'bulk stmts':>11} {'speedup':>8}")
+    for n in args.sizes:
+        site_ids = [f"site_{i}" for i in range(n)]
+        for mode, upsert in (("insert", False), ("update", True)):
+            bulk_ms, bulk_stmts = measure(bulk, site_ids, upsert)
+            if n <= args.loop_limit:
+                loop_ms, loop_stmts = measure(per_site, site_ids, upsert)
+                print(f"{n:>7} {mode:>8} {loop_ms:>10.1f} {loop_stmts:>11} {bulk_ms:>9.1f} {bulk_stmts:>11} "
+                      f"{loop_ms / bulk_ms:>7.1f}x")
+            else:
+                print(f"{n:>7} {mode:>8} {'-':>10} {'-':>11} {bulk_ms:>9.1f} {bulk_stmts:>11} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Measure serverless cold starts: import-to-first-response time of the app
+
+Each run is a fresh interpreter that imports `main` and answers one
+GET /api/health over httpx.ASGITransport without running the lifespan, the
+way a serverless invocation (api/index.py) does. The schema is created once
+beforehand, as a deploy-time migration would. With --baseline, the same runs
+are repeated on a temporary git worktree of that revision for comparison.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 7] [--baseline HEAD~1]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Runs in the child interpreter; httpx is imported first because the harness needs it, not the app
+CHILD = """
+import asyncio, json, time
+import httpx
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def first_response():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        return await client.get("/api/health")
+
+response = asyncio.run(first_response())
+answered = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "response_ms": (answered - imported) * 1000,
+                  "status": response.json().get("status")}))
+"""
+
+SCHEMA = "import database; database.init_db()"
+
+
+def measure(tree: str, runs: int) -> dict:
+    scratch = tempfile.mkdtemp(prefix="mara-cold-")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{scratch}/cold.db", "LOG_FILE": os.path.join(scratch, "app.log"),
+           "PYTHONDONTWRITEBYTECODE": "1"}
+    env.pop("ASYNC_DATABASE_URL", None)
+    subprocess.run([sys.executable, "-c", SCHEMA], cwd=tree, env=env, check=True, capture_output=True)
+    samples = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", CHILD], cwd=tree, env=env, check=True,
+                                capture_output=True, text=True)
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        sample["process_ms"] = (time.perf_counter() - began) * 1000
+        samples.append(sample)
+    return {key: statistics.median(sample[key] for sample in samples)
+            for key in ("import_ms", "response_ms", "process_ms")} | {"status": samples[-1]["status"]}
+
+
+def report(label: str, result: dict) -> None:
+    print(f"{label:>12} {result['import_ms']:>10.0f} {result['response_ms']:>12.0f} "
+          f"{result['import_ms'] + result['response_ms']:>10.0f} {result['process_ms']:>11.0f}  {result['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    print(f"median of {args.runs} cold starts (ms)")
+    print(f"{'tree':>12} {'import':>10} {'1st response':>12} {'total':>10} {'process':>11}  health")
+    if args.baseline:
+        worktree = tempfile.mkdtemp(prefix="mara-baseline-")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline], cwd=ROOT, check=True,
+                       capture_output=True)
+        try:
+            report(args.baseline, measure(worktree, args.runs))
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=ROOT, capture_output=True)
+    report("working tree", measure(ROOT, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Stream years of minute-level prices through the online forecaster
+
+Generates --years of one-minute price samples (a daily cycle, a slow drift,
+AR(1) noise and occasional gaps) as a generator, fits the forecaster on them
+and reports ingest cost (sample generation included), peak traced memory,
+forecast accuracy against persistence per horizon, and cached versus
+uncached forecast latency. Finally it runs POST /api/optimize?wait=true in-process on a
+scratch database, before and after the app's forecaster is ready, and checks
+that the solver stages are filed under the optimize operation.
+
+Usage:
+    python benchmarks/bench_forecasting.py [--years 2] [--seed 7]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before the app creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "mara-bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("CLAUDE_CLIENT", "stub")
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from forecasting import ForecastCache, PriceForecaster
+from schedule_planner import MAX_HORIZON_HOURS
+
+START = 1735689600.0  # 2025-01-01 UTC
+
+
+def minute_prices(years: float, seed: int, start: float = START):
+    """(epoch seconds, prices) per minute from `start`; one hour in 500 is missing"""
+    rng = random.Random(seed)
+    noise = 0.0
+    for minute in range(int(years * 365 * 24 * 60)):
+        timestamp = start + minute * 60
+        hour = int(timestamp // 3600)
+        if hour % 500 == 7:
+            continue
+        noise = 0.98 * noise + rng.gauss(0, 0.004)
+        daily = 0.08 * math.sin(2 * math.pi * (hour % 24) / 24)
+        drift = 0.05 * math.sin(minute / (60 * 24 * 180))
+        energy = 0.65 + daily + drift + noise
+        yield timestamp, {"energy_price": energy, "hash_price": 8.5 + 2 * (daily + noise), "token_price": 2.9 + drift}
+
+
+def optimize_round_trip(seed: int) -> None:
+    """POST /api/optimize?wait=true with the app's forecaster not ready, then ready"""
+    from fastapi.testclient import TestClient
+    from metrics import STAGE_SECONDS
+    import main as app_main
+
+    print(f"\n{'forecaster':>10} {'status':>7} {'ms':>8}")
+    with TestClient(app_main.app) as client:
+        client.post("/api/initialize").raise_for_status()
+        for ready in (False, True):
+            if ready:
+                # A week of minutes after anything the live feed has already sent
+                anchor = app_main.forecaster.anchor_hour
+                first_hour = anchor + 1 if anchor is not None else int(time.time() // 3600) - 7 * 24
+                app_main.forecaster.fit(minute_prices(7 / 365, seed, first_hour * 3600.0))
+            assert app_main.forecaster.ready == ready
+            began = time.perf_counter()
+            response = client.post("/api/optimize", params={"wait": "true"})
+            elapsed = (time.perf_counter() - began) * 1000
+            assert response.status_code == 200, response.text[:200]
+            print(f"{'ready' if ready else 'not ready':>10} {response.status_code:>7} {elapsed:>8.1f}")
+    stages = sorted(stage for operation, stage in STAGE_SECONDS._series if operation == "optimize")
+    assert stages, "no stage timings recorded under the optimize operation"
+    print(f"optimize stages: {', '.join(stages)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    forecaster = PriceForecaster()
+    began = time.perf_counter()
+    kept = forecaster.fit(minute_prices(args.years, args.seed))
+    elapsed = time.perf_counter() - began
+    # A second pass under tracemalloc: memory stays flat however long the stream
+    tracemalloc.start()
+    PriceForecaster().fit(minute_prices(args.years, args.seed))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"samples: {kept}  hours folded: {forecaster.hours_folded}  "
+          f"ingest: {elapsed * 1e6 / kept:.2f} us/sample  peak traced memory: {peak / 1024:.0f} KiB")
+
+    print(f"\n{'horizon':>8} {'price':>13} {'MAE':>9} {'persist':>9} {'skill':>7} {'scored':>7}")
+    for horizon, row in forecaster.accuracy.report().items():
+        for name, error in row["prices"].items():
+            print(f"{horizon:>8} {name:>13} {error['mae']:>9.4f} {error['persistence_mae']:>9.4f} "
+                  f"{error['skill']:>7.2f} {row['scored']:>7}")
+
+    cache = ForecastCache(forecaster, MAX_HORIZON_HOURS)
+    now = START + args.years * 365 * 86400
+    began = time.perf_counter()
+    for i in range(200):
+        cache.tick_seconds = 1e-9  # every call a new tick: always recompute
+        cache.get(MAX_HORIZON_HOURS, now + i)
+    uncached = (time.perf_counter() - began) * 1e6 / 200
+    cache.tick_seconds = 60.0
+    began = time.perf_counter()
+    for hours in (1, 6, 24, 72) * 500:
+        cache.get(hours, now)
+    cached = (time.perf_counter() - began) * 1e6 / 2000
+    print(f"\nforecast {MAX_HORIZON_HOURS}h: {uncached:.1f} us computed, {cached:.2f} us from cache")
+
+    optimize_round_trip(args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark request latency with synchronous vs queued logging
+
+Runs --concurrency simulated requests at a time on one event loop. Each
+request logs --lines INFO records, a DEBUG record that is filtered out, and
+yields to the loop between them, like a handler awaiting the database. Two
+pipelines write the same records to a scratch log file and a console stream:
+  - sync:   basicConfig-style FileHandler + StreamHandler on the loop thread
+  - queue:  configure_logging (queue handler, JSON lines written by the
+            listener thread)
+Per-request latency percentiles are printed for each. --stall-ms makes every
+console write block that long, like a console piped to a busy log collector
+or a log volume under write pressure.
+
+Usage:
+    python benchmarks/bench_logging.py [--requests 5000] [--concurrency 50] [--lines 5] [--stall-ms 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from log_pipeline import configure_logging, request_id_var, shutdown_logging
+
+logger = logging.getLogger("bench")
+
+
+class SlowStream:
+    """Discards writes after blocking for a fixed time"""
+
+    def __init__(self, stall_seconds: float):
+        self.stall_seconds = stall_seconds
+
+    def write(self, text: str) -> int:
+        if self.stall_seconds:
+            time.sleep(self.stall_seconds)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+async def serve(requests: int, concurrency: int, lines: int) -> list:
+    """Milliseconds per simulated request"""
+    samples = []
+    pending = iter(range(requests))
+
+    async def worker():
+        for number in pending:
+            request_id_var.set(f"req-{number}")
+            began = time.perf_counter()
+            for line in range(lines):
+                logger.info("request %d step %d: allocated %.2f MW", number, line, line * 1.5)
+                logger.debug("request %d step %d detail", number, line)
+                await asyncio.sleep(0)
+            samples.append((time.perf_counter() - began) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def sync_logging(path: str, console) -> None:
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    for handler in (logging.FileHandler(path), logging.StreamHandler(console)):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def queue_logging(path: str, console, queue_size: int) -> None:
+    # The console handler binds sys.stderr when it is created
+    stderr, sys.stderr = sys.stderr, console
+    try:
+        configure_logging(level="INFO", log_file=path, fmt="json", queue_size=queue_size)
+    finally:
+        sys.stderr = stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--stall-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="mara-bench-")
+    console = SlowStream(args.stall_ms / 1000)
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {args.lines} records each, "
+          f"console stall {args.stall_ms:g} ms")
+    print(f"{'pipeline':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'total s':>9}")
+    for name in ("sync", "queue"):
+        path = os.path.join(scratch, f"{name}.log")
+        if name == "sync":
+            sync_logging(path, console)
+        else:
+            queue_logging(path, console, args.requests * args.lines * 2)
+        start = time.perf_counter()
+        samples = asyncio.run(serve(args.requests, args.concurrency, args.lines))
+        total = time.perf_counter() - start
+        shutdown_logging()
+        samples.sort()
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"{name:>8} {statistics.median(samples):>9.3f} {p99:>9.3f} {samples[-1]:>9.3f} {total:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
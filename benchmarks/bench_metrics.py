@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of request metrics and stage timers
+
+Times the instrumentation pieces in isolation:
+  - observe:     one histogram observation
+  - stage:       entering and leaving a stage timer
+  - middleware:  a request through MetricsMiddleware around a no-op ASGI app,
+                 against the bare app
+  - render:      /metrics text for the series recorded by --requests requests
+                 over the app's routes
+then requests a paged /api/sites/status in-process for scale.
+
+Usage:
+    python benchmarks/bench_metrics.py [--iterations 100000] [--requests 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "mara-bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def per_request(app, iterations: int) -> float:
+    """Microseconds per request through an ASGI app"""
+    scope = {"type": "http", "method": "GET", "path": "/"}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    import metrics
+    import main as app_main
+
+    print(f"{'case':>18} {'us/op':>9}")
+    histogram = metrics.Histogram("bench_seconds", "benchmark", ("route",))
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        histogram.observe(0.004, "/api/sites/status")
+    print(f"{'observe':>18} {(time.perf_counter() - start) / args.iterations * 1e6:>9.3f}")
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        with metrics.stage("bench"):
+            pass
+    print(f"{'stage':>18} {(time.perf_counter() - start) / args.iterations * 1e6:>9.3f}")
+
+    bare = asyncio.run(per_request(noop_app, args.iterations))
+    wrapped = asyncio.run(per_request(metrics.MetricsMiddleware(noop_app), args.iterations))
+    print(f"{'bare app':>18} {bare:>9.3f}")
+    print(f"{'with middleware':>18} {wrapped:>9.3f}")
+
+    with TestClient(app_main.app) as client:
+        client.post("/api/initialize")
+        samples = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get("/api/sites/status", params={"limit": 100})
+            samples.append((time.perf_counter() - start) * 1e6)
+            assert response.status_code == 200, response.text[:200]
+        for route in ("/api/sites", "/api/sites/{site_id}", "/api/dashboard/metrics", "/api/optimize"):
+            for status in ("200", "400", "500"):
+                metrics.REQUEST_SECONDS.observe(0.01, "GET", route, status)
+        start = time.perf_counter()
+        body = client.get("/metrics").content
+        render = (time.perf_counter() - start) * 1e6
+        print(f"{'sites page':>18} {statistics.median(samples):>9.1f}")
+        print(f"{'GET /metrics':>18} {render:>9.1f}  ({len(body)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark Monte Carlo revenue risk across worker counts
+
+Solves an allocation for the 10-site fleet (with firm SLA power on two
+sites), then samples revenue risk for --scenarios scenarios with each worker
+count, checking that every run returns identical results for the same seed.
+
+Usage:
+    python benchmarks/bench_monte_carlo.py [--scenarios 100000] [--workers 1 2 4] [--horizon 24]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "mara-bench.log"))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from allocation_solver import build_allocation_problem, get_solver
+from monte_carlo import simulate_revenue_risk
+from revenue_engine import fleet_demand_multipliers, pack_fleet
+
+FIRM_SLA_POWER = {"site_1_nordic": 150000, "site_4_singapore": 460000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenarios", type=int, default=100000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--horizon", type=int, default=24, help="Hours per path")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from main import MULTI_SITE_CONFIG, distribute_hardware_across_sites, get_dummy_mara_inventory, get_dummy_mara_prices
+    mara_inventory = get_dummy_mara_inventory()
+    fleet = pack_fleet(MULTI_SITE_CONFIG, distribute_hardware_across_sites(mara_inventory), mara_inventory)
+    prices = get_dummy_mara_prices()
+    problem = build_allocation_problem(fleet, prices, fleet_demand_multipliers(fleet), FIRM_SLA_POWER)
+    allocation = get_solver().solve(problem).allocation
+
+    print(f"{args.scenarios} scenarios x {args.horizon}h x {fleet.size} sites, cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'seconds':>9} {'scen/s':>10} {'identical':>10}")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        result = simulate_revenue_risk(fleet, allocation, prices, FIRM_SLA_POWER, scenarios=args.scenarios,
+                                       horizon_hours=args.horizon, seed=args.seed, workers=workers,
+                                       start=datetime(2025, 7, 1, 12), site_config=MULTI_SITE_CONFIG)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or result
+        identical = result["fleet"] == baseline["fleet"] and result["sites"] == baseline["sites"]
+        print(f"{workers:>8} {elapsed:>9.2f} {args.scenarios / elapsed:>10.0f} {str(identical):>10}")
+
+    fleet_revenue = baseline["fleet"]["revenue"]
+    print(f"\nfleet revenue P5/P50/P95: {fleet_revenue['p5']:,.0f} / {fleet_revenue['p50']:,.0f} / {fleet_revenue['p95']:,.0f}")
+    print(f"{'site':>22} {'P5':>14} {'P50':>14} {'P95':>14} {'P(breach)':>10} {'P(throttle)':>12}")
+    for site_id, site in baseline["sites"].items():
+        print(f"{site_id:>22} {site['revenue']['p5']:>14,.0f} {site['revenue']['p50']:>14,.0f} "
+              f"{site['revenue']['p95']:>14,.0f} {site['sla_breach_probability']:>10.4f} {site['throttle_probability']:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Compare per-sample and batched price writes, then drive the price feed against the local API stub
+
+Writes --samples price samples on a temporary SQLite database one commit at a
+time (add_pricing_data) and in batches (add_pricing_batch), then runs the
+PriceFeed's HTTP source against price_feed_stub over an in-process
+httpx.ASGITransport, with the stub failing every --fail-every requests.
+
+Usage:
+    python benchmarks/bench_price_feed.py [--samples 5000] [--polls 200] [--fail-every 10]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+
+import httpx
+
+from database import SessionLocal, PricingData, latest_pricing, init_db, add_pricing_data, add_pricing_batch
+from price_feed import HttpPriceSource, PriceFeed, synthetic_prices
+from price_feed_stub import create_app
+
+init_db()
+
+
+def samples(count: int, start: datetime) -> list:
+    rng = random.Random(7)
+    return [{**synthetic_prices(i * 5.0, rng), "timestamp": start + timedelta(seconds=i * 5),
+             "source": "benchmark"} for i in range(count)]
+
+
+def bench_writes(count: int) -> None:
+    print(f"{'mode':>12} {'samples':>8} {'ms total':>9} {'us/sample':>10}")
+    db = SessionLocal()
+    start = datetime(2025, 1, 1)
+    began = time.perf_counter()
+    for sample in samples(count, start):
+        add_pricing_data(db, sample)
+    elapsed = time.perf_counter() - began
+    print(f"{'per-sample':>12} {count:>8} {elapsed * 1000:>9.1f} {elapsed * 1e6 / count:>10.1f}")
+    for batch_size in (20, 200):
+        batch_start = start + timedelta(days=batch_size)
+        rows = samples(count, batch_start)
+        began = time.perf_counter()
+        for i in range(0, count, batch_size):
+            add_pricing_batch(db, rows[i:i + batch_size])
+        elapsed = time.perf_counter() - began
+        print(f"{f'batch {batch_size}':>12} {count:>8} {elapsed * 1000:>9.1f} {elapsed * 1e6 / count:>10.1f}")
+    db.close()
+
+
+async def bench_feed(polls: int, fail_every: int) -> None:
+    stub = create_app(interval=0.01, fail_every=fail_every, seed=7)
+    written = {"rows": 0}
+
+    async def writer(batch):
+        with SessionLocal() as db:
+            written["rows"] += add_pricing_batch(db, batch)
+        return len(batch)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub), base_url="http://stub") as client:
+        feed = PriceFeed(HttpPriceSource("http://stub/prices", client), writer, lambda sample: None,
+                         interval=0, batch_size=50)
+        latest_pricing.clear()
+        began = time.perf_counter()
+        for _ in range(polls):
+            try:
+                await feed.poll()
+            except httpx.HTTPStatusError:
+                feed.counters["fetch_errors"] += 1
+            if feed.flush_due():
+                await feed.flush()
+            await asyncio.sleep(0.005)
+        await feed.flush()
+        elapsed = time.perf_counter() - began
+    stats = feed.stats()
+    print(f"\nfeed: {polls} polls in {elapsed * 1000:.0f} ms, {stats['samples']} samples, "
+          f"{stats['fetch_errors']} failed fetches, {stats['batches']} batches, {written['rows']} rows written")
+    print(f"latest price register: {latest_pricing.get()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--fail-every", type=int, default=10)
+    args = parser.parse_args()
+
+    bench_writes(args.samples)
+    asyncio.run(bench_feed(args.polls, args.fail_every))
+    with SessionLocal() as db:
+        print(f"price rows stored: {db.query(PricingData).count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Simulate months of dashboard price polling against the price time-series store
+
+Writes one price sample per --interval seconds of simulated time for --days
+days on a temporary SQLite database, then reports table sizes, write cost,
+latest-price lookup cost and range query cost per resolution.
+
+Usage:
+    python benchmarks/bench_price_store.py [--days 30] [--interval 60]
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+
+from database import (SessionLocal, PricingData, PricingRollup, latest_pricing, init_db,
+                      add_pricing_data, get_latest_pricing, get_pricing_range)
+
+init_db()
+
+
+def sample(i: int, timestamp: datetime) -> dict:
+    wave = math.sin(i / 200) * 0.1
+    return {"energy_price": 0.65 + wave, "hash_price": 8.5 + wave * 2, "token_price": 2.9 + wave,
+            "timestamp": timestamp, "source": "benchmark"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--interval", type=float, default=60, help="Simulated seconds between samples")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    start = datetime(2025, 1, 1)
+    steps = int(args.days * 86400 / args.interval)
+    write_start = time.perf_counter()
+    for i in range(steps):
+        timestamp = start + timedelta(seconds=i * args.interval)
+        add_pricing_data(db, sample(i, timestamp))
+        if (i + 1) % max(steps // 6, 1) == 0:
+            print(f"day {(i + 1) * args.interval / 86400:>6.1f}: raw rows {db.query(PricingData).count():>7}, "
+                  f"rollup rows {db.query(PricingRollup).count():>6}")
+    write_ms = (time.perf_counter() - write_start) * 1000 / max(steps, 1)
+    end = start + timedelta(seconds=steps * args.interval)
+
+    print(f"\nsamples written: {steps}  ({write_ms:.3f} ms per sample incl. rollups and retention)")
+    print(f"latest lookup (memory):   {_timed(lambda: get_latest_pricing(db), 1000) * 1000:8.2f} us")
+    latest_pricing.clear()
+    print(f"latest lookup (database): {_timed(lambda: (latest_pricing.clear(), get_latest_pricing(db)), 200) * 1000:8.2f} us")
+    print(f"\n{'resolution':>10} {'window':>8} {'points':>7} {'query ms':>9}")
+    for resolution, window in (("raw", timedelta(hours=6)), ("1m", timedelta(days=1)),
+                               ("1h", timedelta(days=30)), ("1d", timedelta(days=args.days))):
+        points = get_pricing_range(db, end - window, end, resolution)
+        elapsed = _timed(lambda: get_pricing_range(db, end - window, end, resolution), 20)
+        print(f"{resolution:>10} {window.days or f'{window.seconds // 3600}h':>8} {len(points):>7} {elapsed:>9.2f}")
+    db.close()
+
+
+def _timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized fleet revenue engine against the per-site dict loop
+
+Usage:
+    python benchmarks/bench_revenue_engine.py [--sizes 10 1000 100000]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import pytz
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from revenue_engine import pack_fleet, pack_allocations, compute_fleet_revenue
+
+TIMEZONES = ["Atlantic/Reykjavik", "America/Vancouver", "Europe/Oslo", "Asia/Singapore", "America/Chicago",
+             "Europe/Dublin", "Asia/Tokyo", "Australia/Sydney", "America/Santiago", "Europe/Berlin"]
+
+SITE_INVENTORY = {
+    "miners": {
+        "air": {"hashrate": 1000, "power": 3500, "available": 50},
+        "hydro": {"hashrate": 5000, "power": 5000, "available": 17},
+        "immersion": {"hashrate": 10000, "power": 10000, "available": 8}
+    },
+    "inference": {
+        "gpu": {"tokens": 1000, "power": 5000, "available": 60},
+        "asic": {"tokens": 50000, "power": 15000, "available": 12}
+    }
+}
+
+PRICES = {"energy_price": 0.65, "hash_price": 8.5, "token_price": 2.9}
+
+
+def make_fleet(n_sites: int):
+    """Synthetic fleet of n_sites cycling through the production timezones"""
+    config, inventories, allocations = {}, {}, {}
+    for i in range(n_sites):
+        site_id = f"site_{i}"
+        config[site_id] = {
+            "location": {"timezone": TIMEZONES[i % len(TIMEZONES)]},
+            "climate": {"cooling_efficiency": 0.4 + (i % 6) * 0.1, "renewable_energy": 0.5},
+            "power_capacity": 1000000,
+            "energy_cost_multiplier": 0.5 + (i % 10) * 0.1
+        }
+        inventories[site_id] = SITE_INVENTORY
+        allocations[site_id] = {
+            "gpu_compute": random.randint(20, 60), "asic_compute": random.randint(5, 12),
+            "air_miners": random.randint(10, 40), "hydro_miners": random.randint(5, 17),
+            "immersion_miners": random.randint(2, 8)
+        }
+    return config, inventories, allocations
+
+
+def legacy_demand_multiplier(timezone_str: str) -> float:
+    local_hour = datetime.now(pytz.timezone(timezone_str)).hour
+    if 9 <= local_hour <= 18:
+        base = 1.5
+    elif 6 <= local_hour <= 9 or 18 <= local_hour <= 22:
+        base = 1.2
+    else:
+        base = 0.8
+    return max(0.5, base + math.sin(time.time() / 50) * 0.3)
+
+
+def legacy_loop(config, inventories, allocations):
+    """The per-site dict walk that get_sites_status used to do"""
+    out = {}
+    for site_id, site_config in config.items():
+        inv = inventories[site_id]
+        alloc = allocations[site_id]
+        mult = site_config["energy_cost_multiplier"]
+        power = sum(alloc[k] * inv[g][c]["power"] for k, (g, c) in zip(
+            ["gpu_compute", "asic_compute", "air_miners", "hydro_miners", "immersion_miners"],
+            [("inference", "gpu"), ("inference", "asic"), ("miners", "air"), ("miners", "hydro"), ("miners", "immersion")]))
+        revenue = (alloc["gpu_compute"] * inv["inference"]["gpu"]["tokens"] * PRICES["token_price"] * mult * 0.001 +
+                   alloc["asic_compute"] * inv["inference"]["asic"]["tokens"] * PRICES["token_price"] * mult * 0.001)
+        for key, kind in [("air_miners", "air"), ("hydro_miners", "hydro"), ("immersion_miners", "immersion")]:
+            revenue += alloc[key] * inv["miners"][kind]["hashrate"] * PRICES["hash_price"] * mult * 0.001
+        revenue *= legacy_demand_multiplier(site_config["location"]["timezone"])
+        out[site_id] = (revenue, power)
+    return out
+
+
+def engine(config, inventories, allocations):
+    fleet = pack_fleet(config, inventories)
+    scale = fleet.energy_cost_multiplier * 0.001
+    return compute_fleet_revenue(fleet, pack_allocations(fleet.site_ids, allocations), PRICES,
+                                 inference_scale=scale, mining_scale=scale)
+
+
+def engine_compute_only(fleet, matrix):
+    scale = fleet.energy_cost_multiplier * 0.001
+    return compute_fleet_revenue(fleet, matrix, PRICES, inference_scale=scale, mining_scale=scale)
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--legacy-limit", type=int, default=100000,
+                        help="skip the legacy loop above this many sites")
+    args = parser.parse_args()
+
+    print(f"{'sites':>8} {'legacy sites/s':>16} {'engine sites/s':>16} {'compute sites/s':>16}")
+    for n in args.sizes:
+        config, inventories, allocations = make_fleet(n)
+        fleet = pack_fleet(config, inventories)
+        matrix = pack_allocations(fleet.site_ids, allocations)
+
+        legacy = timed(legacy_loop, config, inventories, allocations) if n <= args.legacy_limit else None
+        packed = timed(engine, config, inventories, allocations)
+        compute = timed(engine_compute_only, fleet, matrix)
+
+        legacy_rate = f"{n / legacy:,.0f}" if legacy else "skipped"
+        print(f"{n:>8} {legacy_rate:>16} {n / packed:>16,.0f} {n / compute:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark rolling-horizon schedule planning as the fleet grows
+
+Imports synthetic sites through POST /api/sites/import (CSV) until the fleet
+reaches each size, then times POST /api/schedule/plan in-process:
+  - full:         no previous plan, every (hour, site) row solved and written
+  - incremental:  re-plan with unchanged inputs, every row reused
+  - after SLA:    re-plan after a new SLA commitment, only its site's hours solved
+plus a 100-site page of GET /api/schedule. plan ms is the planner alone; the
+endpoint time includes reading prices and SLA windows and writing rows.
+
+Usage:
+    python benchmarks/bench_schedule.py [--sizes 100 1000] [--hours 72]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "mara-bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("SCHEDULE_REPLAN_INTERVAL", "0")
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_site_registry import site_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--hours", type=int, default=72)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    def plan():
+        start = time.perf_counter()
+        response = client.post(f"/api/schedule/plan?hours={args.hours}")
+        assert response.status_code == 200, response.text[:200]
+        return (time.perf_counter() - start) * 1000, response.json()
+
+    print(f"{'sites':>6} {'rows':>7} {'run':>12} {'endpoint ms':>12} {'plan ms':>9} {'solved':>7} {'reused':>7} {'written':>8}")
+    with TestClient(app_main.app) as client:
+        client.post("/api/initialize")
+        existing = len(app_main.site_registry.index)
+        for size in sorted(args.sizes):
+            if size > existing:
+                response = client.post("/api/sites/import", content=site_csv(existing, size - existing),
+                                       headers={"content-type": "text/csv"})
+                assert response.status_code == 200, response.text[:200]
+                existing = size
+
+            app_main.schedule_planner.plan = None
+            runs = [("full", plan()), ("incremental", plan())]
+            response = client.post("/api/sla/request", json={"tier": "premium", "power_requirement": 10,
+                                                             "duration_hours": 6})
+            assert response.status_code == 200, response.text[:200]
+            runs.append(("after SLA", plan()))
+            for name, (endpoint_ms, stats) in runs:
+                print(f"{existing:>6} {stats['rows']:>7} {name:>12} {endpoint_ms:>12.1f} {stats['plan_ms']:>9.1f} "
+                      f"{stats['solved_rows']:>7} {stats['reused_rows']:>7} {stats['written_rows']:>8}")
+
+            start = time.perf_counter()
+            response = client.get(f"/api/schedule?hours={args.hours}&site_limit=100")
+            assert response.status_code == 200, response.text[:200]
+            print(f"{existing:>6} {'':>7} {'read page':>12} {(time.perf_counter() - start) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized fleet simulation against per-site Python loops
+
+Generates a year of hourly temperature and demand-multiplier series for
+fleets of increasing size with FleetSimulator, and compares it with the old
+per-site, per-step approach (fresh pytz timezone, datetime conversion and
+random.uniform for every site at every step). The loop baseline runs on a
+slice of steps and is extrapolated to the full year.
+
+Usage:
+    python benchmarks/bench_simulation.py [--sizes 10 100 1000] [--hours 8760] [--loop-steps 200]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from simulation import FleetSimulator, SimulationClock
+
+TIMEZONES = ["America/New_York", "America/Chicago", "America/Los_Angeles", "Europe/Oslo",
+             "Asia/Singapore", "Australia/Sydney", "Asia/Kolkata", "America/Sao_Paulo"]
+
+
+def make_fleet(n_sites: int) -> dict:
+    return {
+        f"site_{i}": {"climate": {"avg_temp": 40 + (i * 7) % 50},
+                      "location": {"timezone": TIMEZONES[i % len(TIMEZONES)]}}
+        for i in range(n_sites)
+    }
+
+
+def legacy_step(fleet: dict, timestamp: float) -> None:
+    """The old per-site weather and demand calls, with an explicit timestamp"""
+    now = datetime.fromtimestamp(timestamp, pytz.utc)
+    for config in fleet.values():
+        base_temp = config["climate"]["avg_temp"]
+        base_temp + math.sin(timestamp / 100) * 10 + random.uniform(-20, 20)
+        local_hour = now.astimezone(pytz.timezone(config["location"]["timezone"])).hour
+        if 9 <= local_hour <= 18:
+            base = 1.5
+        elif 6 <= local_hour <= 9 or 18 <= local_hour <= 22:
+            base = 1.2
+        else:
+            base = 0.8
+        max(0.5, base + math.sin(timestamp / 50) * 0.3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--hours", type=int, default=8760)
+    parser.add_argument("--loop-steps", type=int, default=200, help="Steps timed for the loop baseline")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    clock = SimulationClock.hourly(datetime(2025, 1, 1), args.hours)
+    print(f"{args.hours} hourly steps from {clock.start:%Y-%m-%d}")
+    print(f"{'sites':>7} {'cells':>11} {'vector s':>9} {'loop s (est)':>13} {'speedup':>8} {'reproducible':>13}")
+    for n in args.sizes:
+        fleet = make_fleet(n)
+        simulator = FleetSimulator(fleet)
+
+        start = time.perf_counter()
+        result = simulator.run(clock, seed=args.seed)
+        vector_s = time.perf_counter() - start
+        reproducible = np.array_equal(result.temperature, simulator.run(clock, seed=args.seed).temperature)
+
+        steps = min(args.loop_steps, args.hours)
+        timestamps = clock.timestamps(0, steps)
+        start = time.perf_counter()
+        for timestamp in timestamps:
+            legacy_step(fleet, float(timestamp))
+        loop_s = (time.perf_counter() - start) * args.hours / steps
+
+        print(f"{n:>7} {n * args.hours:>11} {vector_s:>9.3f} {loop_s:>13.1f} {loop_s / vector_s:>7.0f}x "
+              f"{str(reproducible):>13}")
+
+
+if __name__ == "__main__":
+    main()
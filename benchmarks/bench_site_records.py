@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark the /api/sites/status hot path: site records vs nested dicts
+
+Builds fleets of increasing size by repeating the 10 configured sites, then
+times the status snapshot two ways:
+  - dicts:   the previous path, decoding the stored inventory JSON on every
+             request and walking nested config/inventory dicts per site
+             (random.randint allocations, per-site pack_fleet lookups,
+             efficiency scores and local time)
+  - records: compose_sites_status over a SiteIndex compiled once, with the
+             per-site math batched and nested JSON built only for the response
+
+CPU time is process time per request; allocation counts come from
+tracemalloc (memory blocks alive once the response is built, and peak KiB
+while building it).
+
+Usage:
+    python benchmarks/bench_site_records.py [--sizes 10 1000 5000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "mara-bench.log"))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from revenue_engine import compute_fleet_revenue, pack_allocations, pack_fleet
+from simulation import FleetSimulator
+from site_records import SiteIndex
+
+
+def make_fleet(n_sites: int, site_config: dict, inventories: dict):
+    """n_sites copies of the configured sites, with their stored inventories"""
+    base = list(site_config)
+    config, stored = {}, {}
+    for i in range(n_sites):
+        source = base[i % len(base)]
+        site_id = f"{source}_{i}"
+        config[site_id] = site_config[source]
+        stored[site_id] = json.dumps(inventories[source])
+    return config, stored
+
+
+def legacy_allocation(site_inventory: dict) -> dict:
+    return {
+        "gpu_compute": random.randint(20, min(80, site_inventory.get("inference", {}).get("gpu", {}).get("available", 100))),
+        "asic_compute": random.randint(5, min(30, site_inventory.get("inference", {}).get("asic", {}).get("available", 50))),
+        "air_miners": random.randint(10, min(40, site_inventory.get("miners", {}).get("air", {}).get("available", 50))),
+        "hydro_miners": random.randint(5, min(20, site_inventory.get("miners", {}).get("hydro", {}).get("available", 20))),
+        "immersion_miners": random.randint(2, min(15, site_inventory.get("miners", {}).get("immersion", {}).get("available", 10)))
+    }
+
+
+def legacy_efficiency(site_config: dict, weather: dict) -> float:
+    temp_factor = max(0.5, 1.0 - (weather["temperature"] - 20) / 50)
+    energy_factor = max(0.3, 1.0 / site_config["energy_cost_multiplier"])
+    return min(100.0, 80.0 * temp_factor * site_config["climate"]["cooling_efficiency"] * energy_factor)
+
+
+def legacy_status(site_config: dict, stored: dict, simulator: FleetSimulator, prices: dict, get_local_time) -> dict:
+    """The pre-record snapshot: JSON decoded per request, nested dicts walked per site"""
+    inventories = {site_id: json.loads(row) for site_id, row in stored.items()}
+    allocations = {site_id: legacy_allocation(inventories.get(site_id, {})) for site_id in site_config}
+    fleet = pack_fleet(site_config, inventories)
+    price_scale = fleet.energy_cost_multiplier * 0.001
+    result = compute_fleet_revenue(fleet, pack_allocations(fleet.site_ids, allocations), prices,
+                                   inference_scale=price_scale, mining_scale=price_scale)
+    fleet_weather = simulator.weather_now()
+    sites = []
+    for i, (site_id, config) in enumerate(site_config.items()):
+        weather = fleet_weather[site_id]
+        multiplier = config["energy_cost_multiplier"]
+        power_used = int(result.power_used[i])
+        pricing = {key: prices.get(key, 1.0) * multiplier for key in ("hash_price", "token_price", "energy_price")}
+        sites.append({
+            "site_id": site_id, "id": site_id, "name": config["name"], "location": config["location"],
+            "timezone": config["location"]["timezone"], "hardware_inventory": inventories.get(site_id, {}),
+            "allocation": allocations[site_id], "power_used": power_used,
+            "power_capacity": config["power_capacity"],
+            "power_utilization": min(100, power_used / config["power_capacity"] * 100),
+            "weather": weather, "current_temp": weather["temperature"],
+            "local_time": get_local_time(config["location"]["timezone"]),
+            "cooling_efficiency": config["climate"]["cooling_efficiency"], "pricing": pricing,
+            "energy_price": pricing["energy_price"], "energy_cost_multiplier": multiplier,
+            "revenue": float(result.revenue[i]), "uptime": random.uniform(98.5, 99.9),
+            "efficiency_score": legacy_efficiency(config, weather), "last_updated": datetime.now().isoformat(),
+        })
+    hardware = {
+        "gpu_units": sum(s["hardware_inventory"].get("inference", {}).get("gpu", {}).get("available", 0) for s in sites),
+        "asic_units": sum(s["hardware_inventory"].get("inference", {}).get("asic", {}).get("available", 0) for s in sites),
+        "air_miners": sum(s["hardware_inventory"].get("miners", {}).get("air", {}).get("available", 0) for s in sites),
+        "hydro_miners": sum(s["hardware_inventory"].get("miners", {}).get("hydro", {}).get("available", 0) for s in sites),
+        "immersion_miners": sum(s["hardware_inventory"].get("miners", {}).get("immersion", {}).get("available", 0) for s in sites),
+    }
+    return {"sites": sites, "total_sites": len(sites), "total_hardware": hardware}
+
+
+def measure(build, repeat: int):
+    """Median process seconds per call, then live blocks and peak KiB for one traced call"""
+    build()  # warm caches
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        build()
+        timings.append(time.process_time() - start)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    response = build()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del response
+    return sorted(timings)[len(timings) // 2], blocks, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from main import (MULTI_SITE_CONFIG, compose_sites_status, distribute_hardware_across_sites,
+                      get_dummy_mara_inventory, get_dummy_mara_prices, get_local_time)
+    inventories = distribute_hardware_across_sites(get_dummy_mara_inventory())
+    prices = get_dummy_mara_prices()
+
+    print(f"{'sites':>7} {'path':>8} {'ms/req':>9} {'blocks':>10} {'peak KiB':>10} {'cpu x':>7} {'blocks x':>9}")
+    for n in args.sizes:
+        site_config, stored = make_fleet(n, MULTI_SITE_CONFIG, inventories)
+        simulator = FleetSimulator(site_config, seed=args.seed)
+        index = SiteIndex(site_config)
+        index.load_inventories({site_id: json.loads(row) for site_id, row in stored.items()})
+
+        legacy = measure(lambda: legacy_status(site_config, stored, simulator, prices, get_local_time), args.repeat)
+        records = measure(lambda: compose_sites_status(index, simulator, prices), args.repeat)
+        for name, (seconds, blocks, peak) in (("dicts", legacy), ("records", records)):
+            ratios = f"{legacy[0] / seconds:>6.1f}x {legacy[1] / blocks:>8.1f}x" if name == "records" else ""
+            print(f"{n:>7} {name:>8} {seconds * 1000:>9.2f} {blocks:>10} {peak:>10.0f} {ratios}")
+
+
+if __name__ == "__main__":
+    main()
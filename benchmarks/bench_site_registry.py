@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark endpoint latency as the site registry grows
+
+Imports synthetic sites through POST /api/sites/import (CSV) until the fleet
+reaches each size, then times endpoints in-process with the FastAPI test
+client: single-site lookups, a 100-site page and small SLA requests, all
+served from the in-memory registry and placement trees, so they should stay
+flat. Building the full status snapshot (compose_sites_status, without JSON
+encoding) is timed directly for reference; it is linear in fleet size.
+
+Usage:
+    python benchmarks/bench_site_registry.py [--sizes 10 1000 10000] [--requests 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "mara-bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+TIMEZONES = ["America/New_York", "America/Chicago", "America/Los_Angeles", "Europe/Oslo",
+             "Asia/Singapore", "Australia/Sydney", "Asia/Kolkata", "America/Sao_Paulo"]
+COOLING = ["free_air", "hydro_cooled", "immersion", "air_cooled"]
+
+
+def site_csv(first: int, count: int) -> str:
+    header = "site_id,name,timezone,latitude,longitude,avg_temp,cooling_efficiency,gpu_ratio,asic_ratio,cooling_type,power_capacity,energy_cost_multiplier"
+    rows = [
+        f"bench_{i},Bench {i},{TIMEZONES[i % len(TIMEZONES)]},{(i * 7) % 120 - 60},{(i * 13) % 340 - 170},"
+        f"{40 + (i * 7) % 50},{0.4 + (i % 6) / 10:.1f},{(i % 9 + 1) / 10:.1f},{1 - (i % 9 + 1) / 10:.1f},"
+        f"{COOLING[i % len(COOLING)]},{500000 + (i % 5) * 250000},{0.5 + (i % 8) / 10:.1f}"
+        for i in range(first, first + count)
+    ]
+    return "\n".join([header] + rows)
+
+
+def timed(call, requests: int) -> float:
+    """Median milliseconds per call"""
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = call()
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text[:200]
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    print(f"{'sites':>7} {'import s':>9} {'get ms':>8} {'page ms':>8} {'sla ms':>8} {'status build ms':>16}")
+    with TestClient(app_main.app) as client:
+        client.post("/api/initialize")
+        existing = len(app_main.site_registry.index)
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            if size > existing:
+                response = client.post("/api/sites/import", content=site_csv(existing, size - existing),
+                                       headers={"content-type": "text/csv"})
+                assert response.status_code == 200, response.text[:200]
+                existing = size
+            import_s = time.perf_counter() - start
+
+            site_ids = app_main.site_registry.index.site_ids
+            lookups = iter(site_ids[(i * 7919) % len(site_ids)] for i in range(args.requests))
+            get_ms = timed(lambda: client.get(f"/api/sites/{next(lookups)}"), args.requests)
+            page_ms = timed(lambda: client.get("/api/sites?offset=0&limit=100"), args.requests)
+            sla_ms = timed(lambda: client.post("/api/sla/request", json={"tier": "flexible", "power_requirement": 10,
+                                                                         "duration_hours": 1}), args.requests)
+
+            registry = app_main.site_registry
+            prices = app_main.get_dummy_mara_prices()
+            start = time.perf_counter()
+            app_main.compose_sites_status(registry.index, registry.simulator, prices)
+            build_ms = (time.perf_counter() - start) * 1000
+            print(f"{existing:>7} {import_s:>9.2f} {get_ms:>8.2f} {page_ms:>8.2f} {sla_ms:>8.2f} {build_ms:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/sites/status response size and latency on a large fleet
+
+Imports synthetic sites until the fleet reaches --sites, then requests the
+status endpoint in-process with the FastAPI test client:
+  - full:        the whole-fleet snapshot (cached per tick, JSON encoded per request)
+  - page:        one cursor page of --limit sites, every field
+  - projection:  the same page projected to a few fields
+  - filtered:    one region and cooling type, with a utilization floor
+  - not-modified: a repeat of the page with If-None-Match (304, empty body)
+The previous behaviour, FastAPI's generic encoder over the full snapshot, is
+timed directly for reference.
+
+Usage:
+    python benchmarks/bench_sites_status.py [--sites 5000] [--limit 100] [--requests 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Point the database module at a scratch file before it creates its engines
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='mara-bench-')}/bench.db"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "mara-bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_site_registry import site_csv
+
+
+def timed(call, requests: int, status: int = 200):
+    """Median milliseconds per call and the last response's body size"""
+    samples, size = [], 0
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = call()
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == status, response.text[:200]
+        size = len(response.content)
+    return statistics.median(samples), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sites", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    import json
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    with TestClient(app_main.app) as client:
+        client.post("/api/initialize")
+        existing = len(app_main.site_registry.index)
+        if args.sites > existing:
+            response = client.post("/api/sites/import", content=site_csv(existing, args.sites - existing),
+                                   headers={"content-type": "text/csv"})
+            assert response.status_code == 200, response.text[:200]
+
+        page = {"limit": args.limit}
+        etag = client.get("/api/sites/status", params=page).headers["etag"]
+        cases = [
+            ("full", lambda: client.get("/api/sites/status"), 200),
+            ("page", lambda: client.get("/api/sites/status", params=page), 200),
+            ("projection", lambda: client.get("/api/sites/status", params={
+                **page, "fields": "power_utilization,revenue,efficiency_score"}), 200),
+            ("filtered", lambda: client.get("/api/sites/status", params={
+                **page, "region": "Asia", "cooling_type": "immersion", "min_utilization": 0.1}), 200),
+            ("not-modified", lambda: client.get("/api/sites/status", params=page,
+                                                headers={"If-None-Match": etag}), 304),
+        ]
+
+        print(f"{len(app_main.site_registry.index)} sites, page limit {args.limit}")
+        print(f"{'view':>14} {'ms/req':>9} {'bytes':>10}")
+        for name, call, status in cases:
+            ms, size = timed(call, args.requests, status)
+            print(f"{name:>14} {ms:>9.2f} {size:>10}")
+
+        snapshot = app_main.snapshot_cache.peek("sites")
+        if snapshot is not None:
+            start = time.perf_counter()
+            body = json.dumps(jsonable_encoder(snapshot)).encode()
+            print(f"{'full (generic)':>14} {(time.perf_counter() - start) * 1000:>9.2f} {len(body):>10}")
+
+
+if __name__ == "__main__":
+    main()
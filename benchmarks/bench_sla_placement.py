@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark SLA placement throughput and check admission control
+
+Places random SLA requests (mixed tiers, sizes and split settings) on fleets
+of increasing size while commitments expire in the background, then checks
+that no site is committed beyond its capacity.
+
+Usage:
+    python benchmarks/bench_sla_placement.py [--sizes 10 1000 10000] [--requests 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sla_placement import PlacementRejected, SLAPlacementEngine
+
+TIERS = ["premium", "standard", "flexible", "spot"]
+
+
+def make_fleet(n_sites: int, rng: random.Random) -> dict:
+    return {
+        f"site_{i}": {
+            "climate": {"cooling_efficiency": rng.uniform(0.4, 0.95)},
+            "energy_cost_multiplier": rng.uniform(0.5, 1.4),
+            "power_capacity": 1_000_000,
+        }
+        for i in range(n_sites)
+    }
+
+
+def run(n_sites: int, n_requests: int, rng: random.Random) -> tuple:
+    fleet = make_fleet(n_sites, rng)
+    engine = SLAPlacementEngine(fleet, TIERS)
+    engine.set_draw({site_id: rng.uniform(0, 700_000) for site_id in fleet})
+    # Size requests so the fleet fills up and admission control has work to do
+    mean_request = n_sites * 400_000 / n_requests * 4
+    live = []
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        try:
+            placement = engine.place(rng.choice(TIERS), max(1, int(rng.expovariate(1 / mean_request))),
+                                     allow_split=rng.random() < 0.7)
+            live.append(placement)
+        except PlacementRejected:
+            pass
+        # Expire an old commitment now and then
+        if live and rng.random() < 0.2:
+            for site_id, power in live.pop(rng.randrange(len(live))).sites.items():
+                engine.release(site_id, power)
+    elapsed = time.perf_counter() - start
+
+    overcommitted = [site_id for site_id in fleet
+                     if engine.committed[site_id] + engine.draw[site_id] > engine.capacity[site_id] + 1e-6]
+    return elapsed, engine.admitted, engine.rejected, overcommitted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'sites':>7} {'requests':>9} {'req/s':>10} {'us/req':>8} {'admitted':>9} {'rejected':>9} {'overcommitted':>14}")
+    for n in args.sizes:
+        elapsed, admitted, rejected, overcommitted = run(n, args.requests, rng)
+        print(f"{n:>7} {args.requests:>9} {args.requests / elapsed:>10.0f} {elapsed / args.requests * 1e6:>8.1f} "
+              f"{admitted:>9} {rejected:>9} {len(overcommitted):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark follow-the-sun migration steps as the fleet grows
+
+Seeds the engine with a synthetic fleet's allocation, then runs one step per
+simulated --step-minutes over --hours, as the background loop would run once
+a minute. Prints step time percentiles, moves and units moved per step, and
+checks that every step conserves the workload and keeps each site within its
+hardware and power capacity.
+
+Usage:
+    python benchmarks/bench_workload_migration.py [--sizes 1000 10000 100000] [--hours 24] [--step-minutes 60]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_revenue_engine import PRICES, make_fleet
+from revenue_engine import INFERENCE_MASK, pack_allocations, pack_fleet
+from workload_migration import MigrationEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--step-minutes", type=float, default=60)
+    parser.add_argument("--workload-share", type=float, default=0.6)
+    args = parser.parse_args()
+
+    random.seed(7)
+    steps = int(args.hours * 60 / args.step_minutes)
+    start = datetime(2025, 11, 18)
+    print(f"{steps} steps of {args.step_minutes:g} min, workload share {args.workload_share:g}")
+    print(f"{'sites':>7} {'p50 ms':>8} {'max ms':>8} {'moves/step':>11} {'units/step':>11} {'moved share':>12}")
+    for size in args.sizes:
+        config, inventories, allocations = make_fleet(size)
+        fleet = pack_fleet(config, inventories)
+        engine = MigrationEngine(workload_share=args.workload_share)
+        engine.seed(fleet.site_ids, pack_allocations(fleet.site_ids, allocations))
+        workload = engine.placement.sum(axis=0)
+        firm = np.zeros(fleet.size)
+
+        samples, moves, units = [], [], []
+        for i in range(steps):
+            began = time.perf_counter()
+            step = engine.step(fleet, PRICES, firm, start + timedelta(minutes=i * args.step_minutes))
+            samples.append((time.perf_counter() - began) * 1000)
+            moves.append(step.stats["move_count"])
+            units.append(step.stats["units_moved"])
+            placement = engine.placement
+            assert np.array_equal(placement.sum(axis=0), workload), "workload not conserved"
+            assert (placement <= fleet.available).all(), "placement exceeds hardware"
+            inference_power = (placement * fleet.unit_power * INFERENCE_MASK).sum(axis=1)
+            assert (inference_power <= fleet.power_capacity + 1e-6).all(), "placement exceeds power capacity"
+
+        moved_share = statistics.mean(units) / max(1.0, workload.sum())
+        print(f"{size:>7} {statistics.median(samples):>8.2f} {max(samples):>8.2f} {statistics.mean(moves):>11.1f} "
+              f"{statistics.mean(units):>11.1f} {moved_share:>11.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Load test: dashboard polling latency while optimizations write to the database
+
+Starts the API on a temporary SQLite database (or targets --url), runs
+--clients concurrent dashboard pollers alongside a writer calling
+/api/optimize, and reports p50/p95/p99 latency for the polling requests.
+Run it on commits before and after a change to compare.
+
+Usage:
+    python benchmarks/load_dashboard.py [--clients 50] [--duration 15] [--url http://127.0.0.1:8000]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+POLL_PATHS = ("/api/dashboard/metrics", "/api/sites/status")
+
+
+async def poller(client: httpx.AsyncClient, deadline: float, latencies: list, errors: list):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = POLL_PATHS[i % len(POLL_PATHS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            errors.append(str(e))
+
+
+async def writer(client: httpx.AsyncClient, deadline: float, interval: float, counts: dict):
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.post("/api/optimize", params={"wait": "true"})
+            counts["ok" if response.status_code == 200 else "failed"] += 1
+        except Exception:
+            counts["failed"] += 1
+        await asyncio.sleep(interval)
+
+
+async def run(url: str, clients: int, duration: float, write_interval: float):
+    limits = httpx.Limits(max_connections=clients + 4)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        (await client.post("/api/initialize")).raise_for_status()
+        latencies, errors = [], []
+        writes = {"ok": 0, "failed": 0}
+        deadline = time.perf_counter() + duration
+        tasks = [poller(client, deadline, latencies, errors) for _ in range(clients)]
+        if write_interval >= 0:
+            tasks.append(writer(client, deadline, write_interval, writes))
+        await asyncio.gather(*tasks)
+    return latencies, errors, writes
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/api/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Existing server; by default one is started on a temp database")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--write-interval", type=float, default=0.0,
+                        help="Seconds between /api/optimize calls; negative disables the writer")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        tmp = tempfile.mkdtemp(prefix="mara-load-")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/load.db", LOG_FILE=f"{tmp}/load.log",
+                   CLAUDE_API_KEY="", CLAUDE_CLIENT="stub")
+        url = f"http://127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=ROOT, env=env)
+    try:
+        wait_until_up(url)
+        latencies, errors, writes = asyncio.run(run(url, args.clients, args.duration, args.write_interval))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if not latencies:
+        print(f"no successful requests ({len(errors)} errors)")
+        return
+    print(f"clients: {args.clients}  duration: {args.duration:.0f}s  "
+          f"writes ok/failed: {writes['ok']}/{writes['failed']}  errors: {len(errors)}")
+    print(f"{'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print(f"{len(latencies):>9} {len(latencies) / args.duration:>8.0f} {percentile(latencies, 50):>8.1f} "
+          f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} {max(latencies):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
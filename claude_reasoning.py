@@ -0,0 +1,351 @@
+"""
+Asynchronous Claude reasoning for SLA-Smart Energy Arbitrage Platform
+
+Claude's analysis is decoupled from the numeric allocation: /api/optimize
+submits a reasoning job and returns immediately, and the text is delivered
+later by job id (polled or streamed). Reasoning is memoized by a hash of the
+quantized site snapshot plus SLA commitments.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+
+MOCK_REASONING = """
+            MOCK CLAUDE OPTIMIZATION (No API Key Configured):
+
+            SITE PERFORMANCE RANKING:
+            1. Nordic Iceland: 95% cooling efficiency, lowest energy costs (0.6x multiplier)
+            2. Norway Oslo: 90% cooling efficiency, cheapest renewable energy (0.5x multiplier)
+            3. Canada Vancouver: 85% cooling efficiency, good hydro cooling (0.7x multiplier)
+            4. Germany Berlin: 80% cooling efficiency, balanced performance (1.1x multiplier)
+            5. Ireland Dublin: 80% cooling efficiency, free air cooling (0.9x multiplier)
+            6. Chile Santiago: 75% cooling efficiency, good renewable mix (0.7x multiplier)
+            7. Japan Tokyo: 70% cooling efficiency, precision cooling (1.2x multiplier)
+            8. Australia Sydney: 65% cooling efficiency, evaporative cooling (1.0x multiplier)
+            9. Texas USA: 60% cooling efficiency, moderate costs (0.8x multiplier)
+            10. Singapore: 40% cooling efficiency, high cooling costs (1.4x multiplier)
+
+            OPTIMAL ALLOCATION STRATEGY:
+            - Route Premium SLA to Nordic/Norway sites for maximum efficiency
+            - Balance Standard SLA across cold climate sites (Iceland, Norway, Canada)
+            - Use moderate sites (Germany, Ireland, Chile) for flexible workloads
+            - Route mining operations to Singapore/Texas during optimal conditions
+
+            CLIMATE ARBITRAGE: Cold sites save 35-55% on cooling costs
+            TIMEZONE OPTIMIZATION: Following business hours increases revenue by 20-30%
+
+            ⚠️  To enable real Claude AI optimization, add your Claude API key to config.env
+            """
+
+
+def build_prompt(site_data: Dict, sla_commitments: Dict) -> str:
+    """Build the optimization prompt sent to Claude"""
+    return f"""You are an AI energy arbitrage optimizer for a global data center network.
+        Analyze the following data and provide optimization recommendations:
+
+        SITE DATA:
+        {json.dumps(site_data, indent=2, default=str)}
+
+        SLA COMMITMENTS:
+        {json.dumps(sla_commitments, indent=2)}
+
+        Please analyze:
+        1. Which sites should handle Premium SLA workloads (99.9% uptime) based on cooling efficiency and reliability?
+        2. How to distribute compute resources to maximize revenue while minimizing energy costs?
+        3. Climate arbitrage opportunities (routing to cold sites to reduce cooling costs)?
+        4. Timezone optimization (routing AI inference to sites during peak business hours)?
+        5. Specific GPU/ASIC/miner allocation recommendations per site.
+
+        Provide a concise analysis with specific recommendations."""
+
+
+def _bucket(value, step: float) -> float:
+    return round(round(float(value or 0) / step) * step, 6)
+
+
+def snapshot_key(site_data: Dict, sla_commitments: Dict) -> str:
+    """Hash of the quantized site snapshot and SLA commitments.
+
+    Values are bucketed so that demo noise (random allocation, simulated
+    temperature jitter) does not defeat the cache.
+    """
+    quantized = sorted(
+        (
+            site_id,
+            _bucket(site.get("cooling_efficiency"), 0.05),
+            _bucket(site.get("current_temp"), 5),
+            _bucket(site.get("energy_price"), 0.05),
+            _bucket(site.get("power_utilization"), 10),
+        )
+        for site_id, site in site_data.items()
+    )
+    payload = json.dumps({"sites": quantized, "sla": sla_commitments}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ReasoningCache:
+    """LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: float = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds}
+
+
+class _StubTextContent:
+    def __init__(self, text: str):
+        self.type = "text"
+        self.text = text
+
+
+class _StubMessage:
+    def __init__(self, text: str):
+        self.content = [_StubTextContent(text)]
+
+
+class _StubStream:
+    def __init__(self, chunks: List[str], delay: float):
+        self._chunks = chunks
+        self._delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self) -> AsyncIterator[str]:
+        for chunk in self._chunks:
+            if self._delay:
+                await asyncio.sleep(self._delay)
+            yield chunk
+
+
+class _StubMessages:
+    def __init__(self, client: "StubClaudeClient"):
+        self._client = client
+
+    async def create(self, **kwargs) -> _StubMessage:
+        self._client.calls += 1
+        if self._client.delay:
+            await asyncio.sleep(self._client.delay)
+        return _StubMessage(self._client.text)
+
+    def stream(self, **kwargs) -> _StubStream:
+        self._client.calls += 1
+        lines = self._client.text.splitlines(keepends=True)
+        return _StubStream(lines, self._client.delay / max(len(lines), 1))
+
+
+class StubClaudeClient:
+    """Offline stand-in for AsyncAnthropic with the same messages interface"""
+
+    def __init__(self, text: str = MOCK_REASONING, delay: float = 0.0):
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+        self.messages = _StubMessages(self)
+
+
+@dataclass
+class ReasoningJob:
+    """One Claude reasoning request"""
+    job_id: str
+    key: str
+    status: str = "pending"       # pending, running, completed, failed
+    chunks: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    cache_hit: bool = False
+    created_at: float = field(default_factory=time.time)
+    completed_at: Optional[float] = None
+    on_complete: List[Callable[[str], None]] = field(default_factory=list)
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def reasoning(self) -> str:
+        return "".join(self.chunks)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "claude_reasoning": self.reasoning if self.status == "completed" else None,
+            "partial_reasoning": self.reasoning if self.status == "running" else None,
+            "error": self.error,
+            "cache_hit": self.cache_hit,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at
+        }
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class ReasoningService:
+    """Runs Claude reasoning jobs off the request path, with memoization"""
+
+    def __init__(self, client_factory: Callable[[], object], cache: Optional[ReasoningCache] = None,
+                 max_jobs: int = 256, model: str = CLAUDE_MODEL, max_tokens: int = 1024):
+        self._client_factory = client_factory
+        self._client = None
+        self.cache = cache or ReasoningCache()
+        self.max_jobs = max_jobs
+        self.model = model
+        self.max_tokens = max_tokens
+        self._jobs: "OrderedDict[str, ReasoningJob]" = OrderedDict()
+        self._in_flight: Dict[str, ReasoningJob] = {}
+        self._tasks = set()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def submit(self, site_data: Dict, sla_commitments: Dict,
+               on_complete: Optional[Callable[[str], None]] = None) -> ReasoningJob:
+        """Start (or reuse) a reasoning job; completes immediately on a cache hit"""
+        key = snapshot_key(site_data, sla_commitments)
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            if on_complete:
+                in_flight.on_complete.append(on_complete)
+            return in_flight
+
+        job = ReasoningJob(job_id=uuid.uuid4().hex, key=key)
+        if on_complete:
+            job.on_complete.append(on_complete)
+        self._remember(job)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            job.chunks.append(cached)
+            job.cache_hit = True
+            self._finish(job, "completed")
+            return job
+
+        self._in_flight[key] = job
+        task = asyncio.get_running_loop().create_task(self._run(job, build_prompt(site_data, sla_commitments)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def reason(self, site_data: Dict, sla_commitments: Dict) -> str:
+        """Submit and wait for the reasoning text"""
+        job = self.submit(site_data, sla_commitments)
+        async for _ in self.stream(job.job_id):
+            pass
+        return job.reasoning if job.status == "completed" else job.error
+
+    def add_done_callback(self, job: ReasoningJob, callback: Callable[[str], None]) -> None:
+        """Run callback with the final text, immediately if the job already finished"""
+        if job.done:
+            callback(job.reasoning if job.status == "completed" else job.error)
+        else:
+            job.on_complete.append(callback)
+
+    def get_job(self, job_id: str) -> Optional[ReasoningJob]:
+        return self._jobs.get(job_id)
+
+    async def stream(self, job_id: str) -> AsyncIterator[str]:
+        """Yield reasoning text as it arrives, starting with what is already there"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        sent = 0
+        while True:
+            changed = job._changed
+            while sent < len(job.chunks):
+                yield job.chunks[sent]
+                sent += 1
+            if job.done:
+                return
+            await changed.wait()
+
+    def stats(self) -> Dict:
+        return {"jobs": len(self._jobs), "in_flight": len(self._in_flight), "cache": self.cache.stats()}
+
+    async def _run(self, job: ReasoningJob, prompt: str) -> None:
+        job.status = "running"
+        job._notify()
+        try:
+            logger.info("Calling Claude AI for optimization...")
+            request = {"model": self.model, "max_tokens": self.max_tokens,
+                       "messages": [{"role": "user", "content": prompt}]}
+            with stage("claude_call"):
+                async with self.client.messages.stream(**request) as stream:
+                    async for text in stream.text_stream:
+                        job.chunks.append(text)
+                        job._notify()
+            self.cache.set(job.key, job.reasoning)
+            logger.info("Claude AI optimization completed successfully")
+            self._finish(job, "completed")
+        except Exception as e:
+            logger.error(f"Claude optimization error: {e}")
+            job.error = f"Claude optimization error: {e}. Using fallback strategy based on cooling efficiency and energy costs."
+            self._finish(job, "failed")
+
+    def _finish(self, job: ReasoningJob, status: str) -> None:
+        job.status = status
+        job.completed_at = time.time()
+        self._in_flight.pop(job.key, None)
+        text = job.reasoning if status == "completed" else job.error
+        for callback in job.on_complete:
+            try:
+                callback(text)
+            except Exception as e:
+                logger.error(f"Reasoning completion callback failed: {e}")
+        job._notify()
+
+    def _remember(self, job: ReasoningJob) -> None:
+        self._jobs[job.job_id] = job
+        if len(self._jobs) > self.max_jobs:
+            # Evict the oldest finished jobs; in-flight jobs are never dropped
+            finished = [job_id for job_id, old in self._jobs.items() if old.done]
+            for job_id in finished[:len(self._jobs) - self.max_jobs]:
+                del self._jobs[job_id]
@@ -1,24 +1,78 @@
 """
 Database models and operations for SLA-Smart Energy Arbitrage Platform
 """
-from sqlalchemy import create_engine, Column, Integer, Float, String, JSON, DateTime, Boolean
+from sqlalchemy import create_engine, event, inspect, select, update, delete, tuple_, text, Column, Integer, Float, String, JSON, DateTime, Boolean, Index, UniqueConstraint, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv("config.env")
+from metrics import record_query
+from inventory_rollups import apply_rollup_deltas, hardware_unit_rows, region_of
+from price_series import (PRICE_FIELDS, RESOLUTIONS, DEFAULT_RETENTION, LatestPriceRegister,
+                          bucket_start, new_bucket, merge_sample, retention_cutoffs, rollup_to_dict)
 
+# Read from the process environment; config.env is loaded by the entry point (python main.py, uvicorn --env-file)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./energy_platform.db")
 
-# Create engine
+# Async drivers for the URL schemes we deploy with
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def to_async_url(url: str) -> str:
+    """Rewrite a sync database URL to use an asyncio driver"""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        return url
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# How long price samples and rollups are kept
+PRICE_RETENTION = {
+    "raw": timedelta(hours=float(os.getenv("PRICE_RETENTION_RAW_HOURS", DEFAULT_RETENTION["raw"].total_seconds() / 3600))),
+    "1m": timedelta(days=float(os.getenv("PRICE_RETENTION_1M_DAYS", DEFAULT_RETENTION["1m"].days))),
+    "1h": timedelta(days=float(os.getenv("PRICE_RETENTION_1H_DAYS", DEFAULT_RETENTION["1h"].days))),
+    "1d": timedelta(days=float(os.getenv("PRICE_RETENTION_1D_DAYS", DEFAULT_RETENTION["1d"].days))),
+}
+PRICE_PRUNE_INTERVAL = float(os.getenv("PRICE_PRUNE_INTERVAL", "600"))  # seconds between retention sweeps
+
+# Larger per-site writes read whole tables rather than binding one parameter per site
+IN_CLAUSE_LIMIT = 500
+
+# Create engines: the sync engine runs schema creation and scripts, the async
+# engine serves request handlers without blocking the event loop
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args={"timeout": 30} if "sqlite" in ASYNC_DATABASE_URL else {})
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+# Count executed statements so cache effectiveness can be checked against DB load
+query_stats = {"queries": 0}
+
+@event.listens_for(engine, "before_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    query_stats["queries"] += 1
+    record_query()
+
+if "sqlite" in DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets dashboard reads proceed while an optimization commits
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
 # Models
 class SystemState(Base):
     """Track system initialization and global state"""
@@ -31,6 +85,26 @@ class SystemState(Base):
     total_revenue = Column(Float, default=0.0)
     last_updated = Column(DateTime, default=datetime.utcnow)
 
+class Site(Base):
+    """Site configuration, served from the in-memory site registry"""
+    __tablename__ = "sites"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    site_id = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    timezone = Column(String, nullable=False)
+    avg_temp = Column(Float, default=70.0)
+    cooling_efficiency = Column(Float, nullable=False)
+    renewable_energy = Column(Float, default=0.5)
+    gpu_ratio = Column(Float, default=0.5)
+    asic_ratio = Column(Float, default=0.5)
+    cooling_type = Column(String)
+    power_capacity = Column(Float, nullable=False)
+    energy_cost_multiplier = Column(Float, default=1.0)
+    last_updated = Column(DateTime, default=datetime.utcnow)
+
 class SiteHardwareInventory(Base):
     """Hardware inventory for each site"""
     __tablename__ = "site_hardware_inventory"
@@ -40,6 +114,35 @@ class SiteHardwareInventory(Base):
     inventory_data = Column(JSON)  # Store complete inventory as JSON
     last_updated = Column(DateTime, default=datetime.utcnow)
 
+class SiteHardwareUnits(Base):
+    """Typed hardware units per site and class, maintained alongside site_hardware_inventory"""
+    __tablename__ = "site_hardware_units"
+    __table_args__ = (UniqueConstraint("site_id", "hardware_class", name="uq_site_hardware_units_site_class"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    site_id = Column(String, nullable=False, index=True)
+    region = Column(String, nullable=False, index=True)
+    hardware_class = Column(String, nullable=False, index=True)  # gpu, asic, air, hydro, immersion
+    available = Column(Integer, default=0)
+    unit_output = Column(Float)  # tokens or hashrate per unit
+    unit_power = Column(Float)
+
+class HardwareRollup(Base):
+    """Hardware totals per class, fleet-wide and per region, maintained alongside site_hardware_units"""
+    __tablename__ = "hardware_rollups"
+    __table_args__ = (UniqueConstraint("scope", "scope_key", "hardware_class", name="uq_hardware_rollup_scope_class"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # fleet or region
+    scope_key = Column(String, nullable=False, default="")  # region name, "" for the fleet
+    hardware_class = Column(String, nullable=False)
+    sites = Column(Integer, default=0)  # sites with at least one unit
+    units = Column(Integer, default=0)
+    output_capacity = Column(Float, default=0.0)
+    power_capacity = Column(Float, default=0.0)
+    unit_output = Column(Float)  # fleet rows: per-unit specs of the latest write
+    unit_power = Column(Float)
+
 class SiteAllocation(Base):
     """Current resource allocation for each site"""
     __tablename__ = "site_allocations"
@@ -49,9 +152,41 @@ class SiteAllocation(Base):
     allocation_data = Column(JSON)  # GPU, ASIC, miners allocation
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+class AllocationSchedule(Base):
+    """Planned allocation per site and hour over the rolling horizon"""
+    __tablename__ = "allocation_schedule"
+    # Site first: reads fetch a page of sites over a range of hours, in site then hour order
+    __table_args__ = (UniqueConstraint("site_id", "hour", name="uq_allocation_schedule_site_hour"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hour = Column(DateTime, nullable=False, index=True)  # UTC hour start
+    site_id = Column(String, nullable=False)
+    gpu_compute = Column(Integer, default=0)
+    asic_compute = Column(Integer, default=0)
+    air_miners = Column(Integer, default=0)
+    hydro_miners = Column(Integer, default=0)
+    immersion_miners = Column(Integer, default=0)
+    power_used = Column(Float, default=0.0)
+    expected_value = Column(Float, default=0.0)  # net of energy cost, for the hour
+    firm_sla_power = Column(Float, default=0.0)
+    planned_at = Column(DateTime, default=datetime.utcnow)
+
+class WorkloadMigration(Base):
+    """Inference units moved between sites by a follow-the-sun migration step"""
+    __tablename__ = "workload_migrations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    migrated_at = Column(DateTime, nullable=False, index=True)
+    hardware = Column(String, nullable=False)  # gpu_compute or asic_compute
+    source_site_id = Column(String, nullable=False)
+    target_site_id = Column(String, nullable=False)
+    units = Column(Integer, default=0)
+    gain = Column(Float, default=0.0)  # value gained over the lookahead window, net of migration cost
+
 class SLACommitment(Base):
     """SLA commitments by tier"""
     __tablename__ = "sla_commitments"
+    __table_args__ = (Index("ix_sla_commitments_active_expires_at", "active", "expires_at"),)
     
     id = Column(Integer, primary_key=True, index=True)
     tier = Column(String, index=True)  # premium, standard, flexible, spot
@@ -59,8 +194,20 @@ class SLACommitment(Base):
     duration_hours = Column(Integer)
     optimal_site = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime)  # created_at + duration_hours
     active = Column(Boolean, default=True)
 
+class SLAAggregate(Base):
+    """Active SLA power per tier and site, maintained alongside sla_commitments"""
+    __tablename__ = "sla_aggregates"
+    __table_args__ = (UniqueConstraint("tier", "site_id", name="uq_sla_aggregate_tier_site"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tier = Column(String, nullable=False)
+    site_id = Column(String, nullable=False, default="")  # "" when no site was chosen
+    power_committed = Column(Integer, default=0)
+    commitments = Column(Integer, default=0)
+
 class OptimizationHistory(Base):
     """History of optimization runs"""
     __tablename__ = "optimization_history"
@@ -81,9 +228,33 @@ class PricingData(Base):
     energy_price = Column(Float)
     hash_price = Column(Float)
     token_price = Column(Float)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     source = Column(String, default="dummy_data")
 
+class PricingRollup(Base):
+    """OHLC price rollups at 1m/1h/1d resolution"""
+    __tablename__ = "pricing_rollups"
+    __table_args__ = (UniqueConstraint("resolution", "bucket_start", name="uq_pricing_rollup_bucket"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String, nullable=False)  # 1m, 1h, 1d
+    bucket_start = Column(DateTime, nullable=False)
+    samples = Column(Integer, default=0)
+    first_sample_at = Column(DateTime)
+    last_sample_at = Column(DateTime)
+    energy_price_open = Column(Float)
+    energy_price_high = Column(Float)
+    energy_price_low = Column(Float)
+    energy_price_close = Column(Float)
+    hash_price_open = Column(Float)
+    hash_price_high = Column(Float)
+    hash_price_low = Column(Float)
+    hash_price_close = Column(Float)
+    token_price_open = Column(Float)
+    token_price_high = Column(Float)
+    token_price_low = Column(Float)
+    token_price_close = Column(Float)
+
 # Database helper functions
 def get_db():
     """Get database session"""
@@ -93,9 +264,42 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+async def get_async_db():
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def init_db(connection=None):
+    """Create missing tables, columns and indexes and backfill derived tables.
+
+    Not run on import: the app runs it at startup (DB_INIT_ON_STARTUP) and
+    `alembic upgrade head` runs it on the migration's connection.
+    """
+    if connection is None:
+        with engine.begin() as conn:
+            return init_db(conn)
+    Base.metadata.create_all(bind=connection)
+    # create_all skips tables that already exist, so add columns and indexes introduced later
+    _add_missing_columns(connection, SLACommitment.__table__)
+    for table in (PricingData.__table__, SLACommitment.__table__):
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+    # Bound to a connection already in a transaction, the helpers' commits leave committing to the caller
+    db = Session(bind=connection, autoflush=False)
+    try:
+        _backfill_sla_expiry(db)
+        rebuild_sla_aggregates(db)
+        if db.query(SiteHardwareUnits.id).first() is None and db.query(SiteHardwareInventory.id).first() is not None:
+            rebuild_hardware_rollups(db)
+    finally:
+        db.close()
+
+def _add_missing_columns(connection, table) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                                    f"{column.type.compile(dialect=connection.dialect)}"))
 
 def get_system_state(db: Session):
     """Get or create system state"""
@@ -132,6 +336,7 @@ def update_site_inventory(db: Session, site_id: str, inventory_data: dict):
     else:
         inventory = SiteHardwareInventory(site_id=site_id, inventory_data=inventory_data)
         db.add(inventory)
+    _replace_hardware_units(db, {site_id: inventory_data})
     db.commit()
     return inventory
 
@@ -147,58 +352,321 @@ def add_optimization_history(db: Session, optimization_data: dict):
     db.commit()
     return history
 
+def update_optimization_reasoning(db: Session, history_id: int, claude_reasoning: str):
+    """Attach Claude reasoning to an optimization run once it is available"""
+    history = db.query(OptimizationHistory).filter(OptimizationHistory.id == history_id).first()
+    if history:
+        history.claude_reasoning = claude_reasoning
+        db.commit()
+    return history
+
 def get_optimization_history(db: Session, limit: int = 10):
     """Get recent optimization history"""
     history = db.query(OptimizationHistory).order_by(OptimizationHistory.timestamp.desc()).limit(limit).all()
-    return [{
+    return [_history_to_dict(h) for h in history]
+
+def _history_to_dict(h: OptimizationHistory) -> dict:
+    return {
         "timestamp": h.timestamp.isoformat(),
         "total_revenue": h.total_revenue,
         "climate_savings": h.climate_savings,
         "timezone_optimization": h.timezone_optimization,
         "sla_performance": h.sla_performance,
         "claude_reasoning": h.claude_reasoning
-    } for h in history]
+    }
 
-def add_sla_commitment(db: Session, tier: str, power_requirement: int, duration_hours: int, optimal_site: str):
-    """Add SLA commitment"""
-    commitment = SLACommitment(
+def _sla_expiry(created_at: datetime, duration_hours) -> datetime:
+    return created_at + timedelta(hours=duration_hours or 0)
+
+def _sla_aggregate_upsert(dialect_name: str, tier: str, site_id: str, power: int):
+    """Add power to one tier/site aggregate row in a single statement, or None if unsupported"""
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    if dialect_name not in dialects:
+        return None
+    table = SLAAggregate.__table__
+    stmt = dialects[dialect_name].insert(table).values(tier=tier, site_id=site_id, power_committed=power, commitments=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.tier, table.c.site_id],
+        set_={"power_committed": table.c.power_committed + stmt.excluded.power_committed,
+              "commitments": table.c.commitments + 1}
+    )
+
+def _sla_aggregate_decrements(expired) -> list:
+    """UPDATE statements removing expired commitments from their aggregate rows"""
+    totals = {}
+    for tier, site_id, power in expired:
+        key = (tier, site_id or "")
+        power_sum, count = totals.get(key, (0, 0))
+        totals[key] = (power_sum + (power or 0), count + 1)
+    table = SLAAggregate.__table__
+    statements = [
+        update(table).where(table.c.tier == tier, table.c.site_id == site_id).values(
+            power_committed=table.c.power_committed - power_sum, commitments=table.c.commitments - count
+        )
+        for (tier, site_id), (power_sum, count) in totals.items()
+    ]
+    statements.append(delete(table).where(table.c.commitments <= 0))
+    return statements
+
+def _expired_sla_query(now: datetime):
+    return select(SLACommitment.id, SLACommitment.tier, SLACommitment.optimal_site,
+                  SLACommitment.power_requirement).where(
+        SLACommitment.active == True, SLACommitment.expires_at <= now
+    )
+
+def _empty_tiers() -> dict:
+    return {"premium": 0, "standard": 0, "flexible": 0, "spot": 0}
+
+def _aggregate_by_tier(rows) -> dict:
+    aggregated = _empty_tiers()
+    for tier, power in rows:
+        if tier in aggregated:
+            aggregated[tier] += power or 0
+    return aggregated
+
+def _tier_totals_query():
+    return select(SLAAggregate.tier, func.sum(SLAAggregate.power_committed)).group_by(SLAAggregate.tier)
+
+def _site_power_query(tiers: list = None):
+    query = select(SLAAggregate.site_id, func.sum(SLAAggregate.power_committed))
+    if tiers is not None:
+        query = query.where(SLAAggregate.tier.in_(tiers))
+    return query.group_by(SLAAggregate.site_id)
+
+def _site_tier_query(site_id: str):
+    return select(SLAAggregate.tier, SLAAggregate.power_committed).where(SLAAggregate.site_id == site_id)
+
+def _new_sla_commitment(tier: str, power_requirement: int, duration_hours: int, optimal_site: str) -> SLACommitment:
+    created_at = datetime.utcnow()
+    return SLACommitment(
         tier=tier,
         power_requirement=power_requirement,
         duration_hours=duration_hours,
-        optimal_site=optimal_site
+        optimal_site=optimal_site,
+        created_at=created_at,
+        expires_at=_sla_expiry(created_at, duration_hours)
     )
+
+def _stage_sla_commitment(db: Session, commitment: SLACommitment) -> None:
+    """Add a commitment and its aggregate update to the current transaction"""
     db.add(commitment)
+    site_id = commitment.optimal_site or ""
+    stmt = _sla_aggregate_upsert(db.get_bind().dialect.name, commitment.tier, site_id, commitment.power_requirement)
+    if stmt is not None:
+        db.execute(stmt)
+        return
+    aggregate = db.query(SLAAggregate).filter(SLAAggregate.tier == commitment.tier, SLAAggregate.site_id == site_id).first()
+    if aggregate is None:
+        db.add(SLAAggregate(tier=commitment.tier, site_id=site_id, power_committed=commitment.power_requirement, commitments=1))
+    else:
+        aggregate.power_committed += commitment.power_requirement
+        aggregate.commitments += 1
+
+def add_sla_commitment(db: Session, tier: str, power_requirement: int, duration_hours: int, optimal_site: str):
+    """Add SLA commitment and fold it into the tier/site aggregate in the same transaction"""
+    commitment = _new_sla_commitment(tier, power_requirement, duration_hours, optimal_site)
+    _stage_sla_commitment(db, commitment)
     db.commit()
     return commitment
 
+def _sla_windows_query(tiers: list = None):
+    query = select(SLACommitment.optimal_site, SLACommitment.power_requirement, SLACommitment.expires_at).where(
+        SLACommitment.active == True, SLACommitment.optimal_site.is_not(None))
+    if tiers is not None:
+        query = query.where(SLACommitment.tier.in_(tiers))
+    return query
+
 def get_active_sla_commitments(db: Session):
-    """Get all active SLA commitments aggregated by tier"""
-    commitments = db.query(SLACommitment).filter(SLACommitment.active == True).all()
-    aggregated = {"premium": 0, "standard": 0, "flexible": 0, "spot": 0}
+    """Get active SLA power aggregated by tier"""
+    return _aggregate_by_tier(db.execute(_tier_totals_query()).all())
+
+def get_sla_power_by_site(db: Session, tiers: list = None):
+    """Get active SLA power committed to each site, optionally limited to some tiers"""
+    return {site_id: power for site_id, power in db.execute(_site_power_query(tiers)).all() if site_id}
+
+def expire_sla_commitments(db: Session, now: datetime = None):
+    """Deactivate commitments past created_at + duration_hours; returns (tier, site, power) per expired row"""
+    expired = db.execute(_expired_sla_query(now or datetime.utcnow())).all()
+    if not expired:
+        return []
+    db.execute(update(SLACommitment).where(SLACommitment.id.in_([row.id for row in expired])).values(active=False))
+    for statement in _sla_aggregate_decrements(row[1:] for row in expired):
+        db.execute(statement)
+    db.commit()
+    return [(tier, site_id, power) for _, tier, site_id, power in expired]
+
+def rebuild_sla_aggregates(db: Session):
+    """Recompute sla_aggregates from the active commitments"""
+    rows = db.query(SLACommitment.tier, SLACommitment.optimal_site, func.sum(SLACommitment.power_requirement),
+                    func.count(SLACommitment.id)).filter(SLACommitment.active == True).group_by(
+        SLACommitment.tier, SLACommitment.optimal_site).all()
+    db.query(SLAAggregate).delete()
+    totals = {}
+    for tier, site_id, power, count in rows:
+        key = (tier, site_id or "")
+        power_sum, total = totals.get(key, (0, 0))
+        totals[key] = (power_sum + (power or 0), total + count)
+    db.add_all([SLAAggregate(tier=tier, site_id=site_id, power_committed=power, commitments=count)
+                for (tier, site_id), (power, count) in totals.items()])
+    db.commit()
+
+def _backfill_sla_expiry(db: Session) -> None:
+    """Set expires_at on commitments stored before it existed"""
+    commitments = db.query(SLACommitment).filter(SLACommitment.expires_at == None).all()
     for commitment in commitments:
-        if commitment.tier in aggregated:
-            aggregated[commitment.tier] += commitment.power_requirement
-    return aggregated
+        commitment.expires_at = _sla_expiry(commitment.created_at or datetime.utcnow(), commitment.duration_hours)
+    if commitments:
+        db.commit()
+
+# Latest price sample, served from memory; primed from the database on first read
+latest_pricing = LatestPriceRegister()
+_last_prune = {"at": None}
+
+def _rollup_keys(timestamp: datetime) -> dict:
+    return {resolution: bucket_start(timestamp, resolution) for resolution in RESOLUTIONS}
+
+def _rollup_query(pairs: list):
+    """Rollup buckets for (resolution, bucket_start) pairs"""
+    return select(PricingRollup).where(tuple_(PricingRollup.resolution, PricingRollup.bucket_start).in_(pairs))
+
+def _apply_rollups(db, existing, keys: dict, pricing: dict, timestamp: datetime) -> None:
+    """Merge one sample into its 1m/1h/1d buckets, creating missing ones"""
+    found = {bucket.resolution: bucket for bucket in existing}
+    for resolution, start in keys.items():
+        bucket = found.get(resolution)
+        if bucket is None:
+            db.add(PricingRollup(resolution=resolution, bucket_start=start, **new_bucket(pricing, timestamp)))
+        else:
+            merge_sample(bucket, pricing, timestamp)
+
+def _pricing_batch(samples: list) -> list:
+    """(columns, rollup keys) per sample, oldest first"""
+    batch = []
+    for pricing in samples:
+        sample, timestamp = _price_sample(pricing)
+        batch.append(({**sample, "timestamp": timestamp, "source": pricing.get("source") or "dummy_data"},
+                      _rollup_keys(timestamp)))
+    return sorted(batch, key=lambda item: item[0]["timestamp"])
+
+def _batch_rollup_pairs(batch: list) -> list:
+    return list({pair for _, keys in batch for pair in keys.items()})
+
+def _apply_rollup_batch(db, existing, batch: list) -> None:
+    """Merge many samples into their buckets; buckets created for one sample take the later ones"""
+    found = {(bucket.resolution, bucket.bucket_start): bucket for bucket in existing}
+    for row, keys in batch:
+        sample = {name: row[name] for name in PRICE_FIELDS}
+        for pair in keys.items():
+            bucket = found.get(pair)
+            if bucket is None:
+                bucket = found[pair] = PricingRollup(resolution=pair[0], bucket_start=pair[1],
+                                                     **new_bucket(sample, row["timestamp"]))
+                db.add(bucket)
+            else:
+                merge_sample(bucket, sample, row["timestamp"])
+
+def publish_pricing(pricing: dict) -> None:
+    """Make a sample the latest price now; the feed stores it later, in a batch"""
+    sample, timestamp = _price_sample(pricing)
+    latest_pricing.offer({**sample, "timestamp": timestamp.isoformat(), "source": pricing.get("source")}, timestamp)
+
+def _prune_statements(now: datetime) -> list:
+    """DELETE statements enforcing PRICE_RETENTION"""
+    cutoffs = retention_cutoffs(now, PRICE_RETENTION)
+    statements = [delete(PricingData).where(PricingData.timestamp < cutoffs["raw"])]
+    for resolution in RESOLUTIONS:
+        statements.append(delete(PricingRollup).where(
+            PricingRollup.resolution == resolution, PricingRollup.bucket_start < cutoffs[resolution]
+        ))
+    return statements
+
+def _prune_due(timestamp: datetime) -> bool:
+    """Whether a retention sweep is due, measured in sample time"""
+    last = _last_prune["at"]
+    if last is not None and abs((timestamp - last).total_seconds()) < PRICE_PRUNE_INTERVAL:
+        return False
+    _last_prune["at"] = timestamp
+    return True
+
+def _price_sample(pricing: dict) -> tuple:
+    sample = {name: float(pricing[name]) for name in PRICE_FIELDS}
+    return sample, pricing.get("timestamp") or datetime.utcnow()
 
 def add_pricing_data(db: Session, pricing: dict):
-    """Add pricing data"""
-    price = PricingData(**pricing)
+    """Add a price sample, update its rollups and apply retention, in one transaction"""
+    sample, timestamp = _price_sample(pricing)
+    price = PricingData(**{**pricing, "timestamp": timestamp})
     db.add(price)
+    keys = _rollup_keys(timestamp)
+    _apply_rollups(db, db.execute(_rollup_query(list(keys.items()))).scalars().all(), keys, sample, timestamp)
+    if _prune_due(timestamp):
+        for statement in _prune_statements(timestamp):
+            db.execute(statement)
     db.commit()
+    latest_pricing.offer(_pricing_to_dict(price), timestamp)
     return price
 
+def add_pricing_batch(db: Session, samples: list, commit: bool = True):
+    """Insert many price samples with one executemany, update their rollups and apply retention, in one transaction"""
+    batch = _pricing_batch(samples)
+    if not batch:
+        return 0
+    db.execute(PricingData.__table__.insert(), [row for row, _ in batch])
+    pairs = _batch_rollup_pairs(batch)
+    existing = [bucket for i in range(0, len(pairs), IN_CLAUSE_LIMIT)
+                for bucket in db.execute(_rollup_query(pairs[i:i + IN_CLAUSE_LIMIT])).scalars()]
+    _apply_rollup_batch(db, existing, batch)
+    newest = batch[-1][0]["timestamp"]
+    if _prune_due(newest):
+        for statement in _prune_statements(newest):
+            db.execute(statement)
+    if commit:
+        db.commit()
+    publish_pricing(batch[-1][0])
+    return len(batch)
+
 def get_latest_pricing(db: Session):
     """Get latest pricing data"""
+    cached = latest_pricing.get()
+    if cached is not None:
+        return cached
     pricing = db.query(PricingData).order_by(PricingData.timestamp.desc()).first()
-    if pricing:
-        return {
-            "energy_price": pricing.energy_price,
-            "hash_price": pricing.hash_price,
-            "token_price": pricing.token_price,
-            "timestamp": pricing.timestamp.isoformat() if pricing.timestamp else datetime.utcnow().isoformat(),
-            "source": pricing.source
-        }
-    return None
+    if not pricing:
+        return None
+    latest_pricing.offer(_pricing_to_dict(pricing), pricing.timestamp)
+    return latest_pricing.get()
+
+def _pricing_range_query(start: datetime, end: datetime, resolution: str, limit: int):
+    if resolution == "raw":
+        return select(PricingData).where(
+            PricingData.timestamp >= start, PricingData.timestamp <= end
+        ).order_by(PricingData.timestamp).limit(limit)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    return select(PricingRollup).where(
+        PricingRollup.resolution == resolution,
+        PricingRollup.bucket_start >= bucket_start(start, resolution),
+        PricingRollup.bucket_start <= end
+    ).order_by(PricingRollup.bucket_start).limit(limit)
+
+def _pricing_range_rows(rows, resolution: str) -> list:
+    if resolution == "raw":
+        return [_pricing_to_dict(row) for row in rows]
+    return [rollup_to_dict(row, resolution) for row in rows]
+
+def get_pricing_range(db: Session, start: datetime, end: datetime, resolution: str = "1h", limit: int = 5000):
+    """Price history between start and end: raw samples or 1m/1h/1d OHLC buckets"""
+    rows = db.execute(_pricing_range_query(start, end, resolution, limit)).scalars().all()
+    return _pricing_range_rows(rows, resolution)
+
+def _pricing_to_dict(pricing: PricingData) -> dict:
+    return {
+        "energy_price": pricing.energy_price,
+        "hash_price": pricing.hash_price,
+        "token_price": pricing.token_price,
+        "timestamp": pricing.timestamp.isoformat() if pricing.timestamp else datetime.utcnow().isoformat(),
+        "source": pricing.source
+    }
 
 def get_site_allocation(db: Session, site_id: str):
     """Get latest allocation for a site"""
@@ -207,6 +675,12 @@ def get_site_allocation(db: Session, site_id: str):
     ).order_by(SiteAllocation.timestamp.desc()).first()
     return allocation.allocation_data if allocation else None
 
+def get_latest_site_allocations(db: Session):
+    """Get the latest allocation for every site"""
+    latest = db.query(func.max(SiteAllocation.id)).group_by(SiteAllocation.site_id).subquery()
+    allocations = db.query(SiteAllocation).filter(SiteAllocation.id.in_(latest.select())).all()
+    return {allocation.site_id: allocation.allocation_data for allocation in allocations}
+
 def update_site_allocation(db: Session, site_id: str, allocation_data: dict):
     """Update site allocation"""
     allocation = SiteAllocation(site_id=site_id, allocation_data=allocation_data)
@@ -214,6 +688,498 @@ def update_site_allocation(db: Session, site_id: str, allocation_data: dict):
     db.commit()
     return allocation
 
-# Initialize database on import
-init_db()
+# Allocation schedule: planned rows are upserted by (hour, site); hours before the window are pruned
+
+SCHEDULE_COLUMNS = [column.name for column in AllocationSchedule.__table__.columns if column.name != "id"]
+
+def _schedule_upsert(dialect_name: str):
+    """INSERT ... ON CONFLICT (site_id, hour) DO UPDATE, or None if the dialect lacks it"""
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    if dialect_name not in dialects:
+        return None
+    table = AllocationSchedule.__table__
+    stmt = dialects[dialect_name].insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.site_id, table.c.hour],
+        set_={name: stmt.excluded[name] for name in SCHEDULE_COLUMNS if name not in ("hour", "site_id")}
+    )
+
+def _schedule_fallback_statements(rows: list) -> list:
+    """Delete-then-insert for dialects without an upsert"""
+    keys = [(row["hour"], row["site_id"]) for row in rows]
+    table = AllocationSchedule.__table__
+    deletes = [delete(table).where(tuple_(table.c.hour, table.c.site_id).in_(keys[i:i + IN_CLAUSE_LIMIT]))
+               for i in range(0, len(keys), IN_CLAUSE_LIMIT)]
+    return deletes + [table.insert().values(rows)]
+
+def _schedule_query(start: datetime, end: datetime, site_ids: list = None):
+    """Plain column rows rather than ORM objects: a page is thousands of rows"""
+    table = AllocationSchedule.__table__
+    query = select(*(table.c[name] for name in SCHEDULE_COLUMNS)).where(table.c.hour >= start, table.c.hour < end)
+    if site_ids is not None:
+        query = query.where(table.c.site_id.in_(site_ids))
+    return query.order_by(table.c.site_id, table.c.hour)
+
+# Workload migrations: an append-only log of moves, pruned by age
+
+MIGRATION_COLUMNS = [column.name for column in WorkloadMigration.__table__.columns if column.name != "id"]
+
+def _migration_rows(migrated_at: datetime, moves: list) -> list:
+    return [{"migrated_at": migrated_at, "hardware": move["hardware"], "source_site_id": move["source_site"],
+             "target_site_id": move["target_site"], "units": move["units"], "gain": move["gain"]}
+            for move in moves]
+
+def _migrations_query(limit: int, site_id: str = None):
+    table = WorkloadMigration.__table__
+    query = select(*(table.c[name] for name in MIGRATION_COLUMNS))
+    if site_id is not None:
+        query = query.where((table.c.source_site_id == site_id) | (table.c.target_site_id == site_id))
+    return query.order_by(table.c.id.desc()).limit(limit)
+
+# Site columns written by imports and returned by get_all_sites_async, in table order
+SITE_COLUMNS = [column.name for column in Site.__table__.columns if column.name not in ("id", "last_updated")]
+
+def _site_rows(sites: list) -> list:
+    now = datetime.utcnow()
+    return [{**{name: site.get(name) for name in SITE_COLUMNS}, "last_updated": now} for site in sites]
+
+def _site_to_dict(site: Site) -> dict:
+    return {name: getattr(site, name) for name in SITE_COLUMNS}
+
+def _site_upsert(dialect_name: str):
+    """INSERT ... ON CONFLICT (site_id) DO UPDATE, or None if the dialect lacks it"""
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    if dialect_name not in dialects:
+        return None
+    table = Site.__table__
+    stmt = dialects[dialect_name].insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.site_id],
+        set_={name: stmt.excluded[name] for name in SITE_COLUMNS + ["last_updated"] if name != "site_id"}
+    )
+
+def _site_inventory_rows(site_inventories: dict) -> list:
+    now = datetime.utcnow()
+    return [{"site_id": site_id, "inventory_data": inventory, "last_updated": now}
+            for site_id, inventory in site_inventories.items()]
+
+def _site_allocation_rows(allocations: dict) -> list:
+    now = datetime.utcnow()
+    return [{"site_id": site_id, "allocation_data": allocation, "timestamp": now}
+            for site_id, allocation in allocations.items()]
+
+def _site_inventory_upsert(dialect_name: str):
+    """INSERT ... ON CONFLICT (site_id) DO UPDATE, or None if the dialect lacks it"""
+    dialects = {"sqlite": sqlite, "postgresql": postgresql}
+    if dialect_name not in dialects:
+        return None
+    table = SiteHardwareInventory.__table__
+    stmt = dialects[dialect_name].insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.site_id],
+        set_={"inventory_data": stmt.excluded.inventory_data, "last_updated": stmt.excluded.last_updated}
+    )
+
+def bulk_upsert_site_inventories(db: Session, site_inventories: dict, commit: bool = True):
+    """Insert or replace many site inventories in one statement and one transaction"""
+    rows = _site_inventory_rows(site_inventories)
+    if not rows:
+        return 0
+    stmt = _site_inventory_upsert(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, rows)
+    else:
+        existing = {inv.site_id: inv for inv in db.query(SiteHardwareInventory).filter(
+            SiteHardwareInventory.site_id.in_(site_inventories.keys())).all()}
+        for row in rows:
+            if row["site_id"] in existing:
+                existing[row["site_id"]].inventory_data = row["inventory_data"]
+                existing[row["site_id"]].last_updated = row["last_updated"]
+            else:
+                db.add(SiteHardwareInventory(**row))
+    _replace_hardware_units(db, site_inventories)
+    if commit:
+        db.commit()
+    return len(rows)
+
+def bulk_insert_site_allocations(db: Session, allocations: dict, commit: bool = True):
+    """Insert one allocation row per site with a single executemany"""
+    rows = _site_allocation_rows(allocations)
+    if rows:
+        db.execute(SiteAllocation.__table__.insert(), rows)
+    if commit:
+        db.commit()
+    return len(rows)
+
+# Hardware unit rows and rollups, rewritten in the same transaction as each inventory write
+
+def _by_site_ids(query, column, site_ids: list):
+    """Restrict a query to some sites; large writes read the whole table instead of a huge IN list"""
+    return query.where(column.in_(site_ids)) if len(site_ids) <= IN_CLAUSE_LIMIT else query
+
+def _units_to_dict(units: SiteHardwareUnits) -> dict:
+    return {"site_id": units.site_id, "region": units.region, "hardware_class": units.hardware_class,
+            "available": units.available or 0, "unit_output": units.unit_output or 0.0,
+            "unit_power": units.unit_power or 0.0}
+
+def _units_delete_statements(site_ids: list) -> list:
+    return [delete(SiteHardwareUnits).where(SiteHardwareUnits.site_id.in_(site_ids[i:i + IN_CLAUSE_LIMIT]))
+            for i in range(0, len(site_ids), IN_CLAUSE_LIMIT)]
+
+def _replace_hardware_units(db: Session, site_inventories: dict) -> None:
+    """Rewrite these sites' unit rows and fold the difference into the rollups; None or {} removes a site"""
+    db.flush()  # staged site and rollup rows must be visible to the reads below
+    site_ids = list(site_inventories)
+    regions = {site_id: region_of(timezone) for site_id, timezone in db.execute(
+        _by_site_ids(select(Site.site_id, Site.timezone), Site.site_id, site_ids)).all()}
+    old_rows = [_units_to_dict(units) for units in db.execute(
+        _by_site_ids(select(SiteHardwareUnits), SiteHardwareUnits.site_id, site_ids)).scalars().all()
+        if units.site_id in site_inventories]
+    new_rows = hardware_unit_rows(site_inventories, regions)
+    for statement in _units_delete_statements(site_ids):
+        db.execute(statement)
+    if new_rows:
+        db.execute(SiteHardwareUnits.__table__.insert(), new_rows)
+    existing = db.execute(select(HardwareRollup)).scalars().all()
+    db.add_all(apply_rollup_deltas(existing, old_rows, new_rows, HardwareRollup))
+
+def rebuild_hardware_rollups(db: Session):
+    """Recompute site_hardware_units and hardware_rollups from the stored inventories"""
+    db.query(SiteHardwareUnits).delete()
+    db.query(HardwareRollup).delete()
+    _replace_hardware_units(db, get_all_site_inventories(db))
+    db.commit()
+
+# Async database helpers, mirroring the sync helpers above for request handlers
+
+async def get_system_state_async(db: AsyncSession):
+    """Get or create system state"""
+    state = (await db.execute(select(SystemState).limit(1))).scalars().first()
+    if not state:
+        state = SystemState(is_initialized=False)
+        db.add(state)
+        await db.commit()
+        await db.refresh(state)
+    return state
+
+async def update_system_state_async(db: AsyncSession, **kwargs):
+    """Update system state"""
+    state = await get_system_state_async(db)
+    for key, value in kwargs.items():
+        if hasattr(state, key):
+            setattr(state, key, value)
+    state.last_updated = datetime.utcnow()
+    await db.commit()
+    await db.refresh(state)
+    return state
+
+async def get_site_inventory_async(db: AsyncSession, site_id: str):
+    """Get site hardware inventory"""
+    inventory = (await db.execute(
+        select(SiteHardwareInventory).where(SiteHardwareInventory.site_id == site_id)
+    )).scalars().first()
+    return inventory.inventory_data if inventory else None
+
+async def update_site_inventory_async(db: AsyncSession, site_id: str, inventory_data: dict):
+    """Update or create site inventory"""
+    inventory = (await db.execute(
+        select(SiteHardwareInventory).where(SiteHardwareInventory.site_id == site_id)
+    )).scalars().first()
+    if inventory:
+        inventory.inventory_data = inventory_data
+        inventory.last_updated = datetime.utcnow()
+    else:
+        inventory = SiteHardwareInventory(site_id=site_id, inventory_data=inventory_data)
+        db.add(inventory)
+    await _replace_hardware_units_async(db, {site_id: inventory_data})
+    await db.commit()
+    return inventory
+
+async def get_all_site_inventories_async(db: AsyncSession):
+    """Get all site inventories"""
+    inventories = (await db.execute(select(SiteHardwareInventory))).scalars().all()
+    return {inv.site_id: inv.inventory_data for inv in inventories}
+
+async def add_optimization_history_async(db: AsyncSession, optimization_data: dict):
+    """Add optimization run to history"""
+    history = OptimizationHistory(**optimization_data)
+    db.add(history)
+    await db.commit()
+    return history
+
+async def update_optimization_reasoning_async(db: AsyncSession, history_id: int, claude_reasoning: str):
+    """Attach Claude reasoning to an optimization run once it is available"""
+    history = await db.get(OptimizationHistory, history_id)
+    if history:
+        history.claude_reasoning = claude_reasoning
+        await db.commit()
+    return history
+
+async def get_optimization_history_async(db: AsyncSession, limit: int = 10):
+    """Get recent optimization history"""
+    history = (await db.execute(
+        select(OptimizationHistory).order_by(OptimizationHistory.timestamp.desc()).limit(limit)
+    )).scalars().all()
+    return [_history_to_dict(h) for h in history]
+
+async def _stage_sla_commitment_async(db: AsyncSession, commitment: SLACommitment) -> None:
+    """Add a commitment and its aggregate update to the current transaction"""
+    db.add(commitment)
+    site_id = commitment.optimal_site or ""
+    stmt = _sla_aggregate_upsert(db.get_bind().dialect.name, commitment.tier, site_id, commitment.power_requirement)
+    if stmt is not None:
+        await db.execute(stmt)
+        return
+    aggregate = (await db.execute(select(SLAAggregate).where(
+        SLAAggregate.tier == commitment.tier, SLAAggregate.site_id == site_id))).scalars().first()
+    if aggregate is None:
+        db.add(SLAAggregate(tier=commitment.tier, site_id=site_id, power_committed=commitment.power_requirement, commitments=1))
+    else:
+        aggregate.power_committed += commitment.power_requirement
+        aggregate.commitments += 1
+
+async def add_sla_placement_async(db: AsyncSession, tier: str, duration_hours: int, placements: dict):
+    """Store one commitment per site of a (possibly split) placement in one transaction"""
+    commitments = [_new_sla_commitment(tier, int(power), duration_hours, site_id) for site_id, power in placements.items()]
+    for commitment in commitments:
+        await _stage_sla_commitment_async(db, commitment)
+    await db.commit()
+    return commitments
+
+async def get_active_sla_commitments_async(db: AsyncSession):
+    """Get active SLA power aggregated by tier"""
+    return _aggregate_by_tier((await db.execute(_tier_totals_query())).all())
+
+async def get_sla_power_by_site_async(db: AsyncSession, tiers: list = None):
+    """Get active SLA power committed to each site, optionally limited to some tiers"""
+    return {site_id: power for site_id, power in (await db.execute(_site_power_query(tiers))).all() if site_id}
+
+async def get_sla_windows_async(db: AsyncSession, tiers: list = None):
+    """(site_id, power, expires_at) for each active commitment, optionally limited to some tiers"""
+    return [tuple(row) for row in (await db.execute(_sla_windows_query(tiers))).all()]
+
+async def get_site_committed_power_async(db: AsyncSession, site_id: str):
+    """Get active SLA power committed to one site, by tier"""
+    return _aggregate_by_tier((await db.execute(_site_tier_query(site_id))).all())
+
+async def expire_sla_commitments_async(db: AsyncSession, now: datetime = None):
+    """Deactivate commitments past created_at + duration_hours; returns (tier, site, power) per expired row"""
+    expired = (await db.execute(_expired_sla_query(now or datetime.utcnow()))).all()
+    if not expired:
+        return []
+    await db.execute(update(SLACommitment).where(SLACommitment.id.in_([row.id for row in expired])).values(active=False))
+    for statement in _sla_aggregate_decrements(row[1:] for row in expired):
+        await db.execute(statement)
+    await db.commit()
+    return [(tier, site_id, power) for _, tier, site_id, power in expired]
+
+async def add_pricing_data_async(db: AsyncSession, pricing: dict):
+    """Add a price sample, update its rollups and apply retention, in one transaction"""
+    sample, timestamp = _price_sample(pricing)
+    price = PricingData(**{**pricing, "timestamp": timestamp})
+    db.add(price)
+    keys = _rollup_keys(timestamp)
+    _apply_rollups(db, (await db.execute(_rollup_query(list(keys.items())))).scalars().all(), keys, sample, timestamp)
+    if _prune_due(timestamp):
+        for statement in _prune_statements(timestamp):
+            await db.execute(statement)
+    await db.commit()
+    latest_pricing.offer(_pricing_to_dict(price), timestamp)
+    return price
+
+async def add_pricing_batch_async(db: AsyncSession, samples: list, commit: bool = True):
+    """Insert many price samples with one executemany, update their rollups and apply retention, in one transaction"""
+    batch = _pricing_batch(samples)
+    if not batch:
+        return 0
+    await db.execute(PricingData.__table__.insert(), [row for row, _ in batch])
+    pairs = _batch_rollup_pairs(batch)
+    existing = [bucket for i in range(0, len(pairs), IN_CLAUSE_LIMIT)
+                for bucket in (await db.execute(_rollup_query(pairs[i:i + IN_CLAUSE_LIMIT]))).scalars()]
+    _apply_rollup_batch(db, existing, batch)
+    newest = batch[-1][0]["timestamp"]
+    if _prune_due(newest):
+        for statement in _prune_statements(newest):
+            await db.execute(statement)
+    if commit:
+        await db.commit()
+    publish_pricing(batch[-1][0])
+    return len(batch)
+
+async def get_latest_pricing_async(db: AsyncSession):
+    """Get latest pricing data"""
+    cached = latest_pricing.get()
+    if cached is not None:
+        return cached
+    pricing = (await db.execute(
+        select(PricingData).order_by(PricingData.timestamp.desc()).limit(1)
+    )).scalars().first()
+    if not pricing:
+        return None
+    latest_pricing.offer(_pricing_to_dict(pricing), pricing.timestamp)
+    return latest_pricing.get()
+
+async def get_pricing_range_async(db: AsyncSession, start: datetime, end: datetime, resolution: str = "1h",
+                                  limit: int = 5000):
+    """Price history between start and end: raw samples or 1m/1h/1d OHLC buckets"""
+    rows = (await db.execute(_pricing_range_query(start, end, resolution, limit))).scalars().all()
+    return _pricing_range_rows(rows, resolution)
+
+async def get_site_allocation_async(db: AsyncSession, site_id: str):
+    """Get latest allocation for a site"""
+    allocation = (await db.execute(
+        select(SiteAllocation).where(SiteAllocation.site_id == site_id)
+        .order_by(SiteAllocation.timestamp.desc()).limit(1)
+    )).scalars().first()
+    return allocation.allocation_data if allocation else None
+
+async def get_latest_site_allocations_async(db: AsyncSession):
+    """Get the latest allocation for every site"""
+    latest = select(func.max(SiteAllocation.id)).group_by(SiteAllocation.site_id)
+    allocations = (await db.execute(select(SiteAllocation).where(SiteAllocation.id.in_(latest)))).scalars().all()
+    return {allocation.site_id: allocation.allocation_data for allocation in allocations}
+
+async def update_site_allocation_async(db: AsyncSession, site_id: str, allocation_data: dict):
+    """Update site allocation"""
+    allocation = SiteAllocation(site_id=site_id, allocation_data=allocation_data)
+    db.add(allocation)
+    await db.commit()
+    return allocation
+
+async def bulk_upsert_site_inventories_async(db: AsyncSession, site_inventories: dict, commit: bool = True):
+    """Insert or replace many site inventories in one statement and one transaction"""
+    rows = _site_inventory_rows(site_inventories)
+    if not rows:
+        return 0
+    stmt = _site_inventory_upsert(db.get_bind().dialect.name)
+    if stmt is not None:
+        await db.execute(stmt, rows)
+    else:
+        existing = {inv.site_id: inv for inv in (await db.execute(select(SiteHardwareInventory).where(
+            SiteHardwareInventory.site_id.in_(site_inventories.keys())))).scalars().all()}
+        for row in rows:
+            if row["site_id"] in existing:
+                existing[row["site_id"]].inventory_data = row["inventory_data"]
+                existing[row["site_id"]].last_updated = row["last_updated"]
+            else:
+                db.add(SiteHardwareInventory(**row))
+    await _replace_hardware_units_async(db, site_inventories)
+    if commit:
+        await db.commit()
+    return len(rows)
+
+async def _replace_hardware_units_async(db: AsyncSession, site_inventories: dict) -> None:
+    """Rewrite these sites' unit rows and fold the difference into the rollups; None or {} removes a site"""
+    await db.flush()  # staged site and rollup rows must be visible to the reads below
+    site_ids = list(site_inventories)
+    regions = {site_id: region_of(timezone) for site_id, timezone in (await db.execute(
+        _by_site_ids(select(Site.site_id, Site.timezone), Site.site_id, site_ids))).all()}
+    old_rows = [_units_to_dict(units) for units in (await db.execute(
+        _by_site_ids(select(SiteHardwareUnits), SiteHardwareUnits.site_id, site_ids))).scalars().all()
+        if units.site_id in site_inventories]
+    new_rows = hardware_unit_rows(site_inventories, regions)
+    for statement in _units_delete_statements(site_ids):
+        await db.execute(statement)
+    if new_rows:
+        await db.execute(SiteHardwareUnits.__table__.insert(), new_rows)
+    existing = (await db.execute(select(HardwareRollup))).scalars().all()
+    db.add_all(apply_rollup_deltas(existing, old_rows, new_rows, HardwareRollup))
+
+async def get_hardware_rollups_async(db: AsyncSession):
+    """Every rollup row: a few per hardware class, however many sites there are"""
+    return (await db.execute(select(HardwareRollup))).scalars().all()
+
+async def get_site_hardware_units_async(db: AsyncSession, site_ids: list):
+    """Available units per hardware class for some sites, from the typed unit rows"""
+    units = {}
+    for row in (await db.execute(select(SiteHardwareUnits.site_id, SiteHardwareUnits.hardware_class,
+                                        SiteHardwareUnits.available).where(
+            SiteHardwareUnits.site_id.in_(site_ids)))).all():
+        units.setdefault(row.site_id, {})[row.hardware_class] = row.available
+    return units
+
+async def get_all_sites_async(db: AsyncSession):
+    """Every site as a flat row, in insertion order"""
+    sites = (await db.execute(select(Site).order_by(Site.id))).scalars().all()
+    return [_site_to_dict(site) for site in sites]
+
+async def bulk_upsert_sites_async(db: AsyncSession, sites: list, commit: bool = True):
+    """Insert or replace many sites (flat rows keyed by SITE_COLUMNS) in one statement"""
+    rows = _site_rows(sites)
+    if not rows:
+        return 0
+    stmt = _site_upsert(db.get_bind().dialect.name)
+    if stmt is not None:
+        await db.execute(stmt, rows)
+    else:
+        existing = {site.site_id: site for site in (await db.execute(select(Site).where(
+            Site.site_id.in_([row["site_id"] for row in rows])))).scalars().all()}
+        for row in rows:
+            if row["site_id"] in existing:
+                for name, value in row.items():
+                    setattr(existing[row["site_id"]], name, value)
+            else:
+                db.add(Site(**row))
+    if commit:
+        await db.commit()
+    return len(rows)
+
+async def delete_site_async(db: AsyncSession, site_id: str, commit: bool = True):
+    """Remove a site and its hardware inventory; False if it did not exist"""
+    await _replace_hardware_units_async(db, {site_id: None})
+    deleted = (await db.execute(delete(Site).where(Site.site_id == site_id))).rowcount
+    await db.execute(delete(SiteHardwareInventory).where(SiteHardwareInventory.site_id == site_id))
+    await db.execute(delete(AllocationSchedule).where(AllocationSchedule.site_id == site_id))
+    if commit:
+        await db.commit()
+    return deleted > 0
+
+async def seed_sites_async(db: AsyncSession, sites: list):
+    """Insert the default sites when the sites table is empty"""
+    if (await db.execute(select(Site.id).limit(1))).first() is not None:
+        return 0
+    return await bulk_upsert_sites_async(db, sites)
+
+async def bulk_insert_site_allocations_async(db: AsyncSession, allocations: dict, commit: bool = True):
+    """Insert one allocation row per site with a single executemany"""
+    rows = _site_allocation_rows(allocations)
+    if rows:
+        await db.execute(SiteAllocation.__table__.insert(), rows)
+    if commit:
+        await db.commit()
+    return len(rows)
+
+async def write_schedule_async(db: AsyncSession, rows: list, prune_before: datetime = None, commit: bool = True):
+    """Upsert planned (hour, site) rows and drop hours before prune_before"""
+    if rows:
+        stmt = _schedule_upsert(db.get_bind().dialect.name)
+        if stmt is not None:
+            await db.execute(stmt, rows)
+        else:
+            for statement in _schedule_fallback_statements(rows):
+                await db.execute(statement)
+    if prune_before is not None:
+        await db.execute(delete(AllocationSchedule).where(AllocationSchedule.hour < prune_before))
+    if commit:
+        await db.commit()
+    return len(rows)
+
+async def get_schedule_async(db: AsyncSession, start: datetime, end: datetime, site_ids: list = None):
+    """Planned rows in [start, end), by site then hour"""
+    return [dict(row) for row in (await db.execute(_schedule_query(start, end, site_ids))).mappings()]
+
+async def record_workload_migrations_async(db: AsyncSession, migrated_at: datetime, moves: list,
+                                           prune_before: datetime = None, commit: bool = True):
+    """Append one step's moves with a single executemany and drop moves before prune_before"""
+    rows = _migration_rows(migrated_at, moves)
+    if rows:
+        await db.execute(WorkloadMigration.__table__.insert(), rows)
+    if prune_before is not None:
+        await db.execute(delete(WorkloadMigration).where(WorkloadMigration.migrated_at < prune_before))
+    if commit:
+        await db.commit()
+    return len(rows)
 
+async def get_workload_migrations_async(db: AsyncSession, limit: int = 100, site_id: str = None):
+    """Most recent moves first, optionally only those from or to one site"""
+    return [dict(row) for row in (await db.execute(_migrations_query(limit, site_id))).mappings()]
@@ -0,0 +1,318 @@
+"""
+Price forecasting for SLA-Smart Energy Arbitrage Platform
+
+An additive Holt-Winters model of hourly prices (level, damped trend and a
+24-hour UTC season) with an AR(1) term on its one-step residuals, fitted
+online: each price sample updates the model in constant time and memory, so
+years of minute-level history stream through it without being held. The
+price of the hour still being collected anchors the forecast, and its
+deviation from the model fades by the fitted AR(1) coefficient per hour
+ahead, so near hours follow the market and far hours the daily pattern.
+
+Every forecast the model issues at the end of an hour is scored when its
+target hour arrives, against the same hour's persistence forecast, so
+accuracy is reported on the stored history the model was fitted on without
+a separate backtest. Forecasts are served from a cache that computes the
+longest horizon once per model update and tick and slices shorter ones.
+
+Per-site demand needs no fitting: it is a function of local time (the
+business-hours curve in revenue_engine), forecast by schedule_planner's
+demand_grid.
+"""
+from collections import deque
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import time
+
+import numpy as np
+
+from price_series import PRICE_FIELDS
+from simulation import EPOCH, _epoch_seconds
+
+HOUR_SECONDS = 3600
+SEASON_HOURS = 24
+DEFAULT_ALPHA = 0.3         # level smoothing
+DEFAULT_BETA = 0.02         # trend smoothing
+DEFAULT_GAMMA = 0.1         # seasonal smoothing
+DEFAULT_DAMPING = 0.98      # trend damping per hour ahead
+DEFAULT_FORGETTING = 0.995  # per-hour weight decay of the AR(1) estimate
+MAX_AR = 0.95
+# Hours ahead at which issued forecasts are scored
+DEFAULT_ACCURACY_HORIZONS = (1, 6, 24)
+# Longer gaps without data restart the level instead of extrapolating across them
+MAX_GAP_HOURS = 7 * SEASON_HOURS
+
+
+class ForecastAccuracy:
+    """Running error of forecasts issued k hours ahead, against persistence (the value k hours earlier)"""
+
+    def __init__(self, horizons: Sequence[int] = DEFAULT_ACCURACY_HORIZONS):
+        self.horizons = tuple(sorted(set(int(k) for k in horizons if k >= 1)))
+        self._issued = {k: deque() for k in self.horizons}        # (target hour, forecast)
+        self._recent = deque(maxlen=max(self.horizons, default=1))  # (hour, value) of folded hours
+        fields = len(PRICE_FIELDS)
+        self._abs = {k: np.zeros(fields) for k in self.horizons}
+        self._sq = {k: np.zeros(fields) for k in self.horizons}
+        self._naive_abs = {k: np.zeros(fields) for k in self.horizons}
+        self._count = {k: 0 for k in self.horizons}
+
+    def issue(self, hour: int, forecasts: Dict[int, np.ndarray]) -> None:
+        """Remember the forecasts made at the end of `hour`, keyed by hours ahead"""
+        for k in self.horizons:
+            self._issued[k].append((hour + k, forecasts[k]))
+
+    def score(self, hour: int, value: np.ndarray) -> None:
+        """Score forecasts that targeted `hour`; persistence needs the value exactly k hours earlier"""
+        past = dict(self._recent)
+        for k in self.horizons:
+            issued = self._issued[k]
+            while issued and issued[0][0] < hour:
+                issued.popleft()
+            if issued and issued[0][0] == hour and hour - k in past:
+                error = value - issued.popleft()[1]
+                self._abs[k] += np.abs(error)
+                self._sq[k] += error * error
+                self._naive_abs[k] += np.abs(value - past[hour - k])
+                self._count[k] += 1
+        self._recent.append((hour, value))
+
+    def report(self) -> Dict:
+        """MAE, RMSE and skill (1 - MAE / persistence MAE) per horizon and price"""
+        report = {}
+        for k in self.horizons:
+            count = self._count[k]
+            prices = {}
+            for i, name in enumerate(PRICE_FIELDS):
+                mae = self._abs[k][i] / count if count else None
+                naive = self._naive_abs[k][i] / count if count else None
+                prices[name] = {
+                    "mae": mae,
+                    "rmse": float(np.sqrt(self._sq[k][i] / count)) if count else None,
+                    "persistence_mae": naive,
+                    "skill": 1 - mae / naive if count and naive > 0 else None,
+                }
+            report[f"{k}h"] = {"scored": count, "prices": prices}
+        return report
+
+
+class PriceForecaster:
+    """Online hourly price model; `ingest` samples in time order, `forecast` any hours ahead.
+
+    Each hour is represented by its last sample (the hourly close, as in the
+    1h rollups), so a model fitted from rollups and one fed raw samples agree.
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA, beta: float = DEFAULT_BETA, gamma: float = DEFAULT_GAMMA,
+                 damping: float = DEFAULT_DAMPING, forgetting: float = DEFAULT_FORGETTING,
+                 accuracy_horizons: Sequence[int] = DEFAULT_ACCURACY_HORIZONS):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.damping = damping
+        self.forgetting = forgetting
+        fields = len(PRICE_FIELDS)
+        self.level: Optional[np.ndarray] = None
+        self.trend = np.zeros(fields)
+        self.season = np.zeros((SEASON_HOURS, fields))
+        self.residual = np.zeros(fields)   # last folded hour's deviation from level + season
+        self.ar = np.zeros(fields)
+        self._sxx = np.zeros(fields)
+        self._sxy = np.zeros(fields)
+        self.hour: Optional[int] = None    # last folded hour, in hours since the epoch
+        self._pending: Optional[Tuple[int, float, Dict]] = None  # (hour, epoch seconds, latest sample)
+        self.accuracy = ForecastAccuracy(accuracy_horizons)
+        self.version = 0                   # bumped by every folded hour
+        self.hours_folded = 0
+        self.samples = 0
+        self.late_samples = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.hours_folded > 0
+
+    @property
+    def anchor_hour(self) -> Optional[int]:
+        """The hour forecasts start from: the one being collected, else the last folded one"""
+        return self._pending[0] if self._pending is not None else self.hour
+
+    def ingest(self, timestamp: float, prices: Dict) -> bool:
+        """Add one sample (epoch seconds); returns False for a sample older than the hour being collected"""
+        hour = int(timestamp // HOUR_SECONDS)
+        pending = self._pending
+        if pending is not None and hour == pending[0]:
+            if timestamp < pending[1]:
+                self.late_samples += 1
+                return False
+        elif (pending is not None and hour < pending[0]) or (self.hour is not None and hour <= self.hour):
+            self.late_samples += 1
+            return False
+        elif pending is not None:
+            self._fold(pending[0], self._close(pending[2]))
+        self._pending = (hour, timestamp, prices)
+        self.samples += 1
+        return True
+
+    @staticmethod
+    def _close(prices: Dict) -> np.ndarray:
+        return np.array([float(prices[name]) for name in PRICE_FIELDS])
+
+    def fit(self, samples: Iterable[Tuple[float, Dict]]) -> int:
+        """Ingest (epoch seconds, prices) samples from any iterable, e.g. a streamed history; returns the number kept"""
+        return sum(self.ingest(timestamp, prices) for timestamp, prices in samples)
+
+    def _base(self, hours_ahead: np.ndarray, target_hours: np.ndarray) -> np.ndarray:
+        """(N, 3) level + damped trend + season, `hours_ahead` of the last folded hour"""
+        phi = self.damping
+        trend_sum = hours_ahead if phi == 1 else phi * (1 - phi ** hours_ahead) / (1 - phi)
+        return self.level[None, :] + trend_sum[:, None] * self.trend[None, :] + self.season[target_hours % SEASON_HOURS]
+
+    def _fold(self, hour: int, value: np.ndarray) -> None:
+        """Update the model with one completed hour"""
+        slot = hour % SEASON_HOURS
+        if self.level is None or hour - self.hour > MAX_GAP_HOURS:
+            self.level = value - self.season[slot]
+            self.trend[:] = 0.0
+        else:
+            gap = hour - self.hour
+            if self.hours_folded:
+                self.accuracy.score(hour, value)
+            innovation = value - self._base(np.array([gap]), np.array([hour]))[0]
+            # AR(1) of the next innovation on the last deviation, exponentially forgetting old hours
+            previous = self.residual * self.ar ** (gap - 1)
+            self._sxy = self.forgetting * self._sxy + previous * innovation
+            self._sxx = self.forgetting * self._sxx + previous * previous
+            self.ar = np.clip(np.divide(self._sxy, self._sxx, out=np.zeros_like(self._sxy), where=self._sxx > 0),
+                              0.0, MAX_AR)
+            # Holt-Winters update, the trend carried across any missing hours
+            trend_sum = gap if self.damping == 1 else self.damping * (1 - self.damping ** gap) / (1 - self.damping)
+            projected = self.level + trend_sum * self.trend
+            level = self.alpha * (value - self.season[slot]) + (1 - self.alpha) * projected
+            self.trend = self.beta * (level - self.level) / gap + (1 - self.beta) * self.damping ** gap * self.trend
+            self.level = level
+        self.season[slot] = self.gamma * (value - self.level) + (1 - self.gamma) * self.season[slot]
+        self.residual = value - self.level - self.season[slot]
+        self.hour = hour
+        self.hours_folded += 1
+        self.version += 1
+        horizons = self.accuracy.horizons
+        if horizons:
+            ahead = np.array(horizons)
+            predicted = self._base(ahead, hour + ahead) + (self.ar[None, :] ** ahead[:, None]) * self.residual
+            self.accuracy.issue(hour, dict(zip(horizons, predicted)))
+
+    def forecast(self, timestamps: np.ndarray) -> np.ndarray:
+        """(N, 3) forecast price for the hours containing each epoch-seconds timestamp.
+
+        Hours up to the anchor hour get the anchor's price; without any folded
+        hour the latest sample is held.
+        """
+        if self.level is None and self._pending is None:
+            raise ValueError("No price samples ingested yet")
+        target = (np.asarray(timestamps, dtype=float) // HOUR_SECONDS).astype(np.int64)
+        if self.level is None:
+            return np.tile(self._close(self._pending[2]), (len(target), 1))
+        anchor = self.anchor_hour
+        ahead = np.maximum(target - anchor, 0)
+        base = self._base(anchor - self.hour + ahead, anchor + ahead)
+        if self._pending is not None:
+            deviation = self._close(self._pending[2]) - self._base(np.array([anchor - self.hour]), np.array([anchor]))[0]
+        else:
+            deviation = self.residual
+        return base + (self.ar[None, :] ** ahead[:, None]) * deviation[None, :]
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "samples": self.samples,
+            "late_samples": self.late_samples,
+            "hours_folded": self.hours_folded,
+            "last_hour": (EPOCH + timedelta(hours=self.hour)).isoformat() if self.hour is not None else None,
+            "level": dict(zip(PRICE_FIELDS, self.level.tolist())) if self.level is not None else None,
+            "trend_per_hour": dict(zip(PRICE_FIELDS, self.trend.tolist())),
+            "ar": dict(zip(PRICE_FIELDS, self.ar.tolist())),
+        }
+
+
+class ForecastCache:
+    """Forecast of the longest horizon, computed once per model version and tick; shorter horizons are slices"""
+
+    def __init__(self, forecaster: PriceForecaster, max_hours: int, tick_seconds: float = 60.0,
+                 clock=time.time):
+        self.forecaster = forecaster
+        self.max_hours = max_hours
+        self.tick_seconds = tick_seconds
+        self._clock = clock
+        self._entry: Optional[Tuple[Tuple[int, int], np.ndarray, np.ndarray]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, hours: int, now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(hour start epoch seconds, (hours, 3) prices) from the start of the current hour"""
+        if not 1 <= hours <= self.max_hours:
+            raise ValueError(f"hours must be between 1 and {self.max_hours}")
+        now = self._clock() if now is None else now
+        key = (self.forecaster.version, int(now // self.tick_seconds))
+        if self._entry is not None and self._entry[0] == key:
+            self.hits += 1
+        else:
+            self.misses += 1
+            first = now // HOUR_SECONDS * HOUR_SECONDS
+            timestamps = first + np.arange(self.max_hours) * float(HOUR_SECONDS)
+            self._entry = (key, timestamps, self.forecaster.forecast(timestamps))
+        _, timestamps, prices = self._entry
+        return timestamps[:hours], prices[:hours]
+
+    def expected_prices(self, hours: int, now: Optional[float] = None) -> Dict[str, float]:
+        """Mean forecast price over the coming `hours`, in the latest-price shape"""
+        _, prices = self.get(hours, now)
+        return dict(zip(PRICE_FIELDS, prices.mean(axis=0).tolist()))
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "tick_seconds": self.tick_seconds,
+                "max_hours": self.max_hours}
+
+
+class ForecastService:
+    """The model, its cache, and the samples that arrive while history is still being fitted.
+
+    Live samples are held (up to `max_backlog`) until `finish_history`, so
+    history older than them is not rejected as late.
+    """
+
+    def __init__(self, forecaster: PriceForecaster, cache: ForecastCache, max_backlog: int = 10000):
+        self.forecaster = forecaster
+        self.cache = cache
+        self.history_loaded = False
+        self.history_hours = 0
+        self._backlog: deque = deque(maxlen=max_backlog)
+
+    def observe(self, samples: List[Dict]) -> None:
+        """Feed callback: samples with datetime or epoch-second timestamps, oldest first"""
+        for sample in samples:
+            timestamp = sample["timestamp"]
+            seconds = timestamp if isinstance(timestamp, (int, float)) else _epoch_seconds(timestamp)
+            if self.history_loaded:
+                self.forecaster.ingest(seconds, sample)
+            else:
+                self._backlog.append((seconds, sample))
+
+    def fit_history(self, samples: Iterable[Tuple[float, Dict]]) -> int:
+        folded = self.forecaster.hours_folded
+        kept = self.forecaster.fit(samples)
+        self.history_hours += self.forecaster.hours_folded - folded
+        return kept
+
+    def finish_history(self) -> None:
+        """Replay the live samples held back while history loaded, and pass new ones straight through"""
+        self.history_loaded = True
+        while self._backlog:
+            self.forecaster.ingest(*self._backlog.popleft())
+
+    def stats(self) -> Dict:
+        return {
+            "history_loaded": self.history_loaded,
+            "history_hours": self.history_hours,
+            "backlog": len(self._backlog),
+            "model": self.forecaster.stats(),
+            "cache": self.cache.stats(),
+        }
@@ -0,0 +1,116 @@
+"""
+Hardware inventory rollups for SLA-Smart Energy Arbitrage Platform
+
+Site inventories are normalized into one typed row per site and hardware
+class, and rolled up per class fleet-wide and per region as they are
+written, so inventory totals read a handful of rollup rows however many sites
+there are. This module holds the storage-independent parts: unit rows from
+inventory JSON, folding a rewrite of unit rows into the rollups, and the API
+shape of the rollups.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from revenue_engine import HARDWARE_CLASSES, HARDWARE_PATHS, available_row, hardware_specs
+
+FLEET_SCOPE = "fleet"
+REGION_SCOPE = "region"
+UNKNOWN_REGION = "Unknown"
+
+# Unit rows are written and rollups adjusted in these columns
+ROLLUP_TOTALS = ("sites", "units", "output_capacity", "power_capacity")
+
+HARDWARE_GROUPS = dict((kind, group) for group, kind in HARDWARE_PATHS)
+
+
+def region_of(timezone: Optional[str]) -> str:
+    """Region of a site: its timezone's area ("Europe" for Europe/Oslo)"""
+    return timezone.split("/")[0] if timezone else UNKNOWN_REGION
+
+
+def hardware_unit_rows(site_inventories: Dict[str, Dict], regions: Dict[str, str]) -> List[Dict]:
+    """One typed row per site and hardware class; sites without an inventory get none"""
+    rows = []
+    for site_id, inventory in site_inventories.items():
+        if not inventory:
+            continue
+        output, unit_power = hardware_specs(inventory)
+        region = regions.get(site_id, UNKNOWN_REGION)
+        for kind, units, unit_output, power in zip(HARDWARE_CLASSES, available_row(inventory), output, unit_power):
+            rows.append({"site_id": site_id, "region": region, "hardware_class": kind, "available": int(units),
+                         "unit_output": float(unit_output), "unit_power": float(power)})
+    return rows
+
+
+def _rollup_keys(row: Dict) -> tuple:
+    return ((FLEET_SCOPE, "", row["hardware_class"]), (REGION_SCOPE, row["region"], row["hardware_class"]))
+
+
+def rollup_deltas(old_rows: Iterable[Dict], new_rows: Iterable[Dict]) -> Dict[tuple, Dict]:
+    """Change to each (scope, scope_key, hardware_class) rollup when old unit rows are replaced by new ones"""
+    deltas: Dict[tuple, Dict] = {}
+    for rows, sign in ((old_rows, -1), (new_rows, 1)):
+        for row in rows:
+            units = row["available"]
+            for key in _rollup_keys(row):
+                delta = deltas.setdefault(key, dict.fromkeys(ROLLUP_TOTALS, 0))
+                delta["sites"] += sign * (units > 0)
+                delta["units"] += sign * units
+                delta["output_capacity"] += sign * units * row["unit_output"]
+                delta["power_capacity"] += sign * units * row["unit_power"]
+    return deltas
+
+
+def apply_rollup_deltas(existing: Iterable, old_rows: List[Dict], new_rows: List[Dict], make_row) -> list:
+    """Fold a rewrite of unit rows into rollup objects in place; returns new rollup objects to add.
+
+    Fleet rows also carry the per-unit specs of the latest write for each class.
+    """
+    rollups = {(rollup.scope, rollup.scope_key, rollup.hardware_class): rollup for rollup in existing}
+    specs = {row["hardware_class"]: (row["unit_output"], row["unit_power"]) for row in new_rows}
+    added = []
+    for key, delta in rollup_deltas(old_rows, new_rows).items():
+        rollup = rollups.get(key)
+        if rollup is None:
+            scope, scope_key, kind = key
+            rollup = make_row(scope=scope, scope_key=scope_key, hardware_class=kind,
+                              **dict.fromkeys(ROLLUP_TOTALS, 0))
+            rollups[key] = rollup
+            added.append(rollup)
+        for column, change in delta.items():
+            setattr(rollup, column, (getattr(rollup, column) or 0) + change)
+        if key[0] == FLEET_SCOPE and key[2] in specs:
+            rollup.unit_output, rollup.unit_power = specs[key[2]]
+    return added
+
+
+def _nested(values: Dict[str, object]) -> Dict:
+    """Per-class values in the inventory's miners/inference nesting"""
+    nested = {"miners": {}, "inference": {}}
+    for kind in ("air", "hydro", "immersion", "gpu", "asic"):
+        nested[HARDWARE_GROUPS[kind]][kind] = values.get(kind, 0)
+    return nested
+
+
+def rollup_summary(rollups: Iterable) -> Dict:
+    """total_inventory, hardware_specs and region_breakdown from rollup rows"""
+    totals, specs, regions = {}, {}, {}
+    for rollup in rollups:
+        kind = rollup.hardware_class
+        if rollup.scope == FLEET_SCOPE:
+            totals[kind] = rollup.units
+            if rollup.unit_output is not None:
+                output_key = "tokens" if HARDWARE_GROUPS[kind] == "inference" else "hashrate"
+                specs[kind] = {output_key: rollup.unit_output, "power": rollup.unit_power}
+        elif rollup.units or rollup.sites:
+            region = regions.setdefault(rollup.scope_key, {"units": {}, "full_load_power": 0.0})
+            region["units"][kind] = rollup.units
+            region["full_load_power"] += rollup.power_capacity
+    return {
+        "total_inventory": _nested(totals),
+        "hardware_specs": {group: {kind: spec for kind, spec in _nested(specs)[group].items() if spec}
+                           for group in ("miners", "inference")} if specs else {},
+        "region_breakdown": {
+            name: {"hardware": _nested(region["units"]), "full_load_power": region["full_load_power"]}
+            for name, region in sorted(regions.items())
+        },
+    }
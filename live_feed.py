@@ -0,0 +1,205 @@
+"""
+Live dashboard push feed for SLA-Smart Energy Arbitrage Platform
+
+One server-side ticker computes the dashboard snapshot and fans it out to
+every connected subscriber. New subscribers receive the latest full snapshot;
+after that only per-site fields that changed since the previous tick are
+sent, so hardware inventories and other static data cross the wire once.
+"""
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Top-level dashboard sections sent whole whenever they change
+SECTIONS = ("global_metrics", "sla_commitments", "optimization_history", "current_prices")
+
+# Per-site fields that change every tick but carry no information for the dashboard
+VOLATILE_SITE_FIELDS = ("last_updated",)
+
+# Decimal places kept for floats on the wire; smaller changes are not pushed
+FLOAT_PRECISION = 4
+
+_MISSING = object()
+
+
+def compact(value):
+    """Round floats recursively so insignificant jitter doesn't produce deltas"""
+    if isinstance(value, float):
+        return round(value, FLOAT_PRECISION)
+    if isinstance(value, dict):
+        return {key: compact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [compact(item) for item in value]
+    return value
+
+
+def diff_value(before, after):
+    """Nested diff of two values; dicts recurse, removed keys map to None"""
+    if isinstance(before, dict) and isinstance(after, dict):
+        changed = {}
+        for key, value in after.items():
+            previous = before.get(key, _MISSING)
+            if previous is _MISSING:
+                changed[key] = value
+            elif previous != value:
+                changed[key] = diff_value(previous, value)
+        for key in before.keys() - after.keys():
+            changed[key] = None
+        return changed
+    return after
+
+
+def diff_sites(previous: Dict[str, Dict], current: Dict[str, Dict]) -> Dict[str, Optional[Dict]]:
+    """Changed fields per site; a removed site maps to None"""
+    changes: Dict[str, Optional[Dict]] = {}
+    for site_id, site in current.items():
+        before = previous.get(site_id)
+        if before is None:
+            changes[site_id] = site
+            continue
+        changed = diff_value(before, site)
+        if changed:
+            changes[site_id] = changed
+    for site_id in previous.keys() - current.keys():
+        changes[site_id] = None
+    return changes
+
+
+def encode_event(event: str, payload: Dict) -> str:
+    """Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str, separators=(',', ':'))}\n\n"
+
+
+class DashboardFeed:
+    """Single ticker fanning dashboard snapshots and deltas out to subscribers"""
+
+    def __init__(self, snapshot_fn: Callable[[], Awaitable[Dict]], interval: float = 10.0,
+                 queue_size: int = 8):
+        self._snapshot_fn = snapshot_fn
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, asyncio.Queue] = {}
+        self._next_id = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._refresh_lock = asyncio.Lock()
+        self._sites: Dict[str, Dict] = {}
+        self._sections: Dict[str, object] = {}
+        self._snapshot_frame: Optional[str] = None
+        self.seq = 0
+        self.ticks = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.resyncs = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """Yield SSE frames for one client until it disconnects"""
+        subscriber_id = self._next_id
+        self._next_id += 1
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[subscriber_id] = queue
+        self._ensure_ticker()
+        try:
+            if self._snapshot_frame is None:
+                async with self._refresh_lock:
+                    if self._snapshot_frame is None:
+                        await self._refresh()
+            if self._snapshot_frame is not None:
+                yield self._count(self._snapshot_frame)
+            while True:
+                frame = await queue.get()
+                yield self._count(frame)
+        finally:
+            self._subscribers.pop(subscriber_id, None)
+
+    def request_refresh(self) -> None:
+        """Push a tick now instead of waiting for the interval (e.g. after a write)"""
+        self._wakeup.set()
+
+    async def refresh(self) -> None:
+        """Compute one snapshot and broadcast what changed"""
+        async with self._refresh_lock:
+            await self._refresh()
+
+    async def _refresh(self) -> None:
+        snapshot = await self._snapshot_fn()
+        self.ticks += 1
+        if "sites" not in snapshot:
+            return
+
+        snapshot = compact(snapshot)
+        sites = {
+            site["site_id"]: {key: value for key, value in site.items() if key not in VOLATILE_SITE_FIELDS}
+            for site in snapshot["sites"]
+        }
+        sections = {name: snapshot.get(name) for name in SECTIONS}
+        self.seq += 1
+        full_frame = encode_event("snapshot", {"seq": self.seq, **snapshot})
+
+        if self._snapshot_frame is None:
+            delta_frame = None
+        else:
+            delta = {"seq": self.seq, "sites": diff_sites(self._sites, sites)}
+            for name, value in sections.items():
+                if self._sections.get(name) != value:
+                    delta[name] = diff_value(self._sections.get(name), value)
+            delta_frame = encode_event("delta", delta)
+
+        self._sites, self._sections, self._snapshot_frame = sites, sections, full_frame
+        if delta_frame is not None:
+            self._broadcast(delta_frame, full_frame)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "seq": self.seq,
+            "ticks": self.ticks,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "resyncs": self.resyncs,
+            "interval": self.interval
+        }
+
+    def _broadcast(self, frame: str, full_frame: str) -> None:
+        for queue in self._subscribers.values():
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and resynchronise with a full snapshot
+                self.resyncs += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(full_frame)
+
+    def _count(self, frame: str) -> str:
+        self.frames_sent += 1
+        self.bytes_sent += len(frame)
+        return frame
+
+    def _ensure_ticker(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._subscribers:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._subscribers:
+                break
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Dashboard feed tick failed: {e}")
+        # Start from a fresh snapshot when the next client connects
+        self._snapshot_frame = None
+        self._task = None
@@ -0,0 +1,240 @@
+"""
+Logging pipeline for SLA-Smart Energy Arbitrage Platform
+
+Loggers only put records on an in-memory queue; a listener thread formats
+them and does the file and console I/O, so request handlers never block on
+disk. Records are JSON lines carrying the request id of the request that
+emitted them, rotated by size or time, with high-volume debug lines sampled
+and levels configurable per module.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from typing import Dict, Optional
+import atexit
+import json
+import logging
+import queue
+import time
+import uuid
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+ACCESS_LOGGER = "access"
+
+# Attributes every LogRecord has; anything else was passed in extra= and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("mara_request_id", default=None)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request id; runs on the emitting thread, where the context is"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keep one in every `every` DEBUG records per call site; other levels always pass"""
+
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: Dict[tuple, int] = {}
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        seen = self._seen.get(site, 0)
+        self._seen[site] = seen + 1
+        if seen % self.every:
+            self.dropped += 1
+            return False
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and any extra= fields"""
+
+    def __init__(self):
+        super().__init__()
+        self._second = None
+        self._second_text = ""
+
+    def timestamp(self, created: float) -> str:
+        """UTC ISO time with milliseconds; the date part is formatted once per second"""
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._second_text = datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        return f"{self._second_text}.{int((created - second) * 1000):03d}Z"
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.timestamp(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queue handler that never blocks: records are dropped (and counted) when the queue is full.
+
+    Records are queued as they are, unformatted: the listener thread formats them, so pass log
+    arguments as values, not objects that change after the call.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Per-module levels from "snapshot_cache=DEBUG,access=WARNING"; raises ValueError"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, level = item.partition("=")
+        level = level.strip().upper()
+        if not sep or not name.strip() or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Invalid log level setting: {item!r} (expected module=LEVEL)")
+        levels[name.strip()] = level
+    return levels
+
+
+def file_handler(path: str, max_bytes: int = 0, backup_count: int = 5, rotate_when: str = "") -> logging.Handler:
+    """Log file handler: rotated at a time boundary (rotate_when), by size (max_bytes), or not at all"""
+    if rotate_when:
+        return TimedRotatingFileHandler(path, when=rotate_when, backupCount=backup_count, utc=True)
+    if max_bytes > 0:
+        return RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+    return logging.FileHandler(path)
+
+
+_pipeline: Dict = {}
+
+
+def configure_logging(level: str = "INFO", log_file: Optional[str] = "app.log", fmt: str = "json",
+                      module_levels: str = "", max_bytes: int = 0, backup_count: int = 5,
+                      rotate_when: str = "", debug_sample_every: int = 1, queue_size: int = 10000,
+                      console: bool = True) -> QueueListener:
+    """Route the root logger through a queue to a listener thread; replaces any previous pipeline"""
+    shutdown_logging()
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if log_file:
+        handlers.append(file_handler(log_file, max_bytes, backup_count, rotate_when))
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    sampler = DebugSampler(debug_sample_every)
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(sampler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    # Server loggers go through the queue too; uvicorn's access lines duplicate the access logger's
+    levels = {"uvicorn.access": "WARNING", **parse_levels(module_levels)}
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _pipeline.update(listener=listener, handler=queue_handler, sampler=sampler, queue=log_queue)
+    return listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    listener = _pipeline.pop("listener", None)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
+
+
+def logging_stats() -> Dict:
+    handler = _pipeline.get("handler")
+    if handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "queued": _pipeline["queue"].qsize(),
+        "dropped_queue_full": handler.dropped,
+        "dropped_sampled": _pipeline["sampler"].dropped,
+        "debug_sample_every": _pipeline["sampler"].every,
+    }
+
+
+class RequestLogMiddleware:
+    """ASGI middleware assigning each request an id (X-Request-ID, echoed back) and logging its outcome"""
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = logging.getLogger(ACCESS_LOGGER)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+        state = {"status": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("%s %s %s", scope["method"], scope["path"], state["status"], extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": state["status"],
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                })
+            request_id_var.reset(token)
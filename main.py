@@ -1,56 +1,120 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 import httpx
 import asyncio
+import hashlib
 import json
 import os
 from datetime import datetime, timedelta
-import pytz
 import random
-import math
 import time
+import uuid
 from dataclasses import dataclass
-from anthropic import Anthropic
-from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 import logging
-from sqlalchemy.orm import Session
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Run as a script, read config.env before any module reads the environment; servers get it from
+# the platform or `uvicorn main:app --env-file config.env`, so importing the app never touches it
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv("config.env")
 
 # Import database functions
 from database import (
-    get_db, get_system_state, update_system_state,
-    get_site_inventory, update_site_inventory, get_all_site_inventories,
-    add_optimization_history, get_optimization_history,
-    add_sla_commitment, get_active_sla_commitments,
-    add_pricing_data, get_latest_pricing,
-    get_site_allocation, update_site_allocation
+    AsyncSessionLocal, init_db, query_stats, get_async_db,
+    get_system_state_async, update_system_state_async,
+    get_all_site_inventories_async, bulk_upsert_site_inventories_async,
+    add_optimization_history_async, get_optimization_history_async, update_optimization_reasoning_async,
+    get_active_sla_commitments_async, get_sla_power_by_site_async,
+    expire_sla_commitments_async, add_sla_placement_async,
+    add_pricing_batch_async, get_latest_pricing_async, get_pricing_range_async, latest_pricing, publish_pricing,
+    get_latest_site_allocations_async, bulk_insert_site_allocations_async,
+    get_all_sites_async, bulk_upsert_sites_async, delete_site_async, seed_sites_async,
+    get_site_committed_power_async, get_hardware_rollups_async, get_site_hardware_units_async,
+    get_sla_windows_async, write_schedule_async, get_schedule_async,
+    record_workload_migrations_async, get_workload_migrations_async
 )
+from revenue_engine import (ALLOCATION_KEYS, pack_fleet, pack_allocations, unpack_allocation, compute_fleet_revenue,
+                            demand_multipliers_for_hours, fleet_demand_multipliers, get_timezone)
+from allocation_solver import build_allocation_problem, get_solver
+from claude_reasoning import ReasoningCache, ReasoningService, StubClaudeClient
+from snapshot_cache import FleetSnapshotCache
+from live_feed import DashboardFeed
+from inventory_rollups import rollup_summary
+from price_series import PRICE_FIELDS, RANGE_RESOLUTIONS
+from sla_placement import SLAPlacementEngine, PlacementRejected
+from simulation import EPOCH, _epoch_seconds, local_hour_grid
+from site_records import SiteIndex
+from site_status import StatusQuery, compose_sites_status
+from site_registry import SiteRegistry, apportion, config_to_row, parse_site_rows, parse_sites_csv, row_to_config, validate_site_row
+from backtest import BacktestScenario, BACKTEST_OUTPUT_DIR, load_results, run_scenarios
+from monte_carlo import simulate_revenue_risk
+from optimization_jobs import QueueFull, get_job_queue
+from schedule_planner import (MAX_HORIZON_HOURS, RollingHorizonPlanner, demand_grid, firm_power_grid, hour_grid,
+                              hourly_price_profile, price_forecast)
+from workload_migration import MigrationEngine
+from forecasting import ForecastCache, ForecastService, PriceForecaster
+from price_feed import FEED_SOURCES, FileReplaySource, HttpPriceSource, PriceFeed, SyntheticPriceSource, synthetic_prices
+from log_pipeline import RequestLogMiddleware, configure_logging, logging_stats
+from metrics import CONTENT_TYPE, REGISTRY, GaugeCallback, MetricsMiddleware, operation, stage
+
+def setup_logging():
+    """Route logging through the queue pipeline: handlers only enqueue records, a listener thread writes them"""
+    configure_logging(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        log_file=os.getenv("LOG_FILE", "app.log"),
+        fmt=os.getenv("LOG_FORMAT", "json"),
+        module_levels=os.getenv("LOG_LEVELS", ""),
+        max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+        rotate_when=os.getenv("LOG_ROTATE_WHEN", ""),
+        debug_sample_every=int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "1")),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    )
 
-# Load environment variables
-load_dotenv("config.env")
-
-# Configure logging
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO"),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.getenv("LOG_FILE", "app.log")),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup; importing the module does none of this
+    setup_logging()
     logger.info("Application starting up...")
-    # Note: Background tasks removed for Vercel serverless compatibility
+    # Schema changes are a startup (or `alembic upgrade head`) step, not an import side effect
+    if DB_INIT_ON_STARTUP:
+        await asyncio.to_thread(init_db)
+    # Serve sites from the database; an empty sites table is seeded with the default fleet
+    async with AsyncSessionLocal() as db:
+        await load_site_registry(db)
+    # Expire SLA commitments in the background; reads also sweep when due, for serverless deployments
+    sla_expiry_task = asyncio.create_task(run_sla_expiry()) if SLA_EXPIRY_INTERVAL > 0 else None
+    optimization_jobs.start()
+    schedule_task = asyncio.create_task(run_schedule_replans()) if SCHEDULE_REPLAN_INTERVAL > 0 else None
+    migration_task = asyncio.create_task(run_migration_steps()) if MIGRATION_INTERVAL > 0 else None
+    # The forecaster fits the stored history in the background; feed samples wait for it
+    forecast_task = asyncio.create_task(load_forecast_history())
+    # One background loop fetches prices for every reader; handlers only read the latest-price register
+    price_feed_state["feed"] = create_price_feed()
+    price_feed_state["feed"].start()
     yield
     # Shutdown
+    if sla_expiry_task is not None:
+        sla_expiry_task.cancel()
+    if schedule_task is not None:
+        schedule_task.cancel()
+    if migration_task is not None:
+        migration_task.cancel()
+    forecast_task.cancel()
+    await optimization_jobs.stop()
+    await price_feed_state["feed"].stop()
+    if price_feed_state["client"] is not None:
+        await price_feed_state["client"].aclose()
+        price_feed_state["client"] = None
     logger.info("Application shutting down...")
 
 app = FastAPI(title="SLA-Smart Energy Arbitrage Platform", version="1.0.0", lifespan=lifespan)
@@ -68,24 +132,178 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and database statements per route, served at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Request ids for log records (X-Request-ID) and one access record per request; outermost
+app.add_middleware(RequestLogMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Global configuration
 CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() in ("1", "true", "yes")  # false once migrations run at deploy
+ALLOCATION_SOLVER = os.getenv("ALLOCATION_SOLVER", "numpy")
+SNAPSHOT_TICK_SECONDS = float(os.getenv("SNAPSHOT_TICK_SECONDS", "10"))
+DASHBOARD_PUSH_INTERVAL = float(os.getenv("DASHBOARD_PUSH_INTERVAL", str(SNAPSHOT_TICK_SECONDS)))
+SLA_EXPIRY_INTERVAL = float(os.getenv("SLA_EXPIRY_INTERVAL", "60"))  # seconds between expiry sweeps, 0 disables
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+BACKTEST_MAX_STEPS = int(os.getenv("BACKTEST_MAX_STEPS", "100000"))  # per scenario
+MONTE_CARLO_WORKERS = int(os.getenv("MONTE_CARLO_WORKERS", str(os.cpu_count() or 1)))
+MONTE_CARLO_MAX_SCENARIOS = int(os.getenv("MONTE_CARLO_MAX_SCENARIOS", "200000"))
+SIMULATION_SEED = int(os.getenv("SIMULATION_SEED")) if os.getenv("SIMULATION_SEED") else None  # unset = fresh entropy
+SITE_IMPORT_MAX_ROWS = int(os.getenv("SITE_IMPORT_MAX_ROWS", "50000"))
+OPTIMIZATION_JOB_BACKEND = os.getenv("OPTIMIZATION_JOB_BACKEND", "local")
+OPTIMIZATION_WORKERS = int(os.getenv("OPTIMIZATION_WORKERS", "1"))
+OPTIMIZATION_QUEUE_SIZE = int(os.getenv("OPTIMIZATION_QUEUE_SIZE", "16"))  # waiting jobs before 429
+OPTIMIZATION_JOB_TIMEOUT = float(os.getenv("OPTIMIZATION_JOB_TIMEOUT", "300"))  # seconds, 0 disables
+SCHEDULE_HORIZON_HOURS = min(int(os.getenv("SCHEDULE_HORIZON_HOURS", "72")), MAX_HORIZON_HOURS)
+SCHEDULE_REPLAN_INTERVAL = float(os.getenv("SCHEDULE_REPLAN_INTERVAL", "3600"))  # seconds, 0 disables
+SCHEDULE_REPLAN_TOLERANCE = float(os.getenv("SCHEDULE_REPLAN_TOLERANCE", "0.005"))
+SCHEDULE_PRICE_LOOKBACK_DAYS = float(os.getenv("SCHEDULE_PRICE_LOOKBACK_DAYS", "7"))
+SCHEDULE_RETENTION_HOURS = int(os.getenv("SCHEDULE_RETENTION_HOURS", "24"))  # past hours kept in the table
+MIGRATION_INTERVAL = float(os.getenv("MIGRATION_INTERVAL", "60"))  # seconds between migration steps, 0 disables
+MIGRATION_LOOKAHEAD_HOURS = float(os.getenv("MIGRATION_LOOKAHEAD_HOURS", "2"))
+MIGRATION_DOWNTIME_MINUTES = float(os.getenv("MIGRATION_DOWNTIME_MINUTES", "10"))
+MIGRATION_COST_PER_UNIT = float(os.getenv("MIGRATION_COST_PER_UNIT", "0"))
+MIGRATION_WORKLOAD_SHARE = float(os.getenv("MIGRATION_WORKLOAD_SHARE", "0.6"))  # of allocated inference units
+MIGRATION_RETENTION_DAYS = float(os.getenv("MIGRATION_RETENTION_DAYS", "7"))
+PRICE_FEED_SOURCE = os.getenv("PRICE_FEED_SOURCE", "synthetic")  # synthetic, http or replay
+PRICE_FEED_URL = os.getenv("PRICE_FEED_URL", "https://mara-hackathon-api.onrender.com/prices")
+PRICE_FEED_FILE = os.getenv("PRICE_FEED_FILE", "")  # CSV or Parquet file for replay
+PRICE_FEED_REPLAY_SPEED = float(os.getenv("PRICE_FEED_REPLAY_SPEED", "1"))
+PRICE_FEED_INTERVAL = float(os.getenv("PRICE_FEED_INTERVAL", "5"))  # seconds between fetches
+PRICE_FEED_BATCH_SIZE = int(os.getenv("PRICE_FEED_BATCH_SIZE", "20"))
+PRICE_FEED_FLUSH_INTERVAL = float(os.getenv("PRICE_FEED_FLUSH_INTERVAL", "30"))  # max seconds a sample waits to be stored
+PRICE_FEED_TIMEOUT = float(os.getenv("PRICE_FEED_TIMEOUT", "10"))
+PRICE_FEED_SEED = int(os.getenv("PRICE_FEED_SEED")) if os.getenv("PRICE_FEED_SEED") else None
+FORECAST_HISTORY_DAYS = float(os.getenv("FORECAST_HISTORY_DAYS", "90"))  # 1h rollups fitted at startup
+FORECAST_CACHE_SECONDS = float(os.getenv("FORECAST_CACHE_SECONDS", "60"))
+OPTIMIZE_PRICE_HORIZON_HOURS = int(os.getenv("OPTIMIZE_PRICE_HORIZON_HOURS", "4"))  # 1 = current price only
+
+# Fleet snapshots shared by all dashboard readers, recomputed at most once per tick
+snapshot_cache = FleetSnapshotCache(tick_seconds=SNAPSHOT_TICK_SECONDS)
+
+CLAUDE_CLIENT = os.getenv("CLAUDE_CLIENT", "auto")  # auto or stub
+CLAUDE_CACHE_SIZE = int(os.getenv("CLAUDE_CACHE_SIZE", "128"))
+CLAUDE_CACHE_TTL = float(os.getenv("CLAUDE_CACHE_TTL", "900"))
+
+def create_claude_client():
+    """Build the async Claude client, or the offline stub when no API key is configured"""
+    if CLAUDE_CLIENT != "stub" and CLAUDE_API_KEY and CLAUDE_API_KEY != "your_claude_api_key_here":
+        try:
+            from anthropic import AsyncAnthropic  # slow to import; only when reasoning first runs
+            client = AsyncAnthropic(api_key=CLAUDE_API_KEY)
+            logger.info("Claude AI client initialized successfully")
+            return client
+        except Exception as e:
+            logger.error(f"Failed to initialize Claude client: {e}")
+    else:
+        logger.warning("Claude API key not configured - using mock responses")
+    return StubClaudeClient()
+
+# Claude reasoning runs off the optimization critical path, memoized per site snapshot
+reasoning_service = ReasoningService(
+    create_claude_client,
+    ReasoningCache(max_entries=CLAUDE_CACHE_SIZE, ttl_seconds=CLAUDE_CACHE_TTL)
+)
+
+# Optimizations run as queued jobs on a bounded worker pool, each on its own session
+optimization_jobs = get_job_queue(
+    OPTIMIZATION_JOB_BACKEND,
+    lambda: with_session(run_optimization),
+    workers=OPTIMIZATION_WORKERS,
+    max_queue=OPTIMIZATION_QUEUE_SIZE,
+    timeout=OPTIMIZATION_JOB_TIMEOUT
+)
+
+# Rolling-horizon allocation schedule, re-planned incrementally; one planning run at a time
+schedule_planner = RollingHorizonPlanner(SCHEDULE_HORIZON_HOURS, SCHEDULE_REPLAN_TOLERANCE)
+schedule_lock = asyncio.Lock()
+
+# Follow-the-sun placement of inference workload, seeded by each optimization and moved every step
+migration_engine = MigrationEngine(MIGRATION_LOOKAHEAD_HOURS, MIGRATION_DOWNTIME_MINUTES, MIGRATION_COST_PER_UNIT,
+                                   MIGRATION_WORKLOAD_SHARE)
+migration_lock = asyncio.Lock()
+
+# Online price model, fitted on the stored history at startup and updated by every fed sample
+forecaster = PriceForecaster()
+forecast_cache = ForecastCache(forecaster, MAX_HORIZON_HOURS, tick_seconds=FORECAST_CACHE_SECONDS)
+forecast_service = ForecastService(forecaster, forecast_cache)
+FORECAST_HISTORY_PAGE = 5000
+
+# Price feed and the pooled HTTP client it polls with; created at startup
+price_feed_state = {"feed": None, "client": None}
+
+async def store_price_batch(samples: List[Dict]) -> int:
+    async with AsyncSessionLocal() as db:
+        return await add_pricing_batch_async(db, samples)
 
-# Initialize Claude client if API key is available
-claude_client = None
-if CLAUDE_API_KEY and CLAUDE_API_KEY != "your_claude_api_key_here":
+def create_price_source():
+    """Price source selected by PRICE_FEED_SOURCE"""
+    if PRICE_FEED_SOURCE == "http":
+        price_feed_state["client"] = httpx.AsyncClient(
+            timeout=PRICE_FEED_TIMEOUT, limits=httpx.Limits(max_connections=4, max_keepalive_connections=2)
+        )
+        return HttpPriceSource(PRICE_FEED_URL, price_feed_state["client"], timeout=PRICE_FEED_TIMEOUT)
+    if PRICE_FEED_SOURCE == "replay":
+        return FileReplaySource(PRICE_FEED_FILE, speed=PRICE_FEED_REPLAY_SPEED)
+    if PRICE_FEED_SOURCE != "synthetic":
+        logger.warning(f"Unknown PRICE_FEED_SOURCE {PRICE_FEED_SOURCE!r} (expected one of {FEED_SOURCES}); using synthetic")
+    return SyntheticPriceSource(PRICE_FEED_SEED)
+
+def create_price_feed() -> PriceFeed:
+    return PriceFeed(create_price_source(), store_price_batch, publish_pricing, interval=PRICE_FEED_INTERVAL,
+                     batch_size=PRICE_FEED_BATCH_SIZE, flush_interval=PRICE_FEED_FLUSH_INTERVAL,
+                     observe=forecast_service.observe)
+
+def price_feed_stats() -> Dict:
+    feed = price_feed_state["feed"]
+    return feed.stats() if feed is not None else {"running": False}
+
+async def load_forecast_history():
+    """Fit the forecaster on the stored 1h rollups a page at a time, then pass it the live samples"""
     try:
-        claude_client = Anthropic(api_key=CLAUDE_API_KEY)
-        logger.info("Claude AI client initialized successfully")
+        end = datetime.utcnow()
+        start = end - timedelta(days=FORECAST_HISTORY_DAYS)
+        async with AsyncSessionLocal() as db:
+            while True:
+                points = await get_pricing_range_async(db, start, end, "1h", limit=FORECAST_HISTORY_PAGE)
+                forecast_service.fit_history(
+                    (_epoch_seconds(datetime.fromisoformat(point["timestamp"])),
+                     {name: point[name]["close"] for name in PRICE_FIELDS})
+                    for point in points
+                )
+                if len(points) < FORECAST_HISTORY_PAGE:
+                    break
+                start = datetime.fromisoformat(points[-1]["timestamp"]) + timedelta(hours=1)
+        logger.info("Forecaster fitted on %d hours of price history", forecast_service.history_hours)
     except Exception as e:
-        logger.error(f"Failed to initialize Claude client: {e}")
-else:
-    logger.warning("Claude API key not configured - using mock responses")
+        logger.error(f"Loading price history for the forecaster failed: {e}")
+    finally:
+        forecast_service.finish_history()
 
-# Multi-site configuration with enhanced data
+# Point-in-time values read when /metrics is scraped
+REGISTRY.register(GaugeCallback("mara_snapshot_cache_lookups_total", "Fleet snapshot cache lookups by outcome",
+                                lambda: {outcome: snapshot_cache.stats()[outcome] for outcome in ("hits", "misses", "coalesced")},
+                                labelname="outcome", kind="counter"))
+REGISTRY.register(GaugeCallback("mara_optimization_queue_depth", "Optimization jobs waiting for a worker",
+                                lambda: optimization_jobs.depth))
+REGISTRY.register(GaugeCallback("mara_optimization_jobs_running", "Optimization jobs running",
+                                lambda: optimization_jobs.stats()["running"]))
+REGISTRY.register(GaugeCallback("mara_sites", "Registered sites", lambda: len(site_registry.index)))
+REGISTRY.register(GaugeCallback("mara_price_feed_samples_total", "Price feed samples by outcome",
+                                lambda: {outcome: price_feed_stats().get(outcome, 0)
+                                         for outcome in ("samples", "written", "dropped")},
+                                labelname="outcome", kind="counter"))
+REGISTRY.register(GaugeCallback("mara_price_feed_errors_total", "Price feed failures by kind",
+                                lambda: {kind: price_feed_stats().get(f"{kind}_errors", 0) for kind in ("fetch", "write")},
+                                labelname="kind", kind="counter"))
+REGISTRY.register(GaugeCallback("mara_price_feed_buffered", "Price samples waiting to be stored",
+                                lambda: price_feed_stats().get("buffered", 0)))
+
+# Default multi-site configuration, seeded into an empty sites table
 MULTI_SITE_CONFIG = {
     "site_1_nordic": {
         "name": "Nordic Iceland",
@@ -177,6 +395,17 @@ SLA_TIERS = {
     "spot": {"uptime": 0.0, "price_multiplier": 0.4, "priority": 4}
 }
 
+# Tiers whose committed power must be reserved on inference hardware at their site
+FIRM_SLA_TIERS = [tier for tier, config in SLA_TIERS.items() if config["uptime"] >= 95.0]
+
+# In-memory site registry: compiled site and inventory records for hot paths plus the seeded
+# weather simulation, reloaded from the sites table at startup and after every site write
+site_registry = SiteRegistry(MULTI_SITE_CONFIG, seed=SIMULATION_SEED)
+
+# Capacity-aware SLA placement; committed power and allocation draw are loaded from the database on first use
+sla_placement = SLAPlacementEngine(site_registry.config, list(SLA_TIERS))
+sla_placement_state = {"loaded": False}
+
 # Note: Global state replaced with database storage
 # All state now persists in SQLite database via database.py
 
@@ -201,68 +430,44 @@ class GlobalOptimization(BaseModel):
     timezone_optimization: float
     sla_performance: Dict
     claude_reasoning: str
+    reasoning_job_id: Optional[str] = None
+    reasoning_status: Optional[str] = None
+    solver: Optional[Dict] = None
 
 class SLARequest(BaseModel):
     tier: str
     power_requirement: int
     duration_hours: int
+    allow_split: bool = True
+
+class BacktestRequest(BaseModel):
+    start: datetime
+    end: datetime
+    step_minutes: float = 60
+    seeds: List[int] = [0]
+    price_source: str = "synthetic"  # synthetic or stored
+    resolution: str = "1h"           # stored prices: raw, 1m, 1h or 1d
+    solver: Optional[str] = None
+    per_site_series: bool = True
+
+class RevenueRiskRequest(BaseModel):
+    scenarios: int = 10000
+    horizon_hours: int = 24
+    seed: int = 0
 
 # Utility functions
 def get_local_time(timezone_str: str) -> str:
     """Get current local time for a timezone"""
     try:
-        tz = pytz.timezone(timezone_str)
-        return datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S %Z")
+        return datetime.now(get_timezone(timezone_str)).strftime("%Y-%m-%d %H:%M:%S %Z")
     except:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
 
-def calculate_demand_multiplier(timezone_str: str) -> float:
-    """Calculate demand multiplier based on business hours with dynamic variation"""
-    try:
-        tz = pytz.timezone(timezone_str)
-        local_hour = datetime.now(tz).hour
-        
-        # Base demand multiplier
-        if 9 <= local_hour <= 18:
-            base_multiplier = 1.5  # Peak business hours
-        elif 6 <= local_hour <= 9 or 18 <= local_hour <= 22:
-            base_multiplier = 1.2  # Moderate hours
-        else:
-            base_multiplier = 0.8  # Off hours
-        
-        # Add dynamic variation based on time
-        dynamic_factor = math.sin(time.time() / 50) * 0.3  # Oscillating factor
-        return max(0.5, base_multiplier + dynamic_factor)  # Ensure minimum 0.5x
-    except:
-        return 1.0  # Fallback to neutral multiplier
-
-def simulate_weather(climate_config: Dict) -> Dict:
-    """Simulate current temperature with more dramatic randomness for demo purposes"""
-    base_temp = climate_config.get("avg_temp", 70)  # Default to 70F if not found
-    # Add more dramatic randomness (-20 to +20 degrees) and time-based variation
-    time_factor = math.sin(time.time() / 100) * 10  # Slow oscillation
-    random_factor = random.uniform(-20, 20)
-    current_temp = base_temp + time_factor + random_factor
-    
-    return {
-        "temperature": current_temp,
-        "base_temp": base_temp,
-        "conditions": "simulated"
-    }
-
 def get_dummy_mara_prices():
-    """Generate realistic dummy MARA pricing data"""
-    base_time = datetime.now()
-    
-    # Simulate price fluctuations
-    time_factor = math.sin(time.time() / 200) * 0.1
-    random_factor = random.uniform(-0.05, 0.05)
-    
+    """Generate realistic dummy MARA pricing data; the fallback until the price feed has a sample"""
     return {
-        "energy_price": 0.65 + time_factor + random_factor,
-        "hash_price": 8.5 + time_factor * 2 + random_factor * 2,
-        "token_price": 2.9 + time_factor + random_factor,
-        "timestamp": base_time,  # Return datetime object, not string
+        **synthetic_prices(time.time(), random),
+        "timestamp": datetime.utcnow(),  # Return datetime object, not string
         "source": "dummy_data"
     }
 
@@ -281,175 +486,208 @@ def get_dummy_mara_inventory():
         "source": "dummy_data"
     }
 
-def calculate_site_revenue(site_id: str, allocation: Dict, prices: Dict, site_config: Dict, mara_inventory: Dict = None) -> float:
-    """Calculate revenue for a specific site allocation"""
+def calculate_fleet_revenue(allocations: Dict[str, Dict], prices: Dict, mara_inventory: Dict = None,
+                            index: Optional[SiteIndex] = None) -> Dict[str, float]:
+    """Calculate revenue for every site allocation in one batched call"""
     if not mara_inventory:
         mara_inventory = get_dummy_mara_inventory()
     
-    inventory = mara_inventory
-    total_revenue = 0
-    
-    # AI Inference revenue
-    gpu_revenue = (allocation.get("gpu_compute", 0) * 
-                  inventory["inference"]["gpu"]["tokens"] * 
-                  prices["token_price"] * 
-                  site_config["climate"]["cooling_efficiency"])
-    
-    asic_inference_revenue = (allocation.get("asic_compute", 0) * 
-                             inventory["inference"]["asic"]["tokens"] * 
-                             prices["token_price"] * 
-                             site_config["climate"]["cooling_efficiency"])
-    
-    # Bitcoin mining revenue
-    mining_revenue = 0
-    for miner_type in ["air_miners", "hydro_miners", "immersion_miners"]:
-        if miner_type in allocation:
-            miner_key = miner_type.replace("_miners", "")
-            mining_revenue += (allocation[miner_type] * 
-                             inventory["miners"][miner_key]["hashrate"] * 
-                             prices["hash_price"])
-    
-    total_revenue = gpu_revenue + asic_inference_revenue + mining_revenue
+    index = index if index is not None else site_registry.index
+    fleet = index.subset(index.pack(mara_inventory, with_inventories=False), list(allocations))
     
-    # Apply timezone demand multiplier
-    demand_multiplier = calculate_demand_multiplier(site_config["location"]["timezone"])
-    total_revenue *= demand_multiplier
+    # Inference revenue scales with cooling efficiency, timezone demand applies to both
+    result = compute_fleet_revenue(
+        fleet,
+        pack_allocations(fleet.site_ids, allocations),
+        prices,
+        inference_scale=fleet.cooling_efficiency
+    )
+    return dict(zip(fleet.site_ids, result.revenue.tolist()))
+
+def calculate_site_revenue(site_id: str, allocation: Dict, prices: Dict, site_config: Dict, mara_inventory: Dict = None) -> float:
+    """Calculate revenue for a specific site allocation"""
+    if site_id in site_registry.index:
+        return calculate_fleet_revenue({site_id: allocation}, prices, mara_inventory)[site_id]
     
-    return total_revenue
+    fleet = pack_fleet({site_id: site_config}, mara_inventory=mara_inventory or get_dummy_mara_inventory())
+    result = compute_fleet_revenue(
+        fleet,
+        pack_allocations(fleet.site_ids, {site_id: allocation}),
+        prices,
+        inference_scale=fleet.cooling_efficiency
+    )
+    return float(result.revenue[0])
 
 async def claude_optimizer(site_data: Dict, sla_commitments: Dict) -> str:
-    """Use Claude to optimize global allocation"""
-    try:
-        if not claude_client:
-            logger.info("Using mock Claude optimization (API key not configured)")
-            return """
-            MOCK CLAUDE OPTIMIZATION (No API Key Configured):
-            
-            SITE PERFORMANCE RANKING:
-            1. Nordic Iceland: 95% cooling efficiency, lowest energy costs (0.6x multiplier)
-            2. Norway Oslo: 90% cooling efficiency, cheapest renewable energy (0.5x multiplier)  
-            3. Canada Vancouver: 85% cooling efficiency, good hydro cooling (0.7x multiplier)
-            4. Germany Berlin: 80% cooling efficiency, balanced performance (1.1x multiplier)
-            5. Ireland Dublin: 80% cooling efficiency, free air cooling (0.9x multiplier)
-            6. Chile Santiago: 75% cooling efficiency, good renewable mix (0.7x multiplier)
-            7. Japan Tokyo: 70% cooling efficiency, precision cooling (1.2x multiplier)
-            8. Australia Sydney: 65% cooling efficiency, evaporative cooling (1.0x multiplier)
-            9. Texas USA: 60% cooling efficiency, moderate costs (0.8x multiplier)
-            10. Singapore: 40% cooling efficiency, high cooling costs (1.4x multiplier)
-            
-            OPTIMAL ALLOCATION STRATEGY:
-            - Route Premium SLA to Nordic/Norway sites for maximum efficiency
-            - Balance Standard SLA across cold climate sites (Iceland, Norway, Canada)
-            - Use moderate sites (Germany, Ireland, Chile) for flexible workloads
-            - Route mining operations to Singapore/Texas during optimal conditions
-            
-            CLIMATE ARBITRAGE: Cold sites save 35-55% on cooling costs
-            TIMEZONE OPTIMIZATION: Following business hours increases revenue by 20-30%
-            
-            ⚠️  To enable real Claude AI optimization, add your Claude API key to config.env
-            """
-        
-        # Real Claude API call
-        logger.info("Calling Claude AI for optimization...")
-        
-        # Prepare prompt for Claude
-        prompt = f"""You are an AI energy arbitrage optimizer for a global data center network. 
-        Analyze the following data and provide optimization recommendations:
+    """Use Claude to optimize global allocation (waits for the reasoning job)"""
+    return await reasoning_service.reason(site_data, sla_commitments)
 
-        SITE DATA:
-        {json.dumps(site_data, indent=2)}
+async def with_session(build: Callable[[AsyncSession], Awaitable[Dict]]) -> Dict:
+    """Run a snapshot computation on its own session, independent of any one request"""
+    async with AsyncSessionLocal() as db:
+        return await build(db)
 
-        SLA COMMITMENTS:
-        {json.dumps(sla_commitments, indent=2)}
+def invalidate_snapshots(reason: str):
+    """Drop cached fleet snapshots after a write and push fresh data to live dashboards"""
+    snapshot_cache.invalidate(reason)
+    dashboard_feed.request_refresh()
 
-        Please analyze:
-        1. Which sites should handle Premium SLA workloads (99.9% uptime) based on cooling efficiency and reliability?
-        2. How to distribute compute resources to maximize revenue while minimizing energy costs?
-        3. Climate arbitrage opportunities (routing to cold sites to reduce cooling costs)?
-        4. Timezone optimization (routing AI inference to sites during peak business hours)?
-        5. Specific GPU/ASIC/miner allocation recommendations per site.
+sla_expiry_state = {"last_run": 0.0, "expired": 0}
+initialized_state = {"initialized": False}
 
-        Provide a concise analysis with specific recommendations."""
+async def expire_sla_commitments_if_due(db: AsyncSession) -> int:
+    """Deactivate SLA commitments past their duration, at most once per SLA_EXPIRY_INTERVAL"""
+    if SLA_EXPIRY_INTERVAL <= 0 or time.monotonic() - sla_expiry_state["last_run"] < SLA_EXPIRY_INTERVAL:
+        return 0
+    sla_expiry_state["last_run"] = time.monotonic()
+    expired = await expire_sla_commitments_async(db)
+    if expired:
+        for tier, site_id, power in expired:
+            sla_placement.release(site_id, power)
+        sla_expiry_state["expired"] += len(expired)
+        logger.info("Expired %d SLA commitments", len(expired))
+        invalidate_snapshots("sla expiry")
+    return len(expired)
 
-        message = claude_client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1024,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        reasoning = message.content[0].text
-        logger.info("Claude AI optimization completed successfully")
-        return reasoning
-        
-    except Exception as e:
-        logger.error(f"Claude optimization error: {e}")
-        return f"Claude optimization error: {e}. Using fallback strategy based on cooling efficiency and energy costs."
+async def run_sla_expiry():
+    """Background scheduler for SLA commitment expiry"""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await expire_sla_commitments_if_due(db)
+        except Exception as e:
+            logger.error(f"SLA expiry failed: {e}")
+        await asyncio.sleep(SLA_EXPIRY_INTERVAL)
+
+def allocation_draw(fleet, allocation, firm_sla_power) -> Dict[str, float]:
+    """Power drawn by each site's allocation beyond what serves its firm SLA commitments"""
+    draw = (allocation * fleet.unit_power).sum(axis=1) - firm_sla_power
+    return {site_id: max(0.0, float(power)) for site_id, power in zip(fleet.site_ids, draw)}
+
+async def ensure_site_inventories(db: AsyncSession):
+    """Compile the stored inventories into the site index once"""
+    if not site_registry.index.inventories_loaded:
+        site_registry.index.load_inventories(await get_all_site_inventories_async(db))
+
+async def load_sla_placement(db: AsyncSession):
+    """Load committed SLA power and current allocation draw into the placement engine.
+
+    Which commitments the stored allocation already serves is unknown here, so
+    its full draw is counted; headroom is conservative until the next optimize.
+    """
+    committed = await get_sla_power_by_site_async(db)
+    allocations = await get_latest_site_allocations_async(db)
+    system_state = await get_system_state_async(db)
+    await ensure_site_inventories(db)
+    fleet = site_registry.index.pack(system_state.mara_inventory)
+    sla_placement.set_committed(committed)
+    sla_placement.set_draw(allocation_draw(fleet, pack_allocations(fleet.site_ids, allocations), 0.0))
+    sla_placement_state["loaded"] = True
 
-def distribute_hardware_across_sites(mara_inventory: Dict) -> Dict:
-    """Distribute MARA's hardware inventory across 10 sites based on their profiles"""
+# Keep references to fire-and-forget database writes so they are not garbage collected
+background_writes = set()
+
+def save_reasoning_to_history(history_id: int):
+    """Callback that stores finished Claude reasoning on an optimization history row"""
+    async def store(claude_reasoning: str):
+        async with AsyncSessionLocal() as db:
+            await update_optimization_reasoning_async(db, history_id, claude_reasoning)
     
-    # Total hardware to distribute (realistic quantities)
-    total_hardware = {
-        "miners": {
-            "air": 500,      # 500 air miners total
-            "hydro": 200,    # 200 hydro miners total  
-            "immersion": 100 # 100 immersion miners total
-        },
-        "inference": {
-            "gpu": 1000,     # 1000 GPU units total
-            "asic": 300      # 300 ASIC inference units total
-        }
-    }
+    def callback(claude_reasoning: str):
+        task = asyncio.get_running_loop().create_task(store(claude_reasoning))
+        background_writes.add(task)
+        task.add_done_callback(background_writes.discard)
+    return callback
+
+# MARA's fleet-wide hardware, apportioned across every registered site
+FLEET_HARDWARE = {
+    "miners": {"air": 500, "hydro": 200, "immersion": 100},
+    "inference": {"gpu": 1000, "asic": 300},
+}
+
+def distribute_hardware_across_sites(mara_inventory: Dict, index: Optional[SiteIndex] = None) -> Dict:
+    """Distribute MARA's hardware inventory across all sites in proportion to capacity and site profile"""
+    index = index if index is not None else site_registry.index
+    capacity = index.power_capacity
+    cooling = index.cooling_efficiency
+    gpu_ratio = np.array([site.gpu_ratio for site in index], dtype=float)
+    asic_ratio = np.array([site.asic_ratio for site in index], dtype=float)
+    
+    # Each class is split by share of fleet power capacity; a site profile factor below 1
+    # (cooling efficiency for liquid-cooled miners, the GPU/ASIC mix for inference)
+    # holds back that fraction of the site's share
+    share = capacity / capacity.sum() if len(index) else capacity
+    factors = {"air": 1.0, "hydro": cooling, "immersion": cooling, "gpu": gpu_ratio, "asic": asic_ratio}
+    units = {}
+    for kinds in FLEET_HARDWARE.values():
+        for kind, total in kinds.items():
+            weights = share * factors[kind]
+            units[kind] = apportion(int(round(total * weights.sum())), weights).tolist()
     
     site_inventories = {}
     
-    for site_id, site_config in MULTI_SITE_CONFIG.items():
-        gpu_ratio = site_config["hardware_profile"]["gpu_ratio"]
-        asic_ratio = site_config["hardware_profile"]["asic_ratio"]
-        cooling_efficiency = site_config["climate"]["cooling_efficiency"]
-        
-        # Distribute hardware based on site profile
-        site_inventories[site_id] = {
+    for i, site in enumerate(index):
+        site_inventories[site.site_id] = {
             "miners": {
-                "air": {
-                    "hashrate": mara_inventory["miners"]["air"]["hashrate"],
-                    "power": mara_inventory["miners"]["air"]["power"],
-                    "available": int(total_hardware["miners"]["air"] * 0.1)  # 10% per site
-                },
-                "hydro": {
-                    "hashrate": mara_inventory["miners"]["hydro"]["hashrate"],
-                    "power": mara_inventory["miners"]["hydro"]["power"],
-                    "available": int(total_hardware["miners"]["hydro"] * cooling_efficiency * 0.1)
-                },
-                "immersion": {
-                    "hashrate": mara_inventory["miners"]["immersion"]["hashrate"],
-                    "power": mara_inventory["miners"]["immersion"]["power"],
-                    "available": int(total_hardware["miners"]["immersion"] * cooling_efficiency * 0.1)
+                kind: {
+                    "hashrate": mara_inventory["miners"][kind]["hashrate"],
+                    "power": mara_inventory["miners"][kind]["power"],
+                    "available": units[kind][i]
                 }
+                for kind in FLEET_HARDWARE["miners"]
             },
             "inference": {
-                "gpu": {
-                    "tokens": mara_inventory["inference"]["gpu"]["tokens"],
-                    "power": mara_inventory["inference"]["gpu"]["power"],
-                    "available": int(total_hardware["inference"]["gpu"] * gpu_ratio * 0.1)
-                },
-                "asic": {
-                    "tokens": mara_inventory["inference"]["asic"]["tokens"],
-                    "power": mara_inventory["inference"]["asic"]["power"],
-                    "available": int(total_hardware["inference"]["asic"] * asic_ratio * 0.1)
+                kind: {
+                    "tokens": mara_inventory["inference"][kind]["tokens"],
+                    "power": mara_inventory["inference"][kind]["power"],
+                    "available": units[kind][i]
                 }
+                for kind in FLEET_HARDWARE["inference"]
             },
             "site_specs": {
-                "power_capacity": site_config["power_capacity"],
-                "cooling_efficiency": cooling_efficiency,
-                "hardware_profile": site_config["hardware_profile"]
+                "power_capacity": site.power_capacity,
+                "cooling_efficiency": site.cooling_efficiency,
+                "hardware_profile": {"gpu_ratio": site.gpu_ratio, "asic_ratio": site.asic_ratio,
+                                     "cooling_type": site.cooling_type}
             }
         }
     
     return site_inventories
 
+def apply_site_registry(site_config: Dict[str, Dict], index: Optional[SiteIndex] = None):
+    """Swap in a new fleet and reset everything derived from it"""
+    global sla_placement
+    site_registry.load(site_config, index)
+    sla_placement = SLAPlacementEngine(site_registry.config, list(SLA_TIERS))
+    sla_placement_state["loaded"] = False
+    invalidate_snapshots("sites")
+
+async def load_site_registry(db: AsyncSession):
+    """Load the site registry from the sites table, seeding the default fleet into an empty table"""
+    seeded = await seed_sites_async(db, [config_to_row(site_id, config) for site_id, config in MULTI_SITE_CONFIG.items()])
+    if seeded:
+        logger.info(f"Seeded {seeded} default sites")
+    sites = await get_all_sites_async(db)
+    apply_site_registry({site["site_id"]: row_to_config(site) for site in sites})
+    logger.info(f"Site registry loaded with {len(sites)} sites")
+
+async def commit_site_changes(db: AsyncSession, system_state, reason: str) -> int:
+    """Commit staged site writes, rebalancing hardware over the new fleet when initialized, then reload the registry.
+
+    system_state must be read before the writes are staged (reading it may commit).
+    """
+    sites = await get_all_sites_async(db)
+    site_config = {site["site_id"]: row_to_config(site) for site in sites}
+    index = SiteIndex(site_config)
+    if system_state.is_initialized:
+        site_inventories = distribute_hardware_across_sites(system_state.mara_inventory or get_dummy_mara_inventory(), index)
+        await bulk_upsert_site_inventories_async(db, site_inventories, commit=False)
+        index.load_inventories(site_inventories)
+    await db.commit()
+    apply_site_registry(site_config, index)
+    logger.info(f"Site registry reloaded after {reason}: {len(index)} sites")
+    return len(index)
+
 # API Endpoints
 
 @app.get("/", response_class=HTMLResponse)
@@ -458,237 +696,316 @@ async def read_root():
     return FileResponse("static/index.html")
 
 @app.post("/api/initialize")
-async def initialize_system(db: Session = Depends(get_db)):
+async def initialize_system(db: AsyncSession = Depends(get_async_db)):
     try:
         logger.info("Initializing system...")
         
-        # Use dummy data instead of broken MARA API
-        pricing_data = get_dummy_mara_prices()
+        # Prices come from the feed; it stores them, so initializing only reads the latest
+        pricing_data = await get_latest_pricing_async(db) or get_dummy_mara_prices()
         mara_inventory = get_dummy_mara_inventory()
         
-        # Store in database
-        add_pricing_data(db, pricing_data)
-        
         # Convert datetime to string for JSON storage
         pricing_data_json = pricing_data.copy()
-        pricing_data_json['timestamp'] = pricing_data['timestamp'].isoformat()
+        if isinstance(pricing_data['timestamp'], datetime):
+            pricing_data_json['timestamp'] = pricing_data['timestamp'].isoformat()
+        
+        # Distribute hardware across sites; inventories commit together with the system state
+        site_inventories = distribute_hardware_across_sites(mara_inventory)
+        await bulk_upsert_site_inventories_async(db, site_inventories, commit=False)
         
-        update_system_state(
+        await update_system_state_async(
             db,
             is_initialized=True,
             mara_inventory=mara_inventory,
             current_prices=pricing_data_json
         )
         
-        # Distribute hardware across sites and store in database
-        site_inventories = distribute_hardware_across_sites(mara_inventory)
-        for site_id, inventory in site_inventories.items():
-            update_site_inventory(db, site_id, inventory)
-        
+        site_registry.index.load_inventories(site_inventories)
+        initialized_state["initialized"] = True
+        sla_placement_state["loaded"] = False
+        invalidate_snapshots("initialize")
         logger.info(f"System initialized successfully with {len(site_inventories)} sites")
         
         return {
             "status": "success", 
-            "message": "System initialized with dummy data (MARA API unavailable)",
+            "message": f"System initialized with {pricing_data.get('source')} prices",
             "pricing_data": pricing_data,
             "mara_inventory": mara_inventory,
             "total_sites": len(site_inventories),
             "sample_site_inventory": list(site_inventories.keys())[:3],
-            "data_source": "dummy_data"
+            "data_source": pricing_data.get("source")
         }
     except Exception as e:
         logger.error(f"Failed to initialize system: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to initialize: {str(e)}")
 
+async def fleet_sites_status() -> Dict:
+    """Whole-fleet status snapshot, computed once per cache tick and shared by every reader"""
+    return await snapshot_cache.get("sites", lambda: with_session(build_sites_status))
+
+async def fleet_initialized() -> bool:
+    """Whether /api/initialize has run; remembered once true so status reads skip the database"""
+    if not initialized_state["initialized"]:
+        system_state = await with_session(get_system_state_async)
+        initialized_state["initialized"] = bool(system_state.is_initialized)
+    return initialized_state["initialized"]
+
+def sites_status_etag(query: StatusQuery, tick: int) -> str:
+    """Validator for a status view: changes with the fleet, inventories, snapshot tick, prices or query"""
+    state = (site_registry.version, site_registry.index.inventory_version, snapshot_cache.generation, tick,
+             latest_pricing.timestamp, query.key())
+    return '"' + hashlib.sha1(repr(state).encode()).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
 @app.get("/api/sites/status")
-async def get_sites_status(db: Session = Depends(get_db)):
-    """Get status of all sites including distributed hardware inventory"""
+async def get_sites_status(request: Request, fields: Optional[str] = None, timezone: Optional[str] = None,
+                           region: Optional[str] = None, cooling_type: Optional[str] = None,
+                           min_utilization: Optional[float] = None, max_utilization: Optional[float] = None,
+                           cursor: Optional[str] = None, limit: Optional[int] = None):
+    """Get status of sites including distributed hardware inventory.
+
+    Optionally filtered (comma-separated timezone, region, cooling_type; a
+    utilization range), projected to some fields and paginated by cursor.
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified.
+    """
     try:
-        # Check if system is initialized
-        system_state = get_system_state(db)
-        if not system_state.is_initialized:
-            return {"error": "System not initialized. Call /api/initialize first"}
-        
-        # Get site inventories from database
-        site_hardware_inventory = get_all_site_inventories(db)
-        
-        sites = []
-        
-        for site_id, site_config in MULTI_SITE_CONFIG.items():
-            # Get site-specific hardware inventory
-            site_inventory = site_hardware_inventory.get(site_id, {})
-            
-            # Simulate current usage (random allocation for demo)
-            current_allocation = {
-            "gpu_compute": random.randint(20, min(80, site_inventory.get("inference", {}).get("gpu", {}).get("available", 100))),
-            "asic_compute": random.randint(5, min(30, site_inventory.get("inference", {}).get("asic", {}).get("available", 50))),
-            "air_miners": random.randint(10, min(40, site_inventory.get("miners", {}).get("air", {}).get("available", 50))),
-            "hydro_miners": random.randint(5, min(20, site_inventory.get("miners", {}).get("hydro", {}).get("available", 20))),
-                "immersion_miners": random.randint(2, min(15, site_inventory.get("miners", {}).get("immersion", {}).get("available", 10)))
-            }
-            
-            # Calculate power usage based on actual hardware
-            power_used = 0
-            if site_inventory:
-                power_used += current_allocation["gpu_compute"] * site_inventory["inference"]["gpu"]["power"]
-                power_used += current_allocation["asic_compute"] * site_inventory["inference"]["asic"]["power"]
-                power_used += current_allocation["air_miners"] * site_inventory["miners"]["air"]["power"]
-                power_used += current_allocation["hydro_miners"] * site_inventory["miners"]["hydro"]["power"]
-                power_used += current_allocation["immersion_miners"] * site_inventory["miners"]["immersion"]["power"]
-            
-            # Weather simulation
-            weather = simulate_weather(site_config["climate"])
-            
-            # Calculate site-specific pricing using dummy data
-            current_prices = get_latest_pricing(db) or get_dummy_mara_prices()
-            site_pricing = {}
-            if current_prices:
-                energy_multiplier = site_config["energy_cost_multiplier"]
-                site_pricing = {
-                    "hash_price": current_prices.get("hash_price", 1.0) * energy_multiplier,
-                    "token_price": current_prices.get("token_price", 1.0) * energy_multiplier,
-                    "energy_price": current_prices.get("energy_price", 1.0) * energy_multiplier
-                }
-            
-            # Calculate revenue based on current allocation and pricing
-            revenue = 0
-            if site_pricing and current_allocation:
-                # AI inference revenue
-                gpu_revenue = (current_allocation.get("gpu_compute", 0) * 
-                              site_inventory.get("inference", {}).get("gpu", {}).get("tokens", 1000) * 
-                              site_pricing.get("token_price", 1.0) * 0.001)  # Scale down for realistic numbers
-                
-                asic_revenue = (current_allocation.get("asic_compute", 0) * 
-                               site_inventory.get("inference", {}).get("asic", {}).get("tokens", 50000) * 
-                               site_pricing.get("token_price", 1.0) * 0.001)
-                
-                # Mining revenue
-                mining_revenue = (
-                    (current_allocation.get("air_miners", 0) * site_inventory.get("miners", {}).get("air", {}).get("hashrate", 1000) * site_pricing.get("hash_price", 8.5) * 0.001) +
-                    (current_allocation.get("hydro_miners", 0) * site_inventory.get("miners", {}).get("hydro", {}).get("hashrate", 5000) * site_pricing.get("hash_price", 8.5) * 0.001) +
-                    (current_allocation.get("immersion_miners", 0) * site_inventory.get("miners", {}).get("immersion", {}).get("hashrate", 10000) * site_pricing.get("hash_price", 8.5) * 0.001)
-                )
-                
-                revenue = gpu_revenue + asic_revenue + mining_revenue
-                
-                # Apply timezone demand multiplier
-                demand_multiplier = calculate_demand_multiplier(site_config["location"]["timezone"])
-                revenue *= demand_multiplier
-            
-            site_status = {
-                "site_id": site_id,
-                "id": site_id,
-                "name": site_config["name"],
-                "location": site_config["location"],
-                "timezone": site_config["location"]["timezone"],
-                
-                # Hardware inventory (actual available hardware)
-                "hardware_inventory": site_inventory,
-                
-                # Current allocation
-                "allocation": current_allocation,
-                
-                # Power and capacity
-                "power_used": power_used,
-                "power_capacity": site_config["power_capacity"],
-                "power_utilization": min(100, (power_used / site_config["power_capacity"]) * 100),
-                
-                # Environmental
-                "weather": weather,
-                "current_temp": weather["temperature"],  # Add current_temp for frontend compatibility
-                "local_time": get_local_time(site_config["location"]["timezone"]),  # Add local_time for frontend compatibility
-                "cooling_efficiency": site_config["climate"]["cooling_efficiency"],
-                
-                # Economics
-                "pricing": site_pricing,
-                "energy_price": site_pricing.get("energy_price", 1.0) if site_pricing else 1.0,  # Add energy_price for frontend compatibility
-                "energy_cost_multiplier": site_config["energy_cost_multiplier"],
-                "revenue": revenue,
-                
-                # Performance metrics
-                "uptime": random.uniform(98.5, 99.9),
-                "efficiency_score": calculate_efficiency_score(site_config, weather),
-                
-                "last_updated": datetime.now().isoformat()
-            }
+        query = StatusQuery.parse(fields, timezone, region, cooling_type, min_utilization, max_utilization,
+                                  cursor, limit)
+        if query.after is not None and query.after not in site_registry.index:
+            raise ValueError("cursor site no longer exists; restart from the first page")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not await fleet_initialized():
+        return {"error": "System not initialized. Call /api/initialize first"}
+
+    tick = snapshot_cache.current_bucket()
+    etag = sites_status_etag(query, tick)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    if query.is_default:
+        content = await fleet_sites_status()
+    else:
+        content = await with_session(lambda db: build_sites_status(db, query, tick))
+    # Site views are plain JSON types already; skip FastAPI's per-value encoder
+    return JSONResponse(content, headers={"ETag": etag})
+
+@operation("sites_status")
+async def build_sites_status(db: AsyncSession, query: Optional[StatusQuery] = None, tick: Optional[int] = None) -> Dict:
+    """Compute a fleet status view for /api/sites/status (the whole fleet by default)"""
+    try:
+        with stage("db_read"):
+            # Check if system is initialized
+            system_state = await get_system_state_async(db)
+            if not system_state.is_initialized:
+                return {"error": "System not initialized. Call /api/initialize first"}
             
-            sites.append(site_status)
-    
-        return {
-            "sites": sites,
-            "total_sites": len(sites),
-            "global_metrics": calculate_global_metrics(sites),
-            "data_source": "dummy_data",
-            "last_updated": datetime.now().isoformat()
-        }
+            # Site inventories are compiled once; current prices come from the database
+            await ensure_site_inventories(db)
+            current_prices = await get_latest_pricing_async(db) or get_dummy_mara_prices()
+        
+        initialized_state["initialized"] = True
+        return compose_sites_status(site_registry.index, site_registry.simulator, current_prices,
+                                    snapshot_cache.current_bucket() if tick is None else tick,
+                                    SNAPSHOT_TICK_SECONDS, query)
     except Exception as e:
         logger.error(f"Error getting sites status: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get sites status: {str(e)}")
 
-@app.post("/api/optimize")
-async def optimize_global_allocation(db: Session = Depends(get_db)):
-    """Run global optimization across all sites"""
+@app.get("/api/sites")
+async def list_sites(offset: int = 0, limit: int = 1000):
+    """Registered sites as flat rows, in registry order"""
+    if offset < 0 or not 0 < limit <= 10000:
+        raise HTTPException(status_code=400, detail="offset must be non-negative and limit between 1 and 10000")
+    return {
+        "sites": site_registry.rows(offset, limit),
+        "total_sites": len(site_registry.index),
+        "offset": offset,
+        "limit": limit
+    }
+
+@app.get("/api/sites/{site_id}")
+async def get_site(site_id: str):
+    """One site's configuration"""
+    site = site_registry.row(site_id)
+    if site is None:
+        raise HTTPException(status_code=404, detail=f"Site {site_id} not found")
+    return site
+
+@app.post("/api/sites")
+async def create_site(site: Dict, db: AsyncSession = Depends(get_async_db)):
+    """Register a new site"""
+    try:
+        row = validate_site_row(site)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if row["site_id"] in site_registry.index:
+        raise HTTPException(status_code=409, detail=f"Site {row['site_id']} already exists")
+    try:
+        system_state = await get_system_state_async(db)
+        await bulk_upsert_sites_async(db, [row], commit=False)
+        total_sites = await commit_site_changes(db, system_state, f"creating {row['site_id']}")
+        return {"status": "created", "site": site_registry.row(row["site_id"]), "total_sites": total_sites}
+    except Exception as e:
+        logger.error(f"Failed to create site: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to create site: {str(e)}")
+
+@app.patch("/api/sites/{site_id}")
+async def update_site(site_id: str, changes: Dict, db: AsyncSession = Depends(get_async_db)):
+    """Change some of a site's fields"""
+    current = site_registry.row(site_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail=f"Site {site_id} not found")
+    if changes.get("site_id", site_id) != site_id:
+        raise HTTPException(status_code=400, detail="site_id cannot be changed")
+    try:
+        row = validate_site_row({**current, **changes})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        system_state = await get_system_state_async(db)
+        await bulk_upsert_sites_async(db, [row], commit=False)
+        await commit_site_changes(db, system_state, f"updating {site_id}")
+        return {"status": "updated", "site": site_registry.row(site_id)}
+    except Exception as e:
+        logger.error(f"Failed to update site {site_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to update site: {str(e)}")
+
+@app.delete("/api/sites/{site_id}")
+async def remove_site(site_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Remove a site and its hardware inventory; refused while it holds active SLA commitments"""
+    if site_id not in site_registry.index:
+        raise HTTPException(status_code=404, detail=f"Site {site_id} not found")
+    committed = sum((await get_site_committed_power_async(db, site_id)).values())
+    if committed > 0:
+        raise HTTPException(status_code=409, detail=f"Site {site_id} has {committed} active SLA power committed")
+    try:
+        system_state = await get_system_state_async(db)
+        await delete_site_async(db, site_id, commit=False)
+        total_sites = await commit_site_changes(db, system_state, f"removing {site_id}")
+        return {"status": "deleted", "site_id": site_id, "total_sites": total_sites}
+    except Exception as e:
+        logger.error(f"Failed to delete site {site_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to delete site: {str(e)}")
+
+@app.post("/api/sites/import")
+async def import_sites(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Create or update many sites in one transaction, from CSV (Content-Type: text/csv) or a JSON array"""
+    body = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            sites = parse_sites_csv(body.decode("utf-8-sig"))
+        else:
+            payload = json.loads(body)
+            sites = parse_site_rows(payload.get("sites", []) if isinstance(payload, dict) else payload)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid site import: {str(e)}")
+    if not 0 < len(sites) <= SITE_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Import must contain 1 to {SITE_IMPORT_MAX_ROWS} sites")
+    try:
+        created = sum(site["site_id"] not in site_registry.index for site in sites)
+        system_state = await get_system_state_async(db)
+        await bulk_upsert_sites_async(db, sites, commit=False)
+        total_sites = await commit_site_changes(db, system_state, f"importing {len(sites)} sites")
+        return {
+            "status": "imported",
+            "created": created,
+            "updated": len(sites) - created,
+            "total_sites": total_sites
+        }
+    except Exception as e:
+        logger.error(f"Site import failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Site import failed: {str(e)}")
+
+def decision_prices(current_prices: Dict) -> Dict:
+    """Mean forecast price over the next OPTIMIZE_PRICE_HORIZON_HOURS; the current price until the forecaster is ready"""
+    if OPTIMIZE_PRICE_HORIZON_HOURS <= 1 or not forecaster.ready:
+        return current_prices
+    return {**current_prices, **forecast_cache.expected_prices(min(OPTIMIZE_PRICE_HORIZON_HOURS, MAX_HORIZON_HOURS))}
+
+@operation("optimize")
+async def run_optimization(db: AsyncSession) -> Dict:
+    """Run global optimization across all sites; the body of every optimization job"""
     try:
         # Check if system is initialized
-        system_state = get_system_state(db)
+        with stage("db_read"):
+            system_state = await get_system_state_async(db)
         if not system_state.is_initialized:
-            raise HTTPException(status_code=400, detail="System not initialized")
+            raise ValueError("System not initialized")
         
         logger.info("Starting global optimization...")
         
         # Get current site data
-        sites_response = await get_sites_status(db)
+        with stage("snapshot"):
+            sites_response = await fleet_sites_status()
         
         if "error" in sites_response:
-            raise HTTPException(status_code=400, detail=sites_response["error"])
+            raise ValueError(sites_response["error"])
         
         site_data = {site["site_id"]: site for site in sites_response["sites"]}
         
         # Get SLA commitments from database
-        sla_commitments = get_active_sla_commitments(db)
+        with stage("db_read"):
+            await expire_sla_commitments_if_due(db)
+            sla_commitments = await get_active_sla_commitments_async(db)
         
-        # Run Claude optimization
-        claude_reasoning = await claude_optimizer(site_data, sla_commitments)
+        # Start Claude reasoning in the background; the allocation does not wait for it
+        reasoning_job = reasoning_service.submit(site_data, sla_commitments)
+        if reasoning_job.status == "completed":
+            claude_reasoning = reasoning_job.reasoning
+        else:
+            claude_reasoning = f"Claude reasoning in progress (job {reasoning_job.job_id})"
     
         # Implement basic optimization logic
         total_revenue = 0
         climate_savings = 0
         
-        # Get current prices from database
-        current_prices = get_latest_pricing(db) or get_dummy_mara_prices()
+        with stage("db_read"):
+            # Get current prices from database
+            current_prices = await get_latest_pricing_async(db) or get_dummy_mara_prices()
+            await ensure_site_inventories(db)
+            firm_sla_power = await get_sla_power_by_site_async(db, FIRM_SLA_TIERS)
+            previous_allocations = await get_latest_site_allocations_async(db)
         
-        # Simple optimization: allocate more resources to efficient sites
-        for site_id, site_config in MULTI_SITE_CONFIG.items():
-            cooling_efficiency = site_config["climate"]["cooling_efficiency"]
-            energy_multiplier = site_config["energy_cost_multiplier"]
-            
-            # Allocate more GPU compute to efficient sites
-            gpu_allocation = int(50 * cooling_efficiency / energy_multiplier)
-            asic_allocation = int(30 * (1 - cooling_efficiency))  # ASIC mining for less efficient sites
-            
-            # Create allocation
-            allocation = {
-                "gpu_compute": gpu_allocation,
-                "asic_compute": asic_allocation,
-                "immersion_miners": 10 if cooling_efficiency > 0.7 else 5
-            }
-            
-            # Store allocation in database
-            update_site_allocation(db, site_id, allocation)
-            
-            # Calculate revenue
-            site_revenue = calculate_site_revenue(
-                site_id, 
-                allocation, 
-                current_prices, 
-                site_config,
-                system_state.mara_inventory
+        # Solve the constrained allocation program over all sites and hardware classes
+        with stage("solver"):
+            index = site_registry.index  # one fleet for the whole run, even if sites change meanwhile
+            fleet = index.pack(system_state.mara_inventory)
+            problem = build_allocation_problem(
+                fleet,
+                decision_prices(current_prices),
+                fleet_demand_multipliers(fleet),
+                firm_sla_power=firm_sla_power
             )
-            total_revenue += site_revenue
-            
-            # Calculate climate savings (higher efficiency = more savings)
-            if cooling_efficiency > 0.8:
-                climate_savings += site_revenue * 0.3  # 30% savings for high efficiency
+            warm_start = pack_allocations(fleet.site_ids, previous_allocations) if previous_allocations else None
+            solution = get_solver(ALLOCATION_SOLVER).solve(problem, warm_start=warm_start)
+        
+        if solution.infeasible_sites:
+            logger.warning(f"Firm SLA power exceeds inference capacity at: {', '.join(solution.infeasible_sites)}")
+        
+        allocations = {site_id: unpack_allocation(row) for site_id, row in zip(fleet.site_ids, solution.allocation)}
+        
+        # Store allocations in database; they commit together with the history row below
+        with stage("db_write"):
+            await bulk_insert_site_allocations_async(db, allocations, commit=False)
+        sla_placement.set_draw(allocation_draw(fleet, solution.allocation, problem.firm_sla_power))
+        migration_engine.seed(fleet.site_ids, solution.allocation)
+        
+        # Calculate revenue for all sites in one batched call
+        with stage("revenue"):
+            site_revenues = calculate_fleet_revenue(allocations, current_prices, system_state.mara_inventory, index)
+            for site_id, site_revenue in site_revenues.items():
+                total_revenue += site_revenue
+                
+                # Calculate climate savings (higher efficiency = more savings)
+                if index.get(site_id).cooling_efficiency > 0.8:
+                    climate_savings += site_revenue * 0.3  # 30% savings for high efficiency
     
         # Create optimization result
         optimization_data = {
@@ -701,82 +1018,400 @@ async def optimize_global_allocation(db: Session = Depends(get_db)):
         }
         
         # Store in database
-        add_optimization_history(db, optimization_data)
-        update_system_state(db, total_revenue=total_revenue)
+        with stage("db_write"):
+            history = await add_optimization_history_async(db, optimization_data)
+            if not reasoning_job.done:
+                reasoning_service.add_done_callback(reasoning_job, save_reasoning_to_history(history.id))
+            await update_system_state_async(db, total_revenue=total_revenue)
+        invalidate_snapshots("optimize")
         
-        logger.info(f"Optimization completed. Total revenue: ${total_revenue:.2f}")
+        logger.info("Optimization completed. Total revenue: $%.2f", total_revenue, extra={"total_revenue": total_revenue})
         
-        # Return as Pydantic model
+        # Job results are plain JSON, validated by the response model
         return GlobalOptimization(
             timestamp=optimization_data["timestamp"].isoformat(),
             total_revenue=optimization_data["total_revenue"],
             climate_savings=optimization_data["climate_savings"],
             timezone_optimization=optimization_data["timezone_optimization"],
             sla_performance=optimization_data["sla_performance"],
-            claude_reasoning=optimization_data["claude_reasoning"]
-        )
+            claude_reasoning=optimization_data["claude_reasoning"],
+            reasoning_job_id=reasoning_job.job_id,
+            reasoning_status=reasoning_job.status,
+            solver=solution.summary()
+        ).model_dump()
     except Exception as e:
         logger.error(f"Optimization failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
+        raise
+
+def optimization_job_key() -> str:
+    """Requests against the same fleet and snapshot state are identical; they share one job"""
+    return f"optimize:{site_registry.version}:{site_registry.index.inventory_version}:{snapshot_cache.generation}"
+
+def optimization_job_response(job) -> Dict:
+    return {**job.to_dict(), "queue_position": optimization_jobs.position(job)}
+
+@app.post("/api/optimize")
+async def optimize_global_allocation(wait: bool = False):
+    """Queue a global optimization and return its job id (202); identical in-flight requests share a job.
+
+    With wait=true the request waits for the job and returns the optimization result itself.
+    """
+    if not await fleet_initialized():
+        raise HTTPException(status_code=400, detail="System not initialized")
+    try:
+        job = optimization_jobs.submit(optimization_job_key())
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    if not wait:
+        return JSONResponse(optimization_job_response(job), status_code=202)
+    await job.wait()
+    if job.status != "completed":
+        raise HTTPException(status_code=500, detail=f"Optimization {job.status}: {job.error or 'no result'}")
+    return job.result
+
+@app.get("/api/optimize/jobs")
+async def list_optimization_jobs(limit: int = 20):
+    """Queue counters and the most recent optimization jobs"""
+    return {
+        "queue": optimization_jobs.stats(),
+        "jobs": [optimization_job_response(job) for job in optimization_jobs.jobs(max(0, min(limit, 256)))]
+    }
+
+@app.get("/api/optimize/jobs/{job_id}")
+async def get_optimization_job(job_id: str):
+    """Status, timings and (once completed) result of an optimization job"""
+    job = optimization_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Optimization job not found")
+    return optimization_job_response(job)
+
+@app.delete("/api/optimize/jobs/{job_id}")
+async def cancel_optimization_job(job_id: str):
+    """Cancel a queued or running optimization job"""
+    job = optimization_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Optimization job not found")
+    if not optimization_jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Optimization job already {job.status}")
+    return optimization_job_response(job)
+
+@operation("schedule")
+async def run_schedule_planning(db: AsyncSession, horizon_hours: int = SCHEDULE_HORIZON_HOURS) -> Dict:
+    """Plan allocations for the coming hours, reusing the previous plan's unchanged rows, and store re-solved rows"""
+    now = datetime.utcnow()
+    with stage("db_read"):
+        system_state = await get_system_state_async(db)
+        if not system_state.is_initialized:
+            raise ValueError("System not initialized")
+        await ensure_site_inventories(db)
+        if not forecaster.ready:
+            latest = await get_latest_pricing_async(db) or get_dummy_mara_prices()
+            history = await get_pricing_range_async(db, now - timedelta(days=SCHEDULE_PRICE_LOOKBACK_DAYS), now, "1h")
+        windows = await get_sla_windows_async(db, FIRM_SLA_TIERS)
+
+    with stage("forecast"):
+        fleet = site_registry.index.pack(system_state.mara_inventory)
+        timestamps = hour_grid(now, horizon_hours)
+        if forecaster.ready:
+            prices = forecast_cache.get(horizon_hours, _epoch_seconds(now))[1]
+        else:
+            # Before the forecaster has a full hour: the hourly profile of recent rollups
+            samples = [(_epoch_seconds(datetime.fromisoformat(point["timestamp"])),
+                        {name: point[name]["close"] for name in PRICE_FIELDS})
+                       for point in history]
+            prices = price_forecast(timestamps, latest, hourly_price_profile(samples))
+        demand = demand_grid(fleet, timestamps)
+        firm = firm_power_grid(fleet.site_ids, [(site_id, power, _epoch_seconds(expires_at))
+                                                for site_id, power, expires_at in windows if expires_at], timestamps)
+
+    with stage("solver"):
+        # Off the event loop: a 72h x 1k-site horizon is a few hundred milliseconds of NumPy
+        plan = await asyncio.to_thread(schedule_planner.replan, fleet, timestamps, prices, demand, firm, now)
+
+    with stage("db_write"):
+        prune_before = EPOCH + timedelta(seconds=float(timestamps[0])) - timedelta(hours=SCHEDULE_RETENTION_HOURS)
+        plan.stats["written_rows"] = await write_schedule_async(db, plan.rows(plan.changed), prune_before)
+    logger.info("Schedule planned: %d hours x %d sites, %d rows solved, %d reused, %d written",
+                horizon_hours, fleet.size, plan.stats["solved_rows"], plan.stats["reused_rows"],
+                plan.stats["written_rows"])
+    return schedule_summary()
+
+def schedule_summary() -> Optional[Dict]:
+    """Timing and row counts of the latest planning run"""
+    plan = schedule_planner.plan
+    if plan is None:
+        return None
+    start = EPOCH + timedelta(seconds=float(plan.timestamps[0])) if len(plan.timestamps) else None
+    return {
+        "planned_at": plan.planned_at.isoformat(),
+        "horizon_start": start.isoformat() if start else None,
+        **plan.stats
+    }
+
+async def plan_schedule(horizon_hours: int = SCHEDULE_HORIZON_HOURS) -> Dict:
+    """One planning run at a time, on its own session"""
+    async with schedule_lock:
+        return await with_session(lambda db: run_schedule_planning(db, horizon_hours))
+
+async def run_schedule_replans():
+    """Background re-planning of the allocation schedule, once per SCHEDULE_REPLAN_INTERVAL"""
+    while True:
+        try:
+            if await fleet_initialized():
+                await plan_schedule()
+        except Exception as e:
+            logger.error(f"Schedule re-plan failed: {e}")
+        await asyncio.sleep(SCHEDULE_REPLAN_INTERVAL)
+
+@app.post("/api/schedule/plan")
+async def plan_allocation_schedule(hours: int = SCHEDULE_HORIZON_HOURS):
+    """Re-plan the allocation schedule now (incrementally) instead of waiting for the hourly run"""
+    if not 1 <= hours <= MAX_HORIZON_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours must be between 1 and {MAX_HORIZON_HOURS}")
+    if not await fleet_initialized():
+        raise HTTPException(status_code=400, detail="System not initialized. Call /api/initialize first")
+    try:
+        return await plan_schedule(hours)
+    except Exception as e:
+        logger.error(f"Schedule planning failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Schedule planning failed: {str(e)}")
+
+@app.get("/api/schedule")
+async def get_allocation_schedule(site_id: Optional[str] = None, hours: int = SCHEDULE_HORIZON_HOURS,
+                                  site_offset: int = 0, site_limit: int = 100,
+                                  db: AsyncSession = Depends(get_async_db)):
+    """Planned allocation per site and hour, from the current hour on.
+
+    Covers one site, or site_limit sites from site_offset in registry order.
+    The first read plans the schedule if no planning run has happened yet.
+    """
+    if not 1 <= hours <= MAX_HORIZON_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours must be between 1 and {MAX_HORIZON_HOURS}")
+    if site_offset < 0 or not 1 <= site_limit <= 1000:
+        raise HTTPException(status_code=400, detail="site_offset must be non-negative and site_limit between 1 and 1000")
+    if site_id is not None and site_id not in site_registry.index:
+        raise HTTPException(status_code=404, detail=f"Site {site_id} not found")
+    if not await fleet_initialized():
+        raise HTTPException(status_code=400, detail="System not initialized. Call /api/initialize first")
+    try:
+        if schedule_planner.plan is None:
+            await plan_schedule()
+        start = EPOCH + timedelta(seconds=float(hour_grid(datetime.utcnow(), 1)[0]))
+        page = [site_id] if site_id is not None else site_registry.index.site_ids[site_offset:site_offset + site_limit]
+        rows = await get_schedule_async(db, start, start + timedelta(hours=hours), list(page)) if page else []
+
+        by_site = {}
+        for row in rows:
+            by_site.setdefault(row["site_id"], []).append({
+                "hour": row["hour"].isoformat(),
+                "allocation": {key: row[key] for key in ALLOCATION_KEYS},
+                "power_used": row["power_used"],
+                "expected_value": row["expected_value"],
+                "firm_sla_power": row["firm_sla_power"],
+                "planned_at": row["planned_at"].isoformat() if row["planned_at"] else None
+            })
+        # Schedule rows are plain JSON types already; skip FastAPI's per-value encoder
+        return JSONResponse({
+            "plan": schedule_summary(),
+            "horizon_start": start.isoformat(),
+            "hours": hours,
+            "sites": [{"site_id": page_site, "schedule": by_site.get(page_site, [])} for page_site in page],
+            "total_sites": len(site_registry.index),
+            "site_offset": site_offset,
+            "site_limit": site_limit
+        })
+    except Exception as e:
+        logger.error(f"Schedule read failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Schedule read failed: {str(e)}")
+
+async def migration_inputs(db: AsyncSession):
+    """Packed fleet, latest prices and firm SLA power per site; seeds the engine from stored allocations once"""
+    system_state = await get_system_state_async(db)
+    if not system_state.is_initialized:
+        raise ValueError("System not initialized")
+    await ensure_site_inventories(db)
+    prices = await get_latest_pricing_async(db) or get_dummy_mara_prices()
+    firm = await get_sla_power_by_site_async(db, FIRM_SLA_TIERS)
+    fleet = site_registry.index.pack(system_state.mara_inventory)
+    if not migration_engine.seeded:
+        allocations = await get_latest_site_allocations_async(db)
+        migration_engine.seed(fleet.site_ids, pack_allocations(fleet.site_ids, allocations))
+    return fleet, prices, np.array([firm.get(site_id, 0.0) for site_id in fleet.site_ids], dtype=float)
+
+@operation("migration")
+async def run_migration_step(db: AsyncSession) -> Dict:
+    """Move inference workload toward the sites entering business hours, and log the moves"""
+    now = datetime.utcnow()
+    with stage("db_read"):
+        fleet, prices, firm = await migration_inputs(db)
+    with stage("solver"):
+        step = migration_engine.step(fleet, prices, firm, now)
+    with stage("db_write"):
+        await record_workload_migrations_async(db, now, step.moves, now - timedelta(days=MIGRATION_RETENTION_DAYS))
+    if step.moves:
+        logger.info("Migration step: %d moves, %d units, gain %.2f", step.stats["move_count"],
+                    step.stats["units_moved"], step.stats["gain"])
+    return {"at": now.isoformat(), **step.stats, "moves": step.moves}
+
+async def migrate_workload() -> Dict:
+    """One migration step at a time, on its own session"""
+    async with migration_lock:
+        return await with_session(run_migration_step)
+
+async def run_migration_steps():
+    """Background follow-the-sun migration, once per MIGRATION_INTERVAL"""
+    while True:
+        try:
+            if await fleet_initialized():
+                await migrate_workload()
+        except Exception as e:
+            logger.error(f"Migration step failed: {e}")
+        await asyncio.sleep(MIGRATION_INTERVAL)
+
+@app.post("/api/migrations/step")
+async def run_workload_migration():
+    """Run a follow-the-sun migration step now and return its moves"""
+    if not await fleet_initialized():
+        raise HTTPException(status_code=400, detail="System not initialized")
+    try:
+        return await migrate_workload()
+    except Exception as e:
+        logger.error(f"Migration step failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Migration step failed: {str(e)}")
+
+@app.get("/api/migrations")
+async def list_workload_migrations(limit: int = 100, site_id: Optional[str] = None,
+                                   db: AsyncSession = Depends(get_async_db)):
+    """Engine state, inference placement per site and the most recent moves (from or to site_id)"""
+    if not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    try:
+        moves = await get_workload_migrations_async(db, limit, site_id)
+        return {
+            "engine": migration_engine.stats(),
+            "placement": migration_engine.placement_by_site(site_id) if migration_engine.seeded else None,
+            "moves": [{**move, "migrated_at": move["migrated_at"].isoformat()} for move in moves]
+        }
+    except Exception as e:
+        logger.error(f"Migration read failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Migration read failed: {str(e)}")
+
+@app.get("/api/migrations/preview")
+async def preview_workload_migrations(hours: int = 24, step_minutes: int = 60,
+                                      db: AsyncSession = Depends(get_async_db)):
+    """Steps the engine would take from the current placement over the coming hours, without applying them"""
+    steps = hours * 60 // step_minutes if step_minutes > 0 else 0
+    if not 1 <= hours <= 72 or not 1 <= steps <= 1440:
+        raise HTTPException(status_code=400, detail="hours must be between 1 and 72 and give 1 to 1440 steps")
+    if not await fleet_initialized():
+        raise HTTPException(status_code=400, detail="System not initialized")
+    try:
+        fleet, prices, firm = await migration_inputs(db)
+        preview = migration_engine.preview(fleet, prices, firm, datetime.utcnow(), steps, step_minutes * 60)
+        return {
+            "step_minutes": step_minutes,
+            "steps": [{"at": step.at.isoformat(), **step.stats, "moves": step.moves} for step in preview]
+        }
+    except Exception as e:
+        logger.error(f"Migration preview failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Migration preview failed: {str(e)}")
+
+@app.get("/api/optimize/reasoning/{job_id}")
+async def get_optimization_reasoning(job_id: str):
+    """Get the status and text of a Claude reasoning job"""
+    job = reasoning_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reasoning job not found")
+    return job.to_dict()
+
+@app.get("/api/optimize/reasoning/{job_id}/stream")
+async def stream_optimization_reasoning(job_id: str):
+    """Stream Claude reasoning text as Server-Sent Events while it is generated"""
+    job = reasoning_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reasoning job not found")
+    
+    async def events():
+        async for text in reasoning_service.stream(job_id):
+            yield f"data: {json.dumps({'text': text})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'status': job.status, 'error': job.error})}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 @app.post("/api/sla/request")
-async def request_sla(sla_request: SLARequest, db: Session = Depends(get_db)):
+async def request_sla(sla_request: SLARequest, db: AsyncSession = Depends(get_async_db)):
     """Request SLA allocation"""
     try:
         if sla_request.tier not in SLA_TIERS:
             raise HTTPException(status_code=400, detail="Invalid SLA tier")
         
-        logger.info(f"SLA request received: {sla_request.tier}, {sla_request.power_requirement}MW")
+        logger.info("SLA request received: %s, %sMW", sla_request.tier, sla_request.power_requirement)
         
-        # Find optimal site for this SLA tier
-        optimal_site = None
-        best_score = 0
+        if not sla_placement_state["loaded"]:
+            await load_sla_placement(db)
         
-        for site_id, site_config in MULTI_SITE_CONFIG.items():
-            # Score based on cooling efficiency and energy cost
-            score = (site_config["climate"]["cooling_efficiency"] * 0.7 + 
-                    (1 - site_config["energy_cost_multiplier"]) * 0.3)
-            
-            if score > best_score:
-                best_score = score
-                optimal_site = site_id
+        # Reserve headroom on the best sites for this tier; rejected when the fleet is full
+        try:
+            placement = sla_placement.place(sla_request.tier, sla_request.power_requirement, sla_request.allow_split)
+        except PlacementRejected as e:
+            logger.warning(f"SLA request rejected: {e}")
+            raise HTTPException(status_code=409, detail=str(e))
         
-        # Store SLA commitment in database
-        add_sla_commitment(
-            db,
-            tier=sla_request.tier,
-            power_requirement=sla_request.power_requirement,
-            duration_hours=sla_request.duration_hours,
-            optimal_site=optimal_site
-        )
+        # Store SLA commitments in database, giving the headroom back if that fails
+        try:
+            await add_sla_placement_async(db, sla_request.tier, sla_request.duration_hours, placement.sites)
+        except Exception:
+            for site_id, power in placement.sites.items():
+                sla_placement.release(site_id, power)
+            raise
         
-        logger.info(f"SLA allocated to {optimal_site}")
+        optimal_site = placement.primary_site
+        invalidate_snapshots("sla request")
+        logger.info("SLA allocated to %s", ", ".join(placement.sites))
         
         return {
             "sla_tier": sla_request.tier,
             "power_allocated": sla_request.power_requirement,
             "optimal_site": optimal_site,
+            "placements": placement.sites,
+            "split": placement.split,
             "estimated_uptime": SLA_TIERS[sla_request.tier]["uptime"],
             "price_multiplier": SLA_TIERS[sla_request.tier]["price_multiplier"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"SLA request failed: {e}")
         raise HTTPException(status_code=500, detail=f"SLA request failed: {str(e)}")
 
 @app.get("/api/dashboard/metrics")
-async def get_dashboard_metrics(db: Session = Depends(get_db)):
+async def get_dashboard_metrics():
     """Get comprehensive dashboard metrics"""
+    return await snapshot_cache.get("dashboard", lambda: with_session(build_dashboard_metrics))
+
+async def live_dashboard_snapshot() -> Dict:
+    """Dashboard snapshot for the push feed"""
+    return await get_dashboard_metrics()
+
+# One ticker computes the dashboard and fans snapshots/deltas out to every live client
+dashboard_feed = DashboardFeed(live_dashboard_snapshot, interval=DASHBOARD_PUSH_INTERVAL)
+
+@app.get("/api/stream/dashboard")
+async def stream_dashboard():
+    """Push dashboard updates as Server-Sent Events: a full snapshot, then per-site deltas"""
+    return StreamingResponse(
+        dashboard_feed.subscribe(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@operation("dashboard")
+async def build_dashboard_metrics(db: AsyncSession) -> Dict:
+    """Compute the dashboard snapshot; runs once per cache tick"""
     try:
-        # Update current prices with dummy data and store in DB
-        pricing_data = get_dummy_mara_prices()
-        add_pricing_data(db, pricing_data)
-        
-        # Get pricing as JSON-serializable format
-        pricing_data_json = pricing_data.copy()
-        pricing_data_json['timestamp'] = pricing_data['timestamp'].isoformat()
-        
         # Get sites status
-        sites_response = await get_sites_status(db)
+        with stage("snapshot"):
+            sites_response = await fleet_sites_status()
         
         if "error" in sites_response or "sites" not in sites_response:
             return {
@@ -784,41 +1419,44 @@ async def get_dashboard_metrics(db: Session = Depends(get_db)):
                 "sites_response": sites_response
             }
         
-        sites = sites_response["sites"]
+        with stage("compute"):
+            sites = sites_response["sites"]
         
-        # Calculate revenue for each site if not present
-        for site in sites:
-            if "revenue" not in site:
-                # Calculate revenue based on power usage and efficiency
-                base_revenue = site.get("power_used", 0) * 0.1  # $0.1 per MW base rate
-                efficiency_multiplier = site.get("cooling_efficiency", 1.0)
-                site["revenue"] = base_revenue * efficiency_multiplier
+            # Calculate revenue for each site if not present
+            for site in sites:
+                if "revenue" not in site:
+                    # Calculate revenue based on power usage and efficiency
+                    base_revenue = site.get("power_used", 0) * 0.1  # $0.1 per MW base rate
+                    efficiency_multiplier = site.get("cooling_efficiency", 1.0)
+                    site["revenue"] = base_revenue * efficiency_multiplier
             
-            # Ensure required fields exist with defaults
-            site.setdefault("site_id", site.get("id", "unknown"))
-            site.setdefault("cooling_efficiency", 0.8)
-            site.setdefault("power_used", 0)
-        
-        # Calculate global metrics with safe access
-        total_power_used = sum(site.get("power_used", 0) for site in sites)
-        total_revenue = sum(site.get("revenue", 0) for site in sites)
-        
-        # Calculate efficiency metrics with safe access
-        cooling_efficiencies = [site.get("cooling_efficiency", 0.8) for site in sites]
-        avg_cooling_efficiency = sum(cooling_efficiencies) / len(cooling_efficiencies) if cooling_efficiencies else 0.8
-        
-        # Calculate renewable energy usage safely
-        renewable_energy_usage = 0
-        if total_power_used > 0:
-            renewable_energy_usage = sum(
-                MULTI_SITE_CONFIG.get(site.get("site_id", site.get("id", "")), {}).get("climate", {}).get("renewable_energy", 0.5) * site.get("power_used", 0)
-                for site in sites
-            ) / total_power_used
+                # Ensure required fields exist with defaults
+                site.setdefault("site_id", site.get("id", "unknown"))
+                site.setdefault("cooling_efficiency", 0.8)
+                site.setdefault("power_used", 0)
+        
+            # Calculate global metrics with safe access
+            total_power_used = sum(site.get("power_used", 0) for site in sites)
+            total_revenue = sum(site.get("revenue", 0) for site in sites)
+        
+            # Calculate efficiency metrics with safe access
+            cooling_efficiencies = [site.get("cooling_efficiency", 0.8) for site in sites]
+            avg_cooling_efficiency = sum(cooling_efficiencies) / len(cooling_efficiencies) if cooling_efficiencies else 0.8
+        
+            # Calculate renewable energy usage safely
+            renewable_energy_usage = 0
+            if total_power_used > 0:
+                renewable_energy_usage = sum(
+                    getattr(site_registry.index.by_id.get(site["site_id"]), "renewable_energy", 0.5) * site.get("power_used", 0)
+                    for site in sites
+                ) / total_power_used
     
         # Get SLA commitments and optimization history from database
-        sla_commitments = get_active_sla_commitments(db)
-        optimization_history = get_optimization_history(db, limit=10)
-        current_prices = get_latest_pricing(db)
+        with stage("db_read"):
+            await expire_sla_commitments_if_due(db)
+            sla_commitments = await get_active_sla_commitments_async(db)
+            optimization_history = await get_optimization_history_async(db, limit=10)
+            current_prices = await get_latest_pricing_async(db)
         
         return {
             "global_metrics": {
@@ -838,13 +1476,13 @@ async def get_dashboard_metrics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get dashboard metrics: {str(e)}")
 
 @app.get("/api/debug/state")
-async def debug_global_state(db: Session = Depends(get_db)):
+async def debug_global_state(db: AsyncSession = Depends(get_async_db)):
     """Debug endpoint to check system state"""
     try:
-        system_state = get_system_state(db)
-        current_prices = get_latest_pricing(db)
-        sla_commitments = get_active_sla_commitments(db)
-        site_count = len(get_all_site_inventories(db))
+        system_state = await get_system_state_async(db)
+        current_prices = await get_latest_pricing_async(db)
+        sla_commitments = await get_active_sla_commitments_async(db)
+        site_count = len(await get_all_site_inventories_async(db))
         
         return {
             "is_initialized": system_state.is_initialized,
@@ -855,6 +1493,15 @@ async def debug_global_state(db: Session = Depends(get_db)):
             "total_revenue": system_state.total_revenue,
             "site_count": site_count,
             "sla_commitments": sla_commitments,
+            "sla_commitments_by_site": await get_sla_power_by_site_async(db),
+            "sla_commitments_expired": sla_expiry_state["expired"],
+            "sla_placement": sla_placement.stats(),
+            "claude_reasoning": reasoning_service.stats(),
+            "optimization_jobs": optimization_jobs.stats(),
+            "workload_migration": migration_engine.stats(),
+            "price_feed": price_feed_stats(),
+            "forecasting": forecast_service.stats(),
+            "logging": logging_stats(),
             "last_updated": system_state.last_updated.isoformat() if system_state.last_updated else None,
             "data_source": "database"
         }
@@ -863,71 +1510,48 @@ async def debug_global_state(db: Session = Depends(get_db)):
         return {"error": str(e)}
 
 @app.get("/api/hardware/inventory")
-async def get_hardware_inventory(db: Session = Depends(get_db)):
-    """Get detailed hardware inventory across all sites"""
+async def get_hardware_inventory(site_offset: int = 0, site_limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+    """Get hardware inventory totals, per region and for a page of sites.
+
+    Totals, specs and regions are read from the maintained rollup rows, so the
+    cost does not grow with the fleet; site_breakdown covers site_limit sites
+    from site_offset in registry order (0 leaves it out).
+    """
+    if site_offset < 0 or not 0 <= site_limit <= 1000:
+        raise HTTPException(status_code=400, detail="site_offset must be non-negative and site_limit between 0 and 1000")
     try:
         # Check if system is initialized
-        system_state = get_system_state(db)
+        system_state = await get_system_state_async(db)
         if not system_state.is_initialized:
             return {"error": "System not initialized. Call /api/initialize first"}
         
-        # Get all site inventories from database
-        site_hardware_inventory = get_all_site_inventories(db)
-        
-        inventory_summary = {
-            "total_inventory": {
-                "miners": {"air": 0, "hydro": 0, "immersion": 0},
-                "inference": {"gpu": 0, "asic": 0}
-            },
-            "site_breakdown": {},
-            "hardware_specs": {}
-        }
+        inventory_summary = rollup_summary(await get_hardware_rollups_async(db))
         
-        for site_id, inventory in site_hardware_inventory.items():
-            site_name = MULTI_SITE_CONFIG[site_id]["name"]
-            
-            # Add to site breakdown
-            inventory_summary["site_breakdown"][site_name] = {
-                "site_id": site_id,
-                "location": MULTI_SITE_CONFIG[site_id]["location"],
+        # Typed unit rows for one page of sites
+        page = site_registry.index.records[site_offset:site_offset + site_limit]
+        units = await get_site_hardware_units_async(db, [site.site_id for site in page]) if page else {}
+        site_breakdown = {}
+        for site in page:
+            if site.site_id not in units:
+                continue
+            site_units = units[site.site_id]
+            site_breakdown[site.name] = {
+                "site_id": site.site_id,
+                "location": site.location,
                 "hardware": {
-                    "miners": {
-                        "air": inventory["miners"]["air"]["available"],
-                        "hydro": inventory["miners"]["hydro"]["available"], 
-                        "immersion": inventory["miners"]["immersion"]["available"]
-                    },
-                    "inference": {
-                        "gpu": inventory["inference"]["gpu"]["available"],
-                        "asic": inventory["inference"]["asic"]["available"]
-                    }
+                    "miners": {kind: site_units.get(kind, 0) for kind in ("air", "hydro", "immersion")},
+                    "inference": {kind: site_units.get(kind, 0) for kind in ("gpu", "asic")}
                 },
-                "power_capacity": inventory["site_specs"]["power_capacity"],
-                "cooling_efficiency": inventory["site_specs"]["cooling_efficiency"]
+                "power_capacity": site.power_capacity,
+                "cooling_efficiency": site.cooling_efficiency
             }
-            
-            # Add to totals
-            inventory_summary["total_inventory"]["miners"]["air"] += inventory["miners"]["air"]["available"]
-            inventory_summary["total_inventory"]["miners"]["hydro"] += inventory["miners"]["hydro"]["available"]
-            inventory_summary["total_inventory"]["miners"]["immersion"] += inventory["miners"]["immersion"]["available"]
-            inventory_summary["total_inventory"]["inference"]["gpu"] += inventory["inference"]["gpu"]["available"]
-            inventory_summary["total_inventory"]["inference"]["asic"] += inventory["inference"]["asic"]["available"]
-            
-            # Store hardware specs (same across all sites from MARA)
-            if not inventory_summary["hardware_specs"]:
-                inventory_summary["hardware_specs"] = {
-                    "miners": {
-                        "air": {"hashrate": inventory["miners"]["air"]["hashrate"], "power": inventory["miners"]["air"]["power"]},
-                        "hydro": {"hashrate": inventory["miners"]["hydro"]["hashrate"], "power": inventory["miners"]["hydro"]["power"]},
-                        "immersion": {"hashrate": inventory["miners"]["immersion"]["hashrate"], "power": inventory["miners"]["immersion"]["power"]}
-                    },
-                    "inference": {
-                        "gpu": {"tokens": inventory["inference"]["gpu"]["tokens"], "power": inventory["inference"]["gpu"]["power"]},
-                        "asic": {"tokens": inventory["inference"]["asic"]["tokens"], "power": inventory["inference"]["asic"]["power"]}
-                    }
-                }
-    
+        inventory_summary["site_breakdown"] = site_breakdown
+        
         return {
             "inventory": inventory_summary,
+            "total_sites": len(site_registry.index),
+            "site_offset": site_offset,
+            "site_limit": site_limit,
             "data_source": "database",
             "last_updated": datetime.now().isoformat()
         }
@@ -935,12 +1559,172 @@ async def get_hardware_inventory(db: Session = Depends(get_db)):
         logger.error(f"Hardware inventory error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get hardware inventory: {str(e)}")
 
+@app.get("/api/pricing/history")
+async def get_pricing_history(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                              resolution: str = "1h", limit: int = 5000,
+                              db: AsyncSession = Depends(get_async_db)):
+    """Price history as raw samples or 1m/1h/1d OHLC buckets (defaults to the last 24 hours)"""
+    if resolution not in RANGE_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RANGE_RESOLUTIONS)}")
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    try:
+        points = await get_pricing_range_async(db, start, end, resolution, limit=min(max(limit, 1), 5000))
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "resolution": resolution,
+            "points": points
+        }
+    except Exception as e:
+        logger.error(f"Pricing history error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get pricing history: {str(e)}")
+
+@app.get("/api/forecast")
+async def get_forecast(hours: int = 24, site_id: Optional[str] = None):
+    """Forecast prices per hour from the current hour, and the site's demand multipliers when site_id is given"""
+    if not 1 <= hours <= MAX_HORIZON_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours must be between 1 and {MAX_HORIZON_HOURS}")
+    site = site_registry.index.get(site_id) if site_id else None
+    if site_id and site is None:
+        raise HTTPException(status_code=404, detail=f"Unknown site {site_id}")
+    try:
+        timestamps, prices = forecast_cache.get(hours)
+    except ValueError:
+        raise HTTPException(status_code=503, detail="No price samples yet")
+    response = {
+        "hours": [(EPOCH + timedelta(seconds=float(timestamp))).isoformat() for timestamp in timestamps],
+        "prices": {name: prices[:, i].tolist() for i, name in enumerate(PRICE_FIELDS)},
+        "model": forecaster.stats()
+    }
+    if site is not None:
+        local_hours = local_hour_grid([site.timezone], timestamps)
+        response["demand"] = demand_multipliers_for_hours(local_hours, timestamps)[0].tolist()
+    return response
+
+@app.get("/api/forecast/accuracy")
+async def get_forecast_accuracy():
+    """Error of the forecasts issued over the fitted history and live feed, per horizon, against persistence"""
+    return {
+        "accuracy": forecaster.accuracy.report(),
+        "hours_scored_from": forecast_service.history_hours,
+        "model": forecaster.stats()
+    }
+
+@app.post("/api/backtest")
+async def run_backtest_scenarios(request: BacktestRequest, db: AsyncSession = Depends(get_async_db)):
+    """Replay price and weather traces through the allocator, one scenario per seed"""
+    if request.price_source not in ("synthetic", "stored"):
+        raise HTTPException(status_code=400, detail="price_source must be synthetic or stored")
+    if request.resolution not in RANGE_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RANGE_RESOLUTIONS)}")
+    if request.step_minutes <= 0 or not request.seeds or len(request.seeds) > 64:
+        raise HTTPException(status_code=400, detail="step_minutes must be positive and 1-64 seeds given")
+    step = timedelta(minutes=request.step_minutes)
+    steps = int((request.end - request.start) / step)
+    if not 0 < steps <= BACKTEST_MAX_STEPS:
+        raise HTTPException(status_code=400, detail=f"Window must cover 1 to {BACKTEST_MAX_STEPS} steps, got {steps}")
+    try:
+        system_state = await get_system_state_async(db)
+        mara_inventory = system_state.mara_inventory or get_dummy_mara_inventory()
+        site_inventories = await get_all_site_inventories_async(db) or distribute_hardware_across_sites(mara_inventory)
+        firm_sla_power = await get_sla_power_by_site_async(db, FIRM_SLA_TIERS)
+        
+        run_id = uuid.uuid4().hex[:12]
+        scenarios = [
+            BacktestScenario(
+                site_config=site_registry.config, site_inventories=site_inventories, mara_inventory=mara_inventory,
+                firm_sla_power=firm_sla_power, start=request.start, end=request.end, step=step, seed=seed,
+                price_source=request.price_source, resolution=request.resolution,
+                solver=request.solver or ALLOCATION_SOLVER, per_site_series=request.per_site_series,
+                name=f"seed-{seed}", output_dir=os.path.join(BACKTEST_OUTPUT_DIR, run_id, f"seed-{seed}")
+            )
+            for seed in dict.fromkeys(request.seeds)
+        ]
+        # Scenarios run in worker processes; the event loop only waits
+        results = await asyncio.to_thread(run_scenarios, scenarios, BACKTEST_WORKERS)
+        return {"run_id": run_id, "scenarios": results}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Backtest failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Backtest failed: {str(e)}")
+
+@app.get("/api/backtest/{run_id}")
+async def get_backtest(run_id: str):
+    """Summaries of a finished backtest run"""
+    path = os.path.join(BACKTEST_OUTPUT_DIR, run_id)
+    if not run_id.isalnum() or not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail="Backtest run not found")
+    scenarios = []
+    for name in sorted(os.listdir(path)):
+        if os.path.exists(os.path.join(path, name, "manifest.json")):
+            manifest = await asyncio.to_thread(load_results, os.path.join(path, name))
+            scenarios.append(manifest["summary"])
+    return {"run_id": run_id, "scenarios": scenarios}
+
+@app.post("/api/risk/revenue")
+async def get_revenue_risk(request: RevenueRiskRequest, db: AsyncSession = Depends(get_async_db)):
+    """Monte Carlo P5/P50/P95 revenue and SLA-breach probability for the current allocation"""
+    if not 0 < request.scenarios <= MONTE_CARLO_MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"scenarios must be between 1 and {MONTE_CARLO_MAX_SCENARIOS}")
+    if not 0 < request.horizon_hours <= 168:
+        raise HTTPException(status_code=400, detail="horizon_hours must be between 1 and 168")
+    try:
+        system_state = await get_system_state_async(db)
+        if not system_state.is_initialized:
+            raise HTTPException(status_code=400, detail="System not initialized")
+        
+        current_prices = await get_latest_pricing_async(db) or get_dummy_mara_prices()
+        await ensure_site_inventories(db)
+        fleet = site_registry.index.pack(system_state.mara_inventory)
+        firm_sla_power = await get_sla_power_by_site_async(db, FIRM_SLA_TIERS)
+        allocations = await get_latest_site_allocations_async(db)
+        if allocations:
+            allocation = pack_allocations(fleet.site_ids, allocations)
+        else:
+            # Not optimized yet: evaluate what the optimizer would choose now
+            problem = build_allocation_problem(fleet, current_prices, fleet_demand_multipliers(fleet), firm_sla_power)
+            allocation = get_solver(ALLOCATION_SOLVER).solve(problem).allocation
+        
+        result = await asyncio.to_thread(
+            simulate_revenue_risk, fleet, allocation, current_prices, firm_sla_power,
+            scenarios=request.scenarios, horizon_hours=request.horizon_hours, seed=request.seed,
+            workers=MONTE_CARLO_WORKERS, site_config=site_registry.config
+        )
+        result["allocation_source"] = "latest" if allocations else "solver"
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Revenue risk simulation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Revenue risk simulation failed: {str(e)}")
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Snapshot and reasoning cache counters plus total database statements executed"""
+    return {
+        "snapshot_cache": snapshot_cache.stats(),
+        "claude_reasoning": reasoning_service.stats(),
+        "live_feed": dashboard_feed.stats(),
+        "forecast": forecast_cache.stats(),
+        "db_queries": query_stats["queries"],
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Request latency, stage timings and database statement counts in the Prometheus text format"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # Health check endpoint for monitoring
 @app.get("/api/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """Health check endpoint"""
     try:
-        system_state = get_system_state(db)
+        system_state = await get_system_state_async(db)
         return {
             "status": "healthy",
             "initialized": system_state.is_initialized,
@@ -954,50 +1738,6 @@ async def health_check(db: Session = Depends(get_db)):
             "timestamp": datetime.now().isoformat()
         }
 
-def calculate_efficiency_score(site_config: Dict, weather: Dict) -> float:
-    """Calculate site efficiency score based on various factors"""
-    base_score = 80.0
-    
-    # Temperature efficiency (cooler is better)
-    temp_factor = max(0.5, 1.0 - (weather["temperature"] - 20) / 50)
-    
-    # Cooling efficiency factor
-    cooling_factor = site_config["climate"]["cooling_efficiency"]
-    
-    # Energy cost factor (lower cost is better)
-    energy_factor = max(0.3, 1.0 / site_config["energy_cost_multiplier"])
-    
-    return min(100.0, base_score * temp_factor * cooling_factor * energy_factor)
-
-def calculate_global_metrics(sites: List[Dict]) -> Dict:
-    """Calculate global metrics across all sites"""
-    if not sites:
-        return {}
-    
-    total_power_used = sum(site["power_used"] for site in sites)
-    total_power_capacity = sum(site["power_capacity"] for site in sites)
-    avg_efficiency = sum(site["efficiency_score"] for site in sites) / len(sites)
-    avg_uptime = sum(site["uptime"] for site in sites) / len(sites)
-    
-    # Count total hardware across all sites
-    total_hardware = {
-        "gpu_units": sum(site["hardware_inventory"].get("inference", {}).get("gpu", {}).get("available", 0) for site in sites),
-        "asic_units": sum(site["hardware_inventory"].get("inference", {}).get("asic", {}).get("available", 0) for site in sites),
-        "air_miners": sum(site["hardware_inventory"].get("miners", {}).get("air", {}).get("available", 0) for site in sites),
-        "hydro_miners": sum(site["hardware_inventory"].get("miners", {}).get("hydro", {}).get("available", 0) for site in sites),
-        "immersion_miners": sum(site["hardware_inventory"].get("miners", {}).get("immersion", {}).get("available", 0) for site in sites)
-    }
-    
-    return {
-        "total_power_used": total_power_used,
-        "total_power_capacity": total_power_capacity,
-        "global_utilization": (total_power_used / total_power_capacity) * 100 if total_power_capacity > 0 else 0,
-        "average_efficiency": avg_efficiency,
-        "average_uptime": avg_uptime,
-        "total_hardware": total_hardware,
-        "active_sites": len(sites)
-    }
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
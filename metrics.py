@@ -0,0 +1,205 @@
+"""
+Prometheus-style metrics for SLA-Smart Energy Arbitrage Platform
+
+Request latency histograms per route, timers around named stages of the hot
+paths, and database statement counts per request, rendered at /metrics in the
+Prometheus text exposition format. No client library is needed: series are
+plain Python numbers updated in place, so an observation costs a dict lookup
+and a bisect and instrumentation can stay on in production.
+"""
+from bisect import bisect_left
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import time
+
+# Seconds; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def lines(self) -> Iterator[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Bucketed observations per label set (counts are stored per bucket, rendered cumulative)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def lines(self) -> Iterator[str]:
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {count}"
+
+
+class GaugeCallback:
+    """Value read when metrics are rendered: callback returns a number or {label value: number}.
+
+    kind="counter" exposes a count kept elsewhere (cache hits, say) as a counter.
+    """
+
+    def __init__(self, name: str, help: str, callback: Callable[[], object], labelname: Optional[str] = None,
+                 kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelname = labelname
+        self.kind = kind
+
+    def lines(self) -> Iterator[str]:
+        value = self.callback()
+        if isinstance(value, dict):
+            for label, number in sorted(value.items()):
+                yield f"{self.name}{_labels((self.labelname,), (label,))} {_number(number)}"
+        else:
+            yield f"{self.name} {_number(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """Add a metric, replacing one of the same name"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the text exposition format"""
+        out: List[str] = []
+        for metric in self._metrics.values():
+            out.append(f"# HELP {metric.name} {metric.help}")
+            out.append(f"# TYPE {metric.name} {metric.kind}")
+            out.extend(metric.lines())
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")))
+REQUEST_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "Database statements executed per HTTP request", ("method", "route"), QUERY_BUCKETS))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "mara_stage_duration_seconds", "Time spent in named stages of an operation", ("operation", "stage")))
+DB_QUERIES = REGISTRY.register(Counter(
+    "mara_db_queries_total", "Database statements executed"))
+
+# Per-request state, and the operation that stage timers are attributed to
+_request: ContextVar[Optional[Dict]] = ContextVar("mara_request", default=None)
+_operation: ContextVar[str] = ContextVar("mara_operation", default="other")
+
+
+def record_query() -> None:
+    """Count one database statement, for the current request if there is one"""
+    DB_QUERIES.inc()
+    state = _request.get()
+    if state is not None:
+        state["queries"] += 1
+
+
+@asynccontextmanager
+async def operation(name: str) -> AsyncIterator[None]:
+    """Attribute stages inside the block (and tasks started in it) to an operation; also a coroutine decorator"""
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    """Record time spent in a named stage of the current operation"""
+    STAGE_SECONDS.observe(seconds, _operation.get(), name)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a named stage of the current operation"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and database statements per request, labelled by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = {"queries": 0, "status": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            await send(message)
+
+        token = _request.set(state)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request.reset(token)
+            # Templates, not raw paths, keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(elapsed, scope["method"], route, str(state["status"]))
+            REQUEST_QUERIES.observe(state["queries"], scope["method"], route)
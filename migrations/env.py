@@ -0,0 +1,42 @@
+"""
+Alembic environment for SLA-Smart Energy Arbitrage Platform
+
+Migrations run against DATABASE_URL, read from the environment or config.env,
+with the application's models as the target metadata.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from dotenv import load_dotenv
+
+# The migration command is an entry point, so it reads config.env like `python main.py`
+load_dotenv("config.env")
+
+from database import Base, engine  # noqa: E402
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(url=str(engine.url), target_metadata=target_metadata, literal_binds=True,
+                      render_as_batch=engine.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata,
+                          render_as_batch=connection.dialect.name == "sqlite")
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
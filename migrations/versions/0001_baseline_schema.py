@@ -0,0 +1,27 @@
+"""Baseline schema: every table, column and index the models define
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Runs database.init_db on the migration connection, so it also brings a
+database created by an earlier version of the app up to date (missing
+columns and indexes, backfilled SLA expiry and aggregate tables). Later
+schema changes get their own revisions.
+"""
+from alembic import op
+
+from database import Base, init_db
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    init_db(op.get_bind())
+
+
+def downgrade() -> None:
+    Base.metadata.drop_all(bind=op.get_bind())
@@ -0,0 +1,222 @@
+"""
+Monte Carlo revenue risk for SLA-Smart Energy Arbitrage Platform
+
+Samples thousands of correlated energy/hash/token price paths and per-site
+temperature paths over a short horizon, evaluates fleet revenue for a fixed
+allocation with batched array math, and reports P5/P50/P95 revenue and the
+probability of breaching firm SLA power at each site.
+
+Model, per hourly step:
+  - prices follow correlated geometric random walks (PRICE_VOLATILITY per
+    sqrt(day), PRICE_CORRELATION between the three prices)
+  - each site's temperature is its average plus an AR(1) anomaly driven by a
+    fleet-wide shock and a site shock (TEMP_FLEET_CORRELATION)
+  - above THERMAL_DERATE_START a site loses usable power capacity in
+    proportion to how poorly it cools; hardware is throttled to fit, which
+    cuts revenue and can push inference power below firm SLA power
+
+Scenarios are generated in chunks sized so a chunk's (scenarios, steps,
+sites) arrays fit in CHUNK_MEMORY_BYTES, each chunk from its own child of
+one SeedSequence, so results depend only on the seed and the input shape,
+not on how many worker processes run the chunks.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+import multiprocessing
+import time
+
+import numpy as np
+
+from revenue_engine import FleetArrays, INFERENCE_MASK, MINING_MASK
+from simulation import FleetSimulator, SimulationClock
+
+PRICE_FIELDS = ("energy_price", "hash_price", "token_price")
+PRICE_VOLATILITY = (0.06, 0.05, 0.04)   # log-price standard deviation per sqrt(day)
+PRICE_CORRELATION = (
+    (1.0, 0.3, 0.2),
+    (0.3, 1.0, 0.5),
+    (0.2, 0.5, 1.0),
+)
+TEMP_ANOMALY_STD = 8.0         # stationary standard deviation of the anomaly, degrees F
+TEMP_PERSISTENCE = 0.9         # AR(1) coefficient per hour
+TEMP_FLEET_CORRELATION = 0.5   # share of anomaly variance common to every site
+THERMAL_DERATE_START = 85.0    # degrees F
+THERMAL_DERATE_PER_DEGREE = 0.02  # capacity lost per degree, scaled by (1 - cooling efficiency)
+CHUNK_SCENARIOS = 2000              # most scenarios per chunk
+CHUNK_MEMORY_BYTES = 256 * 1024 ** 2  # per-chunk budget for the (M, T, S) working arrays
+CHUNK_ARRAYS = 12                  # (M, T, S) float64 arrays alive at the peak of _evaluate_chunk
+PERCENTILES = (5, 50, 95)
+
+
+@dataclass
+class RiskModel:
+    """Uncertainty parameters; defaults are the module constants"""
+    price_volatility: Sequence[float] = PRICE_VOLATILITY
+    price_correlation: Sequence[Sequence[float]] = PRICE_CORRELATION
+    temp_anomaly_std: float = TEMP_ANOMALY_STD
+    temp_persistence: float = TEMP_PERSISTENCE
+    temp_fleet_correlation: float = TEMP_FLEET_CORRELATION
+    derate_start: float = THERMAL_DERATE_START
+    derate_per_degree: float = THERMAL_DERATE_PER_DEGREE
+
+
+@dataclass
+class _Chunk:
+    """Everything one worker needs to evaluate a block of scenarios"""
+    fleet: FleetArrays
+    allocation: np.ndarray       # (S, H)
+    prices: np.ndarray           # (3,) starting energy, hash, token price
+    firm_sla_power: np.ndarray   # (S,)
+    base_temp: np.ndarray        # (S,)
+    demand: np.ndarray           # (S, T)
+    step_hours: float
+    model: RiskModel
+    scenarios: int
+    seed: np.random.SeedSequence = field(default=None)
+
+
+def _price_paths(chunk: _Chunk, rng: np.random.Generator, steps: int) -> np.ndarray:
+    """(M, T, 3) correlated geometric random walks starting from the current prices"""
+    sigma = np.asarray(chunk.model.price_volatility) * np.sqrt(chunk.step_hours / 24)
+    cholesky = np.linalg.cholesky(np.asarray(chunk.model.price_correlation))
+    shocks = rng.standard_normal((chunk.scenarios, steps, len(PRICE_FIELDS))) @ cholesky.T
+    log_returns = shocks * sigma - 0.5 * sigma ** 2
+    return chunk.prices * np.exp(np.cumsum(log_returns, axis=1))
+
+
+def _temperature_paths(chunk: _Chunk, rng: np.random.Generator, steps: int) -> np.ndarray:
+    """(M, T, S) site temperatures with a shared fleet anomaly and AR(1) persistence"""
+    model = chunk.model
+    n_sites = len(chunk.base_temp)
+    phi = model.temp_persistence
+    shock_std = model.temp_anomaly_std * np.sqrt(1 - phi ** 2)
+    fleet_shock = rng.standard_normal((chunk.scenarios, steps, 1)) * np.sqrt(model.temp_fleet_correlation)
+    site_shock = rng.standard_normal((chunk.scenarios, steps, n_sites)) * np.sqrt(1 - model.temp_fleet_correlation)
+    shocks = (fleet_shock + site_shock) * shock_std
+    anomaly = np.empty_like(shocks)
+    # Start from the stationary distribution
+    anomaly[:, 0] = rng.standard_normal((chunk.scenarios, n_sites)) * model.temp_anomaly_std
+    for t in range(1, steps):
+        anomaly[:, t] = phi * anomaly[:, t - 1] + shocks[:, t]
+    return chunk.base_temp + anomaly
+
+
+def _evaluate_chunk(chunk: _Chunk) -> Dict[str, np.ndarray]:
+    """Per-scenario, per-site revenue, energy cost and SLA breach flags for one chunk"""
+    rng = np.random.default_rng(chunk.seed)
+    fleet = chunk.fleet
+    steps = chunk.demand.shape[1]
+    prices = _price_paths(chunk, rng, steps)            # (M, T, 3)
+    temperature = _temperature_paths(chunk, rng, steps)  # (M, T, S)
+
+    produced = chunk.allocation * fleet.output
+    token_units = produced[:, INFERENCE_MASK].sum(axis=1) * fleet.cooling_efficiency  # (S,)
+    hash_units = produced[:, MINING_MASK].sum(axis=1)
+    unit_power = chunk.allocation * fleet.unit_power
+    power_used = unit_power.sum(axis=1)
+    inference_power = unit_power[:, INFERENCE_MASK].sum(axis=1)
+
+    # Hot sites lose usable capacity and throttle every hardware class alike
+    derate = np.clip(temperature - chunk.model.derate_start, 0.0, None) * \
+        chunk.model.derate_per_degree * (1 - fleet.cooling_efficiency)
+    usable = fleet.power_capacity * np.clip(1.0 - derate, 0.0, 1.0)
+    throttle = np.minimum(1.0, usable / np.where(power_used > 0, power_used, 1.0))  # (M, T, S)
+
+    demand = chunk.demand.T                                             # (T, S)
+    energy_price, hash_price, token_price = (prices[:, :, i:i + 1] for i in range(3))
+    revenue = (token_units * token_price + hash_units * hash_price) * demand * throttle
+    energy_cost = power_used * throttle / 1000 * energy_price * fleet.energy_cost_multiplier
+    breached = (inference_power * throttle + 1e-9 < chunk.firm_sla_power).any(axis=1)
+    return {
+        "revenue": revenue.sum(axis=1) * chunk.step_hours,              # (M, S)
+        "energy_cost": energy_cost.sum(axis=1) * chunk.step_hours,
+        "breached": breached,
+        "throttled": (throttle < 1.0).any(axis=1),
+    }
+
+
+def chunk_scenarios(steps: int, n_sites: int, budget: int = CHUNK_MEMORY_BYTES) -> int:
+    """Scenarios per chunk so that one chunk's working arrays stay within `budget` bytes"""
+    per_scenario = max(1, steps * n_sites) * 8 * CHUNK_ARRAYS
+    return max(1, min(CHUNK_SCENARIOS, budget // per_scenario))
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    points = np.percentile(values, PERCENTILES, axis=0)
+    stats = {f"p{p}": points[i] for i, p in enumerate(PERCENTILES)}
+    stats["mean"] = values.mean(axis=0)
+    return stats
+
+
+def simulate_revenue_risk(fleet: FleetArrays, allocation: np.ndarray, prices: Dict,
+                          firm_sla_power: Optional[Dict[str, float]] = None,
+                          base_temp: Optional[Dict[str, float]] = None,
+                          scenarios: int = 10000, horizon_hours: int = 24, seed: int = 0,
+                          workers: int = 1, start: Optional[datetime] = None,
+                          model: Optional[RiskModel] = None, site_config: Optional[Dict[str, Dict]] = None) -> Dict:
+    """Revenue distribution and SLA-breach probability for a fixed allocation.
+
+    Demand follows each site's local business hours from ``start`` (default
+    now); ``site_config`` supplies timezones and average temperatures.
+    """
+    started = time.perf_counter()
+    firm_sla_power = firm_sla_power or {}
+    site_config = site_config or {}
+    clock = SimulationClock.hourly(start or datetime.utcnow(), horizon_hours)
+    simulator = FleetSimulator({site_id: site_config.get(site_id, {}) for site_id in fleet.site_ids})
+    base = base_temp or {}
+    base_temps = np.array([base.get(site_id, simulator.base_temp[i]) for i, site_id in enumerate(fleet.site_ids)])
+
+    template = dict(
+        fleet=fleet,
+        allocation=np.asarray(allocation, dtype=float),
+        prices=np.array([prices.get(name, 0.0) for name in PRICE_FIELDS], dtype=float),
+        firm_sla_power=np.array([firm_sla_power.get(site_id, 0.0) for site_id in fleet.site_ids], dtype=float),
+        base_temp=base_temps,
+        demand=simulator.demand(clock.timestamps()),
+        step_hours=clock.step.total_seconds() / 3600,
+        model=model or RiskModel(),
+    )
+    per_chunk = chunk_scenarios(template["demand"].shape[1], len(fleet.site_ids))
+    sizes = [min(per_chunk, scenarios - first) for first in range(0, scenarios, per_chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [_Chunk(**template, scenarios=size, seed=chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_evaluate_chunk, chunks))
+    else:
+        results = [_evaluate_chunk(chunk) for chunk in chunks]
+
+    revenue = np.concatenate([result["revenue"] for result in results])
+    net = revenue - np.concatenate([result["energy_cost"] for result in results])
+    breached = np.concatenate([result["breached"] for result in results])
+    throttled = np.concatenate([result["throttled"] for result in results])
+
+    site_revenue, site_net = _percentiles(revenue), _percentiles(net)
+    fleet_revenue, fleet_net = _percentiles(revenue.sum(axis=1)), _percentiles(net.sum(axis=1))
+    return {
+        "scenarios": scenarios,
+        "horizon_hours": horizon_hours,
+        "seed": seed,
+        "start": clock.start.isoformat(),
+        "fleet": {
+            "revenue": {key: float(value) for key, value in fleet_revenue.items()},
+            "net_revenue": {key: float(value) for key, value in fleet_net.items()},
+            "sla_breach_probability": float(breached.any(axis=1).mean()),
+        },
+        "sites": {
+            site_id: {
+                "revenue": {key: float(value[i]) for key, value in site_revenue.items()},
+                "net_revenue": {key: float(value[i]) for key, value in site_net.items()},
+                "sla_breach_probability": float(breached[:, i].mean()),
+                "throttle_probability": float(throttled[:, i].mean()),
+                "firm_sla_power": float(template["firm_sla_power"][i]),
+            }
+            for i, site_id in enumerate(fleet.site_ids)
+        },
+        "elapsed_seconds": time.perf_counter() - started,
+    }
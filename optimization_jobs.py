@@ -0,0 +1,224 @@
+"""
+Optimization job queue for SLA-Smart Energy Arbitrage Platform
+
+/api/optimize enqueues a job and returns its id instead of running the whole
+optimization inside the request. A bounded pool of workers drains the queue;
+a request identical to one still queued or running joins that job instead of
+starting another. Clients poll jobs by id for status, run time and result,
+and can cancel them. The local backend keeps everything in process (asyncio
+queue and tasks), so no external broker is needed.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity"""
+
+
+@dataclass(eq=False)
+class OptimizationJob:
+    """One queued optimization run"""
+    job_id: str
+    key: str
+    status: str = "queued"        # queued, running, completed, failed, cancelled
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    submissions: int = 1          # requests served by this job, including deduplicated ones
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status not in ACTIVE_STATUSES
+
+    @property
+    def run_seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.completed_at or time.time()) - self.started_at
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "submissions": self.submissions,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "queued_seconds": (self.started_at or self.completed_at or time.time()) - self.created_at,
+            "run_seconds": self.run_seconds,
+            "result": self.result if self.status == "completed" else None,
+            "error": self.error
+        }
+
+    async def wait(self) -> "OptimizationJob":
+        await self._done.wait()
+        return self
+
+
+class LocalJobQueue:
+    """In-process job queue: an asyncio queue drained by a fixed number of worker tasks"""
+
+    def __init__(self, runner: Callable[[], Awaitable[Any]], workers: int = 1, max_queue: int = 16,
+                 max_jobs: int = 256, timeout: Optional[float] = None):
+        self._runner = runner
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.max_jobs = max_jobs
+        self.timeout = timeout or None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, OptimizationJob]" = OrderedDict()
+        self._active: Dict[str, OptimizationJob] = {}
+        self.deduplicated = 0
+        self.counts = {"completed": 0, "failed": 0, "cancelled": 0}
+        self.total_run_seconds = 0.0
+
+    def start(self) -> None:
+        """Start the workers on the running loop; submit starts them too if needed"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.get_running_loop().create_task(self._work(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers and every unfinished job"""
+        for job in list(self._active.values()):
+            self.cancel(job.job_id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    @property
+    def depth(self) -> int:
+        """Jobs waiting for a worker"""
+        return sum(1 for job in self._active.values() if job.status == "queued")
+
+    def submit(self, key: str) -> OptimizationJob:
+        """Queue a job, or return the queued or running job with the same key; raises QueueFull"""
+        active = self._active.get(key)
+        if active is not None:
+            active.submissions += 1
+            self.deduplicated += 1
+            return active
+        if self.depth >= self.max_queue:
+            raise QueueFull(f"optimization queue is full ({self.max_queue} jobs waiting)")
+        self.start()
+        job = OptimizationJob(job_id=uuid.uuid4().hex, key=key)
+        self._active[key] = job
+        self._remember(job)
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[OptimizationJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self, limit: int = 20) -> List[OptimizationJob]:
+        """Most recent jobs first"""
+        return list(reversed(self._jobs.values()))[:limit]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it already finished"""
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        if job.status == "running" and job._task is not None:
+            job._task.cancel()  # the worker records the cancellation
+        else:
+            self._finish(job, "cancelled")
+        return True
+
+    def position(self, job: OptimizationJob) -> Optional[int]:
+        """1-based place among waiting jobs, None once started"""
+        if job.status != "queued":
+            return None
+        waiting = (other for other in self._active.values() if other.status == "queued")
+        return next((place for place, other in enumerate(waiting, start=1) if other is job), None)
+
+    def stats(self) -> Dict:
+        finished = self.counts["completed"] + self.counts["failed"]
+        return {
+            "backend": "local",
+            "workers": self.workers,
+            "queue_depth": self.depth,
+            "running": sum(1 for job in self._active.values() if job.status == "running"),
+            "max_queue": self.max_queue,
+            "deduplicated": self.deduplicated,
+            **self.counts,
+            "average_run_seconds": self.total_run_seconds / finished if finished else 0.0
+        }
+
+    async def _work(self, worker: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == "queued":  # skip jobs cancelled while waiting
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: OptimizationJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        job._task = asyncio.get_running_loop().create_task(self._runner())
+        try:
+            job.result = await asyncio.wait_for(asyncio.shield(job._task), self.timeout)
+            self._finish(job, "completed")
+        except asyncio.CancelledError:
+            stopping = not job._task.cancelled()  # the worker itself is being stopped
+            job._task.cancel()
+            self._finish(job, "cancelled")
+            if stopping:
+                raise
+        except asyncio.TimeoutError:
+            job._task.cancel()
+            job.error = f"timed out after {self.timeout:g}s"
+            self._finish(job, "failed")
+        except Exception as e:
+            logger.error(f"Optimization job {job.job_id} failed: {e}")
+            job.error = str(e)
+            self._finish(job, "failed")
+
+    def _finish(self, job: OptimizationJob, status: str) -> None:
+        job.status = status
+        job.completed_at = time.time()
+        job._task = None
+        if self._active.get(job.key) is job:
+            del self._active[job.key]
+        self.counts[status] += 1
+        if status != "cancelled" and job.started_at is not None:
+            self.total_run_seconds += job.completed_at - job.started_at
+        job._done.set()
+
+    def _remember(self, job: OptimizationJob) -> None:
+        self._jobs[job.job_id] = job
+        if len(self._jobs) > self.max_jobs:
+            # Evict the oldest finished jobs; queued and running jobs are never dropped
+            finished = [job_id for job_id, old in self._jobs.items() if old.done]
+            for job_id in finished[:len(self._jobs) - self.max_jobs]:
+                del self._jobs[job_id]
+
+
+JOB_BACKENDS = {"local": LocalJobQueue}
+
+
+def get_job_queue(backend: str, runner: Callable[[], Awaitable[Any]], **options) -> LocalJobQueue:
+    """Job queue for a backend name"""
+    if backend not in JOB_BACKENDS:
+        raise ValueError(f"Unknown optimization job backend: {backend} (choose from {', '.join(JOB_BACKENDS)})")
+    return JOB_BACKENDS[backend](runner, **options)
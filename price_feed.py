@@ -0,0 +1,297 @@
+"""
+Price feed ingestion for SLA-Smart Energy Arbitrage Platform
+
+A single background loop polls one price source, publishes every new sample
+to the in-memory latest-price register as soon as it arrives, and stores the
+samples (with their rollups) in batches. Request handlers only ever read the
+register; they never fetch prices or write them.
+
+Sources implement one coroutine, `fetch`, returning the samples that are new
+since the previous call, oldest first:
+  - SyntheticPriceSource: the seeded synthetic price model (the default)
+  - HttpPriceSource:      polls a JSON endpoint shaped like the MARA price API
+                          over a shared, connection-pooled httpx.AsyncClient
+  - FileReplaySource:     replays a CSV or Parquet price file in (scaled) real
+                          time, re-stamped to the present
+"""
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import csv
+import logging
+import math
+import random
+import time
+
+import httpx
+
+from price_series import PRICE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+FEED_SOURCES = ("synthetic", "http", "replay")
+
+
+def synthetic_prices(clock: float, rng) -> Dict[str, float]:
+    """Slow sine swing plus noise around the long-run MARA averages"""
+    time_factor = math.sin(clock / 200) * 0.1
+    random_factor = rng.uniform(-0.05, 0.05)
+    return {
+        "energy_price": 0.65 + time_factor + random_factor,
+        "hash_price": 8.5 + time_factor * 2 + random_factor * 2,
+        "token_price": 2.9 + time_factor + random_factor,
+    }
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Naive UTC datetime from a datetime, ISO string or epoch seconds; None when missing"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+    moment = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def parse_sample(record: Dict, source: str) -> Dict:
+    """Validated price sample from a raw record; raises ValueError"""
+    try:
+        prices = {name: float(record[name]) for name in PRICE_FIELDS}
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid price record {record!r}: {e}")
+    if not all(math.isfinite(price) for price in prices.values()):
+        raise ValueError(f"Invalid price record {record!r}: non-finite price")
+    return {**prices, "timestamp": parse_timestamp(record.get("timestamp")), "source": source}
+
+
+class PriceSource:
+    """Adapter interface: fetch returns new samples, oldest first"""
+    name = "source"
+
+    async def fetch(self) -> List[Dict]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class SyntheticPriceSource(PriceSource):
+    """One sample of the synthetic model per fetch, stored as dummy_data like before the feed existed"""
+    name = "synthetic"
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    async def fetch(self) -> List[Dict]:
+        return [{**synthetic_prices(time.time(), self.rng), "timestamp": datetime.utcnow(), "source": "dummy_data"}]
+
+
+class HttpPriceSource(PriceSource):
+    """Polls a JSON endpoint returning one price record or a list of them (MARA API shape).
+
+    Records at or before the newest timestamp already seen are skipped;
+    records without a timestamp are stamped on arrival.
+    """
+    name = "http"
+
+    def __init__(self, url: str, client: httpx.AsyncClient, timeout: float = 10.0):
+        self.url = url
+        self.client = client
+        self.timeout = timeout
+        self.newest: Optional[datetime] = None
+
+    async def fetch(self) -> List[Dict]:
+        response = await self.client.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
+        records = payload if isinstance(payload, list) else [payload]
+        now = datetime.utcnow()
+        samples = []
+        for record in records:
+            sample = parse_sample(record, self.name)
+            if sample["timestamp"] is None:
+                sample["timestamp"] = now
+            elif self.newest is not None and sample["timestamp"] <= self.newest:
+                continue
+            samples.append(sample)
+        samples.sort(key=lambda sample: sample["timestamp"])
+        if samples:
+            self.newest = max(self.newest or samples[-1]["timestamp"], samples[-1]["timestamp"])
+        return samples
+
+
+def read_price_file(path: str) -> List[Dict]:
+    """Raw records from a CSV file or, with pyarrow installed, a Parquet file"""
+    if path.endswith(".parquet"):
+        try:  # Parquet replay is optional; CSV needs no extra packages
+            import pyarrow.parquet as parquet
+        except ImportError:
+            raise ValueError("Parquet replay needs pyarrow (pip install pyarrow); CSV works without it")
+        return parquet.read_table(path).to_pylist()
+    with open(path, newline="") as handle:
+        return list(csv.DictReader(handle))
+
+
+class FileReplaySource(PriceSource):
+    """Replays a price file in real time divided by `speed`, shifted so the first row is "now".
+
+    Each fetch returns the rows whose replay time has come, re-stamped to it;
+    at the end the file starts over when `loop` is set.
+    """
+    name = "replay"
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = True):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        samples = [parse_sample(record, self.name) for record in read_price_file(path)]
+        if not samples:
+            raise ValueError(f"Price file {path} has no rows")
+        self.samples = sorted(samples, key=lambda sample: sample["timestamp"] or datetime.min)
+        self.first = self.samples[0]["timestamp"]
+        self.position = 0
+        self.started: Optional[datetime] = None
+
+    def _replay_at(self, sample: Dict, index: int) -> datetime:
+        if self.first is None or sample["timestamp"] is None:
+            return self.started + timedelta(seconds=index / self.speed)  # untimed rows: one per second
+        return self.started + (sample["timestamp"] - self.first) / self.speed
+
+    async def fetch(self) -> List[Dict]:
+        now = datetime.utcnow()
+        if self.started is None:
+            self.started = now
+        due = []
+        while self.position < len(self.samples):
+            replay_at = self._replay_at(self.samples[self.position], self.position)
+            if replay_at > now:
+                break
+            due.append({**self.samples[self.position], "timestamp": replay_at})
+            self.position += 1
+        if self.position == len(self.samples) and self.loop:
+            self.position, self.started = 0, now + timedelta(seconds=1 / self.speed)
+        return due
+
+
+class PriceFeed:
+    """The one background price loop: fetch, publish to the register, store in batches.
+
+    Samples are written when `batch_size` are buffered or `flush_interval`
+    seconds have passed. A failed write keeps its samples for the next flush
+    (up to `max_buffer`, oldest dropped first); failed fetches back off
+    exponentially up to `max_backoff` seconds. `observe`, when set, receives
+    every fetched batch of samples, oldest first.
+    """
+
+    def __init__(self, source: PriceSource, writer: Callable[[List[Dict]], Awaitable[int]],
+                 publish: Callable[[Dict], None], interval: float = 5.0, batch_size: int = 20,
+                 flush_interval: float = 30.0, max_backoff: float = 300.0, max_buffer: int = 10000,
+                 observe: Optional[Callable[[List[Dict]], None]] = None):
+        self.source = source
+        self.writer = writer
+        self.publish = publish
+        self.observe = observe
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.buffer: deque = deque(maxlen=max_buffer)
+        self.last_flush = time.monotonic()
+        self.counters = {"fetches": 0, "fetch_errors": 0, "samples": 0, "written": 0, "batches": 0,
+                         "write_errors": 0, "dropped": 0}
+        self.last_sample_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def poll(self) -> int:
+        """Fetch once, publish the newest sample and buffer all of them; returns the number fetched"""
+        self.counters["fetches"] += 1
+        samples = await self.source.fetch()
+        for sample in samples:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.counters["dropped"] += 1
+            self.buffer.append(sample)
+        if samples:
+            self.counters["samples"] += len(samples)
+            self.last_sample_at = samples[-1]["timestamp"]
+            self.publish(samples[-1])
+            if self.observe is not None:
+                self.observe(samples)
+        return len(samples)
+
+    def flush_due(self) -> bool:
+        return len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval
+
+    async def flush(self) -> int:
+        """Write everything buffered in one batch; on failure the samples stay buffered"""
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return 0
+        batch = list(self.buffer)
+        self.buffer.clear()
+        try:
+            written = await self.writer(batch)
+        except Exception:
+            self.counters["write_errors"] += 1
+            for sample in reversed(batch):
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.counters["dropped"] += 1
+                    break
+                self.buffer.appendleft(sample)
+            raise
+        self.counters["written"] += written
+        self.counters["batches"] += 1
+        return written
+
+    async def run(self) -> None:
+        delay = self.interval
+        while True:
+            try:
+                await self.poll()
+                delay = self.interval
+            except Exception as e:
+                self.counters["fetch_errors"] += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                delay = min(self.max_backoff, max(delay, self.interval) * 2)
+                logger.warning("Price fetch from %s failed (retry in %.0fs): %s", self.source.name, delay, e)
+            try:
+                if self.flush_due():
+                    await self.flush()
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.error("Price batch write failed, %d samples kept: %s", len(self.buffer), e)
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop polling, write what is buffered and close the source"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Final price batch write failed, %d samples lost: %s", len(self.buffer), e)
+        await self.source.close()
+
+    def stats(self) -> Dict:
+        return {
+            "source": self.source.name,
+            "running": self._task is not None,
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "buffered": len(self.buffer),
+            "last_sample_at": self.last_sample_at.isoformat() if self.last_sample_at else None,
+            "last_error": self.last_error,
+            **self.counters,
+        }
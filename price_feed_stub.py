@@ -0,0 +1,71 @@
+"""
+Local stand-in for the MARA price API, for tests and offline development
+
+Serves GET /prices in the MARA shape (a list of samples, newest first) from
+the synthetic price model, adding one sample per --interval seconds of wall
+time. Point the platform at it with PRICE_FEED_SOURCE=http and
+PRICE_FEED_URL=http://localhost:8100/prices, or mount create_app() on an
+httpx.ASGITransport to test the feed in-process.
+
+Usage:
+    python price_feed_stub.py [--port 8100] [--interval 5] [--fail-every 0] [--seed 7]
+"""
+from datetime import datetime
+from typing import Optional
+import argparse
+import random
+import time
+
+from fastapi import FastAPI, HTTPException
+
+from price_feed import synthetic_prices
+
+HISTORY = 100
+
+
+def create_app(interval: float = 5.0, fail_every: int = 0, seed: Optional[int] = None) -> FastAPI:
+    """Stub app; every fail_every-th request answers 503 when set"""
+    app = FastAPI(title="MARA price API stub")
+    rng = random.Random(seed)
+    started = time.time()
+    history = []
+    requests = {"count": 0}
+
+    @app.get("/prices")
+    async def prices():
+        requests["count"] += 1
+        if fail_every and requests["count"] % fail_every == 0:
+            raise HTTPException(status_code=503, detail="Stub outage")
+        # One sample per elapsed tick, keeping the newest HISTORY of them
+        tick = int((time.time() - started) // interval)
+        first = max(history[0][0] + 1 if history else 0, tick - HISTORY + 1)
+        for i in range(first, tick + 1):
+            history.insert(0, (i, synthetic_prices(started + i * interval, rng)))
+        del history[HISTORY:]
+        return [
+            {**sample, "timestamp": datetime.utcfromtimestamp(started + i * interval).isoformat()}
+            for i, sample in history
+        ]
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "requests": requests["count"], "samples": len(history)}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument("--fail-every", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(args.interval, args.fail_every, args.seed), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
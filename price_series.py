@@ -0,0 +1,109 @@
+"""
+Price time-series helpers for SLA-Smart Energy Arbitrage Platform
+
+Raw price samples are rolled up into 1m/1h/1d OHLC buckets as they are
+written, and each resolution has its own retention window so the pricing
+tables stay bounded no matter how long the dashboard polls. This module holds
+the storage-independent parts: bucketing, OHLC merging, retention policy and
+the in-memory latest-price register.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+PRICE_FIELDS = ("energy_price", "hash_price", "token_price")
+
+# Rollup resolutions and their bucket widths
+RESOLUTIONS = {
+    "1m": timedelta(minutes=1),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+
+# "raw" reads the sample table itself
+RANGE_RESOLUTIONS = ("raw",) + tuple(RESOLUTIONS)
+
+DEFAULT_RETENTION = {
+    "raw": timedelta(hours=24),
+    "1m": timedelta(days=7),
+    "1h": timedelta(days=90),
+    "1d": timedelta(days=5 * 365),
+}
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    """Start of the bucket containing timestamp"""
+    if resolution == "1m":
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == "1h":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == "1d":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+
+def new_bucket(sample: Dict, timestamp: datetime) -> Dict:
+    """OHLC columns for a bucket holding one sample"""
+    row = {"samples": 1, "first_sample_at": timestamp, "last_sample_at": timestamp}
+    for name in PRICE_FIELDS:
+        price = sample[name]
+        row.update({f"{name}_open": price, f"{name}_high": price, f"{name}_low": price, f"{name}_close": price})
+    return row
+
+
+def merge_sample(bucket, sample: Dict, timestamp: datetime) -> None:
+    """Fold one sample into an existing bucket object in place; late samples don't move open/close"""
+    for name in PRICE_FIELDS:
+        price = sample[name]
+        setattr(bucket, f"{name}_high", max(getattr(bucket, f"{name}_high"), price))
+        setattr(bucket, f"{name}_low", min(getattr(bucket, f"{name}_low"), price))
+        if timestamp < bucket.first_sample_at:
+            setattr(bucket, f"{name}_open", price)
+        if timestamp >= bucket.last_sample_at:
+            setattr(bucket, f"{name}_close", price)
+    bucket.first_sample_at = min(bucket.first_sample_at, timestamp)
+    bucket.last_sample_at = max(bucket.last_sample_at, timestamp)
+    bucket.samples += 1
+
+
+def retention_cutoffs(now: datetime, retention: Dict[str, timedelta]) -> Dict[str, datetime]:
+    """Oldest timestamp kept for each resolution"""
+    return {resolution: now - keep for resolution, keep in retention.items()}
+
+
+def rollup_to_dict(bucket, resolution: str) -> Dict:
+    """API shape for one rollup bucket"""
+    row = {"timestamp": bucket.bucket_start.isoformat(), "resolution": resolution, "samples": bucket.samples}
+    for name in PRICE_FIELDS:
+        row[name] = {
+            "open": getattr(bucket, f"{name}_open"),
+            "high": getattr(bucket, f"{name}_high"),
+            "low": getattr(bucket, f"{name}_low"),
+            "close": getattr(bucket, f"{name}_close"),
+        }
+    return row
+
+
+class LatestPriceRegister:
+    """Most recent price sample, kept in memory so lookups don't touch the database"""
+
+    def __init__(self):
+        self._latest: Optional[Dict] = None
+        self._timestamp: Optional[datetime] = None
+
+    def get(self) -> Optional[Dict]:
+        return dict(self._latest) if self._latest is not None else None
+
+    @property
+    def timestamp(self) -> Optional[datetime]:
+        return self._timestamp
+
+    def offer(self, pricing: Dict, timestamp: datetime) -> None:
+        """Keep pricing if it is at least as new as the current value"""
+        if self._timestamp is None or timestamp >= self._timestamp:
+            self._latest = pricing
+            self._timestamp = timestamp
+
+    def clear(self) -> None:
+        self._latest = None
+        self._timestamp = None
+
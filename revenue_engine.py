@@ -0,0 +1,220 @@
+"""
+Vectorized fleet revenue engine for SLA-Smart Energy Arbitrage Platform
+
+Packs the site configuration, hardware inventories and allocations into dense
+(sites x hardware classes) NumPy arrays so revenue, power draw and demand
+multipliers for the whole fleet are computed in one batched call.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+import time
+
+import numpy as np
+import pytz
+
+# Hardware classes in column order, with their location in an inventory dict
+HARDWARE_CLASSES = ("gpu", "asic", "air", "hydro", "immersion")
+HARDWARE_PATHS = (
+    ("inference", "gpu"),
+    ("inference", "asic"),
+    ("miners", "air"),
+    ("miners", "hydro"),
+    ("miners", "immersion"),
+)
+ALLOCATION_KEYS = ("gpu_compute", "asic_compute", "air_miners", "hydro_miners", "immersion_miners")
+
+# Inference classes produce tokens, the rest produce hashrate
+INFERENCE_MASK = np.array([True, True, False, False, False])
+MINING_MASK = ~INFERENCE_MASK
+
+# Per-unit output used when a site inventory is missing a hardware class
+DEFAULT_OUTPUT = np.array([1000.0, 50000.0, 1000.0, 5000.0, 10000.0])
+ZERO_ROW = (0,) * len(HARDWARE_CLASSES)
+
+
+@dataclass
+class FleetArrays:
+    """Dense per-site arrays describing the fleet"""
+    site_ids: List[str]
+    timezones: List[str]          # unique timezones referenced by tz_index
+    tz_index: np.ndarray          # (S,) index into timezones
+    cooling_efficiency: np.ndarray  # (S,)
+    energy_cost_multiplier: np.ndarray  # (S,)
+    renewable_energy: np.ndarray  # (S,)
+    power_capacity: np.ndarray    # (S,)
+    output: np.ndarray            # (S, H) tokens or hashrate per unit
+    unit_power: np.ndarray        # (S, H) power draw per unit
+    available: np.ndarray         # (S, H) units available
+    has_inventory: np.ndarray     # (S,) bool
+
+    @property
+    def size(self) -> int:
+        return len(self.site_ids)
+
+    def index(self) -> Dict[str, int]:
+        return {site_id: i for i, site_id in enumerate(self.site_ids)}
+
+
+@dataclass
+class FleetResult:
+    """Batched engine output, one entry per site"""
+    revenue: np.ndarray
+    power_used: np.ndarray
+    demand_multiplier: np.ndarray
+
+
+def hardware_specs(specs: Optional[Dict]) -> tuple:
+    """(output, power) rows for one inventory dict, falling back to defaults"""
+    if not specs:
+        return tuple(DEFAULT_OUTPUT), ZERO_ROW
+    inference = specs.get("inference", {})
+    miners = specs.get("miners", {})
+    entries = (inference.get("gpu", {}), inference.get("asic", {}),
+               miners.get("air", {}), miners.get("hydro", {}), miners.get("immersion", {}))
+    output = tuple(entry.get("tokens" if kind in ("gpu", "asic") else "hashrate", fallback)
+                   for entry, kind, fallback in zip(entries, HARDWARE_CLASSES, DEFAULT_OUTPUT))
+    return output, tuple(entry.get("power", 0) for entry in entries)
+
+
+def available_row(inventory: Dict) -> tuple:
+    inference = inventory.get("inference", {})
+    miners = inventory.get("miners", {})
+    return (inference.get("gpu", {}).get("available", 0), inference.get("asic", {}).get("available", 0),
+            miners.get("air", {}).get("available", 0), miners.get("hydro", {}).get("available", 0),
+            miners.get("immersion", {}).get("available", 0))
+
+
+def pack_fleet(site_config: Dict[str, Dict], site_inventories: Optional[Dict[str, Dict]] = None,
+               mara_inventory: Optional[Dict] = None) -> FleetArrays:
+    """Pack site configuration and inventories into dense arrays.
+
+    Per-unit specs come from each site's inventory; ``mara_inventory`` fills
+    in specs for sites without one (availability is then zero).
+    """
+    site_inventories = site_inventories or {}
+    site_ids = list(site_config.keys())
+
+    timezones: List[str] = []
+    tz_lookup: Dict[str, int] = {}
+    tz_index, cooling, energy, renewable, capacity = [], [], [], [], []
+    output, unit_power, available, has_inventory = [], [], [], []
+
+    # Specs are usually shared by every site, so parse each distinct dict once
+    spec_rows: Dict[int, tuple] = {}
+    for site_id in site_ids:
+        config = site_config[site_id]
+        tz = config["location"]["timezone"]
+        if tz not in tz_lookup:
+            tz_lookup[tz] = len(timezones)
+            timezones.append(tz)
+        tz_index.append(tz_lookup[tz])
+        climate = config["climate"]
+        cooling.append(climate["cooling_efficiency"])
+        renewable.append(climate.get("renewable_energy", 0.5))
+        energy.append(config["energy_cost_multiplier"])
+        capacity.append(config["power_capacity"])
+
+        inventory = site_inventories.get(site_id)
+        specs = inventory or mara_inventory
+        rows = spec_rows.get(id(specs))
+        if rows is None:
+            rows = spec_rows[id(specs)] = hardware_specs(specs)
+        output.append(rows[0])
+        unit_power.append(rows[1])
+        available.append(available_row(inventory) if inventory else ZERO_ROW)
+        has_inventory.append(bool(inventory))
+
+    width = len(HARDWARE_CLASSES)
+    return FleetArrays(
+        site_ids=site_ids,
+        timezones=timezones,
+        tz_index=np.array(tz_index, dtype=np.int32),
+        cooling_efficiency=np.array(cooling, dtype=float),
+        energy_cost_multiplier=np.array(energy, dtype=float),
+        renewable_energy=np.array(renewable, dtype=float),
+        power_capacity=np.array(capacity, dtype=float),
+        output=np.array(output, dtype=float).reshape(-1, width),
+        unit_power=np.array(unit_power, dtype=float).reshape(-1, width),
+        available=np.array(available, dtype=float).reshape(-1, width),
+        has_inventory=np.array(has_inventory, dtype=bool),
+    )
+
+
+def pack_allocations(site_ids: Sequence[str], allocations: Dict[str, Dict]) -> np.ndarray:
+    """Pack per-site allocation dicts into an (S, H) unit-count matrix"""
+    rows = []
+    for site_id in site_ids:
+        allocation = allocations.get(site_id) or {}
+        rows.append([allocation.get(key, 0) for key in ALLOCATION_KEYS])
+    return np.array(rows, dtype=float).reshape(-1, len(ALLOCATION_KEYS))
+
+
+def unpack_allocation(row: np.ndarray) -> Dict[str, int]:
+    """Convert one allocation matrix row back into the API dict shape"""
+    return {key: int(value) for key, value in zip(ALLOCATION_KEYS, row)}
+
+
+@lru_cache(maxsize=None)
+def get_timezone(timezone_str: str):
+    """pytz timezone, built once per name"""
+    return pytz.timezone(timezone_str)
+
+
+def local_hours(timezones: Sequence[str], now: Optional[datetime] = None) -> np.ndarray:
+    """Local hour for each timezone, -1 where the timezone is unknown"""
+    now = now or datetime.now(pytz.utc)
+    hours = np.empty(len(timezones), dtype=np.int32)
+    for i, tz in enumerate(timezones):
+        try:
+            hours[i] = now.astimezone(get_timezone(tz)).hour
+        except Exception:
+            hours[i] = -1
+    return hours
+
+
+def demand_multipliers_for_hours(hours: np.ndarray, timestamp) -> np.ndarray:
+    """Vectorized business-hours demand curve.
+
+    ``timestamp`` may be a scalar or an (N,) array of epoch seconds that
+    broadcasts against the last axis of ``hours``.
+    """
+    base = np.select(
+        [(hours >= 9) & (hours <= 18), ((hours >= 6) & (hours <= 9)) | ((hours >= 18) & (hours <= 22))],
+        [1.5, 1.2],
+        default=0.8,
+    )
+    dynamic_factor = np.sin(np.asarray(timestamp, dtype=float) / 50) * 0.3
+    return np.where(hours < 0, 1.0, np.maximum(0.5, base + dynamic_factor))
+
+
+def fleet_demand_multipliers(fleet: FleetArrays, now: Optional[datetime] = None,
+                             timestamp: Optional[float] = None) -> np.ndarray:
+    """Demand multiplier per site; timezones are resolved once per unique zone"""
+    per_zone = demand_multipliers_for_hours(local_hours(fleet.timezones, now),
+                                            time.time() if timestamp is None else timestamp)
+    return per_zone[fleet.tz_index]
+
+
+def compute_fleet_revenue(fleet: FleetArrays, allocation: np.ndarray, prices: Dict,
+                          inference_scale=1.0, mining_scale=1.0,
+                          demand_multiplier: Optional[np.ndarray] = None) -> FleetResult:
+    """Revenue, power draw and demand multiplier for every site in one call.
+
+    ``inference_scale`` and ``mining_scale`` may be scalars or per-site arrays
+    and are applied to token and hash revenue respectively.
+    """
+    if demand_multiplier is None:
+        demand_multiplier = fleet_demand_multipliers(fleet)
+
+    produced = allocation * fleet.output
+    token_units = produced[:, INFERENCE_MASK].sum(axis=1)
+    hash_units = produced[:, MINING_MASK].sum(axis=1)
+
+    revenue = (token_units * prices.get("token_price", 1.0) * inference_scale +
+               hash_units * prices.get("hash_price", 8.5) * mining_scale)
+    revenue = revenue * demand_multiplier
+    power_used = (allocation * fleet.unit_power).sum(axis=1)
+
+    return FleetResult(revenue=revenue, power_used=power_used, demand_multiplier=demand_multiplier)
@@ -0,0 +1,238 @@
+"""
+Rolling-horizon allocation planner for SLA-Smart Energy Arbitrage Platform
+
+Plans per-site, per-hour allocations over the next 24-72 hours against
+forecast prices, the diurnal demand curve of each site's timezone and the
+firm SLA power still committed in each hour. Hours are independent
+allocation programs, so every (hour, site) row of the horizon is stacked into
+one program and solved in a single vectorized call.
+
+Re-planning is incremental: the horizon slides forward an hour at a time, and
+rows of the previous plan whose inputs have not changed (same hardware, same
+firm SLA power, unit values within a tolerance) keep their allocation instead
+of being solved again. Only re-solved rows need to be written back.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+
+import numpy as np
+
+from allocation_solver import AllocationProblem, NumpyAllocationSolver, build_allocation_problem
+from price_series import PRICE_FIELDS
+from revenue_engine import ALLOCATION_KEYS, FleetArrays, demand_multipliers_for_hours
+from simulation import EPOCH, _epoch_seconds, local_hour_grid
+
+HOUR_SECONDS = 3600
+MAX_HORIZON_HOURS = 72
+# Share of the latest price's deviation from the hourly profile kept per hour ahead
+DEFAULT_PRICE_DECAY = 0.85
+# Relative change in a row's unit values below which its previous allocation is reused
+DEFAULT_REPLAN_TOLERANCE = 0.005
+
+
+def hour_grid(now: datetime, hours: int) -> np.ndarray:
+    """UTC epoch seconds of the start of the current hour and the hours after it"""
+    first = _epoch_seconds(now) // HOUR_SECONDS * HOUR_SECONDS
+    return first + np.arange(hours) * float(HOUR_SECONDS)
+
+
+def hourly_price_profile(samples: Sequence[Tuple[float, Dict]]) -> Optional[np.ndarray]:
+    """(24, 3) mean price per UTC hour of day from (epoch seconds, prices) samples; None without samples.
+
+    Hours of day with no samples take the overall mean.
+    """
+    if not samples:
+        return None
+    hours = np.array([int(timestamp // HOUR_SECONDS) % 24 for timestamp, _ in samples])
+    prices = np.array([[sample[name] for name in PRICE_FIELDS] for _, sample in samples], dtype=float)
+    counts = np.bincount(hours, minlength=24)
+    profile = np.tile(prices.mean(axis=0), (24, 1))
+    for column in range(len(PRICE_FIELDS)):
+        sums = np.bincount(hours, weights=prices[:, column], minlength=24)
+        profile[counts > 0, column] = sums[counts > 0] / counts[counts > 0]
+    return profile
+
+
+def price_forecast(timestamps: np.ndarray, latest: Dict, profile: Optional[np.ndarray] = None,
+                   decay: float = DEFAULT_PRICE_DECAY) -> np.ndarray:
+    """(N, 3) forecast prices per hour: the hourly profile, anchored to the latest price.
+
+    The latest price's deviation from the profile fades by ``decay`` per hour
+    ahead, so near hours follow the market and far hours the daily pattern.
+    Without a profile the latest price is held.
+    """
+    current = np.array([latest[name] for name in PRICE_FIELDS], dtype=float)
+    if profile is None:
+        return np.tile(current, (len(timestamps), 1))
+    hours = (timestamps // HOUR_SECONDS).astype(np.int64) % 24
+    ahead = np.arange(len(timestamps), dtype=float)
+    deviation = current - profile[hours[0]]
+    return profile[hours] + deviation[None, :] * (decay ** ahead)[:, None]
+
+
+def firm_power_grid(site_ids: Sequence[str], windows: Sequence[Tuple[str, float, float]],
+                    timestamps: np.ndarray) -> np.ndarray:
+    """(N, S) firm SLA power per hour and site from (site_id, power, expires epoch seconds) commitments.
+
+    A commitment counts in every hour that starts before it expires.
+    """
+    positions = {site_id: i for i, site_id in enumerate(site_ids)}
+    firm = np.zeros((len(timestamps), len(site_ids)))
+    for site_id, power, expires in windows:
+        i = positions.get(site_id)
+        if i is not None:
+            firm[:, i] += np.where(timestamps < expires, power, 0.0)
+    return firm
+
+
+def demand_grid(fleet: FleetArrays, timestamps: np.ndarray) -> np.ndarray:
+    """(N, S) demand multipliers from each site's timezone business-hours curve"""
+    hours = local_hour_grid(fleet.timezones, timestamps)[fleet.tz_index]
+    return demand_multipliers_for_hours(hours, timestamps).T
+
+
+@dataclass
+class SchedulePlan:
+    """Allocation per hour and site, with the inputs needed to re-plan incrementally"""
+    site_ids: List[str]
+    timestamps: np.ndarray        # (N,) hour starts, UTC epoch seconds
+    allocation: np.ndarray        # (N, S, H) unit counts
+    value: np.ndarray             # (N, S, H) net value per unit and hour
+    firm_sla_power: np.ndarray    # (N, S)
+    unit_power: np.ndarray        # (S, H)
+    available: np.ndarray         # (S, H)
+    power_capacity: np.ndarray    # (S,)
+    changed: np.ndarray           # (N, S) rows solved in this run (new, or inputs changed)
+    planned_at: datetime
+    stats: Dict = field(default_factory=dict)
+
+    @property
+    def power_used(self) -> np.ndarray:
+        """(N, S)"""
+        return (self.allocation * self.unit_power[None]).sum(axis=2)
+
+    @property
+    def expected_value(self) -> np.ndarray:
+        """(N, S) net value of each hour's allocation"""
+        return (self.allocation * self.value).sum(axis=2)
+
+    def rows(self, mask: Optional[np.ndarray] = None) -> List[Dict]:
+        """allocation_schedule rows (naive UTC hour, site, unit counts, ...); all rows, or where mask is set"""
+        hours, sites = np.nonzero(np.ones(self.changed.shape, dtype=bool) if mask is None else mask)
+        starts = [EPOCH + timedelta(seconds=float(t)) for t in self.timestamps]
+        allocation = self.allocation.astype(np.int64)
+        power_used, expected_value = self.power_used, self.expected_value
+        rows = []
+        for h, s in zip(hours.tolist(), sites.tolist()):
+            row = {"hour": starts[h], "site_id": self.site_ids[s]}
+            row.update(zip(ALLOCATION_KEYS, allocation[h, s].tolist()))
+            row.update(power_used=float(power_used[h, s]), expected_value=float(expected_value[h, s]),
+                       firm_sla_power=float(self.firm_sla_power[h, s]), planned_at=self.planned_at)
+            rows.append(row)
+        return rows
+
+
+class RollingHorizonPlanner:
+    """Plans the horizon, reusing the previous plan where its inputs are unchanged"""
+
+    def __init__(self, horizon_hours: int = MAX_HORIZON_HOURS, tolerance: float = DEFAULT_REPLAN_TOLERANCE):
+        self.horizon_hours = horizon_hours
+        self.tolerance = tolerance
+        self.solver = NumpyAllocationSolver()  # rows are independent; MILP does not scale to N x S rows
+        self.plan: Optional[SchedulePlan] = None
+
+    def replan(self, fleet: FleetArrays, timestamps: np.ndarray, prices: np.ndarray, demand: np.ndarray,
+               firm: np.ndarray, planned_at: Optional[datetime] = None) -> SchedulePlan:
+        """Plan every hour of timestamps; prices (N, 3), demand and firm (N, S)"""
+        start = time.perf_counter()
+        n_hours, n_sites = len(timestamps), fleet.size
+        value = np.stack([
+            build_allocation_problem(fleet, dict(zip(PRICE_FIELDS, prices[h])), demand[h]).value
+            for h in range(n_hours)
+        ]) if n_hours else np.zeros((0, n_sites, fleet.unit_power.shape[1]))
+
+        previous, reusable = self._previous_rows(fleet, timestamps, value, firm)
+        solve = ~reusable
+        allocation = np.where(reusable[..., None], previous, 0.0)
+        hours, sites = np.nonzero(solve)
+        if len(hours):
+            problem = AllocationProblem(
+                site_ids=[fleet.site_ids[s] for s in sites.tolist()],
+                value=value[hours, sites],
+                unit_power=fleet.unit_power[sites],
+                available=fleet.available[sites],
+                power_capacity=fleet.power_capacity[sites],
+                firm_sla_power=firm[hours, sites],
+            )
+            # Where the previous allocation is still feasible and as good, keep it
+            solution = self.solver.solve(problem, warm_start=previous[hours, sites])
+            allocation[hours, sites] = solution.allocation
+            infeasible = len(solution.infeasible_sites)
+        else:
+            infeasible = 0
+
+        moved = solve & self._had_previous(fleet, timestamps) & (allocation != previous).any(axis=2)
+        plan = SchedulePlan(
+            site_ids=list(fleet.site_ids),
+            timestamps=timestamps,
+            allocation=allocation,
+            value=value,
+            firm_sla_power=firm,
+            unit_power=fleet.unit_power,
+            available=fleet.available,
+            power_capacity=fleet.power_capacity,
+            changed=solve,
+            planned_at=planned_at or datetime.utcnow(),
+        )
+        plan.stats = {
+            "horizon_hours": n_hours,
+            "sites": n_sites,
+            "rows": n_hours * n_sites,
+            "solved_rows": int(solve.sum()),
+            "reused_rows": int(reusable.sum()),
+            "moved_rows": int(moved.sum()),
+            "infeasible_rows": infeasible,
+            "objective": float(plan.expected_value.sum()),
+            "plan_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+        self.plan = plan
+        return plan
+
+    def _alignment(self, fleet: FleetArrays, timestamps: np.ndarray):
+        """Positions of each hour and site in the previous plan, -1 where absent"""
+        previous = self.plan
+        hour_lookup = {float(t): i for i, t in enumerate(previous.timestamps)}
+        site_lookup = {site_id: i for i, site_id in enumerate(previous.site_ids)}
+        hours = np.array([hour_lookup.get(float(t), -1) for t in timestamps], dtype=np.int64)
+        sites = np.array([site_lookup.get(site_id, -1) for site_id in fleet.site_ids], dtype=np.int64)
+        return hours, sites
+
+    def _had_previous(self, fleet: FleetArrays, timestamps: np.ndarray) -> np.ndarray:
+        if self.plan is None:
+            return np.zeros((len(timestamps), fleet.size), dtype=bool)
+        hours, sites = self._alignment(fleet, timestamps)
+        return (hours >= 0)[:, None] & (sites >= 0)[None, :]
+
+    def _previous_rows(self, fleet: FleetArrays, timestamps: np.ndarray, value: np.ndarray,
+                       firm: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Previous allocation aligned to this horizon (zeros where none) and the rows that can reuse it"""
+        shape = value.shape
+        if self.plan is None:
+            return np.zeros(shape), np.zeros(shape[:2], dtype=bool)
+        previous = self.plan
+        hours, sites = self._alignment(fleet, timestamps)
+        present = (hours >= 0)[:, None] & (sites >= 0)[None, :]
+        h, s = np.maximum(hours, 0), np.maximum(sites, 0)
+        allocation = np.where(present[..., None], previous.allocation[h][:, s], 0.0)
+
+        # Same hardware and capacity per site, same firm power and near-identical values per row
+        same_site = ((previous.unit_power[s] == fleet.unit_power).all(axis=1) &
+                     (previous.available[s] == fleet.available).all(axis=1) &
+                     (previous.power_capacity[s] == fleet.power_capacity))
+        old_value = previous.value[h][:, s]
+        scale = np.maximum(np.abs(value), np.abs(old_value)).max(axis=2)
+        close = (np.abs(value - old_value).max(axis=2) <= self.tolerance * np.maximum(scale, 1e-12))
+        reusable = present & same_site[None, :] & (previous.firm_sla_power[h][:, s] == firm) & close
+        return allocation, reusable
@@ -0,0 +1,232 @@
+"""
+Vectorized weather and demand simulation for SLA-Smart Energy Arbitrage Platform
+
+Generates temperature and demand-multiplier series for every site x N
+timesteps in one NumPy call. Runs are driven by an explicit seed and clock,
+so a backtest replays exactly, and UTC offsets are resolved once per timezone
+from its transition table rather than converting datetimes per site per step.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pytz
+
+from revenue_engine import demand_multipliers_for_hours, get_timezone
+
+EPOCH = datetime(1970, 1, 1)
+
+# Temperature model, matching the live dashboard's weather simulation
+TEMP_WAVE_PERIOD = 100    # seconds per radian of the slow oscillation
+TEMP_WAVE_AMPLITUDE = 10.0
+TEMP_NOISE = 20.0         # uniform noise in [-TEMP_NOISE, TEMP_NOISE]
+DEFAULT_AVG_TEMP = 70.0
+
+# SplitMix64 constants for counter-based draws
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+_MASK64 = (1 << 64) - 1
+
+
+@dataclass
+class SimulationClock:
+    """Explicit simulation timeline: ``steps`` ticks of ``step`` from ``start``"""
+    start: datetime
+    step: timedelta = timedelta(hours=1)
+    steps: int = 1
+
+    @classmethod
+    def hourly(cls, start: datetime, hours: int) -> "SimulationClock":
+        return cls(start=start, step=timedelta(hours=1), steps=hours)
+
+    @classmethod
+    def at(cls, moment: datetime) -> "SimulationClock":
+        """A single tick, e.g. the current request time"""
+        return cls(start=moment, steps=1)
+
+    @property
+    def start_seconds(self) -> float:
+        return _epoch_seconds(self.start)
+
+    def timestamps(self, first: int = 0, count: Optional[int] = None) -> np.ndarray:
+        """UTC epoch seconds for steps [first, first + count)"""
+        count = self.steps - first if count is None else count
+        return self.start_seconds + (first + np.arange(count)) * self.step.total_seconds()
+
+
+@dataclass
+class SimulationResult:
+    """Per-site series, one row per site and one column per timestep"""
+    site_ids: List[str]
+    timestamps: np.ndarray         # (N,) UTC epoch seconds
+    local_hours: np.ndarray        # (S, N) local hour, -1 where the timezone is unknown
+    temperature: np.ndarray        # (S, N) degrees F
+    demand_multiplier: np.ndarray  # (S, N)
+
+    def site(self, site_id: str) -> Dict[str, np.ndarray]:
+        i = self.site_ids.index(site_id)
+        return {"timestamps": self.timestamps, "temperature": self.temperature[i],
+                "demand_multiplier": self.demand_multiplier[i]}
+
+
+def _splitmix64(value: int) -> int:
+    value = (value + _GOLDEN) & _MASK64
+    value = ((value ^ (value >> 30)) * _MIX1) & _MASK64
+    value = ((value ^ (value >> 27)) * _MIX2) & _MASK64
+    return value ^ (value >> 31)
+
+
+def keyed_uniform(key: int, site_keys: np.ndarray, streams: int) -> np.ndarray:
+    """(S, streams) uniforms in [0, 1) that depend only on (key, site key, stream).
+
+    Counter-based (SplitMix64), so any subset of sites can be drawn on its own
+    and gets the same values it would get in a whole-fleet draw.
+    """
+    with np.errstate(over="ignore"):
+        counters = (site_keys.astype(np.uint64)[:, None] * np.uint64(streams)
+                    + np.arange(streams, dtype=np.uint64) + np.uint64(key))
+        z = counters * np.uint64(_GOLDEN)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX1)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX2)
+        z ^= z >> np.uint64(31)
+    return (z >> np.uint64(11)).astype(float) * 2.0 ** -53
+
+
+def _epoch_seconds(moment: datetime) -> float:
+    """UTC epoch seconds; naive datetimes are taken as UTC"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(pytz.utc).replace(tzinfo=None)
+    return (moment - EPOCH).total_seconds()
+
+
+@lru_cache(maxsize=None)
+def _offset_table(timezone_str: str) -> Optional[tuple]:
+    """(transition epoch seconds, UTC offset seconds) for a timezone, None if unknown"""
+    try:
+        tz = get_timezone(timezone_str)
+    except pytz.UnknownTimeZoneError:
+        return None
+    transitions = getattr(tz, "_utc_transition_times", None)
+    if not transitions:
+        # Fixed-offset zones (UTC, Etc/GMT+5, ...)
+        offset = tz.utcoffset(datetime(2000, 1, 1)).total_seconds()
+        return np.array([-np.inf]), np.array([offset])
+    edges = np.array([(moment - EPOCH).total_seconds() for moment in transitions])
+    edges[0] = -np.inf  # pytz starts the table at datetime.min
+    offsets = np.array([info[0].total_seconds() for info in tz._transition_info])
+    return edges, offsets
+
+
+def utc_offsets(timezone_str: str, timestamps: np.ndarray) -> Optional[np.ndarray]:
+    """UTC offset in seconds at each timestamp (DST aware), None for an unknown timezone"""
+    table = _offset_table(timezone_str)
+    if table is None:
+        return None
+    edges, offsets = table
+    return offsets[np.searchsorted(edges, timestamps, side="right") - 1]
+
+
+def local_hour_grid(timezones: Sequence[str], timestamps: np.ndarray) -> np.ndarray:
+    """(Z, N) local hour per timezone and timestep, -1 rows for unknown timezones"""
+    hours = np.full((len(timezones), len(timestamps)), -1, dtype=np.int32)
+    for z, tz in enumerate(timezones):
+        offsets = utc_offsets(tz, timestamps)
+        if offsets is not None:
+            hours[z] = ((timestamps + offsets) // 3600) % 24
+    return hours
+
+
+class FleetSimulator:
+    """Seeded weather and demand simulation over a fixed fleet.
+
+    Site constants (base temperature, timezone index) are packed once.
+    ``run`` draws noise time-major, so running a clock in chunks via
+    ``iter_chunks`` yields exactly the same series as one call.
+    """
+
+    def __init__(self, site_config: Dict[str, Dict], seed: Optional[int] = None):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.stream_key = int(np.random.SeedSequence(seed).generate_state(1, np.uint64)[0])
+        self.site_ids = list(site_config)
+        self.base_temp = np.array([config.get("climate", {}).get("avg_temp", DEFAULT_AVG_TEMP)
+                                   for config in site_config.values()], dtype=float)
+        self.timezones: List[str] = []
+        tz_lookup: Dict[str, int] = {}
+        tz_index = []
+        for config in site_config.values():
+            tz = config.get("location", {}).get("timezone", "UTC")
+            if tz not in tz_lookup:
+                tz_lookup[tz] = len(self.timezones)
+                self.timezones.append(tz)
+            tz_index.append(tz_lookup[tz])
+        self.tz_index = np.array(tz_index, dtype=np.int32)
+
+    @property
+    def size(self) -> int:
+        return len(self.site_ids)
+
+    def local_hours(self, timestamps: np.ndarray) -> np.ndarray:
+        return local_hour_grid(self.timezones, timestamps)[self.tz_index]
+
+    def demand(self, timestamps: np.ndarray, hours: Optional[np.ndarray] = None) -> np.ndarray:
+        """(S, N) demand multipliers from the business-hours curve"""
+        hours = self.local_hours(timestamps) if hours is None else hours
+        return demand_multipliers_for_hours(hours, timestamps)
+
+    def temperature(self, timestamps: np.ndarray, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """(S, N) temperatures: base + slow oscillation + uniform noise"""
+        rng = self.rng if rng is None else rng
+        noise = rng.uniform(-TEMP_NOISE, TEMP_NOISE, size=(len(timestamps), self.size)).T
+        wave = np.sin(timestamps / TEMP_WAVE_PERIOD) * TEMP_WAVE_AMPLITUDE
+        return self.base_temp[:, None] + wave + noise
+
+    def run(self, clock: SimulationClock, seed: Optional[int] = None) -> SimulationResult:
+        """Simulate the whole clock; with a seed the result depends only on (seed, clock)"""
+        rng = self.rng if seed is None else np.random.default_rng(seed)
+        return self._simulate(clock.timestamps(), rng)
+
+    def iter_chunks(self, clock: SimulationClock, chunk_steps: int = 24 * 7,
+                    seed: Optional[int] = None) -> Iterator[SimulationResult]:
+        """Same series as ``run`` in bounded-memory slices of ``chunk_steps``"""
+        rng = self.rng if seed is None else np.random.default_rng(seed)
+        for first in range(0, clock.steps, chunk_steps):
+            yield self._simulate(clock.timestamps(first, min(chunk_steps, clock.steps - first)), rng)
+
+    def temperature_now(self, now: Optional[datetime] = None) -> np.ndarray:
+        """(S,) temperatures for one tick, e.g. the current request time"""
+        moment = now or datetime.now(pytz.utc)
+        return self.temperature(SimulationClock.at(moment).timestamps())[:, 0]
+
+    def tick_draws(self, tick: int, site_keys: np.ndarray, streams: int) -> np.ndarray:
+        """(S, streams) uniforms for one tick; the same (tick, site) always draws the same values"""
+        return keyed_uniform(_splitmix64(self.stream_key ^ (tick & _MASK64)), site_keys, streams)
+
+    def temperature_tick(self, moment: datetime, noise_draws: np.ndarray,
+                         rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(R,) temperatures at moment from per-site uniform draws, for the given positions or every site"""
+        base = self.base_temp if rows is None else self.base_temp[rows]
+        wave = np.sin(_epoch_seconds(moment) / TEMP_WAVE_PERIOD) * TEMP_WAVE_AMPLITUDE
+        return base + wave + (2.0 * noise_draws - 1.0) * TEMP_NOISE
+
+    def weather_now(self, now: Optional[datetime] = None) -> Dict[str, Dict]:
+        """One tick of weather per site, in the dashboard's weather dict shape"""
+        temperature = self.temperature_now(now)
+        return {
+            site_id: {"temperature": float(temperature[i]), "base_temp": float(self.base_temp[i]),
+                      "conditions": "simulated"}
+            for i, site_id in enumerate(self.site_ids)
+        }
+
+    def _simulate(self, timestamps: np.ndarray, rng: np.random.Generator) -> SimulationResult:
+        hours = self.local_hours(timestamps)
+        return SimulationResult(
+            site_ids=self.site_ids,
+            timestamps=timestamps,
+            local_hours=hours,
+            temperature=self.temperature(timestamps, rng),
+            demand_multiplier=self.demand(timestamps, hours),
+        )
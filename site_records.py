@@ -0,0 +1,226 @@
+"""
+Compiled site records for SLA-Smart Energy Arbitrage Platform
+
+Site configuration and stored hardware inventories are nested JSON dicts.
+Hot paths read them through compact ``__slots__`` records instead, compiled
+once and indexed by site id. The numeric columns are also kept as NumPy
+arrays for batched math, and packed fleets are cached until the inventories
+change. Nested dicts are rebuilt only where a response needs them.
+"""
+import hashlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from revenue_engine import (ALLOCATION_KEYS, HARDWARE_CLASSES, HARDWARE_PATHS, FleetArrays,
+                            available_row, hardware_specs)
+
+# Simulated allocations draw each class from [low, min(cap, available)], never above
+# what the site has; sites without an inventory use the fallback availability
+SIMULATED_ALLOCATION_LOW = np.array([20, 5, 10, 5, 2])
+SIMULATED_ALLOCATION_CAP = np.array([80, 30, 40, 20, 15])
+FALLBACK_AVAILABLE = (100, 50, 50, 20, 10)
+
+
+class SiteRecord:
+    """One site's static configuration"""
+    __slots__ = ("site_id", "name", "latitude", "longitude", "timezone", "avg_temp", "cooling_efficiency",
+                 "renewable_energy", "gpu_ratio", "asic_ratio", "cooling_type", "power_capacity",
+                 "energy_cost_multiplier", "location")
+
+    def __init__(self, site_id: str, config: Dict):
+        location, climate = config["location"], config["climate"]
+        profile = config.get("hardware_profile", {})
+        self.site_id = site_id
+        self.name = config["name"]
+        self.latitude = location.get("lat")
+        self.longitude = location.get("lon")
+        self.timezone = location["timezone"]
+        self.avg_temp = climate.get("avg_temp", 70)
+        self.cooling_efficiency = climate["cooling_efficiency"]
+        self.renewable_energy = climate.get("renewable_energy", 0.5)
+        self.gpu_ratio = profile.get("gpu_ratio", 0.5)
+        self.asic_ratio = profile.get("asic_ratio", 0.5)
+        self.cooling_type = profile.get("cooling_type")
+        self.power_capacity = config["power_capacity"]
+        self.energy_cost_multiplier = config["energy_cost_multiplier"]
+        # Shared by every response that includes the site's location
+        self.location = {"lat": self.latitude, "lon": self.longitude, "timezone": self.timezone}
+
+    def to_config(self) -> Dict:
+        """The site in MULTI_SITE_CONFIG shape"""
+        return {
+            "name": self.name,
+            "location": dict(self.location),
+            "climate": {"avg_temp": self.avg_temp, "cooling_efficiency": self.cooling_efficiency,
+                        "renewable_energy": self.renewable_energy},
+            "hardware_profile": {"gpu_ratio": self.gpu_ratio, "asic_ratio": self.asic_ratio,
+                                 "cooling_type": self.cooling_type},
+            "power_capacity": self.power_capacity,
+            "energy_cost_multiplier": self.energy_cost_multiplier,
+        }
+
+
+class InventoryRecord:
+    """One site's hardware, columns in HARDWARE_CLASSES order"""
+    __slots__ = ("available", "output", "unit_power", "limits", "site_specs")
+
+    def __init__(self, inventory: Dict):
+        self.output, self.unit_power = hardware_specs(inventory)
+        self.available = available_row(inventory)
+        # Classes missing from the inventory fall back like an absent inventory does
+        self.limits = tuple(
+            inventory.get(group, {}).get(kind, {}).get("available", fallback)
+            for (group, kind), fallback in zip(HARDWARE_PATHS, FALLBACK_AVAILABLE)
+        )
+        self.site_specs = inventory.get("site_specs", {})
+
+    def to_json(self) -> Dict:
+        """The inventory in its stored JSON shape"""
+        entries = {
+            kind: {"tokens" if group == "inference" else "hashrate": output, "power": power, "available": available}
+            for (group, kind), output, power, available in zip(HARDWARE_PATHS, self.output, self.unit_power, self.available)
+        }
+        return {
+            "miners": {kind: entries[kind] for kind in ("air", "hydro", "immersion")},
+            "inference": {kind: entries[kind] for kind in ("gpu", "asic")},
+            "site_specs": dict(self.site_specs),
+        }
+
+
+class SiteIndex:
+    """Site and inventory records by id, with per-site columns as arrays"""
+
+    def __init__(self, site_config: Dict[str, Dict]):
+        self.records: List[SiteRecord] = [SiteRecord(site_id, config) for site_id, config in site_config.items()]
+        self.by_id: Dict[str, SiteRecord] = {record.site_id: record for record in self.records}
+        self.position: Dict[str, int] = {record.site_id: i for i, record in enumerate(self.records)}
+        self.site_ids = [record.site_id for record in self.records]
+        # Stable per-site keys for counter-based simulation draws
+        self.site_keys = np.array([int.from_bytes(hashlib.blake2b(site_id.encode(), digest_size=8).digest(), "little")
+                                   for site_id in self.site_ids], dtype=np.uint64)
+
+        self.timezones: List[str] = list(dict.fromkeys(record.timezone for record in self.records))
+        tz_lookup = {tz: i for i, tz in enumerate(self.timezones)}
+        self.tz_index = np.array([tz_lookup[record.timezone] for record in self.records], dtype=np.int32)
+        # Region is the timezone's area ("Europe" for Europe/Oslo), aligned with timezones
+        self.regions: List[str] = [tz.split("/")[0] for tz in self.timezones]
+        self.cooling_types = np.array([record.cooling_type or "" for record in self.records], dtype=str)
+        self.cooling_efficiency = np.array([record.cooling_efficiency for record in self.records], dtype=float)
+        self.energy_cost_multiplier = np.array([record.energy_cost_multiplier for record in self.records], dtype=float)
+        self.renewable_energy = np.array([record.renewable_energy for record in self.records], dtype=float)
+        self.power_capacity = np.array([record.power_capacity for record in self.records], dtype=float)
+
+        self.inventories: Dict[str, InventoryRecord] = {}
+        self.inventories_loaded = False
+        self.inventory_version = 0
+        self._packed: Dict[bool, Tuple[int, Optional[Dict], FleetArrays]] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[SiteRecord]:
+        return iter(self.records)
+
+    def __contains__(self, site_id: str) -> bool:
+        return site_id in self.by_id
+
+    def get(self, site_id: str) -> SiteRecord:
+        return self.by_id[site_id]
+
+    def load_inventories(self, inventories: Dict[str, Dict]) -> None:
+        """Compile stored inventory JSON; call again whenever the inventories are rewritten"""
+        self.inventories = {site_id: InventoryRecord(inventory) for site_id, inventory in inventories.items()
+                            if inventory and site_id in self.by_id}
+        self.inventories_loaded = True
+        self.inventory_version += 1
+        self._packed.clear()
+
+    def inventory_json(self, site_id: str) -> Dict:
+        inventory = self.inventories.get(site_id)
+        return inventory.to_json() if inventory else {}
+
+    def pack(self, mara_inventory: Optional[Dict] = None, with_inventories: bool = True) -> FleetArrays:
+        """Fleet arrays like pack_fleet, cached until inventories or MARA specs change.
+
+        The result is shared between callers and must be treated as read-only.
+        """
+        cached = self._packed.get(with_inventories)
+        if cached and cached[0] == self.inventory_version and cached[1] == mara_inventory:
+            return cached[2]
+        default_output, default_power = hardware_specs(mara_inventory)
+        output, unit_power, available, has_inventory = [], [], [], []
+        for record in self.records:
+            inventory = self.inventories.get(record.site_id) if with_inventories else None
+            output.append(inventory.output if inventory else default_output)
+            unit_power.append(inventory.unit_power if inventory else default_power)
+            available.append(inventory.available if inventory else (0,) * len(HARDWARE_CLASSES))
+            has_inventory.append(inventory is not None)
+
+        width = len(HARDWARE_CLASSES)
+        fleet = FleetArrays(
+            site_ids=self.site_ids,
+            timezones=self.timezones,
+            tz_index=self.tz_index,
+            cooling_efficiency=self.cooling_efficiency,
+            energy_cost_multiplier=self.energy_cost_multiplier,
+            renewable_energy=self.renewable_energy,
+            power_capacity=self.power_capacity,
+            output=np.array(output, dtype=float).reshape(-1, width),
+            unit_power=np.array(unit_power, dtype=float).reshape(-1, width),
+            available=np.array(available, dtype=float).reshape(-1, width),
+            has_inventory=np.array(has_inventory, dtype=bool),
+        )
+        self._packed[with_inventories] = (self.inventory_version, mara_inventory, fleet)
+        return fleet
+
+    def subset(self, fleet: FleetArrays, site_ids: List[str]) -> FleetArrays:
+        """Rows of a packed fleet for some sites, in the given order"""
+        if site_ids == fleet.site_ids:
+            return fleet
+        return self.take(fleet, np.array([self.position[site_id] for site_id in site_ids], dtype=np.int64))
+
+    def take(self, fleet: FleetArrays, rows: np.ndarray) -> FleetArrays:
+        """Rows of a packed fleet by index position"""
+        return FleetArrays(
+            site_ids=[self.site_ids[row] for row in rows.tolist()],
+            timezones=fleet.timezones,
+            tz_index=fleet.tz_index[rows],
+            cooling_efficiency=fleet.cooling_efficiency[rows],
+            energy_cost_multiplier=fleet.energy_cost_multiplier[rows],
+            renewable_energy=fleet.renewable_energy[rows],
+            power_capacity=fleet.power_capacity[rows],
+            output=fleet.output[rows],
+            unit_power=fleet.unit_power[rows],
+            available=fleet.available[rows],
+            has_inventory=fleet.has_inventory[rows],
+        )
+
+    def select(self, timezones: Optional[Sequence[str]] = None, regions: Optional[Sequence[str]] = None,
+               cooling_types: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Index positions of sites matching every given filter, in index order"""
+        mask = np.ones(len(self.records), dtype=bool)
+        if timezones or regions:
+            zones = [i for i, (tz, region) in enumerate(zip(self.timezones, self.regions))
+                     if (not timezones or tz in timezones) and (not regions or region in regions)]
+            mask &= np.isin(self.tz_index, zones)
+        if cooling_types:
+            mask &= np.isin(self.cooling_types, list(cooling_types))
+        return np.flatnonzero(mask)
+
+    def simulate_allocations(self, draws: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(R, H) demo allocation from (R, H) uniform draws, for the given positions or every site"""
+        records = self.records if rows is None else [self.records[row] for row in rows.tolist()]
+        limits = np.array([self.inventories[record.site_id].limits if record.site_id in self.inventories
+                           else FALLBACK_AVAILABLE for record in records]).reshape(-1, len(ALLOCATION_KEYS))
+        high = np.minimum(SIMULATED_ALLOCATION_CAP, limits)
+        low = np.minimum(SIMULATED_ALLOCATION_LOW, high)
+        return low + np.floor(draws * (high - low + 1))
+
+    def efficiency_scores(self, temperature: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Site efficiency score from temperature, cooling efficiency and energy cost, capped at 100"""
+        cooling = self.cooling_efficiency if rows is None else self.cooling_efficiency[rows]
+        cost = self.energy_cost_multiplier if rows is None else self.energy_cost_multiplier[rows]
+        temp_factor = np.maximum(0.5, 1.0 - (temperature - 20) / 50)
+        energy_factor = np.maximum(0.3, 1.0 / cost)
+        return np.minimum(100.0, 80.0 * temp_factor * cooling * energy_factor)
@@ -0,0 +1,172 @@
+"""
+Site registry for SLA-Smart Energy Arbitrage Platform
+
+Sites are rows in the ``sites`` table. Request handlers never query them:
+the registry keeps the current fleet in memory as a SiteIndex (records by
+site id plus per-site array columns) and a FleetSimulator, loaded at startup
+and rebuilt after every site write. This module also validates site rows
+from JSON or CSV imports and apportions fleet hardware across sites.
+"""
+from typing import Dict, Iterable, List, Optional
+import csv
+import io
+import re
+
+import numpy as np
+import pytz
+
+from simulation import FleetSimulator
+from site_records import SiteIndex
+
+SITE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Flat site row fields: (type, default, minimum, maximum); a default of ... marks a required field
+SITE_FIELDS = {
+    "site_id": (str, ..., None, None),
+    "name": (str, ..., None, None),
+    "latitude": (float, None, -90.0, 90.0),
+    "longitude": (float, None, -180.0, 180.0),
+    "timezone": (str, ..., None, None),
+    "avg_temp": (float, 70.0, None, None),
+    "cooling_efficiency": (float, ..., 0.0, 1.0),
+    "renewable_energy": (float, 0.5, 0.0, 1.0),
+    "gpu_ratio": (float, 0.5, 0.0, 1.0),
+    "asic_ratio": (float, 0.5, 0.0, 1.0),
+    "cooling_type": (str, None, None, None),
+    "power_capacity": (float, ..., 0.0, None),
+    "energy_cost_multiplier": (float, 1.0, 0.0, None),
+}
+
+
+def config_to_row(site_id: str, config: Dict) -> Dict:
+    """A MULTI_SITE_CONFIG entry as a flat site row"""
+    location, climate = config["location"], config["climate"]
+    profile = config.get("hardware_profile", {})
+    return {
+        "site_id": site_id,
+        "name": config["name"],
+        "latitude": location.get("lat"),
+        "longitude": location.get("lon"),
+        "timezone": location["timezone"],
+        "avg_temp": climate.get("avg_temp", 70.0),
+        "cooling_efficiency": climate["cooling_efficiency"],
+        "renewable_energy": climate.get("renewable_energy", 0.5),
+        "gpu_ratio": profile.get("gpu_ratio", 0.5),
+        "asic_ratio": profile.get("asic_ratio", 0.5),
+        "cooling_type": profile.get("cooling_type"),
+        "power_capacity": config["power_capacity"],
+        "energy_cost_multiplier": config.get("energy_cost_multiplier", 1.0),
+    }
+
+
+def row_to_config(row: Dict) -> Dict:
+    """A flat site row in MULTI_SITE_CONFIG shape"""
+    return {
+        "name": row["name"],
+        "location": {"lat": row.get("latitude"), "lon": row.get("longitude"), "timezone": row["timezone"]},
+        "climate": {"avg_temp": row.get("avg_temp", 70.0), "cooling_efficiency": row["cooling_efficiency"],
+                    "renewable_energy": row.get("renewable_energy", 0.5)},
+        "hardware_profile": {"gpu_ratio": row.get("gpu_ratio", 0.5), "asic_ratio": row.get("asic_ratio", 0.5),
+                             "cooling_type": row.get("cooling_type")},
+        "power_capacity": row["power_capacity"],
+        "energy_cost_multiplier": row.get("energy_cost_multiplier", 1.0),
+    }
+
+
+def validate_site_row(row: Dict) -> Dict:
+    """Check and coerce one site row; raises ValueError naming the bad field"""
+    if not isinstance(row, dict):
+        raise ValueError("site must be an object")
+    unknown = set(row) - set(SITE_FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    site = {}
+    for name, (kind, default, low, high) in SITE_FIELDS.items():
+        value = row.get(name)
+        if value is None or value == "":
+            if default is ...:
+                raise ValueError(f"{name} is required")
+            site[name] = default
+            continue
+        try:
+            value = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number") from None
+        if kind is float and not np.isfinite(value):
+            raise ValueError(f"{name} must be finite")
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise ValueError(f"{name} must be " + (f"between {low} and {high}" if high is not None else f"at least {low}"))
+        site[name] = value
+    if not SITE_ID_PATTERN.match(site["site_id"]):
+        raise ValueError("site_id must be 1-64 letters, digits, '_' or '-'")
+    if site["timezone"] not in pytz.all_timezones_set:
+        raise ValueError(f"unknown timezone {site['timezone']}")
+    if site["power_capacity"] <= 0 or site["energy_cost_multiplier"] <= 0:
+        raise ValueError("power_capacity and energy_cost_multiplier must be positive")
+    return site
+
+
+def parse_site_rows(rows: Iterable[Dict]) -> List[Dict]:
+    """Validate imported rows; errors name the 1-based row number"""
+    sites, seen = [], set()
+    for number, row in enumerate(rows, start=1):
+        try:
+            site = validate_site_row(row)
+        except ValueError as e:
+            raise ValueError(f"row {number}: {e}") from None
+        if site["site_id"] in seen:
+            raise ValueError(f"row {number}: duplicate site_id {site['site_id']}")
+        seen.add(site["site_id"])
+        sites.append(site)
+    return sites
+
+
+def parse_sites_csv(text: str) -> List[Dict]:
+    """Validate a CSV import with a header row of site fields"""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ValueError("CSV import needs a header row")
+    return parse_site_rows({key.strip(): value.strip() if isinstance(value, str) else value
+                            for key, value in row.items() if key} for row in reader)
+
+
+def apportion(total: int, weights: np.ndarray) -> np.ndarray:
+    """Split a whole number of units in proportion to weights (largest remainder)"""
+    weights = np.clip(np.asarray(weights, dtype=float), 0.0, None)
+    if weights.sum() <= 0 or total <= 0:
+        return np.zeros(len(weights), dtype=np.int64)
+    quotas = total * weights / weights.sum()
+    units = np.floor(quotas).astype(np.int64)
+    leftover = int(total - units.sum())
+    if leftover:
+        # Stable sort so ties go to the earlier site
+        units[np.argsort(-(quotas - units), kind="stable")[:leftover]] += 1
+    return units
+
+
+class SiteRegistry:
+    """The current fleet: site config, compiled index and weather simulator"""
+
+    def __init__(self, site_config: Dict[str, Dict], seed: Optional[int] = None):
+        self.seed = seed
+        self.version = 0
+        self.load(site_config)
+
+    def load(self, site_config: Dict[str, Dict], index: Optional[SiteIndex] = None) -> None:
+        """Replace the fleet; inventories recompile on next use"""
+        self.config = dict(site_config)
+        self.index = index if index is not None else SiteIndex(self.config)
+        self.simulator = FleetSimulator(self.config, seed=self.seed)
+        self.version += 1
+
+    def load_rows(self, rows: List[Dict]) -> None:
+        self.load({row["site_id"]: row_to_config(row) for row in rows})
+
+    def rows(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Flat rows for a slice of the fleet, in registry order"""
+        site_ids = self.index.site_ids[offset:None if limit is None else offset + limit]
+        return [config_to_row(site_id, self.config[site_id]) for site_id in site_ids]
+
+    def row(self, site_id: str) -> Optional[Dict]:
+        config = self.config.get(site_id)
+        return config_to_row(site_id, config) if config else None
@@ -0,0 +1,354 @@
+"""
+Fleet status views for SLA-Smart Energy Arbitrage Platform
+
+/api/sites/status serves the whole fleet or a filtered, field-projected page
+of it. Simulated usage, weather and uptime are drawn per (tick, site) with
+counter-based draws, so a page computes only its own sites and still agrees
+with the full snapshot and with every other page of the same tick.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import base64
+import binascii
+import time
+
+import numpy as np
+import pytz
+
+from metrics import observe_stage, stage
+from revenue_engine import compute_fleet_revenue, fleet_demand_multipliers, get_timezone, unpack_allocation
+from simulation import FleetSimulator
+from site_records import SiteIndex
+
+# Global hardware counts, in HARDWARE_CLASSES order
+HARDWARE_TOTAL_KEYS = ("gpu_units", "asic_units", "air_miners", "hydro_miners", "immersion_miners")
+
+# Uniform draws per site and tick: five allocation classes, temperature noise, uptime
+DRAW_STREAMS = 7
+UPTIME_RANGE = (98.5, 99.9)
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+# Sites simulated per pass while scanning for a utilization range
+SCAN_CHUNK = 1024
+
+# Per-site response fields, in response order; site_id is always included
+STATUS_FIELDS = ("site_id", "id", "name", "location", "timezone", "hardware_inventory", "allocation",
+                 "power_used", "power_capacity", "power_utilization", "weather", "current_temp", "local_time",
+                 "cooling_efficiency", "pricing", "energy_price", "energy_cost_multiplier", "revenue",
+                 "uptime", "efficiency_score", "last_updated")
+# Fields that need the simulated usage and weather
+SIMULATED_FIELDS = frozenset({"allocation", "power_used", "power_utilization", "weather", "current_temp",
+                              "revenue", "uptime", "efficiency_score"})
+
+
+def encode_cursor(site_id: str) -> str:
+    """Opaque page cursor: the last site id served"""
+    return base64.urlsafe_b64encode(site_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("invalid cursor") from None
+
+
+def _split(value: Optional[str]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(part.strip() for part in value.split(",") if part.strip())) if value else ()
+
+
+@dataclass(frozen=True)
+class StatusQuery:
+    """Filters, projection and page of a /api/sites/status request"""
+    fields: Optional[Tuple[str, ...]] = None
+    timezones: Tuple[str, ...] = ()
+    regions: Tuple[str, ...] = ()
+    cooling_types: Tuple[str, ...] = ()
+    min_utilization: Optional[float] = None
+    max_utilization: Optional[float] = None
+    after: Optional[str] = None      # site id from the cursor
+    limit: Optional[int] = None
+
+    @classmethod
+    def parse(cls, fields: Optional[str] = None, timezone: Optional[str] = None, region: Optional[str] = None,
+              cooling_type: Optional[str] = None, min_utilization: Optional[float] = None,
+              max_utilization: Optional[float] = None, cursor: Optional[str] = None,
+              limit: Optional[int] = None) -> "StatusQuery":
+        """Build from query parameters (comma-separated lists); raises ValueError"""
+        projection = None
+        if fields:
+            requested = _split(fields)
+            unknown = [name for name in requested if name not in STATUS_FIELDS]
+            if unknown:
+                raise ValueError(f"unknown fields: {', '.join(unknown)}")
+            projection = tuple(name for name in STATUS_FIELDS if name == "site_id" or name in requested)
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        for value in (min_utilization, max_utilization):
+            if value is not None and not np.isfinite(value):
+                raise ValueError("utilization bounds must be finite")
+        if min_utilization is not None and max_utilization is not None and min_utilization > max_utilization:
+            raise ValueError("min_utilization must not exceed max_utilization")
+        return cls(fields=projection, timezones=_split(timezone), regions=_split(region),
+                   cooling_types=_split(cooling_type), min_utilization=min_utilization,
+                   max_utilization=max_utilization, after=decode_cursor(cursor) if cursor else None, limit=limit)
+
+    @property
+    def paged(self) -> bool:
+        return self.limit is not None or self.after is not None
+
+    @property
+    def is_default(self) -> bool:
+        """The unfiltered whole-fleet view, served from the shared snapshot"""
+        return self == StatusQuery()
+
+    @property
+    def utilization_range(self) -> bool:
+        return self.min_utilization is not None or self.max_utilization is not None
+
+    def key(self) -> str:
+        """Stable text form, for cache validators"""
+        return repr((self.fields, self.timezones, self.regions, self.cooling_types,
+                     self.min_utilization, self.max_utilization, self.after, self.limit))
+
+
+def tick_moment(tick: int, tick_seconds: float) -> datetime:
+    """UTC start of a snapshot tick"""
+    return datetime.fromtimestamp(tick * tick_seconds, pytz.utc)
+
+
+def simulate_rows(index: SiteIndex, simulator: FleetSimulator, prices: Dict, tick: int, moment: datetime,
+                  rows: np.ndarray) -> Dict[str, np.ndarray]:
+    """Simulated usage, weather and economics for some sites, as columns aligned with rows"""
+    with stage("simulation"):
+        fleet = index.take(index.pack(), rows)
+        draws = simulator.tick_draws(tick, index.site_keys[rows], DRAW_STREAMS)
+        allocation = index.simulate_allocations(draws[:, :5], rows)
+        temperature = simulator.temperature_tick(moment, draws[:, 5], rows)
+
+    with stage("revenue"):
+        price_scale = fleet.energy_cost_multiplier * 0.001  # Scale down for realistic numbers
+        demand = fleet_demand_multipliers(fleet, now=moment, timestamp=moment.timestamp())
+        result = compute_fleet_revenue(fleet, allocation, prices, inference_scale=price_scale,
+                                       mining_scale=price_scale, demand_multiplier=demand)
+    low, high = UPTIME_RANGE
+    return {
+        "rows": rows,
+        "allocation": allocation,
+        "power_used": result.power_used,
+        "power_utilization": np.minimum(100, result.power_used / fleet.power_capacity * 100),
+        "revenue": result.revenue,
+        "temperature": temperature,
+        "uptime": low + draws[:, 6] * (high - low),
+        "efficiency_score": index.efficiency_scores(temperature, rows),
+    }
+
+
+def _utilization_mask(columns: Dict[str, np.ndarray], query: StatusQuery) -> np.ndarray:
+    utilization = columns["power_utilization"]
+    mask = np.ones(len(utilization), dtype=bool)
+    if query.min_utilization is not None:
+        mask &= utilization >= query.min_utilization
+    if query.max_utilization is not None:
+        mask &= utilization <= query.max_utilization
+    return mask
+
+
+def _take_columns(columns: Dict[str, np.ndarray], keep) -> Dict[str, np.ndarray]:
+    return {name: values[keep] for name, values in columns.items()}
+
+
+def select_rows(index: SiteIndex, query: StatusQuery) -> np.ndarray:
+    """Positions matching the static filters, after the cursor; raises ValueError for a stale cursor"""
+    rows = index.select(query.timezones, query.regions, query.cooling_types)
+    if query.after is not None:
+        if query.after not in index:
+            raise ValueError("cursor site no longer exists; restart from the first page")
+        rows = rows[rows > index.position[query.after]]
+    return rows
+
+
+def page_columns(index: SiteIndex, simulator: FleetSimulator, prices: Dict, tick: int, moment: datetime,
+                 rows: np.ndarray, query: StatusQuery) -> Tuple[Dict[str, np.ndarray], bool]:
+    """Columns for the sites served (at most one page), and whether more sites match"""
+    limit = (query.limit or DEFAULT_PAGE_SIZE) if query.paged else len(rows)
+    if not query.utilization_range:
+        return simulate_rows(index, simulator, prices, tick, moment, rows[:limit]), len(rows) > limit
+
+    # Utilization is simulated, so matches are found by scanning forward in chunks
+    step = SCAN_CHUNK if query.paged else max(len(rows), 1)
+    found, matched = [], 0
+    for start in range(0, len(rows), step):
+        chunk = simulate_rows(index, simulator, prices, tick, moment, rows[start:start + step])
+        chunk = _take_columns(chunk, _utilization_mask(chunk, query))
+        found.append(chunk)
+        matched += len(chunk["rows"])
+        if matched > limit:
+            break
+    if not found:
+        return simulate_rows(index, simulator, prices, tick, moment, rows[:0]), False
+    columns = {name: np.concatenate([chunk[name] for chunk in found]) for name in found[0]}
+    return _take_columns(columns, slice(0, limit)), matched > limit
+
+
+def fleet_metrics(index: SiteIndex, columns: Dict[str, np.ndarray]) -> Dict:
+    """Global metrics over the sites in columns"""
+    rows = columns["rows"]
+    if not len(rows):
+        return {}
+    total_power_used = int(columns["power_used"].astype(int).sum())
+    total_power_capacity = float(index.power_capacity[rows].sum())
+    hardware_totals = index.pack().available[rows].sum(axis=0)
+    return {
+        "total_power_used": total_power_used,
+        "total_power_capacity": total_power_capacity,
+        "global_utilization": (total_power_used / total_power_capacity) * 100 if total_power_capacity > 0 else 0,
+        "average_efficiency": float(columns["efficiency_score"].mean()),
+        "average_uptime": float(columns["uptime"].mean()),
+        "total_hardware": dict(zip(HARDWARE_TOTAL_KEYS, (int(units) for units in hardware_totals))),
+        "active_sites": len(rows)
+    }
+
+
+def compose_sites_status(index: SiteIndex, simulator: FleetSimulator, current_prices: Dict,
+                         tick: Optional[int] = None, tick_seconds: float = 10.0,
+                         query: Optional[StatusQuery] = None) -> Dict:
+    """Fleet status for the sites a query selects (every indexed site by default), at one snapshot tick"""
+    query = query or StatusQuery()
+    tick = int(time.time() // tick_seconds) if tick is None else tick
+    moment = tick_moment(tick, tick_seconds)
+    rows = select_rows(index, query)
+    fields = query.fields
+    if fields is None or query.utilization_range or SIMULATED_FIELDS.intersection(fields) or not query.paged:
+        columns, more = page_columns(index, simulator, current_prices, tick, moment, rows, query)
+    else:
+        # Only static fields on a plain page: nothing to simulate
+        limit = query.limit or DEFAULT_PAGE_SIZE
+        columns, more = {"rows": rows[:limit]}, len(rows) > limit
+    served = columns["rows"].tolist()
+    build_start = time.perf_counter()
+
+    local_times = {}
+    hash_price = current_prices.get("hash_price", 1.0)
+    token_price = current_prices.get("token_price", 1.0)
+    energy_price = current_prices.get("energy_price", 1.0)
+    last_updated = moment.astimezone().replace(tzinfo=None).isoformat()
+
+    def local_time(tz: str) -> str:
+        if tz not in local_times:
+            try:
+                local_times[tz] = moment.astimezone(get_timezone(tz)).strftime("%Y-%m-%d %H:%M:%S %Z")
+            except Exception:
+                local_times[tz] = moment.strftime("%Y-%m-%d %H:%M:%S UTC")
+        return local_times[tz]
+
+    simulated = "power_used" in columns
+    if simulated:
+        allocation = columns["allocation"]
+        power_used = columns["power_used"].astype(int).tolist()
+        utilization = columns["power_utilization"].tolist()
+        revenue = columns["revenue"].tolist()
+        temperature = columns["temperature"].tolist()
+        uptime = columns["uptime"].tolist()
+        efficiency = columns["efficiency_score"].tolist()
+
+    sites = []
+
+    # Nested JSON is built here, at the response boundary, only for the sites served
+    for i, row in enumerate(served):
+        site = index.records[row]
+        multiplier = site.energy_cost_multiplier
+        site_pricing = {
+            "hash_price": hash_price * multiplier,
+            "token_price": token_price * multiplier,
+            "energy_price": energy_price * multiplier
+        }
+        if fields is None:
+            weather = {"temperature": temperature[i], "base_temp": site.avg_temp, "conditions": "simulated"}
+            sites.append({
+                "site_id": site.site_id,
+                "id": site.site_id,
+                "name": site.name,
+                "location": site.location,
+                "timezone": site.timezone,
+
+                # Hardware inventory (actual available hardware)
+                "hardware_inventory": index.inventory_json(site.site_id),
+
+                # Current allocation
+                "allocation": unpack_allocation(allocation[i]),
+
+                # Power and capacity
+                "power_used": power_used[i],
+                "power_capacity": site.power_capacity,
+                "power_utilization": utilization[i],
+
+                # Environmental
+                "weather": weather,
+                "current_temp": temperature[i],  # Add current_temp for frontend compatibility
+                "local_time": local_time(site.timezone),  # Add local_time for frontend compatibility
+                "cooling_efficiency": site.cooling_efficiency,
+
+                # Economics
+                "pricing": site_pricing,
+                "energy_price": site_pricing["energy_price"],  # Add energy_price for frontend compatibility
+                "energy_cost_multiplier": multiplier,
+                "revenue": revenue[i],
+
+                # Performance metrics
+                "uptime": uptime[i],
+                "efficiency_score": efficiency[i],
+
+                "last_updated": last_updated
+            })
+            continue
+
+        entry = {}
+        for name in fields:
+            if name in ("site_id", "id"):
+                entry[name] = site.site_id
+            elif name in ("name", "location", "timezone", "power_capacity", "cooling_efficiency",
+                          "energy_cost_multiplier"):
+                entry[name] = getattr(site, name)
+            elif name == "hardware_inventory":
+                entry[name] = index.inventory_json(site.site_id)
+            elif name == "allocation":
+                entry[name] = unpack_allocation(allocation[i])
+            elif name == "power_used":
+                entry[name] = power_used[i]
+            elif name == "power_utilization":
+                entry[name] = utilization[i]
+            elif name == "weather":
+                entry[name] = {"temperature": temperature[i], "base_temp": site.avg_temp, "conditions": "simulated"}
+            elif name == "current_temp":
+                entry[name] = temperature[i]
+            elif name == "local_time":
+                entry[name] = local_time(site.timezone)
+            elif name == "pricing":
+                entry[name] = site_pricing
+            elif name == "energy_price":
+                entry[name] = site_pricing["energy_price"]
+            elif name == "revenue":
+                entry[name] = revenue[i]
+            elif name == "uptime":
+                entry[name] = uptime[i]
+            elif name == "efficiency_score":
+                entry[name] = efficiency[i]
+            elif name == "last_updated":
+                entry[name] = last_updated
+        sites.append(entry)
+
+    response = {"sites": sites}
+    if query.paged:
+        response.update({
+            "count": len(sites),
+            "limit": query.limit or DEFAULT_PAGE_SIZE,
+            "next_cursor": encode_cursor(index.site_ids[served[-1]]) if more and served else None,
+        })
+    else:
+        response.update({"total_sites": len(sites), "global_metrics": fleet_metrics(index, columns)})
+    response.update({"data_source": "dummy_data", "last_updated": last_updated})
+    observe_stage("response_build", time.perf_counter() - build_start)
+    return response
@@ -0,0 +1,215 @@
+"""
+Capacity-aware SLA placement for SLA-Smart Energy Arbitrage Platform
+
+Each tier keeps its eligible sites in tier-score order inside a max segment
+tree over remaining headroom (power capacity minus committed SLA power minus
+allocation draw). "Best-scoring site with at least X headroom" is one
+O(log sites) descent, and reservations, releases and draw updates are
+O(tiers * log sites). A request goes whole to the best site that can take it;
+otherwise it is split greedily by score when allowed. A request the eligible
+fleet can't hold is rejected and nothing is reserved.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import math
+
+# Placement rules per tier: minimum site cooling efficiency (our reliability
+# proxy) and how much cooling efficiency vs. energy cost weighs in the score
+TIER_POLICIES = {
+    "premium": {"min_cooling_efficiency": 0.8, "efficiency_weight": 0.8},
+    "standard": {"min_cooling_efficiency": 0.6, "efficiency_weight": 0.7},
+    "flexible": {"min_cooling_efficiency": 0.0, "efficiency_weight": 0.5},
+    "spot": {"min_cooling_efficiency": 0.0, "efficiency_weight": 0.2},
+}
+DEFAULT_POLICY = {"min_cooling_efficiency": 0.0, "efficiency_weight": 0.5}
+
+
+class PlacementRejected(Exception):
+    """Raised when the fleet cannot admit an SLA request"""
+
+    def __init__(self, message: str, available: float):
+        super().__init__(message)
+        self.available = available
+
+
+@dataclass
+class Placement:
+    """Where an admitted request was placed"""
+    tier: str
+    power_requirement: float
+    sites: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def primary_site(self) -> str:
+        return max(self.sites, key=self.sites.get)
+
+    @property
+    def split(self) -> bool:
+        return len(self.sites) > 1
+
+    def to_dict(self) -> Dict:
+        return {"tier": self.tier, "power_requirement": self.power_requirement,
+                "sites": dict(self.sites), "split": self.split}
+
+
+def tier_score(site_config: Dict, policy: Dict) -> float:
+    """Higher is better: cooling efficiency blended with cheap energy"""
+    weight = policy["efficiency_weight"]
+    return (site_config["climate"]["cooling_efficiency"] * weight +
+            (1 - site_config["energy_cost_multiplier"]) * (1 - weight))
+
+
+class _HeadroomTree:
+    """Max segment tree over per-site headroom, positions in tier-score order"""
+
+    def __init__(self, values: List[float]):
+        self.size = 1
+        while self.size < max(len(values), 1):
+            self.size *= 2
+        self.tree = [0.0] * (2 * self.size)
+        self.tree[self.size:self.size + len(values)] = values
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def update(self, position: int, value: float) -> None:
+        node = position + self.size
+        self.tree[node] = value
+        node //= 2
+        while node:
+            best = max(self.tree[2 * node], self.tree[2 * node + 1])
+            if self.tree[node] == best:
+                break
+            self.tree[node] = best
+            node //= 2
+
+    def first_at_least(self, threshold: float) -> int:
+        """Lowest position whose headroom is >= threshold, or -1"""
+        if self.tree[1] < threshold:
+            return -1
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.tree[2 * node] >= threshold else 2 * node + 1
+        return node - self.size
+
+
+class SLAPlacementEngine:
+    """Per-tier headroom trees over sites in score order, with admission control"""
+
+    def __init__(self, site_config: Dict[str, Dict], tiers: Optional[List[str]] = None,
+                 policies: Optional[Dict[str, Dict]] = None):
+        policies = policies or TIER_POLICIES
+        self.site_ids = list(site_config)
+        self.capacity = {site_id: float(config["power_capacity"]) for site_id, config in site_config.items()}
+        self.committed = {site_id: 0.0 for site_id in self.site_ids}
+        self.draw = {site_id: 0.0 for site_id in self.site_ids}
+        self._order: Dict[str, List[str]] = {}           # tier -> eligible sites, best score first
+        self._position: Dict[str, Dict[str, int]] = {}   # tier -> site -> position in _order
+        self._trees: Dict[str, _HeadroomTree] = {}
+        self._available: Dict[str, float] = {}
+        for tier in tiers or list(policies):
+            policy = policies.get(tier, DEFAULT_POLICY)
+            scores = {
+                site_id: tier_score(config, policy)
+                for site_id, config in site_config.items()
+                if config["climate"]["cooling_efficiency"] >= policy["min_cooling_efficiency"]
+            }
+            order = sorted(scores, key=lambda site_id: (-scores[site_id], site_id))
+            self._order[tier] = order
+            self._position[tier] = {site_id: i for i, site_id in enumerate(order)}
+        self._rebuild()
+        self.admitted = 0
+        self.rejected = 0
+
+    def headroom(self, site_id: str) -> float:
+        return max(0.0, self.capacity[site_id] - self.committed[site_id] - self.draw[site_id])
+
+    def available(self, tier: str) -> float:
+        """Total headroom on sites eligible for a tier"""
+        return max(0.0, self._available.get(tier, 0.0))
+
+    def place(self, tier: str, power_requirement: float, allow_split: bool = True) -> Placement:
+        """Reserve headroom for a request, or raise PlacementRejected without reserving anything"""
+        if tier not in self._trees:
+            raise PlacementRejected(f"No placement policy for tier {tier}", 0.0)
+        if power_requirement <= 0:
+            raise PlacementRejected("Power requirement must be positive", self.available(tier))
+        if self.available(tier) + 1e-9 < power_requirement:
+            raise self._reject(tier, power_requirement, "fleet lacks")
+
+        tree, order = self._trees[tier], self._order[tier]
+        position = tree.first_at_least(power_requirement)
+        if position >= 0:
+            site_id = order[position]
+            self._change(site_id, committed=self.committed[site_id] + power_requirement)
+            self.admitted += 1
+            return Placement(tier=tier, power_requirement=float(power_requirement), sites={site_id: float(power_requirement)})
+        if not allow_split:
+            raise self._reject(tier, power_requirement, "no single site has")
+
+        # Split greedily by score, in whole power units so the parts store exactly
+        plan, remaining = {}, float(power_requirement)
+        while remaining > 1e-9:
+            position = tree.first_at_least(1.0)
+            if position < 0:
+                for site_id, power in plan.items():
+                    self.release(site_id, power)
+                raise self._reject(tier, power_requirement, "fleet lacks")
+            site_id = order[position]
+            take = min(math.floor(self.headroom(site_id)), remaining)
+            plan[site_id] = take
+            remaining -= take
+            self._change(site_id, committed=self.committed[site_id] + take)
+        self.admitted += 1
+        return Placement(tier=tier, power_requirement=float(power_requirement), sites=plan)
+
+    def release(self, site_id: str, power: float) -> None:
+        """Return committed power to a site (commitment expired or cancelled)"""
+        if site_id in self.committed:
+            self._change(site_id, committed=max(0.0, self.committed[site_id] - power))
+
+    def set_committed(self, committed: Dict[str, float]) -> None:
+        """Replace committed SLA power per site, e.g. after loading from the database"""
+        for site_id in self.site_ids:
+            self.committed[site_id] = float(committed.get(site_id, 0.0))
+        self._rebuild()
+
+    def set_draw(self, draw: Dict[str, float]) -> None:
+        """Update allocation power draw for the given sites"""
+        for site_id, power in draw.items():
+            if site_id in self.draw:
+                self._change(site_id, draw=float(power))
+
+    def stats(self) -> Dict:
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "headroom": {site_id: self.headroom(site_id) for site_id in self.site_ids},
+            "available_by_tier": {tier: self.available(tier) for tier in self._trees}
+        }
+
+    def _reject(self, tier: str, power_requirement: float, reason: str) -> PlacementRejected:
+        self.rejected += 1
+        available = self.available(tier)
+        return PlacementRejected(
+            f"Cannot admit {tier} request for {power_requirement}: {reason} enough headroom "
+            f"({available:.0f} available on eligible sites)", available)
+
+    def _change(self, site_id: str, committed: Optional[float] = None, draw: Optional[float] = None) -> None:
+        """Apply a headroom change to every tier tree the site belongs to"""
+        before = self.headroom(site_id)
+        if committed is not None:
+            self.committed[site_id] = committed
+        if draw is not None:
+            self.draw[site_id] = draw
+        headroom = self.headroom(site_id)
+        for tier, positions in self._position.items():
+            position = positions.get(site_id)
+            if position is not None:
+                self._available[tier] += headroom - before
+                self._trees[tier].update(position, headroom)
+
+    def _rebuild(self) -> None:
+        for tier, order in self._order.items():
+            values = [self.headroom(site_id) for site_id in order]
+            self._trees[tier] = _HeadroomTree(values)
+            self._available[tier] = sum(values)
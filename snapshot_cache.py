@@ -0,0 +1,95 @@
+"""
+Time-bucketed fleet snapshot cache for SLA-Smart Energy Arbitrage Platform
+
+Dashboard readers poll the same fleet view; the snapshot is computed once per
+tick and shared by every concurrent reader. Concurrent misses for the same key
+wait on a single computation (single-flight) instead of each hitting the
+database.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FleetSnapshotCache:
+    """Per-key snapshot cache that expires at tick boundaries"""
+
+    def __init__(self, tick_seconds: float = 10.0, clock: Callable[[], float] = time.time):
+        self.tick_seconds = tick_seconds
+        self._clock = clock
+        self._entries: Dict[str, tuple] = {}        # key -> (bucket, generation, value)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Bumped by every invalidation"""
+        return self._generation
+
+    def current_bucket(self) -> int:
+        return int(self._clock() // self.tick_seconds)
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the snapshot for this tick, computing it at most once"""
+        bucket = self.current_bucket()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == bucket and entry[1] == self._generation:
+            self.hits += 1
+            return entry[2]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        # Compute in its own task so a disconnecting first caller can't strand the waiters
+        generation = self._generation
+        task = asyncio.get_running_loop().create_task(compute())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._store(key, bucket, generation, done))
+        return await asyncio.shield(task)
+
+    def _store(self, key: str, bucket: int, generation: int, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        # Don't store a value computed before an invalidation landed
+        if generation == self._generation:
+            self._entries[key] = (bucket, generation, task.result())
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Current snapshot without computing or counting, if still fresh"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == self.current_bucket() and entry[1] == self._generation:
+            return entry[2]
+        return None
+
+    def invalidate(self, reason: str = "") -> None:
+        """Drop all snapshots; in-flight computations finish but are not stored"""
+        self._generation += 1
+        self._entries.clear()
+        self._in_flight.clear()
+        self.invalidations += 1
+        if reason:
+            logger.debug("Fleet snapshot cache invalidated: %s", reason)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "tick_seconds": self.tick_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "keys": sorted(self._entries.keys())
+        }
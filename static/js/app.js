@@ -1,6 +1,8 @@
 // Global state
 let systemInitialized = false;
 let updateInterval = null;
+let dashboardStream = null;
+let dashboardState = null;
 let worldMap = null;
 let revenueChart = null;
 let efficiencyChart = null;
@@ -79,12 +81,20 @@ async function optimizeSystem() {
             throw new Error('Failed to optimize system');
         }
         
-        const data = await response.json();
+        // The optimization runs as a queued job; clicks while it runs join the same job
+        const job = await waitForOptimizationJob((await response.json()).job_id);
+        if (job.status !== 'completed') {
+            throw new Error(job.error || `optimization ${job.status}`);
+        }
+        const data = job.result;
         
-        // Update Claude reasoning
+        // Update Claude reasoning (streamed in once ready if not cached)
         const claudeElement = document.getElementById('claudeReasoning');
         if (claudeElement) {
             claudeElement.textContent = data.claude_reasoning || 'Optimization completed successfully';
+            if (data.reasoning_job_id && data.reasoning_status !== 'completed') {
+                streamClaudeReasoning(data.reasoning_job_id, claudeElement);
+            }
         }
         
         // Update metrics
@@ -111,6 +121,71 @@ async function optimizeSystem() {
     }
 }
 
+// Poll an optimization job until it finishes
+async function waitForOptimizationJob(jobId, interval = 1000) {
+    while (true) {
+        const response = await fetch(`${API_BASE}/api/optimize/jobs/${jobId}`);
+        if (!response.ok) {
+            throw new Error('Optimization job not found');
+        }
+        const job = await response.json();
+        if (job.status !== 'queued' && job.status !== 'running') {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
+// Stream Claude reasoning for an optimization run into an element
+function streamClaudeReasoning(jobId, element) {
+    const url = `${API_BASE}/api/optimize/reasoning/${jobId}`;
+    
+    if (!window.EventSource) {
+        pollClaudeReasoning(url, element);
+        return;
+    }
+    
+    const source = new EventSource(`${url}/stream`);
+    let started = false;
+    
+    source.onmessage = function(event) {
+        const chunk = JSON.parse(event.data);
+        element.textContent = (started ? element.textContent : '') + chunk.text;
+        started = true;
+    };
+    
+    source.addEventListener('done', function(event) {
+        const result = JSON.parse(event.data);
+        if (result.status === 'failed' && result.error) {
+            element.textContent = result.error;
+        }
+        source.close();
+    });
+    
+    source.onerror = function() {
+        source.close();
+        pollClaudeReasoning(url, element);
+    };
+}
+
+// Fallback when streaming is unavailable: poll the reasoning job until it finishes
+async function pollClaudeReasoning(url, element, attempts = 30) {
+    for (let i = 0; i < attempts; i++) {
+        try {
+            const response = await fetch(url);
+            if (!response.ok) return;
+            const job = await response.json();
+            if (job.status === 'completed' || job.status === 'failed') {
+                element.textContent = job.claude_reasoning || job.error;
+                return;
+            }
+        } catch (error) {
+            console.error('Reasoning poll error:', error);
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+}
+
 // Request SLA
 async function requestSLA() {
     const tier = document.getElementById('slaTypeSelect').value;
@@ -135,13 +210,19 @@ async function requestSLA() {
             })
         });
         
+        if (response.status === 409) {
+            const rejection = await response.json();
+            showNotification(`SLA ${tier} rejected: ${rejection.detail}`, 'error');
+            return;
+        }
         if (!response.ok) {
             throw new Error('Failed to request SLA');
         }
         
         const data = await response.json();
+        const sites = data.placements ? Object.keys(data.placements).join(', ') : data.optimal_site;
         
-        showNotification(`SLA ${tier} requested successfully! Allocated to ${data.optimal_site}`, 'success');
+        showNotification(`SLA ${tier} requested successfully! Allocated to ${sites}`, 'success');
         
         // Clear form
         document.getElementById('powerRequirement').value = '';
@@ -174,34 +255,115 @@ async function updateDashboard() {
             return;
         }
         
-        // Update global metrics
-        if (data.global_metrics) {
-            updateGlobalMetrics(data.global_metrics);
-        }
-        
-        // Update sites
-        if (data.sites) {
-            updateSites(data.sites);
-        }
-        
-        // Update SLA commitments
-        if (data.sla_commitments) {
-            updateSLACommitments(data.sla_commitments);
-        }
-        
-        // Update map
-        if (data.sites) {
-            updateMapMarkers(data.sites);
-        }
-        
-        // Update charts
-        updateCharts(data);
+        dashboardState = data;
+        renderDashboard(data);
         
     } catch (error) {
         console.error('Dashboard update error:', error);
     }
 }
 
+// Render a full dashboard payload
+function renderDashboard(data) {
+    // Update global metrics
+    if (data.global_metrics) {
+        updateGlobalMetrics(data.global_metrics);
+    }
+    
+    // Update sites
+    if (data.sites) {
+        updateSites(data.sites);
+    }
+    
+    // Update SLA commitments
+    if (data.sla_commitments) {
+        updateSLACommitments(data.sla_commitments);
+    }
+    
+    // Update map
+    if (data.sites) {
+        updateMapMarkers(data.sites);
+    }
+    
+    // Update charts
+    updateCharts(data);
+}
+
+// Recursively merge changed fields into an object; null removes a key
+function mergeDelta(target, changes) {
+    Object.entries(changes).forEach(([key, value]) => {
+        if (value === null) {
+            delete target[key];
+        } else if (typeof value === 'object' && !Array.isArray(value) &&
+                   target[key] && typeof target[key] === 'object' && !Array.isArray(target[key])) {
+            mergeDelta(target[key], value);
+        } else {
+            target[key] = value;
+        }
+    });
+    return target;
+}
+
+// Merge a pushed delta (changed fields per site plus changed sections) into the dashboard state
+function applyDashboardDelta(delta) {
+    if (!dashboardState) return;
+    
+    const sites = dashboardState.sites || [];
+    Object.entries(delta.sites || {}).forEach(([siteId, changes]) => {
+        const index = sites.findIndex(site => site.site_id === siteId);
+        if (changes === null) {
+            if (index >= 0) sites.splice(index, 1);
+        } else if (index >= 0) {
+            mergeDelta(sites[index], changes);
+        } else {
+            sites.push(changes);
+        }
+    });
+    dashboardState.sites = sites;
+    
+    ['global_metrics', 'sla_commitments', 'optimization_history', 'current_prices'].forEach(section => {
+        if (!(section in delta)) return;
+        const current = dashboardState[section];
+        if (delta[section] && typeof delta[section] === 'object' && !Array.isArray(delta[section]) &&
+            current && typeof current === 'object' && !Array.isArray(current)) {
+            mergeDelta(current, delta[section]);
+        } else {
+            dashboardState[section] = delta[section];
+        }
+    });
+}
+
+// Subscribe to server-pushed dashboard updates; returns false if streaming is unavailable
+function startDashboardStream() {
+    if (!window.EventSource) return false;
+    
+    dashboardStream = new EventSource(`${API_BASE}/api/stream/dashboard`);
+    
+    dashboardStream.addEventListener('snapshot', function(event) {
+        const data = JSON.parse(event.data);
+        if (data.error) return;
+        dashboardState = data;
+        renderDashboard(dashboardState);
+    });
+    
+    dashboardStream.addEventListener('delta', function(event) {
+        applyDashboardDelta(JSON.parse(event.data));
+        if (dashboardState) {
+            renderDashboard(dashboardState);
+        }
+    });
+    
+    dashboardStream.onerror = function() {
+        // The browser retries transient errors itself; fall back to polling once it gives up
+        if (dashboardStream.readyState === EventSource.CLOSED) {
+            dashboardStream = null;
+            startPolling();
+        }
+    };
+    
+    return true;
+}
+
 // Update global metrics
 function updateGlobalMetrics(metrics) {
     if (!metrics) return;
@@ -582,7 +744,14 @@ function showNotification(message, type = 'info') {
 }
 
 function startPeriodicUpdates() {
-    // Update dashboard every 30 seconds
+    // Prefer server push; poll every 30 seconds where streaming is unavailable
+    if (dashboardStream || startDashboardStream()) {
+        return;
+    }
+    startPolling();
+}
+
+function startPolling() {
     if (updateInterval) {
         clearInterval(updateInterval);
     }
@@ -594,4 +763,7 @@ window.addEventListener('beforeunload', function() {
     if (updateInterval) {
         clearInterval(updateInterval);
     }
+    if (dashboardStream) {
+        dashboardStream.close();
+    }
 }); 
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""Tests for the constrained allocation solver (allocation_solver.py)"""
+import numpy as np
+import pytest
+
+from allocation_solver import AllocationProblem, NumpyAllocationSolver, ScipyAllocationSolver, get_solver
+from revenue_engine import INFERENCE_MASK
+
+# Hardware classes: gpu, asic (inference), air, hydro, immersion (mining)
+UNIT_POWER = np.array([1000.0, 1500.0, 3000.0, 5000.0, 8000.0])
+# Mining earns more per kW, so firm SLA power is the only reason to run inference
+UNIT_VALUE = np.array([50.0, 60.0, 400.0, 700.0, 1200.0])
+
+
+def small_fleet(firm_sla_power=(12000.0, 0.0, 25000.0)) -> AllocationProblem:
+    return AllocationProblem(
+        site_ids=["site_a", "site_b", "site_c"],
+        value=np.tile(UNIT_VALUE, (3, 1)),
+        unit_power=np.tile(UNIT_POWER, (3, 1)),
+        available=np.array([[20, 10, 10, 10, 10], [5, 5, 4, 4, 4], [20, 10, 10, 10, 10]], dtype=float),
+        power_capacity=np.array([50000.0, 30000.0, 100000.0]),
+        firm_sla_power=np.array(firm_sla_power),
+    )
+
+
+def random_fleet(rng: np.random.Generator, sites: int = 40) -> AllocationProblem:
+    unit_power = rng.uniform(500, 8000, (sites, len(INFERENCE_MASK)))
+    available = rng.integers(0, 30, (sites, len(INFERENCE_MASK))).astype(float)
+    capacity = rng.uniform(0.2, 1.2, sites) * (unit_power * available).sum(axis=1)
+    reachable = np.minimum((unit_power * available * INFERENCE_MASK).sum(axis=1), capacity)
+    return AllocationProblem(
+        site_ids=[f"site_{i}" for i in range(sites)],
+        value=rng.uniform(-50, 1500, (sites, len(INFERENCE_MASK))),
+        unit_power=unit_power,
+        available=available,
+        power_capacity=capacity,
+        firm_sla_power=np.where(rng.random(sites) < 0.5, rng.uniform(0, 0.8, sites) * reachable, 0.0),
+    )
+
+
+@pytest.fixture(params=["numpy", "scipy"])
+def solver(request):
+    if request.param == "scipy":
+        pytest.importorskip("scipy.optimize")
+        return ScipyAllocationSolver()
+    return NumpyAllocationSolver()
+
+
+def inference_power(problem: AllocationProblem, allocation: np.ndarray) -> np.ndarray:
+    return (allocation * problem.unit_power * INFERENCE_MASK).sum(axis=1)
+
+
+def assert_within_bounds(problem: AllocationProblem, allocation: np.ndarray) -> None:
+    assert (allocation >= 0).all()
+    assert (allocation <= problem.available).all()
+    assert np.array_equal(allocation, np.round(allocation))
+    assert ((allocation * problem.unit_power).sum(axis=1) <= problem.power_capacity + 1e-6).all()
+
+
+def test_keeps_firm_sla_power_and_site_capacity(solver):
+    problem = small_fleet()
+    solution = solver.solve(problem)
+    assert_within_bounds(problem, solution.allocation)
+    assert (inference_power(problem, solution.allocation) >= problem.firm_sla_power - 1e-6).all()
+    assert solution.status in ("optimal", "feasible")
+    assert solution.infeasible_sites == []
+    assert solution.objective == pytest.approx((problem.value * solution.allocation).sum())
+
+
+def test_firm_sla_power_overrides_more_valuable_mining(solver):
+    # Left alone, inference only soaks up capacity mining can't use in whole units
+    unconstrained = solver.solve(small_fleet(firm_sla_power=(0.0, 0.0, 0.0)))
+    assert inference_power(small_fleet(), unconstrained.allocation)[0] < 12000
+
+    problem = small_fleet()
+    constrained = solver.solve(problem)
+    assert inference_power(problem, constrained.allocation)[0] >= 12000
+    assert constrained.objective <= unconstrained.objective
+
+
+def test_unreachable_firm_power_is_reported_not_overbuilt(solver):
+    # site_c's inference hardware tops out at 35 kW
+    problem = small_fleet(firm_sla_power=(12000.0, 0.0, 40000.0))
+    solution = solver.solve(problem)
+    assert_within_bounds(problem, solution.allocation)
+    assert solution.status == "infeasible"
+    assert solution.infeasible_sites == ["site_c"]
+    assert inference_power(problem, solution.allocation)[2] == pytest.approx(35000)
+
+
+def test_random_fleets_stay_within_bounds(solver):
+    rng = np.random.default_rng(11)
+    for _ in range(20):
+        problem = random_fleet(rng)
+        solution = solver.solve(problem)
+        assert_within_bounds(problem, solution.allocation)
+        short = inference_power(problem, solution.allocation) + 1e-6 < problem.firm_sla_power
+        assert solution.infeasible_sites == [problem.site_ids[i] for i in np.flatnonzero(short)]
+
+
+def test_integer_solution_never_beats_the_relaxation():
+    rng = np.random.default_rng(3)
+    solver = NumpyAllocationSolver()
+    for _ in range(10):
+        problem = random_fleet(rng)
+        relaxed = solver.solve(problem, integer=False)
+        integral = solver.solve(problem)
+        assert integral.objective <= relaxed.objective + 1e-6
+        assert ((relaxed.allocation * problem.unit_power).sum(axis=1) <= problem.power_capacity + 1e-6).all()
+
+
+def test_warm_start_keeps_an_equally_good_previous_allocation():
+    problem = small_fleet()
+    solver = NumpyAllocationSolver()
+    first = solver.solve(problem)
+    again = solver.solve(problem, warm_start=first.allocation.copy())
+    assert again.warm_started_sites == len(problem.site_ids)
+    assert np.array_equal(again.allocation, first.allocation)
+
+
+def test_warm_start_ignores_a_previous_allocation_that_no_longer_fits():
+    problem = small_fleet()
+    solver = NumpyAllocationSolver()
+    previous = solver.solve(problem).allocation
+    problem.power_capacity = problem.power_capacity / 2
+    solution = solver.solve(problem, warm_start=previous)
+    assert solution.warm_started_sites == 0
+    assert_within_bounds(problem, solution.allocation)
+
+
+def test_get_solver_falls_back_to_numpy():
+    with pytest.raises(ValueError):
+        get_solver("simplex")
+    assert get_solver("numpy").name == "numpy"
+    assert get_solver("scipy").name in ("scipy", "numpy")
@@ -0,0 +1,148 @@
+"""Tests for capacity-aware SLA placement (sla_placement.py)"""
+import random
+
+import pytest
+
+from sla_placement import TIER_POLICIES, PlacementRejected, SLAPlacementEngine, tier_score
+
+
+def site(capacity, cooling_efficiency, energy_cost_multiplier):
+    return {"power_capacity": capacity, "climate": {"cooling_efficiency": cooling_efficiency},
+            "energy_cost_multiplier": energy_cost_multiplier}
+
+
+# Two sites cool enough for premium, one only for flexible and spot
+SITES = {
+    "nordic": site(1000, 0.9, 0.8),
+    "iceland": site(500, 0.85, 0.5),
+    "texas": site(2000, 0.5, 0.3),
+}
+
+
+def best_site(tier, sites):
+    policy = TIER_POLICIES[tier]
+    return max(sites, key=lambda site_id: tier_score(SITES[site_id], policy))
+
+
+def test_whole_request_goes_to_best_scoring_site_with_room():
+    engine = SLAPlacementEngine(SITES)
+    placement = engine.place("premium", 400)
+    assert placement.sites == {best_site("premium", ["nordic", "iceland"]): 400}
+    assert not placement.split
+
+
+def test_placement_respects_per_tier_headroom():
+    engine = SLAPlacementEngine(SITES)
+    # Texas has 2000 spare but is not eligible for premium
+    assert engine.available("premium") == 1500
+    with pytest.raises(PlacementRejected) as rejected:
+        engine.place("premium", 1600)
+    assert rejected.value.available == 1500
+    assert engine.committed == {"nordic": 0.0, "iceland": 0.0, "texas": 0.0}
+    assert engine.rejected == 1
+
+    # The same request fits for flexible, which may use every site
+    engine.place("flexible", 1600)
+    assert engine.available("flexible") == pytest.approx(3500 - 1600)
+
+
+def test_committed_power_in_one_tier_reduces_every_tier_sharing_the_site():
+    engine = SLAPlacementEngine(SITES)
+    placement = engine.place("standard", 500, allow_split=False)
+    (site_id, power), = placement.sites.items()
+    assert engine.available("premium") == 1500 - power
+    assert engine.headroom(site_id) == SITES[site_id]["power_capacity"] - power
+
+
+def test_random_requests_never_overcommit_a_site():
+    engine = SLAPlacementEngine(SITES)
+    rng = random.Random(7)
+    for _ in range(500):
+        tier = rng.choice(list(TIER_POLICIES))
+        try:
+            placement = engine.place(tier, rng.randint(1, 400), allow_split=rng.random() < 0.5)
+        except PlacementRejected:
+            continue
+        assert sum(placement.sites.values()) == placement.power_requirement
+        if rng.random() < 0.3:
+            engine.release(placement.primary_site, placement.sites[placement.primary_site])
+    for site_id, config in SITES.items():
+        assert engine.committed[site_id] <= config["power_capacity"] + 1e-9
+    assert engine.available("flexible") == pytest.approx(sum(engine.headroom(site_id) for site_id in SITES))
+
+
+def test_split_request_uses_whole_units_across_sites():
+    engine = SLAPlacementEngine(SITES)
+    placement = engine.place("premium", 1200)
+    assert placement.split
+    assert set(placement.sites) == {"nordic", "iceland"}
+    assert all(power == int(power) for power in placement.sites.values())
+    assert sum(placement.sites.values()) == 1200
+
+
+def test_no_split_rejects_without_reserving():
+    engine = SLAPlacementEngine(SITES)
+    with pytest.raises(PlacementRejected):
+        engine.place("premium", 1200, allow_split=False)
+    assert engine.available("premium") == 1500
+    assert all(power == 0 for power in engine.committed.values())
+
+
+def test_failed_split_rolls_back_partial_reservations():
+    engine = SLAPlacementEngine(SITES)
+    # Leave 10.6 kW on each premium site: 21.2 kW in total, but only 20 whole units
+    engine.set_draw({"nordic": 989.4, "iceland": 489.4})
+    assert engine.available("premium") == pytest.approx(21.2)
+    before = dict(engine.committed)
+
+    with pytest.raises(PlacementRejected):
+        engine.place("premium", 21)
+    assert engine.committed == before
+    assert engine.available("premium") == pytest.approx(21.2)
+    assert engine.admitted == 0
+
+    # The fleet can still take what actually fits
+    assert sum(engine.place("premium", 20).sites.values()) == 20
+
+
+def test_release_restores_capacity():
+    engine = SLAPlacementEngine(SITES)
+    placements = [engine.place("premium", 300) for _ in range(5)]
+    assert engine.available("premium") == 0
+    with pytest.raises(PlacementRejected):
+        engine.place("premium", 1)
+
+    for placement in placements:
+        for site_id, power in placement.sites.items():
+            engine.release(site_id, power)
+    assert engine.available("premium") == 1500
+    assert engine.place("premium", 1000, allow_split=False).sites == {"nordic": 1000}
+
+
+def test_set_draw_moves_headroom_and_restores_it():
+    engine = SLAPlacementEngine(SITES)
+    engine.set_draw({"nordic": 900})
+    assert engine.headroom("nordic") == 100
+    assert engine.available("premium") == 600
+    with pytest.raises(PlacementRejected):
+        engine.place("premium", 700)
+
+    engine.set_draw({"nordic": 0})
+    assert engine.available("premium") == 1500
+    assert engine.place("premium", 700, allow_split=False).sites == {"nordic": 700}
+
+
+def test_set_committed_rebuilds_from_stored_commitments():
+    engine = SLAPlacementEngine(SITES)
+    engine.set_committed({"nordic": 1000, "texas": 500})
+    assert engine.available("premium") == 500
+    assert engine.available("spot") == 2000
+    assert engine.place("premium", 500).sites == {"iceland": 500}
+
+
+def test_invalid_requests_are_rejected():
+    engine = SLAPlacementEngine(SITES)
+    with pytest.raises(PlacementRejected):
+        engine.place("platinum", 10)
+    with pytest.raises(PlacementRejected):
+        engine.place("premium", 0)
@@ -0,0 +1,235 @@
+"""
+Follow-the-sun workload migration for SLA-Smart Energy Arbitrage Platform
+
+Inference workload (running gpu_compute / asic_compute units) is worth most
+where local business hours drive demand. Each planning step values one unit
+of workload at every site over a short lookahead window, net of the mining
+it displaces there, and moves units from the lowest-valued sites to the
+highest-valued ones that still have idle hardware and power, but only while
+the gain over the window beats the migration cost. The total workload is
+conserved; only its placement changes. The allocation solver sizes the
+inference hardware each site may run; the workload offered to it is a share
+of that, and the idle rest is the headroom the workload follows the sun into.
+
+With one value per site and hardware class, the best transfer is a two-
+pointer merge of donors (ascending value) against receivers (descending
+value), cut where the gain no longer covers the cost. It runs as cumulative
+sums and searchsorted over the whole fleet, and every move is one
+(source, target) pair, so a step emits at most donors + receivers - 1 moves.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import time
+
+import numpy as np
+
+from allocation_solver import build_allocation_problem
+from revenue_engine import ALLOCATION_KEYS, INFERENCE_MASK, FleetArrays, demand_multipliers_for_hours
+from simulation import _epoch_seconds, local_hour_grid
+
+INFERENCE_COLUMNS = np.flatnonzero(INFERENCE_MASK)
+DEFAULT_LOOKAHEAD_HOURS = 2.0
+# Samples of the demand curve per lookahead window
+LOOKAHEAD_SAMPLES = 8
+# A migrating unit earns nothing for this long
+DEFAULT_DOWNTIME_MINUTES = 10.0
+# Gains within this fraction of the largest value are ties, not worth a move
+GAIN_TOLERANCE = 1e-9
+
+
+def match_transfers(donor_key: np.ndarray, supply: np.ndarray, receiver_key: np.ndarray,
+                    demand: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Greedy transfer of units from low-key donors to high-key receivers while receiver_key > donor_key.
+
+    Optimal for a single commodity with per-site values and per-unit costs
+    folded into donor_key. Returns (donor sites, receiver sites, units, gain
+    per unit) for each move.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    donors = np.flatnonzero(supply > 0)
+    receivers = np.flatnonzero(demand > 0)
+    if not len(donors) or not len(receivers):
+        return empty, empty, np.zeros(0), np.zeros(0)
+    donors = donors[np.argsort(donor_key[donors], kind="stable")]
+    receivers = receivers[np.argsort(-receiver_key[receivers], kind="stable")]
+    supplied = np.cumsum(supply[donors])
+    demanded = np.cumsum(demand[receivers])
+    total = min(supplied[-1], demanded[-1])
+
+    # Segments of the merged unit line, each served by one donor and one receiver
+    ends = np.unique(np.concatenate([supplied, demanded]))
+    ends = ends[ends <= total]
+    starts = np.concatenate([[0.0], ends[:-1]])
+    donor_at = donors[np.searchsorted(supplied, starts, side="right")]
+    receiver_at = receivers[np.searchsorted(demanded, starts, side="right")]
+    gain = receiver_key[receiver_at] - donor_key[donor_at]
+    # Gains only fall along the merge; stop at the first move that does not pay
+    tie = GAIN_TOLERANCE * max(np.abs(donor_key[donors]).max(), np.abs(receiver_key[receivers]).max())
+    unprofitable = gain <= tie
+    worthwhile = int(np.argmax(unprofitable)) if unprofitable.any() else len(gain)
+    return donor_at[:worthwhile], receiver_at[:worthwhile], (ends - starts)[:worthwhile], gain[:worthwhile]
+
+
+def lookahead_demand(fleet: FleetArrays, now: datetime, hours: float,
+                     samples: int = LOOKAHEAD_SAMPLES) -> np.ndarray:
+    """(S,) mean demand multiplier of each site over the next `hours`"""
+    start = _epoch_seconds(now)
+    timestamps = start + np.arange(samples) * (hours * 3600 / samples)
+    local = local_hour_grid(fleet.timezones, timestamps)[fleet.tz_index]
+    return demand_multipliers_for_hours(local, timestamps).mean(axis=1)
+
+
+def workload_values(fleet: FleetArrays, prices: Dict, demand: np.ndarray) -> np.ndarray:
+    """(S, H) value per unit and hour net of displaced mining, for the inference columns.
+
+    An inference unit's power would otherwise run the site's best miner, so
+    its value is its own net value minus that miner's value per watt.
+    """
+    value = build_allocation_problem(fleet, prices, demand).value
+    power = np.where(fleet.unit_power > 0, fleet.unit_power, np.inf)
+    mining = np.where(~INFERENCE_MASK[None, :] & (fleet.available > 0), value / power, 0.0)
+    displaced = np.clip(mining.max(axis=1), 0.0, None)
+    return value - fleet.unit_power * displaced[:, None]
+
+
+@dataclass
+class MigrationStep:
+    """Moves planned for one step, and the resulting inference placement"""
+    at: datetime
+    moves: List[Dict]
+    placement: np.ndarray          # (S, H) inference units per site after the moves
+    stats: Dict = field(default_factory=dict)
+
+
+class MigrationEngine:
+    """Keeps the inference placement and moves it with local business hours.
+
+    `seed` sets the placement (the latest optimization's allocation); `step`
+    plans and applies one step's moves.
+    """
+
+    def __init__(self, lookahead_hours: float = DEFAULT_LOOKAHEAD_HOURS,
+                 downtime_minutes: float = DEFAULT_DOWNTIME_MINUTES, cost_per_unit: float = 0.0,
+                 workload_share: float = 1.0):
+        self.lookahead_hours = lookahead_hours
+        self.downtime_minutes = downtime_minutes
+        self.cost_per_unit = cost_per_unit
+        self.workload_share = workload_share
+        self.site_ids: List[str] = []
+        self.placement: Optional[np.ndarray] = None
+        self.last_step: Optional[MigrationStep] = None
+        self.total_moves = 0
+        self.total_units = 0
+
+    @property
+    def seeded(self) -> bool:
+        return self.placement is not None
+
+    def seed(self, site_ids: Sequence[str], allocation: np.ndarray) -> None:
+        """Place workload_share of the inference units of an (S, H) allocation where they run now"""
+        self.site_ids = list(site_ids)
+        units = np.floor(np.asarray(allocation, dtype=float) * self.workload_share + 1e-9)
+        self.placement = np.where(INFERENCE_MASK[None, :], units, 0.0)
+
+    def aligned(self, fleet: FleetArrays) -> np.ndarray:
+        """Current placement in fleet order: removed sites' workload is dropped, new sites start empty"""
+        if self.site_ids == fleet.site_ids:
+            return np.minimum(self.placement, fleet.available)
+        positions = {site_id: i for i, site_id in enumerate(self.site_ids)}
+        placement = np.zeros(fleet.unit_power.shape)
+        for s, site_id in enumerate(fleet.site_ids):
+            i = positions.get(site_id)
+            if i is not None:
+                placement[s] = self.placement[i]
+        return np.minimum(placement, fleet.available)
+
+    def plan(self, fleet: FleetArrays, placement: np.ndarray, prices: Dict, firm_sla_power: np.ndarray,
+             now: datetime) -> MigrationStep:
+        """Moves for one step from `placement`, without changing the engine's state"""
+        start = time.perf_counter()
+        current = workload_values(fleet, prices, lookahead_demand(fleet, now, 0.0, 1))
+        window = workload_values(fleet, prices, lookahead_demand(fleet, now, self.lookahead_hours)) \
+            * self.lookahead_hours
+        # A move forfeits the unit's current value while it is down, plus any fixed cost
+        cost = np.clip(current, 0.0, None) * self.downtime_minutes / 60 + self.cost_per_unit
+
+        placement = placement.copy()
+        unit_power = fleet.unit_power
+        inference_power = (placement * unit_power).sum(axis=1)
+        moves = []
+        for h in INFERENCE_COLUMNS.tolist():
+            power = np.where(unit_power[:, h] > 0, unit_power[:, h], np.inf)
+            # Donors keep enough inference power for their firm SLAs; receivers need idle units and power
+            supply = np.clip(np.floor((inference_power - firm_sla_power) / power + 1e-9), 0, placement[:, h])
+            room = np.floor((fleet.power_capacity - inference_power) / power + 1e-9)
+            demand = np.clip(np.minimum(fleet.available[:, h] - placement[:, h], room), 0, None)
+            sources, targets, units, gain = match_transfers(window[:, h] + cost[:, h], supply, window[:, h], demand)
+            np.subtract.at(placement[:, h], sources, units)
+            np.add.at(placement[:, h], targets, units)
+            inference_power += np.bincount(targets, units * unit_power[targets, h], fleet.size) \
+                - np.bincount(sources, units * unit_power[sources, h], fleet.size)
+            for source, target, count, per_unit in zip(sources.tolist(), targets.tolist(), units.tolist(),
+                                                       gain.tolist()):
+                moves.append({
+                    "hardware": ALLOCATION_KEYS[h],
+                    "source_site": fleet.site_ids[source],
+                    "target_site": fleet.site_ids[target],
+                    "source_timezone": fleet.timezones[fleet.tz_index[source]],
+                    "target_timezone": fleet.timezones[fleet.tz_index[target]],
+                    "units": int(count),
+                    "gain": float(per_unit * count),
+                })
+
+        return MigrationStep(at=now, moves=moves, placement=placement, stats={
+            "sites": fleet.size,
+            "move_count": len(moves),
+            "units_moved": int(sum(move["units"] for move in moves)),
+            "gain": float(sum(move["gain"] for move in moves)),
+            "plan_ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+
+    def step(self, fleet: FleetArrays, prices: Dict, firm_sla_power: np.ndarray,
+             now: Optional[datetime] = None) -> MigrationStep:
+        """Plan and apply one step from the current placement"""
+        if not self.seeded:
+            raise ValueError("Migration engine has no placement; seed it from an allocation first")
+        result = self.plan(fleet, self.aligned(fleet), prices, firm_sla_power, now or datetime.utcnow())
+        self.site_ids = list(fleet.site_ids)
+        self.placement = result.placement
+        self.last_step = result
+        self.total_moves += result.stats["move_count"]
+        self.total_units += result.stats["units_moved"]
+        return result
+
+    def preview(self, fleet: FleetArrays, prices: Dict, firm_sla_power: np.ndarray, start: datetime,
+                steps: int, step_seconds: float) -> List[MigrationStep]:
+        """Steps a run would take from the current placement over the coming hours, without applying them"""
+        placement = self.aligned(fleet)
+        results = []
+        for i in range(steps):
+            at = start + timedelta(seconds=i * step_seconds)
+            result = self.plan(fleet, placement, prices, firm_sla_power, at)
+            placement = result.placement
+            results.append(result)
+        return results
+
+    def placement_by_site(self, site_id: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Inference units per site (or one site), in the allocation dict shape"""
+        return {
+            placed_site: {ALLOCATION_KEYS[h]: int(row[h]) for h in INFERENCE_COLUMNS.tolist()}
+            for placed_site, row in zip(self.site_ids, self.placement)
+            if site_id is None or placed_site == site_id
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "seeded": self.seeded,
+            "lookahead_hours": self.lookahead_hours,
+            "downtime_minutes": self.downtime_minutes,
+            "cost_per_unit": self.cost_per_unit,
+            "workload_share": self.workload_share,
+            "total_moves": self.total_moves,
+            "total_units_moved": self.total_units,
+            "last_step": {"at": self.last_step.at.isoformat(), **self.last_step.stats} if self.last_step else None,
+        }